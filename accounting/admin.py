@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.db import transaction
 from django.utils.translation import gettext_lazy as _
 from .models import (
     AccountingClass,
@@ -9,7 +10,11 @@ from .models import (
     AccountingType,
     AccountingJournal,
     AccountingEntry,
-    AccountingEntryLine
+    AccountingEntryLine,
+    EDITABLE_ENTRY_STATUSES,
+    AccountBalanceSnapshot,
+    AnalyticalAggregate,
+    FiscalYearReportArchive
 )
 from .models.reference_data import (
     ClientAccountType,
@@ -22,6 +27,7 @@ from .models.reference_data import (
     PayerType,
     Municipality
 )
+from .utils.ledger_balances import bump_ledger_version, post_entry
 
 
 class AccountingChapterInline(admin.TabularInline):
@@ -116,6 +122,16 @@ class AccountingEntryLineInline(admin.TabularInline):
     extra = 0
     fields = ('line_number', 'account', 'is_debit', 'amount', 'description', 'auxiliary_account_type', 'auxiliary_account_id')
     readonly_fields = ('line_number',)
+    
+    # The lines of posted and cancelled entries are read-only
+    def has_add_permission(self, request, obj=None):
+        return (obj is None or obj.is_editable) and super().has_add_permission(request, obj)
+    
+    def has_change_permission(self, request, obj=None):
+        return (obj is None or obj.is_editable) and super().has_change_permission(request, obj)
+    
+    def has_delete_permission(self, request, obj=None):
+        return (obj is None or obj.is_editable) and super().has_delete_permission(request, obj)
 
 
 @admin.register(AccountingEntry)
@@ -124,6 +140,7 @@ class AccountingEntryAdmin(admin.ModelAdmin):
     list_filter = ('status', 'journal', 'fiscal_year', 'entry_date', 'is_opening_balance', 'is_closing_entry', 'is_reversing_entry')
     search_fields = ('entry_number', 'reference', 'source_document', 'source_document_id')
     readonly_fields = ('created_at', 'updated_at', 'total_debit', 'total_credit', 'is_balanced')
+    list_select_related = ('journal', 'fiscal_year')
     inlines = [AccountingEntryLineInline]
     fieldsets = (
         (None, {
@@ -142,6 +159,39 @@ class AccountingEntryAdmin(admin.ModelAdmin):
     )
     actions = ['validate_entries', 'post_to_ledger', 'cancel_entries']
     
+    def get_readonly_fields(self, request, obj=None):
+        # The status only changes through the actions, which keep the balances in step;
+        # posted and cancelled entries are corrected with a reversing entry
+        if obj is not None and not obj.is_editable:
+            return [field.name for field in self.model._meta.fields] + list(self.readonly_fields)
+        return list(self.readonly_fields) + ['status', 'posting_date']
+    
+    def has_delete_permission(self, request, obj=None):
+        return (obj is None or obj.is_editable) and super().has_delete_permission(request, obj)
+    
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            super().delete_model(request, obj)
+            bump_ledger_version(obj.fiscal_year_id)
+    
+    def delete_queryset(self, request, queryset):
+        queryset = queryset.filter(status__in=EDITABLE_ENTRY_STATUSES)
+        with transaction.atomic():
+            fiscal_year_ids = set(queryset.values_list('fiscal_year_id', flat=True))
+            super().delete_queryset(request, queryset)
+            bump_ledger_version(*fiscal_year_ids)
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change and 'fiscal_year' in form.changed_data:
+            bump_ledger_version(form.initial['fiscal_year'])
+    
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Lines may have been edited through the inline: refresh the stored totals
+        form.instance.update_totals()
+        bump_ledger_version(form.instance.fiscal_year_id)
+    
     def validate_entries(self, request, queryset):
         for entry in queryset.filter(status='draft'):
             if entry.is_balanced:
@@ -152,18 +202,56 @@ class AccountingEntryAdmin(admin.ModelAdmin):
     def post_to_ledger(self, request, queryset):
         for entry in queryset.filter(status='validated'):
             if entry.is_balanced:
-                entry.status = 'posted'
-                entry.posting_date = timezone.now().date()
-                entry.save()
+                try:
+                    post_entry(entry)
+                except ValueError:
+                    # Posted by someone else since the selection was read
+                    continue
     post_to_ledger.short_description = _("Post selected entries to ledger")
     
     def cancel_entries(self, request, queryset):
-        for entry in queryset.filter(status__in=['draft', 'validated']):
-            entry.status = 'cancelled'
-            entry.save()
+        with transaction.atomic():
+            for entry in queryset.filter(status__in=EDITABLE_ENTRY_STATUSES):
+                entry.status = 'cancelled'
+                entry.save()
+                bump_ledger_version(entry.fiscal_year_id)
     cancel_entries.short_description = _("Cancel selected entries")
 
 
+@admin.register(AccountBalanceSnapshot)
+class AccountBalanceSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('account', 'fiscal_year', 'journal', 'period', 'debit_total', 'credit_total', 'updated_at')
+    list_filter = ('fiscal_year', 'journal', 'period')
+    search_fields = ('account__account_number',)
+    list_select_related = ('account', 'fiscal_year', 'journal')
+    readonly_fields = ('account', 'fiscal_year', 'journal', 'period', 'debit_total', 'credit_total', 'created_at', 'updated_at')
+
+
+@admin.register(AnalyticalAggregate)
+class AnalyticalAggregateAdmin(admin.ModelAdmin):
+    list_display = (
+        'fiscal_year', 'journal', 'analytical_code', 'activity', 'service_type', 'municipality',
+        'debit_total', 'credit_total', 'updated_at'
+    )
+    list_filter = ('fiscal_year', 'journal', 'activity', 'service_type')
+    search_fields = ('analytical_code', 'municipality__name')
+    list_select_related = ('fiscal_year', 'journal', 'activity', 'service_type', 'municipality')
+    readonly_fields = (
+        'fiscal_year', 'journal', 'analytical_code', 'activity', 'service_type', 'municipality',
+        'payer_type', 'pricing_type', 'debit_total', 'credit_total', 'created_at', 'updated_at'
+    )
+
+
+@admin.register(FiscalYearReportArchive)
+class FiscalYearReportArchiveAdmin(admin.ModelAdmin):
+    list_display = ('fiscal_year', 'report', 'key', 'ledger_version', 'size', 'created_at')
+    list_filter = ('fiscal_year', 'report')
+    search_fields = ('key',)
+    list_select_related = ('fiscal_year',)
+    exclude = ('content',)
+    readonly_fields = ('fiscal_year', 'report', 'key', 'ledger_version', 'size', 'created_at', 'updated_at')
+
+
 # Reference data admin classes
 @admin.register(ClientAccountType)
 class ClientAccountTypeAdmin(admin.ModelAdmin):
@@ -8,5 +8,5 @@ class AccountingConfig(AppConfig):
     
     def ready(self):
         # Import signals if you have any
-        # import accounting.signals
-        pass
+        import accounting.signals
+        import accounting.checks
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, Tags, register
+
+# Cache backends private to a process: a stamp set there is never seen by the other workers
+PROCESS_LOCAL_CACHES = (LocMemCache, DummyCache)
+
+
+@register(Tags.caches)
+def check_reference_data_cache(app_configs, **kwargs):
+    """Check that the cache carrying the reference data and municipality index stamps is shared between processes."""
+    alias = getattr(settings, 'ACCOUNTING_REFERENCE_DATA_CACHE', 'default')
+    if alias not in settings.CACHES:
+        return [Error(
+            f"ACCOUNTING_REFERENCE_DATA_CACHE refers to the unknown cache alias '{alias}'.",
+            id='accounting.E001',
+        )]
+    if isinstance(caches[alias], PROCESS_LOCAL_CACHES):
+        return [Error(
+            f"The '{alias}' cache ({settings.CACHES[alias]['BACKEND']}) is private to each process, so workers "
+            "never see the reference data and municipality changes made by the others.",
+            hint="Point ACCOUNTING_REFERENCE_DATA_CACHE to a database, file or other shared cache backend.",
+            id='accounting.E002',
+        )]
+    return []
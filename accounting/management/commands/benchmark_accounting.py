@@ -0,0 +1,425 @@
+import random
+import statistics
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import CharField, Count, F, Q
+from django.db.models.functions import Cast
+from accounting.models import (
+    FiscalYear,
+    AccountingJournal,
+    GeneralLedgerAccount,
+    AccountingEntry,
+    AccountingEntryLine
+)
+from accounting.utils.financial_statements import (
+    account_balance_rows,
+    calculate_account_balance,
+    calculate_account_balances,
+    generate_trial_balance
+)
+from accounting.models.reference_data import Municipality
+from accounting.utils.account_statement import account_statement
+from accounting.utils.auxiliary_ledger import auxiliary_balance_rows
+from accounting.utils.lettrage import match_open_lines, reconcile_account
+from accounting.utils.ledger_balances import rebuild_balance_snapshots
+from accounting.utils.csv_import import open_csv
+from accounting.utils.municipality_index import build_municipality_index, normalize_code
+from accounting.utils.entry_lines import create_entry_lines
+from accounting.serializers import AccountingEntryCreateUpdateSerializer
+
+
+class _Rollback(Exception):
+    """Raised to roll back the benchmark data once measurements are done."""
+
+
+class Command(BaseCommand):
+    help = 'Benchmark accounting engines on a generated ledger (rolled back by default)'
+
+    scenarios = {
+        'trial_balance': '_bench_trial_balance',
+        'entry_lines': '_bench_entry_lines',
+        'account_balances': '_bench_account_balances',
+        'account_statement': '_bench_account_statement',
+        'auxiliary_balances': '_bench_auxiliary_balances',
+        'lettrage': '_bench_lettrage',
+        'municipality_autocomplete': '_bench_municipality_autocomplete',
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenario', choices=sorted(self.scenarios), help='Benchmark scenario to run')
+        parser.add_argument('--lines', type=int, default=1_000_000, help='Number of ledger lines to generate')
+        parser.add_argument('--accounts', type=int, default=500, help='Number of accounts in the generated chart')
+        parser.add_argument('--lines-per-entry', type=int, default=10, help='Number of lines per generated entry')
+        parser.add_argument('--third-parties', type=int, default=100_000, help='Number of auxiliary accounts')
+        parser.add_argument('--queries', type=int, default=1000, help='Number of autocomplete queries to time')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for the generated ledger')
+        parser.add_argument('--keep', action='store_true', help='Keep the generated data instead of rolling it back')
+
+    def handle(self, *args, **options):
+        self.options = options
+        random.seed(options['seed'])
+        # Query logging under DEBUG formats every parameter and dominates bulk timings
+        settings.DEBUG = False
+
+        try:
+            with transaction.atomic():
+                getattr(self, self.scenarios[options['scenario']])()
+                if not options['keep']:
+                    raise _Rollback()
+        except _Rollback:
+            self.stdout.write(self.style.NOTICE('Benchmark data rolled back.'))
+
+    def _timed(self, label, func, *args, **kwargs):
+        """Run func once, print its wall-clock time and number of queries, and return its result and time."""
+        queries = []
+
+        def count_query(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_query):
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            elapsed = time.perf_counter() - start
+        self.stdout.write(f'{label:<40} {elapsed:>10.3f} s  ({len(queries)} queries)')
+        return result, elapsed
+
+    def _generate_chart(self):
+        """
+        Generate a dedicated fiscal year, journal and chart of accounts.
+
+        Returns:
+            tuple: (fiscal_year, journal, accounts)
+        """
+        year = (FiscalYear.objects.order_by('-year').values_list('year', flat=True).first() or 2000) + 1
+        fiscal_year = FiscalYear.objects.create(
+            year=year,
+            name=f'BENCHMARK {year}',
+            start_date=date(year, 1, 1),
+            end_date=date(year, 12, 31)
+        )
+        journal, _ = AccountingJournal.objects.get_or_create(
+            id_journal='BENCH',
+            defaults={'code': 'BEN', 'short_name': 'BENCH', 'name': 'Benchmark journal'}
+        )
+
+        numbers = [f'{1 + i % 7}9{i // 7:04d}' for i in range(self.options['accounts'])]
+        GeneralLedgerAccount.objects.bulk_create(
+            [GeneralLedgerAccount(account_number=n, short_name=n, full_name=f'Benchmark {n}') for n in numbers],
+            ignore_conflicts=True
+        )
+        accounts = list(GeneralLedgerAccount.objects.filter(account_number__in=numbers))
+        return fiscal_year, journal, accounts
+
+    def _generate_ledger(self):
+        """
+        Generate a posted ledger in a dedicated fiscal year and journal.
+
+        Returns:
+            tuple: (fiscal_year, journal, accounts)
+        """
+        total_lines = self.options['lines']
+        lines_per_entry = max(2, self.options['lines_per_entry'])
+        fiscal_year, journal, accounts = self._generate_chart()
+        year = fiscal_year.year
+
+        self.stdout.write(f'Generating {total_lines} lines on {len(accounts)} accounts...')
+        start = time.perf_counter()
+
+        # (line count, amount) of each entry; odd line numbers are debits
+        layout = [
+            (min(lines_per_entry, total_lines - start_line), Decimal(random.randint(100, 1_000_000)) / 100)
+            for start_line in range(0, total_lines, lines_per_entry)
+        ]
+        entries = AccountingEntry.objects.bulk_create(
+            [
+                AccountingEntry(
+                    entry_number=f'BENCH-{year}-{i:08d}',
+                    journal=journal,
+                    fiscal_year=fiscal_year,
+                    entry_date=fiscal_year.start_date + timedelta(days=i % 365),
+                    status='posted',
+                    total_debit=amount * ((size + 1) // 2),
+                    total_credit=amount * (size // 2)
+                )
+                for i, (size, amount) in enumerate(layout)
+            ],
+            batch_size=5000
+        )
+        if entries and entries[0].pk is None:
+            entries = list(AccountingEntry.objects.filter(fiscal_year=fiscal_year).order_by('entry_number'))
+
+        batch = []
+        for entry, (size, amount) in zip(entries, layout):
+            for line_number in range(1, size + 1):
+                batch.append(AccountingEntryLine(
+                    entry=entry,
+                    account=random.choice(accounts),
+                    line_number=line_number,
+                    is_debit=line_number % 2 == 1,
+                    amount=amount
+                ))
+            if len(batch) >= 10000:
+                AccountingEntryLine.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            AccountingEntryLine.objects.bulk_create(batch)
+
+        # Lines were inserted as posted directly, so materialize their balances
+        rebuild_balance_snapshots(fiscal_year)
+
+        self.stdout.write(f'Ledger generated in {time.perf_counter() - start:.1f} s')
+        return fiscal_year, journal, accounts
+
+    def _bench_trial_balance(self):
+        """Compare the per-account trial balance loop with the single grouped aggregate."""
+        fiscal_year, _, _ = self._generate_ledger()
+
+        def legacy_trial_balance():
+            balances = {}
+            for account in GeneralLedgerAccount.objects.all().order_by('account_number'):
+                balance = calculate_account_balance(account, fiscal_year)
+                if balance != Decimal('0.00'):
+                    balances[account.account_number] = balance
+            return balances
+
+        legacy, legacy_time = self._timed('per-account loop', legacy_trial_balance)
+        from_lines, _ = self._timed(
+            'grouped aggregate over lines', calculate_account_balances, fiscal_year, use_snapshots=False
+        )
+        report, grouped_time = self._timed('trial balance from snapshots', generate_trial_balance, fiscal_year)
+
+        grouped = {row['account_number']: row['debit'] - row['credit'] for row in report['accounts']}
+        numbers = dict(GeneralLedgerAccount.objects.values_list('id', 'account_number'))
+        if grouped != legacy or {numbers[pk]: b for pk, b in from_lines.items() if b} != legacy:
+            raise CommandError('Grouped trial balance does not match the per-account computation')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Results match on {len(grouped)} accounts; speedup x{legacy_time / max(grouped_time, 1e-9):.1f}'
+        ))
+
+    def _bench_entry_lines(self):
+        """Measure the line write throughput of the entry write paths, in lines per second."""
+        fiscal_year, journal, accounts = self._generate_chart()
+        line_count = self.options['lines']
+
+        def new_entry(number):
+            return AccountingEntry.objects.create(
+                entry_number=number, journal=journal, fiscal_year=fiscal_year, entry_date=fiscal_year.start_date
+            )
+
+        lines_data = [
+            {
+                'account_id': accounts[i % len(accounts)].pk,
+                'is_debit': i % 2 == 0,
+                'amount': Decimal(100 + (i // 2) % 50) / 100,
+                'description': f'Line {i}'
+            }
+            for i in range(line_count)
+        ]
+
+        def legacy_create(entry):
+            for i, line_data in enumerate(lines_data):
+                AccountingEntryLine.objects.create(entry=entry, line_number=i + 1, **line_data)
+
+        def serializer_save(data, instance=None):
+            serializer = AccountingEntryCreateUpdateSerializer(instance, data=data)
+            serializer.is_valid(raise_exception=True)
+            return serializer.save()
+
+        payload = {
+            'entry_number': 'BENCH-API',
+            'journal': journal.pk,
+            'fiscal_year': fiscal_year.pk,
+            'entry_date': str(fiscal_year.start_date),
+            'lines': [
+                {
+                    'account': line['account_id'],
+                    'is_debit': line['is_debit'],
+                    'amount': str(line['amount']),
+                    'description': line['description']
+                }
+                for line in lines_data
+            ]
+        }
+
+        timings = []
+        _, elapsed = self._timed('per-line create', legacy_create, new_entry('BENCH-LEGACY'))
+        timings.append(('per-line create', elapsed))
+        _, elapsed = self._timed('batched create', create_entry_lines, new_entry('BENCH-BATCH'), lines_data)
+        timings.append(('batched create', elapsed))
+        entry, elapsed = self._timed('serializer create (with validation)', serializer_save, payload)
+        timings.append(('serializer create', elapsed))
+
+        # Change the amounts of the last tenth of the lines only
+        for line in payload['lines'][-max(1, line_count // 10):]:
+            line['amount'] = str(Decimal(line['amount']) + 1)
+        _, elapsed = self._timed('serializer update (10% changed)', serializer_save, payload, entry)
+        timings.append(('serializer update', elapsed))
+
+        for label, elapsed in timings:
+            self.stdout.write(f'{label:<40} {line_count / max(elapsed, 1e-9):>10.0f} lines/s')
+        if entry.lines.count() != line_count:
+            raise CommandError('Entry line count does not match the payload')
+
+    def _bench_account_balances(self):
+        """Compare one account_balance call per account with the batched account_balances lookup."""
+        fiscal_year, _, accounts = self._generate_ledger()
+        numbers = sorted(account.account_number for account in accounts)
+        as_of_date = fiscal_year.start_date + timedelta(days=200)
+
+        for count in sorted({10, len(numbers) // 10, len(numbers)} - {0}):
+            selected = numbers[:count]
+            self._timed(
+                f'per-account calls ({count} accounts)',
+                lambda: [calculate_account_balance(number, fiscal_year, as_of_date) for number in selected]
+            )
+            self._timed(
+                f'batched lookup ({count} accounts)',
+                lambda: list(account_balance_rows(selected, fiscal_year, as_of_date))
+            )
+        self._timed('batched lookup (all, by prefixes)', lambda: list(account_balance_rows(
+            [f'{digit}*' for digit in range(1, 8)], fiscal_year, as_of_date
+        )))
+
+    def _bench_account_statement(self):
+        """Compare the window-function and Python running balances on the busiest account."""
+        fiscal_year, _, _ = self._generate_ledger()
+        account = GeneralLedgerAccount.objects.get(pk=AccountingEntryLine.objects.filter(
+            entry__fiscal_year=fiscal_year
+        ).values('account').annotate(n=Count('id')).order_by('-n').values_list('account', flat=True)[:1])
+        line_count = account.entry_lines.filter(entry__fiscal_year=fiscal_year).count()
+        self.stdout.write(f'Account {account.account_number}: {line_count} lines')
+
+        def last_row(use_window):
+            row = None
+            for row in account_statement(account, fiscal_year, use_window=use_window):
+                pass
+            return row
+
+        results = []
+        modes = [False]
+        if connection.features.supports_over_clause:
+            modes.insert(0, True)
+        for use_window in modes:
+            label = 'window function' if use_window else 'python running sum'
+            row, elapsed = self._timed(label, last_row, use_window)
+            self.stdout.write(f'{label:<40} {line_count / max(elapsed, 1e-9):>10.0f} lines/s')
+            results.append(row['running_balance'])
+        if len(set(results)) != 1:
+            raise CommandError('Running balances do not match')
+
+    def _bench_auxiliary_balances(self):
+        """Measure the sub-ledger balance and aging report over many third parties."""
+        fiscal_year, _, _ = self._generate_ledger()
+        third_parties = max(1, self.options['third_parties'])
+        AccountingEntryLine.objects.filter(entry__fiscal_year=fiscal_year).update(
+            auxiliary_account_id=Cast(F('id') % third_parties, CharField())
+        )
+
+        rows, elapsed = self._timed(
+            'auxiliary balances and aging',
+            lambda: sum(1 for _ in auxiliary_balance_rows(fiscal_year, fiscal_year.end_date))
+        )
+        self.stdout.write(f'{rows} third parties, {rows / max(elapsed, 1e-9):,.0f} rows/s')
+
+    def _bench_lettrage(self):
+        """Measure the matching engine on synthetic open lines, then the lettering of a generated account."""
+        line_count = self.options['lines']
+        debits = []
+        credits = []
+        line_id = 0
+        while len(debits) + len(credits) < line_count:
+            kind = random.random()
+            invoices = [random.randint(100, 500_000) for _ in range(1 if kind < 0.6 else random.randint(2, 3))]
+            for amount in invoices:
+                line_id += 1
+                credits.append((line_id, amount))
+            line_id += 1
+            if kind < 0.9:
+                # Paid in full, by one payment per invoice or one payment for the group
+                debits.append((line_id, sum(invoices)))
+            else:
+                # Partial payment: stays open
+                debits.append((line_id, max(1, sum(invoices) - random.randint(1, 99))))
+        self.stdout.write(f'{len(debits) + len(credits)} open lines')
+
+        for subsets in (False, True):
+            label = 'pairs and subsets' if subsets else 'pairs only'
+            (pairs, groups), _ = self._timed(label, match_open_lines, debits, credits, subsets)
+            matched = 2 * len(pairs) + sum(len(group) for group in groups)
+            self.stdout.write(f'{label:<40} {matched} lines matched ({len(pairs)} pairs, {len(groups)} groups)')
+
+        fiscal_year, _, _ = self._generate_ledger()
+        account = GeneralLedgerAccount.objects.get(pk=AccountingEntryLine.objects.filter(
+            entry__fiscal_year=fiscal_year
+        ).values('account').annotate(n=Count('id')).order_by('-n').values_list('account', flat=True)[:1])
+        self._timed(f'reconcile_account {account.account_number} (dry run)', reconcile_account, account, dry_run=True)
+        result, elapsed = self._timed(f'reconcile_account {account.account_number}', reconcile_account, account)
+        self.stdout.write(
+            f"{result['open_lines']} open lines, {result['lines_matched']} lettered, "
+            f"{result['open_lines'] / max(elapsed, 1e-9):,.0f} lines/s"
+        )
+
+    def _latencies(self, label, search, queries):
+        """Time each query separately and print the median, 95th percentile and worst latency."""
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            search(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) >= 20 else latencies[-1]
+        self.stdout.write(
+            f'{label:<40} p50 {statistics.median(latencies):>7.3f} ms  p95 {p95:>7.3f} ms  max {latencies[-1]:>7.3f} ms'
+        )
+
+    def _bench_municipality_autocomplete(self):
+        """Measure the municipality type-ahead against the SearchFilter-style icontains scan."""
+        if not Municipality.objects.exists():
+            path = settings.BASE_DIR / 'accounting' / 'data' / 'commune_insee.csv'
+            reader, file, _ = open_csv(path)
+            with file:
+                Municipality.objects.bulk_create([
+                    Municipality(
+                        insee_code=normalize_code(row['CODE_COMMUNE_INSEE']),
+                        name=row['LIB_COMMUNE_INSEE'].strip(),
+                        postal_code=normalize_code(row['CODE_POSTAL']),
+                        department_code=row['CODE_DEPT_COMMUNE_INSEE'].strip(),
+                        region_code=row['INDIC_EPCI'].strip()[:3]
+                    )
+                    for row in reader
+                    if row.get('CODE_COMMUNE_INSEE') and row.get('LIB_COMMUNE_INSEE')
+                ], batch_size=1000, ignore_conflicts=True)
+        index, _ = self._timed('build index', build_municipality_index)
+        self.stdout.write(f'{len(index)} municipalities')
+        self._timed('build trigram index', index.fuzzy_search, 'warm up')
+
+        names = [record.name for record in random.sample(index.records, min(len(index), self.options['queries']))]
+        queries = {
+            'name prefix': [name[:random.randint(1, 6)] for name in names],
+            'postal code prefix': [
+                normalize_code(record.postal_code)[:random.randint(2, 5)]
+                for record in random.sample(index.records, len(names))
+            ],
+            # One character dropped from each name
+            'misspelled name (fuzzy)': [
+                name[:position] + name[position + 1:]
+                for name, position in ((name, random.randrange(len(name))) for name in names)
+            ],
+        }
+        for label, sample in queries.items():
+            fuzzy = 'fuzzy' in label
+            self._latencies(f'index: {label}', lambda query: index.search(query, fuzzy=fuzzy), sample)
+        for label in ('name prefix', 'postal code prefix'):
+            self._latencies(
+                f'icontains scan: {label}',
+                lambda query: list(Municipality.objects.filter(
+                    Q(insee_code__icontains=query) | Q(name__icontains=query) | Q(postal_code__icontains=query)
+                ).order_by('insee_code')[:10]),
+                queries[label][:200]
+            )
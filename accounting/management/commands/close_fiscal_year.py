@@ -0,0 +1,49 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from accounting.models import FiscalYear
+from accounting.utils.report_archives import archive_fiscal_year, fiscal_years_to_archive
+
+
+class Command(BaseCommand):
+    help = 'Close a fiscal year and precompute its report archives (trial balance, statements, general ledger)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('year', type=int, nargs='?', help='Fiscal year to close (e.g. 2023)')
+        parser.add_argument('--rebuild', action='store_true', help='Rebuild the archives of an already closed fiscal year')
+        parser.add_argument(
+            '--pending', action='store_true',
+            help='Build the archives of every closed fiscal year whose archives are missing or stale. '
+                 'Run it from cron: it catches up the builds started on close (admin, API) that were lost or failed'
+        )
+
+    def handle(self, *args, **options):
+        if options['pending']:
+            if options['year']:
+                raise CommandError('--pending archives every closed fiscal year: do not give a year')
+            for fiscal_year in fiscal_years_to_archive():
+                self._archive(fiscal_year, 'archived')
+            return
+        if not options['year']:
+            raise CommandError('Give the fiscal year to close, or --pending')
+
+        try:
+            fiscal_year = FiscalYear.objects.get(year=options['year'])
+        except FiscalYear.DoesNotExist:
+            raise CommandError(f"Fiscal year not found: {options['year']}")
+
+        if fiscal_year.is_closed and not options['rebuild']:
+            raise CommandError(f'Fiscal year {fiscal_year.year} is already closed; use --rebuild to rebuild its archives')
+
+        if not fiscal_year.is_closed:
+            fiscal_year.is_closed = True
+            # Archived below, not in the background thread started on close
+            fiscal_year._archive_on_close = False
+            fiscal_year.save()
+        self._archive(fiscal_year, 'closed')
+
+    def _archive(self, fiscal_year, done):
+        start = time.perf_counter()
+        count = archive_fiscal_year(fiscal_year)
+        self.stdout.write(self.style.SUCCESS(
+            f'Fiscal year {fiscal_year.year} {done}: {count} report archives built in {time.perf_counter() - start:.1f} s'
+        ))
@@ -1,62 +1,18 @@
-import csv
-import os
-import logging
-from django.core.management.base import BaseCommand
+from accounting.management.commands.utils import CSVImportCommand
 from accounting.models.reference_data import Activity
-from django.conf import settings
+from accounting.utils.csv_import import Column, CSVImporter
 
-logger = logging.getLogger(__name__)
 
-class Command(BaseCommand):
-    help = 'Import activities from CSV file'
-
-    def add_arguments(self, parser):
-        parser.add_argument(
-            '--path',
-            type=str,
-            help='Path to the CSV file',
-            default=None
-        )
+class ActivityImporter(CSVImporter):
+    model = Activity
+    columns = [
+        Column('code', ('CODE_ACTIVITE', 'CODE'), required=True),
+        Column('name', ('LIB_ACTIVITE', 'NAME'), required=True),
+    ]
+    unique_fields = ['code']
 
-    def handle(self, *args, **options):
-        # Determine the path to the CSV file
-        path = options.get('path')
-        if not path:
-            path = os.path.join(settings.BASE_DIR, 'accounting', 'data', 'activite.csv')
-        
-        if not os.path.exists(path):
-            self.stdout.write(self.style.ERROR(f'File not found: {path}'))
-            return
 
-        self.stdout.write(self.style.NOTICE(f'Importing activities from {path}'))
-        
-        try:
-            with open(path, mode='r', encoding='utf-8') as file:
-                reader = csv.DictReader(file, delimiter=';')
-                
-                # Clear existing data if any
-                Activity.objects.all().delete()
-                self.stdout.write(self.style.WARNING('All existing activities cleared from database.'))
-                  # Import data
-                count = 0
-                for row in reader:
-                    # Extract data from CSV
-                    code = row.get('CODE', '').strip()
-                    name = row.get('NAME', '').strip()
-                    
-                    if not code or not name:
-                        logger.warning(f"Skipping row with missing required fields: {row}")
-                        continue
-                    
-                    # Create Activity object
-                    Activity.objects.create(
-                        code=code,
-                        name=name
-                    )
-                    count += 1
-                    
-                self.stdout.write(self.style.SUCCESS(f'Successfully imported {count} activities'))
-                
-        except Exception as e:
-            self.stdout.write(self.style.ERROR(f'Error importing activities: {str(e)}'))
-            logger.exception("Error importing activities")
+class Command(CSVImportCommand):
+    help = 'Import activities from CSV file'
+    importer_class = ActivityImporter
+    default_file = 'activite.csv'
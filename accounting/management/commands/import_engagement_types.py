@@ -1,62 +1,18 @@
-import csv
-import os
-import logging
-from django.core.management.base import BaseCommand
+from accounting.management.commands.utils import CSVImportCommand
 from accounting.models.reference_data import EngagementType
-from django.conf import settings
+from accounting.utils.csv_import import Column, CSVImporter
 
-logger = logging.getLogger(__name__)
 
-class Command(BaseCommand):
-    help = 'Import engagement types from CSV file'
-
-    def add_arguments(self, parser):
-        parser.add_argument(
-            '--path',
-            type=str,
-            help='Path to the CSV file',
-            default=None
-        )
+class EngagementTypeImporter(CSVImporter):
+    model = EngagementType
+    columns = [
+        Column('code', ('CODE_TYPE_ENGAGEMENT', 'CODE'), required=True),
+        Column('name', ('LIB_TYPE_ENGAGEMENT', 'NAME'), required=True),
+    ]
+    unique_fields = ['code']
 
-    def handle(self, *args, **options):
-        # Determine the path to the CSV file
-        path = options.get('path')
-        if not path:
-            path = os.path.join(settings.BASE_DIR, 'accounting', 'data', 'type_d_engagement.csv')
-        
-        if not os.path.exists(path):
-            self.stdout.write(self.style.ERROR(f'File not found: {path}'))
-            return
 
-        self.stdout.write(self.style.NOTICE(f'Importing engagement types from {path}'))
-        
-        try:
-            with open(path, mode='r', encoding='utf-8') as file:
-                reader = csv.DictReader(file, delimiter=';')
-                
-                # Clear existing data if any
-                EngagementType.objects.all().delete()
-                self.stdout.write(self.style.WARNING('All existing engagement types cleared from database.'))
-                  # Import data
-                count = 0
-                for row in reader:
-                    # Extract data from CSV
-                    code = row.get('CODE', '').strip()
-                    name = row.get('NAME', '').strip()
-                    
-                    if not code or not name:
-                        logger.warning(f"Skipping row with missing required fields: {row}")
-                        continue
-                    
-                    # Create EngagementType object
-                    EngagementType.objects.create(
-                        code=code,
-                        name=name
-                    )
-                    count += 1
-                    
-                self.stdout.write(self.style.SUCCESS(f'Successfully imported {count} engagement types'))
-                
-        except Exception as e:
-            self.stdout.write(self.style.ERROR(f'Error importing engagement types: {str(e)}'))
-            logger.exception("Error importing engagement types")
+class Command(CSVImportCommand):
+    help = 'Import engagement types from CSV file'
+    importer_class = EngagementTypeImporter
+    default_file = 'type_d_engagement.csv'
@@ -1,73 +1,44 @@
-import os
-import csv
-import codecs
-from django.core.management.base import BaseCommand
-from django.db import transaction
-from accounting.models import (
-    FiscalYear
-)
-from django.utils.text import slugify
-from datetime import datetime, date
+from datetime import date
+from django.utils import timezone
+from accounting.management.commands.utils import CSVImportCommand
+from accounting.models import FiscalYear
+from accounting.utils.csv_import import NULL_VALUES, Column, CSVImporter
 
-class Command(BaseCommand):
-    help = 'Import fiscal years from CSV file'
-
-    def add_arguments(self, parser):
-        parser.add_argument('file_path', type=str, help='Path to the CSV file')
 
-    def handle(self, *args, **options):
-        file_path = options['file_path']
-        
-        if not os.path.exists(file_path):
-            self.stdout.write(self.style.ERROR(f'File does not exist: {file_path}'))
-            return
-        
-        try:
-            with transaction.atomic():
-                count = self._import_fiscal_years(file_path)
-                
-                self.stdout.write(
-                    self.style.SUCCESS(f'Successfully imported {count} fiscal years')
-                )
-        except Exception as e:
-            self.stdout.write(self.style.ERROR(f'Error: {str(e)}'))
+class FiscalYearImporter(CSVImporter):
+    model = FiscalYear
+    columns = [
+        # ??? marks the placeholder row of the source file
+        Column('year', 'NO_EXERCICE', required=True, coerce=int, null_values=NULL_VALUES + ('???',)),
+        Column('name', 'LIB_EXERCICE_'),
+    ]
+    unique_fields = ['year']
+    
+    def clean(self, values):
+        year = values['year']
+        current_year = timezone.now().year
+        values['name'] = values['name'] or f'EXERCICE {year}'
+        # Calendar fiscal years; the years before the current one are closed
+        values['start_date'] = date(year, 1, 1)
+        values['end_date'] = date(year, 12, 31)
+        values['is_current'] = year == current_year
+        values['is_closed'] = year < current_year
+        return values
     
-    def _import_fiscal_years(self, file_path):
-        """Import fiscal years from CSV file."""
-        count = 0
-        current_year = datetime.now().year
-        
-        with codecs.open(file_path, 'r', encoding='utf-8', errors='ignore') as csvfile:
-            reader = csv.DictReader(csvfile, delimiter=';')
-            
-            for row in reader:
-                year_str = row.get('NO_EXERCICE', '').strip()
-                if not year_str or not year_str.isdigit():
-                    continue
-                
-                year = int(year_str)
-                name = row.get('LIB_EXERCICE_', '').strip() or f'EXERCICE {year}'
-                
-                # Set start and end dates (typically January 1 to December 31)
-                start_date = date(year, 1, 1)
-                end_date = date(year, 12, 31)
-                
-                # Check if this is the current year
-                is_current = (year == current_year)
-                
-                # Assume years before current are closed
-                is_closed = (year < current_year)
-                
-                FiscalYear.objects.update_or_create(
-                    year=year,
-                    defaults={
-                        'name': name,
-                        'start_date': start_date,
-                        'end_date': end_date,
-                        'is_current': is_current,
-                        'is_closed': is_closed
-                    }
-                )
-                count += 1
-        
-        return count
+    def upsert(self, objects, update_fields):
+        # A few rows per file: save() keeps a single current fiscal year and runs
+        # the fiscal year signals (reference data, archives dropped on reopening)
+        existing = FiscalYear.objects.in_bulk([fiscal_year.year for fiscal_year in objects], field_name='year')
+        for fiscal_year in objects:
+            current = existing.get(fiscal_year.year)
+            if current is not None:
+                for field in update_fields:
+                    setattr(current, field, getattr(fiscal_year, field))
+                fiscal_year = current
+            fiscal_year.save()
+
+
+class Command(CSVImportCommand):
+    help = 'Import fiscal years from CSV file'
+    importer_class = FiscalYearImporter
+    default_file = 'exercice_comptable.csv'
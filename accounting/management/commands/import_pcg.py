@@ -1,6 +1,5 @@
 import os
-import csv
-import codecs
+import time
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from accounting.models import (
@@ -9,7 +8,149 @@ from accounting.models import (
     AccountingSection,
     GeneralLedgerAccount
 )
-from django.utils.text import slugify
+from accounting.utils.bulk_upsert import bulk_upsert
+from accounting.utils.csv_import import open_csv
+
+# Accounting classes of the PCG (1-9)
+CLASSES = [
+    {'code': '1', 'name': 'Comptes de capitaux'},
+    {'code': '2', 'name': 'Comptes d\'immobilisations'},
+    {'code': '3', 'name': 'Comptes de stocks et en-cours'},
+    {'code': '4', 'name': 'Comptes de tiers'},
+    {'code': '5', 'name': 'Comptes financiers'},
+    {'code': '6', 'name': 'Comptes de charges'},
+    {'code': '7', 'name': 'Comptes de produits'},
+    {'code': '8', 'name': 'Comptes spéciaux'},
+    {'code': '9', 'name': 'Comptabilité analytique'},
+]
+
+
+def parse_chart(reader):
+    """
+    Read the PCG rows once and deduplicate the classes, chapters, sections and accounts.
+
+    Chapters and sections keep the first non-empty name met in the file (None
+    when the file never names them); accounts keep the last row of their number.
+
+    Returns:
+    - Dict with 'classes', 'chapters', 'sections' and 'accounts', each mapping a
+      code (account number for accounts) to its field values, and 'rows', the
+      number of rows read
+    """
+    classes = {data['code']: {'name': data['name']} for data in CLASSES}
+    chapters = {}
+    sections = {}
+    accounts = {}
+    rows = 0
+
+    for row in reader:
+        rows += 1
+        account_number = (row.get('NO_CPT_COMPTABLE_GENERAL') or '').strip()
+        if not account_number:
+            continue
+
+        class_code = account_number[0]
+        chapter_code = account_number[:2] if len(account_number) > 1 else None
+        section_code = account_number[:3] if len(account_number) > 2 else None
+        classes.setdefault(class_code, {'name': ''})
+
+        if chapter_code:
+            chapter = chapters.setdefault(chapter_code, {'class_code': class_code, 'name': None})
+            if not chapter['name']:
+                chapter['name'] = (row.get('LIB_CHAPITRE_COMPTABLE') or '').strip() or None
+        if section_code and chapter_code:
+            section = sections.setdefault(section_code, {'chapter_code': chapter_code, 'name': None})
+            if not section['name']:
+                section['name'] = (row.get('LIB_SECTION_COMPTABLE') or '').strip() or None
+
+        short_name = (row.get('LIB_RED_CPT_COMPTABLE_GENERAL') or '').strip()
+        full_name = (row.get('LIB_CPT_COMPTABLE_GENERAL') or '').strip()
+        indic_bilan_resultat = (row.get('INDIC_BILAN_RESULTAT') or '').strip()
+        accounts[account_number] = {
+            'section_code': section_code if chapter_code else None,
+            'short_name': short_name or full_name[:50],
+            'full_name': full_name or short_name,
+            # Balance sheet by default; income statement for RESULTAT and classes 6 and 7
+            'is_balance_sheet': not (indic_bilan_resultat == 'RESULTAT' or class_code in ['6', '7']),
+            'budget_account_code': (row.get('CODE_CPT_BUDG_THEO') or '').strip() or None,
+            'recovery_status': (row.get('STATUT_RECUP_CPT') or '').strip() or None,
+            'financial_statement_group': (row.get('CODE_REGRP_ETATS_FINANC_CPT') or '').strip() or None,
+        }
+
+    return {'classes': classes, 'chapters': chapters, 'sections': sections, 'accounts': accounts, 'rows': rows}
+
+
+def _upsert_named(model, parent_field, items, parents):
+    """
+    Upsert chapters or sections, then return their {code: id} map.
+
+    Rows named in the file overwrite their name; the others only get their
+    parent, so a name set by an earlier import is kept.
+    """
+    named = []
+    unnamed = []
+    for code, data in items.items():
+        instance = model(code=code, name=data['name'] or '', **{f'{parent_field}_id': parents[data['parent']]})
+        (named if data['name'] else unnamed).append(instance)
+    bulk_upsert(model, named, ['code'], ['name', parent_field])
+    bulk_upsert(model, unnamed, ['code'], [parent_field])
+    return dict(model.objects.filter(code__in=items).values_list('code', 'pk'))
+
+
+def import_chart(chart):
+    """
+    Write a parsed chart of accounts with one bulk upsert per level.
+
+    Parameters:
+    - chart: Result of parse_chart
+
+    Returns:
+    - Dict with the number of classes, chapters, sections and accounts written
+    """
+    bulk_upsert(
+        AccountingClass,
+        [AccountingClass(code=code, name=data['name']) for code, data in chart['classes'].items() if data['name']],
+        ['code'], ['name']
+    )
+    bulk_upsert(
+        AccountingClass,
+        [AccountingClass(code=code, name='') for code, data in chart['classes'].items() if not data['name']],
+        ['code'], []
+    )
+    class_ids = dict(AccountingClass.objects.filter(code__in=chart['classes']).values_list('code', 'pk'))
+
+    chapter_ids = _upsert_named(
+        AccountingChapter, 'accounting_class',
+        {code: {'name': data['name'], 'parent': data['class_code']} for code, data in chart['chapters'].items()},
+        class_ids
+    )
+    section_ids = _upsert_named(
+        AccountingSection, 'chapter',
+        {code: {'name': data['name'], 'parent': data['chapter_code']} for code, data in chart['sections'].items()},
+        chapter_ids
+    )
+
+    accounts = []
+    for account_number, data in chart['accounts'].items():
+        data = dict(data)
+        section_code = data.pop('section_code')
+        accounts.append(GeneralLedgerAccount(
+            account_number=account_number,
+            section_id=section_ids.get(section_code),
+            **data
+        ))
+    bulk_upsert(GeneralLedgerAccount, accounts, ['account_number'], [
+        'section', 'short_name', 'full_name', 'is_balance_sheet',
+        'budget_account_code', 'recovery_status', 'financial_statement_group'
+    ])
+
+    return {
+        'classes': len(class_ids),
+        'chapters': len(chapter_ids),
+        'sections': len(section_ids),
+        'accounts': len(accounts),
+    }
+
 
 class Command(BaseCommand):
     help = 'Import accounting chart data from PCG CSV file'
@@ -19,147 +160,28 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         file_path = options['file_path']
-        
+
         if not os.path.exists(file_path):
             self.stdout.write(self.style.ERROR(f'File does not exist: {file_path}'))
             return
-        
+
         try:
+            start = time.perf_counter()
+            reader, file, encoding = open_csv(file_path)
+            with file:
+                chart = parse_chart(reader)
+
             with transaction.atomic():
-                # Create default classes, chapters, and sections first
-                self._create_chart_structure()
-                
-                # Then import accounts
-                count = self._import_accounts(file_path)
-                
-                self.stdout.write(
-                    self.style.SUCCESS(f'Successfully imported {count} general ledger accounts')
-                )
+                counts = import_chart(chart)
+
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"{counts['classes']} classes, {counts['chapters']} chapters, "
+                f"{counts['sections']} sections ({encoding})"
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f"Successfully imported {counts['accounts']} general ledger accounts from {chart['rows']} rows "
+                f"in {elapsed:.2f} s ({chart['rows'] / max(elapsed, 1e-9):,.0f} rows/s)"
+            ))
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'Error: {str(e)}'))
-    
-    def _create_chart_structure(self):
-        """Create the basic structure of accounting classes, chapters and sections."""
-        
-        # Define accounting classes (1-9)
-        classes = [
-            {'code': '1', 'name': 'Comptes de capitaux'},
-            {'code': '2', 'name': 'Comptes d\'immobilisations'},
-            {'code': '3', 'name': 'Comptes de stocks et en-cours'},
-            {'code': '4', 'name': 'Comptes de tiers'},
-            {'code': '5', 'name': 'Comptes financiers'},
-            {'code': '6', 'name': 'Comptes de charges'},
-            {'code': '7', 'name': 'Comptes de produits'},
-            {'code': '8', 'name': 'Comptes spéciaux'},
-            {'code': '9', 'name': 'Comptabilité analytique'},
-        ]
-        
-        for class_data in classes:
-            AccountingClass.objects.get_or_create(
-                code=class_data['code'],
-                defaults={'name': class_data['name']}
-            )
-        
-        self.stdout.write(self.style.SUCCESS(f'Created accounting classes'))
-      def _import_accounts(self, file_path):
-        """Import general ledger accounts from CSV file."""
-        count = 0
-        
-        # Try different encodings, preferring latin1 which is common for French CSV files
-        encodings_to_try = ['latin1', 'cp1252', 'iso-8859-1', 'utf-8-sig', 'utf-8']
-        
-        for encoding in encodings_to_try:
-            try:
-                self.stdout.write(f"Trying with encoding: {encoding}")
-                with codecs.open(file_path, 'r', encoding=encoding) as csvfile:
-                    reader = csv.DictReader(csvfile, delimiter=';')
-                    
-                    for row in reader:
-                account_number = row.get('NO_CPT_COMPTABLE_GENERAL', '').strip()
-                if not account_number:
-                    continue
-                
-                # Extract class, chapter, and section codes
-                class_code = account_number[0] if len(account_number) > 0 else None
-                chapter_code = account_number[:2] if len(account_number) > 1 else None
-                section_code = account_number[:3] if len(account_number) > 2 else None
-                
-                # Get or create accounting class
-                if class_code:
-                    accounting_class, _ = AccountingClass.objects.get_or_create(
-                        code=class_code
-                    )
-                else:
-                    continue  # Skip if no class code
-                
-                # Get or create accounting chapter
-                if chapter_code:
-                    chapter_name = row.get('LIB_CHAPITRE_COMPTABLE', '').strip()
-                    if chapter_name:
-                        accounting_chapter, _ = AccountingChapter.objects.get_or_create(
-                            code=chapter_code,
-                            defaults={
-                                'name': chapter_name,
-                                'accounting_class': accounting_class
-                            }
-                        )
-                    else:
-                        accounting_chapter, _ = AccountingChapter.objects.get_or_create(
-                            code=chapter_code,
-                            accounting_class=accounting_class
-                        )
-                else:
-                    accounting_chapter = None
-                
-                # Get or create accounting section
-                if section_code and accounting_chapter:
-                    section_name = row.get('LIB_SECTION_COMPTABLE', '').strip()
-                    if section_name:
-                        accounting_section, _ = AccountingSection.objects.get_or_create(
-                            code=section_code,
-                            defaults={
-                                'name': section_name,
-                                'chapter': accounting_chapter
-                            }
-                        )
-                    else:
-                        accounting_section, _ = AccountingSection.objects.get_or_create(
-                            code=section_code,
-                            chapter=accounting_chapter
-                        )
-                else:
-                    accounting_section = None
-                
-                # Create general ledger account
-                short_name = row.get('LIB_RED_CPT_COMPTABLE_GENERAL', '').strip()
-                full_name = row.get('LIB_CPT_COMPTABLE_GENERAL', '').strip()
-                
-                # Determine if account is balance sheet or income statement
-                is_balance_sheet = True  # Default to balance sheet
-                indic_bilan_resultat = row.get('INDIC_BILAN_RESULTAT', '').strip()
-                if indic_bilan_resultat == 'RESULTAT' or class_code in ['6', '7']:
-                    is_balance_sheet = False
-                
-                budget_account_code = row.get('CODE_CPT_BUDG_THEO', '').strip()
-                recovery_status = row.get('STATUT_RECUP_CPT', '').strip()
-                financial_statement_group = row.get('CODE_REGRP_ETATS_FINANC_CPT', '').strip()
-                
-                # Create or update account
-                GeneralLedgerAccount.objects.update_or_create(
-                    account_number=account_number,
-                    defaults={
-                        'short_name': short_name or full_name[:50],
-                        'full_name': full_name or short_name,
-                        'section': accounting_section,
-                        'is_balance_sheet': is_balance_sheet,
-                        'budget_account_code': budget_account_code or None,
-                        'recovery_status': recovery_status or None,
-                        'financial_statement_group': financial_statement_group or None
-                    }
-                )
-                count += 1
-                
-                if count % 1000 == 0:
-                    self.stdout.write(f'Imported {count} accounts so far...')
-        
-        return count
@@ -0,0 +1,306 @@
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from accounting.management.commands import (
+    import_accounting_entry_types,
+    import_accounting_types,
+    import_activities,
+    import_client_account_types,
+    import_engagement_types,
+    import_fiscal_years,
+    import_journals,
+    import_municipalities,
+    import_payer_types,
+    import_pricing_types,
+    import_reconciliation_types,
+    import_service_types,
+)
+from accounting.management.commands.import_pcg import import_chart, parse_chart
+from accounting.management.commands.utils import sync_summary
+from accounting.models import GeneralLedgerAccount, ImportedFile
+from accounting.utils.csv_import import file_fingerprint, open_csv
+
+# One node of the import graph: run(path, sync) returns a dict with at least rows and imported
+ImportStage = namedtuple('ImportStage', ['name', 'file', 'run', 'depends_on'])
+
+# Name of the checkpoint file written in the data directory
+CHECKPOINT_FILE = '.import_reference_data.json'
+
+DEFAULT_WORKERS = 4
+
+
+def _csv_stage(name, command, depends_on=()):
+    """Build a stage running the importer of a CSVImportCommand over its default file."""
+    importer_class = command.Command.importer_class
+
+    def run(path, sync=True):
+        importer = importer_class()
+        reader, file, encoding = open_csv(path, delimiter=importer.delimiter)
+        with file:
+            if sync:
+                result = importer.sync(reader, fingerprint=importer.fingerprint(path))
+            else:
+                result = importer.run(reader)
+        result['encoding'] = encoding
+        return result
+
+    return ImportStage(name, command.Command.default_file, run, tuple(depends_on))
+
+
+def _run_pcg(path, sync=True):
+    # The chart is upserted as a whole: a sync only skips an unchanged file
+    source = GeneralLedgerAccount._meta.label_lower
+    fingerprint = file_fingerprint(path, 'import_pcg')
+    if sync and ImportedFile.objects.filter(source=source, fingerprint=fingerprint).exists():
+        return {'rows': 0, 'imported': 0, 'errors': [], 'file_unchanged': True}
+    reader, file, encoding = open_csv(path)
+    with file:
+        chart = parse_chart(reader)
+    with transaction.atomic():
+        counts = import_chart(chart)
+        ImportedFile.objects.update_or_create(source=source, defaults={'fingerprint': fingerprint, 'rows': chart['rows']})
+    return {'rows': chart['rows'], 'imported': counts['accounts'], 'errors': [], 'encoding': encoding}
+
+
+# Accounting types before journals, the PCG hierarchy (classes, chapters,
+# sections, accounts) in one stage, and the independent reference tables
+STAGES = [
+    _csv_stage('accounting_types', import_accounting_types),
+    _csv_stage('journals', import_journals, depends_on=['accounting_types']),
+    _csv_stage('fiscal_years', import_fiscal_years),
+    ImportStage('pcg', 'export_comptes_pcg.csv', _run_pcg, ()),
+    _csv_stage('municipalities', import_municipalities),
+    _csv_stage('client_account_types', import_client_account_types),
+    _csv_stage('accounting_entry_types', import_accounting_entry_types),
+    _csv_stage('engagement_types', import_engagement_types),
+    _csv_stage('reconciliation_types', import_reconciliation_types),
+    _csv_stage('payer_types', import_payer_types),
+    _csv_stage('service_types', import_service_types),
+    _csv_stage('pricing_types', import_pricing_types),
+    _csv_stage('activities', import_activities),
+]
+
+
+def select_stages(stages, only=None, skip=None):
+    """
+    Return the stages to run, in declaration order.
+
+    Dependencies left out by only or skip are assumed to be already imported.
+
+    Raises:
+    - ValueError: Unknown stage name
+    """
+    names = {stage.name for stage in stages}
+    unknown = sorted((set(only or []) | set(skip or [])) - names)
+    if unknown:
+        raise ValueError(f"Unknown stage(s): {', '.join(unknown)} (available: {', '.join(stage.name for stage in stages)})")
+    return [
+        stage for stage in stages
+        if (not only or stage.name in only) and stage.name not in (skip or [])
+    ]
+
+
+def file_signature(path):
+    """Return the (size, mtime) of a file, compared to decide whether a checkpoint still applies."""
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime]
+
+
+def load_checkpoint(path):
+    """Return the stages recorded in a checkpoint file ({} when there is none)."""
+    try:
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_checkpoint(path, checkpoint):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(checkpoint, file, indent=2)
+
+
+def run_stages(stages, data_dir, workers=DEFAULT_WORKERS, checkpoint=None, on_result=None, sync=True):
+    """
+    Run import stages in dependency order, independent stages concurrently.
+
+    Each stage runs in a worker thread with its own database connection. A
+    stage starts once the selected stages it depends on are done; when one
+    fails, the stages depending on it are reported as blocked. On SQLite,
+    which allows a single writer, stages are still scheduled in one process
+    but write one at a time.
+
+    Parameters:
+    - stages: Selected ImportStage list
+    - data_dir: Directory of the CSV files
+    - workers: Maximum concurrent stages (1 runs them in the calling thread)
+    - checkpoint: Dict {stage name: record} updated in place; a stage whose
+      record matches the signature of its file is skipped
+    - on_result: Optional callable(result) called as each stage ends
+    - sync: Write only the differences with the previous sync of each file
+      (see CSVImporter.sync) instead of upserting every row
+
+    Returns:
+    - List of result dicts (name, status, elapsed and the stage result), in
+      completion order; status is done, resumed, missing, failed or blocked
+    """
+    checkpoint = {} if checkpoint is None else checkpoint
+    pending = {stage.name: stage for stage in stages}
+    paths = {stage.name: os.path.join(data_dir, stage.file) for stage in stages}
+    running = {}
+    finished = {}
+    results = []
+    write_lock = threading.Lock() if workers > 1 and connection.vendor == 'sqlite' else None
+
+    def execute(stage):
+        if write_lock:
+            write_lock.acquire()
+        # Timed once the stage may write, so that waiting for the lock is not counted
+        start = time.perf_counter()
+        try:
+            result = stage.run(paths[stage.name], sync=sync)
+            return dict(result, status='done', elapsed=time.perf_counter() - start)
+        except Exception as exc:
+            return {'status': 'failed', 'error': str(exc), 'elapsed': time.perf_counter() - start}
+        finally:
+            if write_lock:
+                write_lock.release()
+            if workers > 1:
+                # Connections are per thread: release the worker's one
+                connection.close()
+
+    def record(name, result):
+        result['name'] = name
+        finished[name] = result['status']
+        results.append(result)
+        if result['status'] == 'done':
+            checkpoint[name] = {
+                'signature': file_signature(paths[name]),
+                'completed_at': datetime.now().isoformat(timespec='seconds'),
+            }
+        if on_result:
+            on_result(result)
+
+    def ready():
+        """Yield the pending stages whose selected dependencies have ended, with the failed ones."""
+        for name, stage in list(pending.items()):
+            if any(dep in pending or dep in running for dep in stage.depends_on):
+                continue
+            del pending[name]
+            yield stage, [dep for dep in stage.depends_on if finished.get(dep) in ('failed', 'blocked')]
+
+    executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        while pending or running:
+            started = False
+            for stage, blocked in ready():
+                started = True
+                path = paths[stage.name]
+                if blocked:
+                    record(stage.name, {'status': 'blocked', 'error': f"{', '.join(blocked)} failed", 'elapsed': 0})
+                elif not os.path.exists(path):
+                    record(stage.name, {'status': 'missing', 'error': f'File not found: {path}', 'elapsed': 0})
+                elif checkpoint.get(stage.name, {}).get('signature') == file_signature(path):
+                    record(stage.name, {'status': 'resumed', 'elapsed': 0})
+                elif executor:
+                    running[stage.name] = executor.submit(execute, stage)
+                else:
+                    record(stage.name, execute(stage))
+            if executor and running:
+                done, _ = wait(running.values(), return_when=FIRST_COMPLETED)
+                for name, future in list(running.items()):
+                    if future in done:
+                        del running[name]
+                        record(name, future.result())
+            elif not started:
+                raise ValueError(f"Dependency cycle between stages: {', '.join(pending)}")
+    finally:
+        if executor:
+            executor.shutdown()
+    return results
+
+
+class Command(BaseCommand):
+    help = 'Import all reference data (chart of accounts, journals, reference tables) in dependency order'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--data-dir', type=str, help='Directory of the CSV files (default: accounting/data)')
+        parser.add_argument('--only', nargs='+', metavar='STAGE', help='Run only these stages')
+        parser.add_argument('--skip', nargs='+', metavar='STAGE', help='Do not run these stages')
+        parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Stages run concurrently')
+        parser.add_argument('--full', action='store_true', help='Upsert every row instead of syncing the changes of each file')
+        parser.add_argument('--resume', action='store_true', help='Skip the stages completed by an interrupted run whose file is unchanged')
+        parser.add_argument('--list', action='store_true', help='List the stages and their dependencies')
+
+    def handle(self, *args, **options):
+        if options.get('list'):
+            for stage in STAGES:
+                after = f" (after {', '.join(stage.depends_on)})" if stage.depends_on else ''
+                self.stdout.write(f'{stage.name:<24} {stage.file}{after}')
+            return
+
+        data_dir = options.get('data_dir') or os.path.join(settings.BASE_DIR, 'accounting', 'data')
+        if not os.path.isdir(data_dir):
+            raise CommandError(f'Data directory not found: {data_dir}')
+        try:
+            stages = select_stages(STAGES, options.get('only'), options.get('skip'))
+        except ValueError as e:
+            raise CommandError(str(e))
+        workers = max(1, min(options.get('workers') or 1, len(stages) or 1))
+
+        checkpoint_path = os.path.join(data_dir, CHECKPOINT_FILE)
+        checkpoint = load_checkpoint(checkpoint_path) if options.get('resume') else {}
+        self.stdout.write(self.style.NOTICE(
+            f'Importing {len(stages)} stages from {data_dir} with {workers} worker(s)'
+            + (' (SQLite: one writer at a time)' if workers > 1 and connection.vendor == 'sqlite' else '')
+        ))
+
+        def on_result(result):
+            self._write_result(result)
+            if result['status'] == 'done':
+                save_checkpoint(checkpoint_path, checkpoint)
+
+        start = time.perf_counter()
+        results = run_stages(
+            stages, data_dir, workers=workers, checkpoint=checkpoint, on_result=on_result, sync=not options.get('full')
+        )
+        elapsed = time.perf_counter() - start
+
+        failed = [result['name'] for result in results if result['status'] in ('failed', 'blocked')]
+        stage_time = sum(result['elapsed'] for result in results)
+        summary = f'{len(results)} stages in {elapsed:.2f} s (stage time {stage_time:.2f} s)'
+        if failed:
+            self.stdout.write(self.style.ERROR(
+                f"{summary}, {len(failed)} not imported: {', '.join(failed)}. Rerun with --resume to continue"
+            ))
+            return
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        self.stdout.write(self.style.SUCCESS(f'Successfully imported {summary}'))
+
+    def _write_result(self, result):
+        name = result['name']
+        status = result['status']
+        if status == 'done' and result.get('file_unchanged'):
+            self.stdout.write(f"{name:<24} unchanged since the last sync {result['elapsed']:>7.2f} s")
+        elif status == 'done':
+            rejected = f", {len(result['errors'])} rejected" if result.get('errors') else ''
+            self.stdout.write(
+                f"{name:<24} {result['imported']:>7} imported from {result['rows']:>7} rows{rejected} "
+                f"({result.get('encoding', '')}) {result['elapsed']:>7.2f} s"
+            )
+            if 'file_unchanged' in result:
+                self.stdout.write(f"{'':<24} {sync_summary(result)}")
+        elif status == 'resumed':
+            self.stdout.write(f'{name:<24} already imported (checkpoint)')
+        elif status == 'missing':
+            self.stdout.write(self.style.WARNING(f"{name:<24} skipped: {result['error']}"))
+        else:
+            self.stdout.write(self.style.ERROR(f"{name:<24} {status}: {result['error']}"))
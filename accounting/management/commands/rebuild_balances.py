@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from accounting.models import FiscalYear
+from accounting.utils.analytics import analytical_aggregates_enabled, rebuild_analytical_aggregates
+from accounting.utils.ledger_balances import rebuild_balance_snapshots, verify_balance_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Recompute the materialized account balances from the posted entry lines and verify them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fiscal-year', type=int, help='Only rebuild this fiscal year (e.g. 2024)')
+        parser.add_argument('--verify-only', action='store_true', help='Only compare the stored balances with the ledger')
+
+    def handle(self, *args, **options):
+        fiscal_year = None
+        if options.get('fiscal_year'):
+            try:
+                fiscal_year = FiscalYear.objects.get(year=options['fiscal_year'])
+            except FiscalYear.DoesNotExist:
+                raise CommandError(f"Fiscal year not found: {options['fiscal_year']}")
+
+        if not options.get('verify_only'):
+            count = rebuild_balance_snapshots(fiscal_year)
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} account balance snapshots'))
+            if analytical_aggregates_enabled():
+                count = rebuild_analytical_aggregates(fiscal_year)
+                self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} analytical aggregates'))
+
+        mismatches = verify_balance_snapshots(fiscal_year)
+        if mismatches:
+            for key, expected, stored in mismatches[:20]:
+                self.stdout.write(self.style.ERROR(
+                    f'Mismatch for (account, fiscal year, journal, period) {key}: '
+                    f'expected D/C {expected[0]}/{expected[1]}, stored {stored[0]}/{stored[1]}'
+                ))
+            raise CommandError(f'{len(mismatches)} account balance snapshots do not match the ledger')
+
+        self.stdout.write(self.style.SUCCESS('Account balance snapshots match the ledger'))
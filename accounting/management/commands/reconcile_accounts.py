@@ -0,0 +1,53 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from accounting.models import FiscalYear, GeneralLedgerAccount
+from accounting.models.reference_data import ReconciliationType
+from accounting.utils.financial_statements import account_selector_filter
+from accounting.utils.lettrage import MAX_SUBSET_SIZE, reconcile_account
+
+
+class Command(BaseCommand):
+    help = 'Letter the open lines of accounts automatically (exact pairs, then small subset-sum groups)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('accounts', nargs='+', help='Account numbers or prefixes (e.g. 401000 411*)')
+        parser.add_argument('--auxiliary-id', help='Only letter the lines of this auxiliary account')
+        parser.add_argument('--year', type=int, help='Only letter the lines of this fiscal year')
+        parser.add_argument('--type', dest='reconciliation_type', help='Reconciliation type code set on lettered lines')
+        parser.add_argument('--max-subset-size', type=int, default=MAX_SUBSET_SIZE,
+                            help='Maximum number of lines grouped against one line (1 disables subset matching)')
+        parser.add_argument('--dry-run', action='store_true', help='Report the matches without writing them')
+
+    def handle(self, *args, **options):
+        fiscal_year = None
+        if options['year']:
+            try:
+                fiscal_year = FiscalYear.objects.get(year=options['year'])
+            except FiscalYear.DoesNotExist:
+                raise CommandError(f"Fiscal year not found: {options['year']}")
+
+        reconciliation_type = None
+        if options['reconciliation_type']:
+            try:
+                reconciliation_type = ReconciliationType.objects.get(code=options['reconciliation_type'])
+            except ReconciliationType.DoesNotExist:
+                raise CommandError(f"Reconciliation type not found: {options['reconciliation_type']}")
+
+        accounts = GeneralLedgerAccount.objects.filter(account_selector_filter(options['accounts']))
+        for account in accounts.order_by('account_number'):
+            start = time.perf_counter()
+            try:
+                result = reconcile_account(
+                    account, options['auxiliary_id'], fiscal_year, reconciliation_type,
+                    max_subset_size=options['max_subset_size'], dry_run=options['dry_run']
+                )
+            except ValueError as e:
+                self.stdout.write(self.style.ERROR(f'{account.account_number}: {e}'))
+                continue
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"{account.account_number}: {result['open_lines']} open lines, {result['pairs']} pairs, "
+                f"{result['subsets']} groups, {result['lines_matched']} lines lettered in {elapsed:.2f} s"
+            )
+        if options['dry_run']:
+            self.stdout.write(self.style.NOTICE('Dry run: nothing was written.'))
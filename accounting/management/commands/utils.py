@@ -1,46 +1,11 @@
-import csv
 import os
 import logging
-from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from accounting.utils.csv_import import IMPORT_BATCH_SIZE, open_csv
 
 logger = logging.getLogger(__name__)
 
-def open_csv_with_different_encodings(file_path, delimiter=';'):
-    """
-    Try to open a CSV file with different encodings until one works.
-    
-    Args:
-        file_path: Path to the CSV file
-        delimiter: CSV delimiter character
-        
-    Returns:
-        tuple: (reader, encoding) - CSV reader and the encoding that worked
-        
-    Raises:
-        CommandError: If all encodings fail
-    """
-    encodings_to_try = ['latin1', 'cp1252', 'iso-8859-1', 'utf-8-sig', 'utf-8']
-    
-    for encoding in encodings_to_try:
-        try:
-            logger.info(f"Trying to open file with encoding: {encoding}")
-            file = open(file_path, mode='r', encoding=encoding)
-            reader = csv.DictReader(file, delimiter=delimiter)
-            # Test reading the first row
-            next(reader)
-            # If successful, reset the file pointer
-            file.seek(0)
-            reader = csv.DictReader(file, delimiter=delimiter)
-            return reader, file, encoding
-        except UnicodeDecodeError:
-            logger.warning(f"Failed to open file with encoding: {encoding}")
-            continue
-        except Exception as e:
-            logger.error(f"Error opening file: {str(e)}")
-            raise CommandError(f"Error opening file: {str(e)}")
-    
-    raise CommandError("Could not open file with any of the tried encodings")
-
 def batch_process_objects(objects, batch_size=500, create_func=None):
     """
     Process objects in batches to avoid SQLite limitations.
@@ -68,3 +33,81 @@ def batch_process_objects(objects, batch_size=500, create_func=None):
         count += len(batch)
         
     return count
+
+
+def sync_summary(result):
+    """Describe the differences written by CSVImporter.sync."""
+    summary = f"{result['inserted']} inserted, {result['updated']} updated, {result['deleted']} deleted, {result['unchanged']} unchanged"
+    if result['kept']:
+        summary += f", {result['kept']} removed from the file but kept (still referenced)"
+    return summary
+
+
+class CSVImportCommand(BaseCommand):
+    """
+    Management command running a CSVImporter over one file.
+    
+    Subclasses only declare importer_class and default_file (a file name in
+    accounting/data used when no path is given).
+    """
+    
+    importer_class = None
+    default_file = None
+    
+    def add_arguments(self, parser):
+        parser.add_argument('file_path', nargs='?', type=str, help='Path to the CSV file')
+        parser.add_argument('--path', type=str, help='Path to the CSV file (same as file_path)')
+        parser.add_argument('--dry-run', action='store_true', help='Validate the file without writing anything')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help='Rows validated and written together')
+        parser.add_argument('--sync', action='store_true', help='Write only the rows changed since the last sync and delete the removed ones')
+        parser.add_argument('--force', action='store_true', help='With --sync, compare the rows even if the file is unchanged')
+    
+    def handle(self, *args, **options):
+        importer = self.importer_class()
+        self.verbosity = options.get('verbosity', 1)
+        importer.batch_size = options.get('batch_size') or IMPORT_BATCH_SIZE
+        label = str(importer.model._meta.verbose_name_plural).lower()
+        path = options.get('file_path') or options.get('path')
+        if not path and self.default_file:
+            path = os.path.join(settings.BASE_DIR, 'accounting', 'data', self.default_file)
+        
+        if not path or not os.path.exists(path):
+            self.stdout.write(self.style.ERROR(f'File not found: {path}'))
+            return
+        
+        self.stdout.write(self.style.NOTICE(f'Importing {label} from {path}'))
+        try:
+            reader, file, encoding = open_csv(path, delimiter=importer.delimiter)
+            with file:
+                if options.get('sync'):
+                    fingerprint = None if options.get('force') else importer.fingerprint(path)
+                    result = importer.sync(
+                        reader, fingerprint=fingerprint, dry_run=options.get('dry_run', False), progress=self._progress
+                    )
+                else:
+                    result = importer.run(reader, dry_run=options.get('dry_run', False), progress=self._progress)
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'Error importing {label}: {str(e)}'))
+            logger.exception("Error importing %s", label)
+            return
+        
+        if result.get('file_unchanged'):
+            self.stdout.write(self.style.SUCCESS(f'{path} is unchanged since the last sync, nothing to import'))
+            return
+        for line_number, message in result['errors']:
+            self.stdout.write(self.style.WARNING(f'Line {line_number}: {message}'))
+        if 'file_unchanged' in result:
+            self.stdout.write(sync_summary(result))
+        summary = (
+            f"{result['imported']} {label} from {result['rows']} rows ({encoding}), "
+            f"{result['skipped']} skipped, {len(result['errors'])} rejected "
+            f"in {result['elapsed']:.2f} s ({result['rows_per_second']:,.0f} rows/s)"
+        )
+        if result['dry_run']:
+            self.stdout.write(self.style.NOTICE(f'Dry run: {summary}, nothing written'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Successfully imported {summary}'))
+    
+    def _progress(self, rows, imported):
+        if self.verbosity > 1:
+            self.stdout.write(f'{rows} rows read, {imported} imported so far...')
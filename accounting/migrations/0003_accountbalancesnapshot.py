@@ -0,0 +1,70 @@
+# Generated by Django 5.2.1 on 2026-10-17 00:11
+
+import django.db.models.deletion
+import django.utils.timezone
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Q, Sum
+from django.db.models.functions import TruncMonth
+
+
+def build_snapshots(apps, schema_editor):
+    """Materialize the balances of the entries posted before this migration."""
+    AccountingEntryLine = apps.get_model('accounting', 'AccountingEntryLine')
+    AccountBalanceSnapshot = apps.get_model('accounting', 'AccountBalanceSnapshot')
+
+    rows = AccountingEntryLine.objects.filter(entry__status='posted').order_by().values(
+        'account_id',
+        'entry__fiscal_year_id',
+        'entry__journal_id',
+        period=TruncMonth('entry__entry_date')
+    ).annotate(
+        debit=Sum('amount', filter=Q(is_debit=True)),
+        credit=Sum('amount', filter=Q(is_debit=False))
+    )
+    AccountBalanceSnapshot.objects.bulk_create(
+        [
+            AccountBalanceSnapshot(
+                account_id=row['account_id'],
+                fiscal_year_id=row['entry__fiscal_year_id'],
+                journal_id=row['entry__journal_id'],
+                period=row['period'],
+                debit_total=row['debit'] or Decimal('0.00'),
+                credit_total=row['credit'] or Decimal('0.00')
+            )
+            for row in rows
+        ],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0002_accountingentrytype_activity_clientaccounttype_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountBalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, editable=False, help_text='Date and time when the record was created', verbose_name='created at')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Date and time when the record was last updated', verbose_name='updated at')),
+                ('period', models.DateField(help_text='First day of the month covered by this snapshot', verbose_name='period')),
+                ('debit_total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Sum of posted debit lines', max_digits=17, verbose_name='debit total')),
+                ('credit_total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Sum of posted credit lines', max_digits=17, verbose_name='credit total')),
+                ('account', models.ForeignKey(help_text='The general ledger account', on_delete=django.db.models.deletion.CASCADE, related_name='balance_snapshots', to='accounting.generalledgeraccount')),
+                ('fiscal_year', models.ForeignKey(help_text='The fiscal year of the posted entries', on_delete=django.db.models.deletion.CASCADE, related_name='balance_snapshots', to='accounting.fiscalyear')),
+                ('journal', models.ForeignKey(help_text='The journal of the posted entries', on_delete=django.db.models.deletion.CASCADE, related_name='balance_snapshots', to='accounting.accountingjournal')),
+            ],
+            options={
+                'verbose_name': 'Account Balance Snapshot',
+                'verbose_name_plural': 'Account Balance Snapshots',
+                'ordering': ['fiscal_year', 'period', 'account'],
+                'indexes': [models.Index(fields=['fiscal_year', 'period'], name='accounting__fiscal__62d6ec_idx')],
+                'unique_together': {('account', 'fiscal_year', 'journal', 'period')},
+            },
+        ),
+        migrations.RunPython(build_snapshots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.1 on 2026-10-17 00:14
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Q, Sum
+
+
+def fill_entry_totals(apps, schema_editor):
+    """Store the line totals of the existing entries."""
+    AccountingEntry = apps.get_model('accounting', 'AccountingEntry')
+    AccountingEntryLine = apps.get_model('accounting', 'AccountingEntryLine')
+
+    totals = AccountingEntryLine.objects.order_by().values('entry_id').annotate(
+        debit=Sum('amount', filter=Q(is_debit=True)),
+        credit=Sum('amount', filter=Q(is_debit=False))
+    )
+    entries = []
+    for row in totals:
+        entry = AccountingEntry(pk=row['entry_id'])
+        entry.total_debit = (row['debit'] or Decimal('0.00')).quantize(Decimal('0.01'))
+        entry.total_credit = (row['credit'] or Decimal('0.00')).quantize(Decimal('0.01'))
+        entries.append(entry)
+    AccountingEntry.objects.bulk_update(entries, ['total_debit', 'total_credit'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0003_accountbalancesnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='accountingentry',
+            name='total_credit',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, help_text='Sum of the credit lines of this entry', max_digits=17, verbose_name='total credit'),
+        ),
+        migrations.AddField(
+            model_name='accountingentry',
+            name='total_debit',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, help_text='Sum of the debit lines of this entry', max_digits=17, verbose_name='total debit'),
+        ),
+        migrations.RunPython(fill_entry_totals, migrations.RunPython.noop),
+    ]
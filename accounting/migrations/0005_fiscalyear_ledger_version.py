@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-17 00:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0004_accountingentry_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fiscalyear',
+            name='ledger_version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Counter bumped whenever the ledger of this fiscal year changes; used to invalidate cached reports', verbose_name='ledger version'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-17 00:28
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0005_fiscalyear_ledger_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FiscalYearReportArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, editable=False, help_text='Date and time when the record was created', verbose_name='created at')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Date and time when the record was last updated', verbose_name='updated at')),
+                ('report', models.CharField(choices=[('trial_balance', 'Trial balance'), ('income_statement', 'Income statement'), ('balance_sheet', 'Balance sheet'), ('general_ledger', 'General ledger')], max_length=30, verbose_name='report')),
+                ('key', models.CharField(blank=True, default='', help_text='Account number for per-account reports, empty otherwise', max_length=50, verbose_name='key')),
+                ('ledger_version', models.PositiveIntegerField(help_text='Ledger version of the fiscal year when the archive was built', verbose_name='ledger version')),
+                ('content', models.BinaryField(help_text='gzip-compressed JSON report', verbose_name='content')),
+                ('size', models.PositiveIntegerField(default=0, help_text='Uncompressed size in bytes', verbose_name='size')),
+                ('fiscal_year', models.ForeignKey(help_text='The closed fiscal year', on_delete=django.db.models.deletion.CASCADE, related_name='report_archives', to='accounting.fiscalyear')),
+            ],
+            options={
+                'verbose_name': 'Fiscal Year Report Archive',
+                'verbose_name_plural': 'Fiscal Year Report Archives',
+                'ordering': ['fiscal_year', 'report', 'key'],
+                'unique_together': {('fiscal_year', 'report', 'key')},
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.1 on 2026-10-17 00:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0006_fiscalyearreportarchive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='accountingentryline',
+            name='due_date',
+            field=models.DateField(blank=True, help_text='Due date of the line for aging; defaults to the entry date when empty', null=True, verbose_name='due date'),
+        ),
+        migrations.AddIndex(
+            model_name='accountingentryline',
+            index=models.Index(fields=['auxiliary_account_type', 'auxiliary_account_id'], name='accounting__auxilia_ed1925_idx'),
+        ),
+    ]
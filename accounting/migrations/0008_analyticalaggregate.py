@@ -0,0 +1,40 @@
+# Generated by Django 5.2.1 on 2026-10-17 00:51
+
+import django.db.models.deletion
+import django.utils.timezone
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0007_entryline_due_date_auxiliary_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticalAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, editable=False, help_text='Date and time when the record was created', verbose_name='created at')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Date and time when the record was last updated', verbose_name='updated at')),
+                ('analytical_code', models.CharField(blank=True, help_text='Analytical code of the lines', max_length=20, null=True, verbose_name='analytical code')),
+                ('debit_total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Sum of posted debit lines', max_digits=17, verbose_name='debit total')),
+                ('credit_total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Sum of posted credit lines', max_digits=17, verbose_name='credit total')),
+                ('activity', models.ForeignKey(blank=True, help_text='Activity of the entries', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='analytical_aggregates', to='accounting.activity')),
+                ('fiscal_year', models.ForeignKey(help_text='The fiscal year of the posted entries', on_delete=django.db.models.deletion.CASCADE, related_name='analytical_aggregates', to='accounting.fiscalyear')),
+                ('journal', models.ForeignKey(help_text='The journal of the posted entries', on_delete=django.db.models.deletion.CASCADE, related_name='analytical_aggregates', to='accounting.accountingjournal')),
+                ('municipality', models.ForeignKey(blank=True, help_text='Municipality of the lines', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='analytical_aggregates', to='accounting.municipality')),
+                ('payer_type', models.ForeignKey(blank=True, help_text='Payer type of the lines', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='analytical_aggregates', to='accounting.payertype')),
+                ('pricing_type', models.ForeignKey(blank=True, help_text='Pricing type of the lines', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='analytical_aggregates', to='accounting.pricingtype')),
+                ('service_type', models.ForeignKey(blank=True, help_text='Service type of the entries', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='analytical_aggregates', to='accounting.servicetype')),
+            ],
+            options={
+                'verbose_name': 'Analytical Aggregate',
+                'verbose_name_plural': 'Analytical Aggregates',
+                'ordering': ['fiscal_year', 'journal'],
+                'indexes': [models.Index(fields=['fiscal_year', 'journal'], name='accounting__fiscal__145183_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.1 on 2026-10-17 01:23
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0008_analyticalaggregate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportedFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, editable=False, help_text='Date and time when the record was created', verbose_name='created at')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Date and time when the record was last updated', verbose_name='updated at')),
+                ('source', models.CharField(help_text='Label of the imported model', max_length=100, unique=True, verbose_name='source')),
+                ('fingerprint', models.CharField(help_text='Hash of the file and of the importer declaration', max_length=64, verbose_name='fingerprint')),
+                ('rows', models.PositiveIntegerField(default=0, help_text='Rows read from the file', verbose_name='rows')),
+            ],
+            options={
+                'verbose_name': 'Imported File',
+                'verbose_name_plural': 'Imported Files',
+                'ordering': ['source'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ImportedRow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(help_text='Label of the imported model', max_length=100, verbose_name='source')),
+                ('key', models.CharField(help_text='Values of the unique fields of the row', max_length=255, verbose_name='key')),
+                ('row_hash', models.CharField(help_text='Hash of the imported field values', max_length=32, verbose_name='row hash')),
+            ],
+            options={
+                'verbose_name': 'Imported Row',
+                'verbose_name_plural': 'Imported Rows',
+                'ordering': ['source', 'key'],
+                'unique_together': {('source', 'key')},
+            },
+        ),
+    ]
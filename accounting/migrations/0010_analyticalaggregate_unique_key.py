@@ -0,0 +1,41 @@
+# Generated by Django 5.2.1 on 2026-10-17 01:45
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+AGGREGATE_KEY = (
+    'fiscal_year_id', 'journal_id', 'analytical_code', 'activity_id',
+    'service_type_id', 'municipality_id', 'payer_type_id', 'pricing_type_id',
+)
+
+
+def merge_duplicate_aggregates(apps, schema_editor):
+    """Merge the aggregate rows created twice for the same key by concurrent postings."""
+    AnalyticalAggregate = apps.get_model('accounting', 'AnalyticalAggregate')
+    # The constraint does not tell '' from NULL: store the empty codes as NULL
+    AnalyticalAggregate.objects.filter(analytical_code='').update(analytical_code=None)
+
+    duplicates = AnalyticalAggregate.objects.order_by().values(*AGGREGATE_KEY).annotate(
+        rows=Count('id'), debit=Sum('debit_total'), credit=Sum('credit_total')
+    ).filter(rows__gt=1)
+    for row in duplicates:
+        key = {field: row[field] for field in AGGREGATE_KEY}
+        ids = list(AnalyticalAggregate.objects.filter(**key).order_by('id').values_list('id', flat=True))
+        AnalyticalAggregate.objects.filter(pk=ids[0]).update(debit_total=row['debit'], credit_total=row['credit'])
+        AnalyticalAggregate.objects.filter(pk__in=ids[1:]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0009_import_state'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_aggregates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='analyticalaggregate',
+            constraint=models.UniqueConstraint(models.F('fiscal_year'), models.F('journal'), django.db.models.functions.comparison.Coalesce('analytical_code', models.Value('')), django.db.models.functions.comparison.Coalesce('activity', models.Value(0)), django.db.models.functions.comparison.Coalesce('service_type', models.Value(0)), django.db.models.functions.comparison.Coalesce('municipality', models.Value(0)), django.db.models.functions.comparison.Coalesce('payer_type', models.Value(0)), django.db.models.functions.comparison.Coalesce('pricing_type', models.Value(0)), name='unique_analytical_aggregate_key'),
+        ),
+    ]
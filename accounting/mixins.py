@@ -0,0 +1,161 @@
+import gzip
+import hashlib
+import threading
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+
+# Pre-serialized full dumps, by model label: (table versions, gzip-compressed JSON)
+_full_dumps = {}
+_full_dumps_lock = threading.Lock()
+
+# Models of the nested serializers, by serializer class
+_nested_models = {}
+
+
+def table_version(model):
+    """
+    Return (last update, row count) of a table in one aggregate query.
+    
+    Saves refresh updated_at and deletions change the count, so the pair changes
+    whenever the table does (QuerySet.update() calls that leave updated_at
+    untouched are not seen).
+    """
+    version = model.objects.aggregate(last_modified=Max('updated_at'), count=Count('pk'))
+    return version['last_modified'], version['count']
+
+
+def nested_models(serializer_class):
+    """
+    Return the models serialized by the nested serializers of a model serializer.
+    
+    Parameters:
+    - serializer_class: ModelSerializer subclass
+    
+    Returns:
+    - Tuple of models, outermost first, without duplicates
+    """
+    if serializer_class not in _nested_models:
+        models = []
+        pending = list(serializer_class().fields.values())
+        while pending:
+            field = pending.pop(0)
+            if isinstance(field, serializers.ListSerializer):
+                field = field.child
+            if isinstance(field, serializers.ModelSerializer):
+                if field.Meta.model not in models:
+                    models.append(field.Meta.model)
+                pending.extend(field.fields.values())
+        _nested_models[serializer_class] = tuple(models)
+    return _nested_models[serializer_class]
+
+
+def _full_dump(view, version):
+    """
+    Return the gzip-compressed JSON dump of the whole table, serialized once per version.
+    
+    version (the one the response headers were built from) only serves the dump
+    already built; a new dump is stored under the version read inside the lock,
+    before the queryset is serialized, so that it is never labelled with a version
+    older than its content.
+    """
+    label = view.get_queryset().model._meta.label_lower
+    cached = _full_dumps.get(label)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    with _full_dumps_lock:
+        version = view._table_versions()
+        cached = _full_dumps.get(label)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        queryset = view.get_queryset()
+        if view.ordering:
+            queryset = queryset.order_by(*view.ordering)
+        data = view.get_serializer(queryset, many=True).data
+        body = gzip.compress(JSONRenderer().render(data), compresslevel=6)
+        _full_dumps[label] = (version, body)
+        return body
+
+
+class ConditionalReferenceMixin:
+    """
+    Conditional GET support for the read-mostly reference viewsets.
+    
+    list and retrieve answer with an ETag and a Last-Modified header derived from
+    the request URL and the versions (max updated_at and row count) of the table
+    and of the tables whose rows are serialized with it: the models of the nested
+    serializers and those listed in conditional_related_models. A matching
+    If-None-Match or If-Modified-Since is answered 304 after these aggregate
+    queries (one per table), before the queryset is evaluated.
+    
+    list also accepts ?all=1: the whole table, without filters or pagination, is
+    returned as a JSON array serialized and gzip-compressed once per version.
+    """
+    
+    # Other models the representation depends on, besides the nested serializers
+    conditional_related_models = ()
+    
+    def _version_models(self):
+        model = self.get_queryset().model
+        models = [model]
+        for related in nested_models(self.get_serializer_class()) + tuple(self.conditional_related_models):
+            if related not in models:
+                models.append(related)
+        return models
+    
+    def _table_versions(self):
+        return tuple(table_version(model) for model in self._version_models())
+    
+    def _conditional_headers(self, request):
+        versions = self._table_versions()
+        timestamps = [last_modified for last_modified, count in versions if last_modified is not None]
+        last_modified = max(timestamps) if timestamps else None
+        accepted = getattr(getattr(request, 'accepted_renderer', None), 'format', '')
+        key = '|'.join([request.get_full_path(), accepted] + [
+            f'{count}|{modified.isoformat() if modified else ""}' for modified, count in versions
+        ])
+        etag = '"%s"' % hashlib.md5(key.encode()).hexdigest()
+        return etag, last_modified, versions
+    
+    def _finalize_conditional(self, response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        # Clients keep the representation but revalidate it on each use
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+    
+    def _conditional(self, request, render):
+        etag, last_modified, version = self._conditional_headers(request)
+        timestamp = int(last_modified.timestamp()) if last_modified is not None else None
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = render(version)
+        return self._finalize_conditional(response, etag, last_modified)
+    
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get('all', '').lower() in ('1', 'true'):
+            return self._conditional(request, lambda version: self._full_dump_response(request, version))
+        return self._conditional(request, lambda version: super(ConditionalReferenceMixin, self).list(
+            request, *args, **kwargs
+        ))
+    
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(request, lambda version: super(ConditionalReferenceMixin, self).retrieve(
+            request, *args, **kwargs
+        ))
+    
+    def _full_dump_response(self, request, version):
+        body = _full_dump(self, version)
+        response = HttpResponse(content_type='application/json')
+        if 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+            response['Content-Encoding'] = 'gzip'
+            response.content = body
+        else:
+            response.content = gzip.decompress(body)
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
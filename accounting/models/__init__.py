@@ -12,7 +12,26 @@ from .accounting_base import (
 )
 
 from .accounting_entries import (
+    EDITABLE_ENTRY_STATUSES,
     AccountingEntryStatus,
     AccountingEntry,
     AccountingEntryLine
 )
+
+from .ledger_balances import (
+    AccountBalanceSnapshot
+)
+
+from .report_archives import (
+    ArchivedReport,
+    FiscalYearReportArchive
+)
+
+from .analytics import (
+    AnalyticalAggregate
+)
+
+from .import_state import (
+    ImportedFile,
+    ImportedRow
+)
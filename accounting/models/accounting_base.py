@@ -16,6 +16,12 @@ class FiscalYear(BaseModel):
     end_date = models.DateField(_("end date"), help_text=_("End date of the fiscal year"))
     is_closed = models.BooleanField(_("is closed"), default=False, help_text=_("Whether the fiscal year is closed for posting"))
     is_current = models.BooleanField(_("is current"), default=False, help_text=_("Whether this is the current fiscal year"))
+    ledger_version = models.PositiveIntegerField(
+        _("ledger version"),
+        default=0,
+        editable=False,
+        help_text=_("Counter bumped whenever the ledger of this fiscal year changes; used to invalidate cached reports")
+    )
     
     class Meta:
         verbose_name = _("Fiscal Year")
@@ -26,6 +32,13 @@ class FiscalYear(BaseModel):
         return f"{self.name} ({self.year})"
     
     def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # ledger_version is only changed by bump_ledger_version(): a stale
+            # in-memory value must not overwrite it
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'ledger_version'
+            ]
         if self.is_current:
             # Ensure only one fiscal year is marked as current
             FiscalYear.objects.filter(is_current=True).exclude(pk=self.pk).update(is_current=False)
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Coalesce
 from django.utils.translation import gettext_lazy as _
 from core.models import BaseModel, StatusChoices
 from django.core.validators import MinValueValidator
@@ -28,6 +30,37 @@ class AccountingEntryStatus(models.TextChoices):
     CANCELLED = 'cancelled', _('Cancelled')
 
 
+# Statuses whose entries may still be edited or deleted: posted entries are
+# corrected with a reversing entry, cancelled ones are final
+EDITABLE_ENTRY_STATUSES = (AccountingEntryStatus.DRAFT, AccountingEntryStatus.VALIDATED)
+
+
+class AccountingEntryQuerySet(models.QuerySet):
+    """
+    QuerySet for accounting entries.
+    """
+    
+    def with_line_totals(self):
+        """
+        Annotate each entry with line_debit and line_credit computed from its lines.
+        
+        The totals are computed in the same query as the listing, which is useful to
+        audit the stored total_debit/total_credit columns without one query per row.
+        """
+        return self.annotate(
+            line_debit=Coalesce(
+                models.Sum('lines__amount', filter=models.Q(lines__is_debit=True)),
+                Value(Decimal('0.00')),
+                output_field=models.DecimalField(max_digits=17, decimal_places=2)
+            ),
+            line_credit=Coalesce(
+                models.Sum('lines__amount', filter=models.Q(lines__is_debit=False)),
+                Value(Decimal('0.00')),
+                output_field=models.DecimalField(max_digits=17, decimal_places=2)
+            )
+        )
+
+
 class AccountingEntry(BaseModel):
     """
     Represents an accounting entry (journal entry).
@@ -117,6 +150,26 @@ class AccountingEntry(BaseModel):
     is_recurring = models.BooleanField(_("is recurring"), default=False, help_text=_("Whether this is a recurring entry"))
     period_code = models.CharField(_("period code"), max_length=10, null=True, blank=True, help_text=_("Accounting period code"))
     
+    # Denormalized totals of the lines, kept in sync by update_totals()
+    total_debit = models.DecimalField(
+        _("total debit"),
+        max_digits=17,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        editable=False,
+        help_text=_("Sum of the debit lines of this entry")
+    )
+    total_credit = models.DecimalField(
+        _("total credit"),
+        max_digits=17,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        editable=False,
+        help_text=_("Sum of the credit lines of this entry")
+    )
+    
+    objects = AccountingEntryQuerySet.as_manager()
+    
     class Meta:
         verbose_name = _("Accounting Entry")
         verbose_name_plural = _("Accounting Entries")
@@ -131,24 +184,30 @@ class AccountingEntry(BaseModel):
     def __str__(self):
         return f"{self.entry_number} ({self.journal.code}) - {self.entry_date}"
     
-    @property
-    def total_debit(self):
-        """Returns the total debit amount for this entry."""
-        return self.lines.filter(is_debit=True).aggregate(
-            total=models.Sum('amount')
-        )['total'] or Decimal('0.00')
-    
-    @property
-    def total_credit(self):
-        """Returns the total credit amount for this entry."""
-        return self.lines.filter(is_debit=False).aggregate(
-            total=models.Sum('amount')
-        )['total'] or Decimal('0.00')
-    
     @property
     def is_balanced(self):
         """Checks if the entry is balanced (total debits = total credits)."""
         return self.total_debit == self.total_credit
+    
+    @property
+    def is_editable(self):
+        """Whether the entry and its lines may still be changed or deleted (see EDITABLE_ENTRY_STATUSES)."""
+        return self.status in EDITABLE_ENTRY_STATUSES
+    
+    def update_totals(self, save=True):
+        """
+        Recompute the stored debit and credit totals from the entry lines.
+        
+        Must be called whenever lines are added, changed or removed.
+        """
+        totals = self.lines.aggregate(
+            debit=models.Sum('amount', filter=models.Q(is_debit=True)),
+            credit=models.Sum('amount', filter=models.Q(is_debit=False))
+        )
+        self.total_debit = (totals['debit'] or Decimal('0.00')).quantize(Decimal('0.01'))
+        self.total_credit = (totals['credit'] or Decimal('0.00')).quantize(Decimal('0.01'))
+        if save:
+            self.save(update_fields=['total_debit', 'total_credit', 'updated_at'])
 
 
 class AccountingEntryLine(BaseModel):
@@ -250,6 +309,12 @@ class AccountingEntryLine(BaseModel):
         related_name="entry_lines",
         help_text=_("Municipality associated with this line")
     )
+    due_date = models.DateField(
+        _("due date"),
+        null=True,
+        blank=True,
+        help_text=_("Due date of the line for aging; defaults to the entry date when empty")
+    )
     
     class Meta:
         verbose_name = _("Accounting Entry Line")
@@ -259,6 +324,7 @@ class AccountingEntryLine(BaseModel):
         indexes = [
             models.Index(fields=['account']),
             models.Index(fields=['entry']),
+            models.Index(fields=['auxiliary_account_type', 'auxiliary_account_id']),
         ]
     
     def __str__(self):
@@ -0,0 +1,114 @@
+from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+from django.utils.translation import gettext_lazy as _
+from decimal import Decimal
+from core.models import BaseModel
+from .accounting_base import FiscalYear, AccountingJournal
+from .reference_data import Activity, ServiceType, Municipality, PayerType, PricingType
+
+
+class AnalyticalAggregate(BaseModel):
+    """
+    Materialized debit and credit totals of posted lines per analytical combination.
+    
+    One row exists per (fiscal year, journal, analytical code, activity, service
+    type, municipality, payer type, pricing type). Rows are incremented when
+    entries are posted, if ACCOUNTING_ANALYTICAL_AGGREGATES is enabled, so the
+    analytical cube can group these rows instead of every entry line.
+    """
+    fiscal_year = models.ForeignKey(
+        FiscalYear,
+        on_delete=models.CASCADE,
+        related_name="analytical_aggregates",
+        help_text=_("The fiscal year of the posted entries")
+    )
+    journal = models.ForeignKey(
+        AccountingJournal,
+        on_delete=models.CASCADE,
+        related_name="analytical_aggregates",
+        help_text=_("The journal of the posted entries")
+    )
+    analytical_code = models.CharField(
+        _("analytical code"), max_length=20, null=True, blank=True, help_text=_("Analytical code of the lines")
+    )
+    activity = models.ForeignKey(
+        Activity,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="analytical_aggregates",
+        help_text=_("Activity of the entries")
+    )
+    service_type = models.ForeignKey(
+        ServiceType,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="analytical_aggregates",
+        help_text=_("Service type of the entries")
+    )
+    municipality = models.ForeignKey(
+        Municipality,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="analytical_aggregates",
+        help_text=_("Municipality of the lines")
+    )
+    payer_type = models.ForeignKey(
+        PayerType,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="analytical_aggregates",
+        help_text=_("Payer type of the lines")
+    )
+    pricing_type = models.ForeignKey(
+        PricingType,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="analytical_aggregates",
+        help_text=_("Pricing type of the lines")
+    )
+    debit_total = models.DecimalField(
+        _("debit total"),
+        max_digits=17,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text=_("Sum of posted debit lines")
+    )
+    credit_total = models.DecimalField(
+        _("credit total"),
+        max_digits=17,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text=_("Sum of posted credit lines")
+    )
+    
+    class Meta:
+        verbose_name = _("Analytical Aggregate")
+        verbose_name_plural = _("Analytical Aggregates")
+        ordering = ["fiscal_year", "journal"]
+        indexes = [
+            models.Index(fields=['fiscal_year', 'journal']),
+        ]
+        constraints = [
+            # NULL keys are coalesced so that they compare equal on every database
+            # (nulls_distinct=False is PostgreSQL 15+ only)
+            models.UniqueConstraint(
+                'fiscal_year',
+                'journal',
+                Coalesce('analytical_code', Value('')),
+                Coalesce('activity', Value(0)),
+                Coalesce('service_type', Value(0)),
+                Coalesce('municipality', Value(0)),
+                Coalesce('payer_type', Value(0)),
+                Coalesce('pricing_type', Value(0)),
+                name='unique_analytical_aggregate_key',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.fiscal_year} - {self.journal}: D {self.debit_total} / C {self.credit_total}"
@@ -0,0 +1,45 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+from core.models import BaseModel
+
+
+class ImportedFile(BaseModel):
+    """
+    Fingerprint of the last file synchronized into a table.
+    
+    A sync whose file has the same fingerprint (content and importer
+    declaration) is skipped without parsing the file.
+    """
+    source = models.CharField(_("source"), max_length=100, unique=True, help_text=_("Label of the imported model"))
+    fingerprint = models.CharField(_("fingerprint"), max_length=64, help_text=_("Hash of the file and of the importer declaration"))
+    rows = models.PositiveIntegerField(_("rows"), default=0, help_text=_("Rows read from the file"))
+    
+    class Meta:
+        verbose_name = _("Imported File")
+        verbose_name_plural = _("Imported Files")
+        ordering = ["source"]
+    
+    def __str__(self):
+        return f"{self.source}: {self.fingerprint}"
+
+
+class ImportedRow(models.Model):
+    """
+    Content hash of one row synchronized from a file, by key of the imported table.
+    
+    A sync compares the hashes of the file rows with these to write only the
+    inserted and changed rows, and to find the rows removed from the file.
+    There is one row per imported row, so no timestamps are kept.
+    """
+    source = models.CharField(_("source"), max_length=100, help_text=_("Label of the imported model"))
+    key = models.CharField(_("key"), max_length=255, help_text=_("Values of the unique fields of the row"))
+    row_hash = models.CharField(_("row hash"), max_length=32, help_text=_("Hash of the imported field values"))
+    
+    class Meta:
+        verbose_name = _("Imported Row")
+        verbose_name_plural = _("Imported Rows")
+        ordering = ["source", "key"]
+        unique_together = ['source', 'key']
+    
+    def __str__(self):
+        return f"{self.source} {self.key}: {self.row_hash}"
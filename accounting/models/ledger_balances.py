@@ -0,0 +1,66 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+from decimal import Decimal
+from core.models import BaseModel
+from .chart_of_accounts import GeneralLedgerAccount
+from .accounting_base import FiscalYear, AccountingJournal
+
+
+class AccountBalanceSnapshot(BaseModel):
+    """
+    Materialized debit and credit totals of posted lines per account and period.
+    
+    One row exists per (account, fiscal year, journal, month). Rows are updated
+    incrementally when an entry is posted, so reports can sum O(accounts x periods)
+    rows instead of scanning every entry line.
+    """
+    account = models.ForeignKey(
+        GeneralLedgerAccount,
+        on_delete=models.CASCADE,
+        related_name="balance_snapshots",
+        help_text=_("The general ledger account")
+    )
+    fiscal_year = models.ForeignKey(
+        FiscalYear,
+        on_delete=models.CASCADE,
+        related_name="balance_snapshots",
+        help_text=_("The fiscal year of the posted entries")
+    )
+    journal = models.ForeignKey(
+        AccountingJournal,
+        on_delete=models.CASCADE,
+        related_name="balance_snapshots",
+        help_text=_("The journal of the posted entries")
+    )
+    period = models.DateField(_("period"), help_text=_("First day of the month covered by this snapshot"))
+    debit_total = models.DecimalField(
+        _("debit total"),
+        max_digits=17,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text=_("Sum of posted debit lines")
+    )
+    credit_total = models.DecimalField(
+        _("credit total"),
+        max_digits=17,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text=_("Sum of posted credit lines")
+    )
+    
+    class Meta:
+        verbose_name = _("Account Balance Snapshot")
+        verbose_name_plural = _("Account Balance Snapshots")
+        ordering = ["fiscal_year", "period", "account"]
+        unique_together = ['account', 'fiscal_year', 'journal', 'period']
+        indexes = [
+            models.Index(fields=['fiscal_year', 'period']),
+        ]
+    
+    def __str__(self):
+        return f"{self.account_id} {self.period:%Y-%m}: D {self.debit_total} / C {self.credit_total}"
+    
+    @property
+    def balance(self):
+        """Returns the net balance (positive for debit, negative for credit)."""
+        return self.debit_total - self.credit_total
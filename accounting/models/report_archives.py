@@ -0,0 +1,60 @@
+import gzip
+import json
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+from core.models import BaseModel
+from .accounting_base import FiscalYear
+
+
+class ArchivedReport(models.TextChoices):
+    """
+    Reports precomputed when a fiscal year is closed.
+    """
+    TRIAL_BALANCE = 'trial_balance', _('Trial balance')
+    INCOME_STATEMENT = 'income_statement', _('Income statement')
+    BALANCE_SHEET = 'balance_sheet', _('Balance sheet')
+    GENERAL_LEDGER = 'general_ledger', _('General ledger')
+
+
+class FiscalYearReportArchive(BaseModel):
+    """
+    Immutable, precomputed report of a closed fiscal year.
+    
+    The report is stored as gzip-compressed JSON. The general ledger is stored
+    per account, the account number being the key. The ledger version of the
+    fiscal year at archiving time is recorded so a stale archive is never served.
+    """
+    fiscal_year = models.ForeignKey(
+        FiscalYear,
+        on_delete=models.CASCADE,
+        related_name="report_archives",
+        help_text=_("The closed fiscal year")
+    )
+    report = models.CharField(_("report"), max_length=30, choices=ArchivedReport.choices)
+    key = models.CharField(
+        _("key"),
+        max_length=50,
+        blank=True,
+        default='',
+        help_text=_("Account number for per-account reports, empty otherwise")
+    )
+    ledger_version = models.PositiveIntegerField(
+        _("ledger version"),
+        help_text=_("Ledger version of the fiscal year when the archive was built")
+    )
+    content = models.BinaryField(_("content"), help_text=_("gzip-compressed JSON report"))
+    size = models.PositiveIntegerField(_("size"), default=0, help_text=_("Uncompressed size in bytes"))
+    
+    class Meta:
+        verbose_name = _("Fiscal Year Report Archive")
+        verbose_name_plural = _("Fiscal Year Report Archives")
+        ordering = ["fiscal_year", "report", "key"]
+        unique_together = ['fiscal_year', 'report', 'key']
+    
+    def __str__(self):
+        suffix = f" {self.key}" if self.key else ""
+        return f"{self.fiscal_year.year} {self.report}{suffix}"
+    
+    def load(self):
+        """Return the decompressed report."""
+        return json.loads(gzip.decompress(bytes(self.content)))
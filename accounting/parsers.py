@@ -0,0 +1,48 @@
+import json
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParseError(ParseError):
+    """Parse error of an NDJSON body, raised while iterating over its documents."""
+    
+    def __init__(self, line_number, detail):
+        self.line_number = line_number
+        super().__init__(f'NDJSON parse error on line {line_number} - {detail}')
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parses newline-delimited JSON: one JSON object per line.
+    
+    The documents are decoded lazily while the view iterates over them, so a
+    large request body is never held in memory as a whole. Blank lines are ignored.
+    A line that cannot be decoded or parsed, or is not a JSON object, raises NDJSONParseError
+    when the iteration reaches it: the documents before it may already have been
+    processed (see accounting.utils.entry_import.import_entries).
+    """
+    media_type = 'application/x-ndjson'
+    
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if stream is None:
+            return iter(())
+        return self._iter_documents(stream, encoding)
+    
+    def _iter_documents(self, stream, encoding):
+        for line_number, raw_line in enumerate(stream, start=1):
+            try:
+                line = raw_line.decode(encoding).strip()
+            except UnicodeDecodeError as exc:
+                raise NDJSONParseError(line_number, exc)
+            if not line:
+                continue
+            try:
+                document = json.loads(line)
+            except ValueError as exc:
+                raise NDJSONParseError(line_number, exc)
+            if not isinstance(document, dict):
+                raise NDJSONParseError(line_number, f'expected a JSON object, got {type(document).__name__}')
+            yield document
@@ -1,3 +1,6 @@
+from decimal import Decimal
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
 from rest_framework import serializers
 from accounting.models import (
     AccountingClass,
@@ -8,7 +11,8 @@ from accounting.models import (
     AccountingType,
     AccountingJournal,
     AccountingEntry,
-    AccountingEntryLine
+    AccountingEntryLine,
+    AccountingEntryStatus
 )
 from accounting.models.reference_data import (
     ClientAccountType,
@@ -21,6 +25,9 @@ from accounting.models.reference_data import (
     PayerType,
     Municipality
 )
+from accounting.utils.entry_lines import create_entry_lines, sync_entry_lines
+from accounting.utils.ledger_balances import bump_ledger_version
+from accounting.utils.reference_data import reference_table
 
 
 class AccountingClassSerializer(serializers.ModelSerializer):
@@ -78,7 +85,103 @@ class AccountingJournalSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Primary key field that resolves its value from the objects preloaded in the context.
+    
+    Falls back to the regular one-query lookup when the object was not preloaded.
+    """
+    
+    def to_internal_value(self, data):
+        related_objects = self.context.get('related_objects')
+        if related_objects is None or isinstance(data, bool):
+            return super().to_internal_value(data)
+        model = self.get_queryset().model
+        try:
+            return related_objects[model][model._meta.pk.to_python(data)]
+        except (KeyError, TypeError, ValueError, DjangoValidationError):
+            return super().to_internal_value(data)
+
+
+def _collect_related_ids(serializer, items, wanted):
+    """Collect the primary keys referenced by items, per model, including nested lists."""
+    for name, field in serializer.fields.items():
+        if field.read_only:
+            continue
+        if isinstance(field, PrefetchedPrimaryKeyRelatedField):
+            queryset = field.get_queryset()
+            pk_field = queryset.model._meta.pk
+            ids = wanted.setdefault(queryset.model, (queryset, set()))[1]
+            for item in items:
+                value = item.get(name) if isinstance(item, dict) else None
+                if value in (None, '') or isinstance(value, bool):
+                    continue
+                try:
+                    ids.add(pk_field.to_python(value))
+                except DjangoValidationError:
+                    continue
+        elif isinstance(field, serializers.ListSerializer) and isinstance(field.child, serializers.Serializer):
+            nested = [
+                row
+                for item in items if isinstance(item, dict) and isinstance(item.get(name), list)
+                for row in item[name]
+            ]
+            _collect_related_ids(field.child, nested, wanted)
+
+
+def preload_related_objects(serializer, items, context):
+    """
+    Load every object referenced by primary key in a batch of input items.
+    
+    Runs one query per related model instead of one lookup per item and per
+    foreign key. The objects are stored in context['related_objects'], where
+    PrefetchedPrimaryKeyRelatedField picks them up; objects already loaded
+    are not queried again.
+    
+    Parameters:
+    - serializer: Serializer (or list child) the items will be validated with
+    - items: List of input dicts
+    - context: Serializer context shared by the serializers validating the items
+    """
+    related_objects = context.setdefault('related_objects', {})
+    wanted = {}
+    _collect_related_ids(serializer, items, wanted)
+    for model, (queryset, ids) in wanted.items():
+        known = related_objects.setdefault(model, {})
+        missing = ids - known.keys()
+        if missing:
+            known.update(queryset.in_bulk(missing))
+
+
+class AccountingEntryLineListSerializer(serializers.ListSerializer):
+    """
+    List serializer for entry lines that loads all referenced objects up front.
+    
+    Validating thousands of lines would otherwise run one lookup query per line
+    and per foreign key.
+    """
+    
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            preload_related_objects(self.child, data, self.context)
+        return super().to_internal_value(data)
+
+
+def reference_details(model, pk, name_field='name'):
+    """
+    Return {id, code, name} of a reference row, read from the in-memory registry.
+    
+    Returns None when pk is None.
+    """
+    row = reference_table(model).get(pk)
+    if row is None:
+        return None
+    return {'id': row['id'], 'code': row['code'], 'name': row[name_field]}
+
+
 class AccountingEntryLineSerializer(serializers.ModelSerializer):
+    serializer_related_field = PrefetchedPrimaryKeyRelatedField
+
     account_details = GeneralLedgerAccountSerializer(source='account', read_only=True)
     auxiliary_account_type_details = serializers.SerializerMethodField()
     client_account_type_details = serializers.SerializerMethodField()
@@ -90,51 +193,24 @@ class AccountingEntryLineSerializer(serializers.ModelSerializer):
     class Meta:
         model = AccountingEntryLine
         fields = '__all__'
+        # Lines are written nested in their entry, which numbers them
+        read_only_fields = ['entry', 'line_number']
+        list_serializer_class = AccountingEntryLineListSerializer
     
     def get_auxiliary_account_type_details(self, obj):
-        if (obj.auxiliary_account_type):
-            return {
-                'id': obj.auxiliary_account_type.id,
-                'code': obj.auxiliary_account_type.code,
-                'name': obj.auxiliary_account_type.name
-            }
-        return None
+        return reference_details(AccountingType, obj.auxiliary_account_type_id, 'full_name')
     
     def get_client_account_type_details(self, obj):
-        if (obj.client_account_type):
-            return {
-                'id': obj.client_account_type.id,
-                'code': obj.client_account_type.code,
-                'name': obj.client_account_type.name
-            }
-        return None
+        return reference_details(ClientAccountType, obj.client_account_type_id, 'name')
     
     def get_reconciliation_type_details(self, obj):
-        if (obj.reconciliation_type):
-            return {
-                'id': obj.reconciliation_type.id,
-                'code': obj.reconciliation_type.code,
-                'name': obj.reconciliation_type.name
-            }
-        return None
+        return reference_details(ReconciliationType, obj.reconciliation_type_id, 'name')
     
     def get_payer_type_details(self, obj):
-        if (obj.payer_type):
-            return {
-                'id': obj.payer_type.id,
-                'code': obj.payer_type.code,
-                'name': obj.payer_type.name
-            }
-        return None
+        return reference_details(PayerType, obj.payer_type_id, 'name')
     
     def get_pricing_type_details(self, obj):
-        if (obj.pricing_type):
-            return {
-                'id': obj.pricing_type.id,
-                'code': obj.pricing_type.code,
-                'name': obj.pricing_type.name
-            }
-        return None
+        return reference_details(PricingType, obj.pricing_type_id, 'name')
     
     def get_municipality_details(self, obj):
         if (obj.municipality):
@@ -219,34 +295,171 @@ class AccountingEntrySerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class AccountingEntryLineCompactSerializer(serializers.BaseSerializer):
+    """
+    Read-only line representation with ids and codes only (?view=compact).
+    
+    Account number and municipality code come from select_related joins; the
+    codes of the reference tables come from the in-memory reference registry.
+    """
+    
+    # Foreign keys to reference tables, emitted as <name> (id) and <name>_code
+    reference_fields = [
+        ('auxiliary_account_type', AccountingType),
+        ('client_account_type', ClientAccountType),
+        ('reconciliation_type', ReconciliationType),
+        ('payer_type', PayerType),
+        ('pricing_type', PricingType),
+    ]
+    
+    def to_representation(self, line):
+        representation = {
+            'id': line.pk,
+            'line_number': line.line_number,
+            'account': line.account_id,
+            'account_number': line.account.account_number,
+            'is_debit': line.is_debit,
+            'amount': str(line.amount),
+            'description': line.description,
+            'auxiliary_account_id': line.auxiliary_account_id,
+            'reconciliation_code': line.reconciliation_code,
+            'analytical_code': line.analytical_code,
+            'due_date': line.due_date.isoformat() if line.due_date else None,
+            'municipality': line.municipality_id,
+            'municipality_code': line.municipality.insee_code if line.municipality_id else None,
+        }
+        for name, model in self.reference_fields:
+            pk = getattr(line, f'{name}_id')
+            representation[name] = pk
+            representation[f'{name}_code'] = reference_table(model).code(pk)
+        return representation
+
+
+class AccountingEntryCompactSerializer(serializers.BaseSerializer):
+    """
+    Read-only entry representation with ids, codes and compact lines (?view=compact).
+    
+    Expects the lines to be prefetched with their account and municipality
+    (see AccountingEntryViewSet.get_queryset).
+    """
+    
+    reference_fields = [
+        ('journal', AccountingJournal),
+        ('entry_type', AccountingEntryType),
+        ('engagement_type', EngagementType),
+        ('activity', Activity),
+        ('service_type', ServiceType),
+    ]
+    
+    def to_representation(self, entry):
+        representation = {
+            'id': entry.pk,
+            'entry_number': entry.entry_number,
+            'fiscal_year': entry.fiscal_year_id,
+            'fiscal_year_code': reference_table(FiscalYear).code(entry.fiscal_year_id),
+            'entry_date': entry.entry_date.isoformat(),
+            'posting_date': entry.posting_date.isoformat() if entry.posting_date else None,
+            'reference': entry.reference,
+            'status': entry.status,
+            'is_opening_balance': entry.is_opening_balance,
+            'is_closing_entry': entry.is_closing_entry,
+            'is_reversing_entry': entry.is_reversing_entry,
+            'total_debit': str(entry.total_debit),
+            'total_credit': str(entry.total_credit),
+        }
+        for name, model in self.reference_fields:
+            pk = getattr(entry, f'{name}_id')
+            representation[name] = pk
+            representation[f'{name}_code'] = reference_table(model).code(pk)
+        line_serializer = AccountingEntryLineCompactSerializer(context=self.context)
+        representation['lines'] = [line_serializer.to_representation(line) for line in entry.lines.all()]
+        return representation
+
+
+def locked_entry_error(entry):
+    """Return the message refusing a change to an entry that is no longer editable."""
+    if entry.status == AccountingEntryStatus.POSTED:
+        return "Posted entries cannot be modified or deleted. Create a reversing entry instead."
+    return f"{entry.get_status_display()} entries cannot be modified or deleted."
+
+
 class AccountingEntryCreateUpdateSerializer(serializers.ModelSerializer):
+    """
+    Entry serializer for create and update, with nested lines.
+    
+    Only draft and validated entries can be updated: posted entries are in the
+    account balances and are corrected with a reversing entry. Entries reach
+    the posted status through the post_to_ledger action only.
+    """
+    serializer_related_field = PrefetchedPrimaryKeyRelatedField
+
     lines = AccountingEntryLineSerializer(many=True)
     
+    # Whether entries may be written directly with the posted status
+    allow_posted_status = False
+    
     class Meta:
         model = AccountingEntry
         fields = '__all__'
     
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        if self.instance is not None and not self.instance.is_editable:
+            raise serializers.ValidationError({'status': [locked_entry_error(self.instance)]})
+        if attrs.get('status') == AccountingEntryStatus.POSTED and not self.allow_posted_status:
+            raise serializers.ValidationError({
+                'status': ["Entries are posted with the post_to_ledger action, which updates the account balances."]
+            })
+        return attrs
+    
     def create(self, validated_data):
         lines_data = validated_data.pop('lines')
-        accounting_entry = AccountingEntry.objects.create(**validated_data)
         
-        for i, line_data in enumerate(lines_data):
-            line_data['line_number'] = i + 1
-            AccountingEntryLine.objects.create(entry=accounting_entry, **line_data)
+        with transaction.atomic():
+            accounting_entry = AccountingEntry.objects.create(**validated_data)
+            create_entry_lines(accounting_entry, lines_data)
         
         return accounting_entry
     
     def update(self, instance, validated_data):
         lines_data = validated_data.pop('lines', None)
         
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
-        
-        if lines_data is not None:
-            instance.lines.all().delete()
-            for i, line_data in enumerate(lines_data):
-                line_data['line_number'] = i + 1
-                AccountingEntryLine.objects.create(entry=instance, **line_data)
+        with transaction.atomic():
+            # The entry may have been posted since it was validated: check again under a row lock
+            locked = AccountingEntry.objects.select_for_update().get(pk=instance.pk)
+            if not locked.is_editable:
+                raise serializers.ValidationError({'status': [locked_entry_error(locked)]})
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            instance.save()
+            
+            if lines_data is not None:
+                sync_entry_lines(instance, lines_data)
+            # The entry may have moved to another fiscal year: both ledgers changed
+            bump_ledger_version(locked.fiscal_year_id, instance.fiscal_year_id)
         
         return instance
+
+
+class AccountingEntryBulkSerializer(AccountingEntryCreateUpdateSerializer):
+    """
+    Entry serializer used by the bulk import.
+    
+    Each entry must balance. Entry number uniqueness is checked by the importer
+    once per chunk rather than with one query per entry. Posted entries are
+    accepted: the importer adds their lines to the account balances.
+    """
+    entry_number = serializers.CharField(max_length=50)
+    
+    allow_posted_status = True
+    
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        lines = attrs.get('lines', [])
+        total_debit = sum((line['amount'] for line in lines if line.get('is_debit')), Decimal('0.00'))
+        total_credit = sum((line['amount'] for line in lines if not line.get('is_debit')), Decimal('0.00'))
+        if total_debit != total_credit:
+            raise serializers.ValidationError({
+                'lines': [f"Entry is not balanced: total debit {total_debit} != total credit {total_credit}."]
+            })
+        return attrs
@@ -0,0 +1,79 @@
+import threading
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from accounting.models import FiscalYear
+from accounting.models.reference_data import Municipality
+from accounting.utils.municipality_index import invalidate_municipality_index
+from accounting.utils.reference_data import REFERENCE_MODELS, registry
+from accounting.utils.report_archives import delete_fiscal_year_archives, start_archive_thread
+
+
+@receiver(pre_save, sender=FiscalYear)
+def remember_closed_state(sender, instance, **kwargs):
+    """Record whether the fiscal year was closed before this save."""
+    if instance.pk is None:
+        instance._was_closed = False
+    else:
+        instance._was_closed = FiscalYear.objects.filter(pk=instance.pk, is_closed=True).exists()
+
+
+@receiver(post_save, sender=FiscalYear)
+def update_archives_on_close(sender, instance, raw=False, **kwargs):
+    """
+    Build the report archives when a fiscal year is closed, drop them when it is reopened.
+    
+    Archiving reads the whole ledger, so it does not run in the saving request:
+    once the close is committed, a background thread builds the archives
+    (ACCOUNTING_ARCHIVE_ON_CLOSE). The close_fiscal_year command, which builds
+    them itself, sets _archive_on_close to False on the instance it saves.
+    """
+    if raw:
+        return
+    was_closed = getattr(instance, '_was_closed', False)
+    if was_closed and not instance.is_closed:
+        delete_fiscal_year_archives(instance)
+    elif (instance.is_closed and not was_closed and getattr(instance, '_archive_on_close', True)
+          and getattr(settings, 'ACCOUNTING_ARCHIVE_ON_CLOSE', True)):
+        fiscal_year_id = instance.pk
+        transaction.on_commit(lambda: start_archive_thread(fiscal_year_id))
+
+
+def invalidate_reference_data(sender, **kwargs):
+    """Drop the in-memory copy of a reference table now, and tell other processes on commit."""
+    registry.invalidate(sender, broadcast=False)
+    transaction.on_commit(lambda: registry.invalidate(sender))
+
+
+for reference_model in REFERENCE_MODELS:
+    post_save.connect(invalidate_reference_data, sender=reference_model,
+                      dispatch_uid=f'reference_data_save_{reference_model._meta.label_lower}')
+    post_delete.connect(invalidate_reference_data, sender=reference_model,
+                        dispatch_uid=f'reference_data_delete_{reference_model._meta.label_lower}')
+
+
+# Per thread, like database connections: whether a municipality change awaits its broadcast
+_municipality_changes = threading.local()
+
+
+def broadcast_municipality_index():
+    """
+    Tell the other processes that the municipalities changed, once per transaction.
+    
+    Registered on commit for every changed row: the first callback changes the
+    cross-process stamp and the following ones find nothing pending. Changes
+    rolled back leave the flag set, which only costs one extra broadcast at the
+    next commit.
+    """
+    if getattr(_municipality_changes, 'pending', False):
+        _municipality_changes.pending = False
+        invalidate_municipality_index()
+
+
+@receiver([post_save, post_delete], sender=Municipality)
+def invalidate_municipalities(sender, **kwargs):
+    """Drop the municipality lookup index now, and tell other processes on commit."""
+    invalidate_municipality_index(broadcast=False)
+    _municipality_changes.pending = True
+    transaction.on_commit(broadcast_municipality_index)
@@ -0,0 +1,94 @@
+import json
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from accounting.models import GeneralLedgerAccount
+from accounting.tests.utils import LedgerTestMixin
+from accounting.utils.financial_statements import account_balance_rows
+
+User = get_user_model()
+
+BALANCES_URL = '/api/v1.0/acc/reports/account_balances/'
+
+
+class AccountBalancesTest(LedgerTestMixin, TestCase):
+    """Test suite for the batched multi-account balance report."""
+    
+    def setUp(self):
+        """Set up a small posted ledger and an authenticated API client."""
+        self.create_ledger_fixtures()
+        self.create_entry('E1', date(2024, 1, 10), [
+            ('606100', True, '100.00'),
+            ('401000', False, '100.00'),
+        ])
+        self.create_entry('E2', date(2024, 2, 5), [
+            ('411000', True, '250.00'),
+            ('706000', False, '250.00'),
+        ])
+        self.user = User.objects.create_superuser(email='admin@example.com', password='testpass123')
+        self.client_api = APIClient()
+        self.client_api.force_authenticate(self.user)
+    
+    def read_ndjson(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+    
+    def test_numbers_and_prefixes(self):
+        """Test that exact numbers and prefixes select accounts in account order."""
+        rows = list(account_balance_rows(['7*', '401000', '6*'], self.fiscal_year))
+        self.assertEqual(
+            [(row['account_number'], row['balance']) for row in rows],
+            [('401000', Decimal('-100.00')), ('606100', Decimal('100.00')), ('706000', Decimal('-250.00'))]
+        )
+    
+    def test_zero_balances(self):
+        """Test that zero balances are emitted unless excluded."""
+        self.assertEqual(len(list(account_balance_rows(['1*', '5*'], self.fiscal_year))), 2)
+        self.assertEqual(list(account_balance_rows(['1*', '5*'], self.fiscal_year, include_zero_balances=False)), [])
+    
+    def test_query_count_does_not_depend_on_account_count(self):
+        """Test that many accounts are answered with the same queries as a few."""
+        GeneralLedgerAccount.objects.bulk_create([
+            GeneralLedgerAccount(account_number=f'60{i:04d}', short_name='x', full_name='x') for i in range(300)
+        ])
+        with CaptureQueriesContext(connection) as few:
+            list(account_balance_rows(['606100'], self.fiscal_year, '2024-02-15'))
+        with CaptureQueriesContext(connection) as many:
+            rows = list(account_balance_rows(['6*', '401000'], self.fiscal_year, '2024-02-15'))
+        self.assertEqual(len(rows), 302)
+        self.assertEqual(len(few.captured_queries), len(many.captured_queries))
+        self.assertLessEqual(len(many.captured_queries), 3)
+    
+    def test_get_stream(self):
+        """Test the GET endpoint with comma separated selectors and a journal filter."""
+        response = self.client_api.get(BALANCES_URL, {
+            'accounts': '606100,7*', 'fiscal_year': self.fiscal_year.pk, 'journal': 'ACH'
+        })
+        rows = self.read_ndjson(response)
+        self.assertEqual([(row['account_number'], row['balance']) for row in rows],
+                         [('606100', '100.00'), ('706000', '-250.00')])
+        
+        response = self.client_api.get(BALANCES_URL, {'accounts': '606100', 'journal': 'VEN'})
+        self.assertEqual(self.read_ndjson(response)[0]['balance'], '0.00')
+    
+    def test_post_stream_csv(self):
+        """Test the POST endpoint with a JSON list and CSV output."""
+        response = self.client_api.post(f'{BALANCES_URL}?stream=csv', {
+            'accounts': ['411000', '401000'], 'fiscal_year': self.fiscal_year.pk, 'as_of_date': '2024-01-31'
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines, [
+            'account_number,account_name,balance,is_debit',
+            '401000,Fournisseurs,-100.00,False',
+            '411000,Clients,0.00,False',
+        ])
+    
+    def test_missing_accounts(self):
+        """Test that a request without accounts is rejected."""
+        response = self.client_api.get(BALANCES_URL, {'fiscal_year': self.fiscal_year.pk})
+        self.assertEqual(response.status_code, 400)
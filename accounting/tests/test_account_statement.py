@@ -0,0 +1,99 @@
+import json
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+from accounting.models import FiscalYear
+from accounting.tests.utils import LedgerTestMixin
+from accounting.utils.account_statement import account_statement, calculate_opening_balance
+from accounting.utils.ledger_balances import rebuild_balance_snapshots
+
+User = get_user_model()
+
+STATEMENT_URL = '/api/v1.0/acc/reports/account_statement/'
+
+
+class AccountStatementTest(LedgerTestMixin, TestCase):
+    """Test suite for the account statement with running balances."""
+    
+    def setUp(self):
+        """Set up a ledger on the bank account over two fiscal years."""
+        self.create_ledger_fixtures()
+        self.create_entry('E1', date(2024, 1, 10), [('512000', True, '100.00'), ('706000', False, '100.00')])
+        self.create_entry('E2', date(2024, 2, 5), [('606100', True, '30.00'), ('512000', False, '30.00')])
+        self.create_entry('E3', date(2024, 2, 5), [('512000', True, '12.50'), ('706000', False, '12.50')])
+        self.create_entry('E4', date(2024, 3, 1), [('606100', True, '40.00'), ('512000', False, '40.00')])
+        self.previous_year = FiscalYear.objects.create(
+            year=2023, name='EXERCICE 2023', start_date=date(2023, 1, 1), end_date=date(2023, 12, 31)
+        )
+        fiscal_year = self.fiscal_year
+        self.fiscal_year = self.previous_year
+        self.create_entry('P1', date(2023, 6, 1), [('512000', True, '500.00'), ('101000', False, '500.00')])
+        self.create_entry('P2', date(2023, 7, 1), [('606100', True, '80.00'), ('512000', False, '80.00')])
+        self.fiscal_year = fiscal_year
+    
+    def _balances(self, rows):
+        return [(row['row_type'], row['entry_number'], row['running_balance']) for row in rows]
+    
+    def test_window_and_python_paths_match(self):
+        """Test that both running balance implementations give the same rows."""
+        for use_window in (True, False):
+            with self.subTest(use_window=use_window):
+                rows = list(account_statement('512000', self.fiscal_year, use_window=use_window))
+                self.assertEqual(self._balances(rows), [
+                    ('opening', '', Decimal('420.00')),
+                    ('line', 'E1', Decimal('520.00')),
+                    ('line', 'E2', Decimal('490.00')),
+                    ('line', 'E3', Decimal('502.50')),
+                    ('line', 'E4', Decimal('462.50')),
+                    ('closing', '', Decimal('462.50')),
+                ])
+                self.assertEqual((rows[-1]['debit'], rows[-1]['credit']), (Decimal('112.50'), Decimal('70.00')))
+    
+    def test_opening_balance_from_snapshots(self):
+        """Test that the opening balance of a period comes from the earlier months."""
+        rows = list(account_statement('512000', self.fiscal_year, start_date='2024-02-10', carry_forward=False))
+        self.assertEqual(self._balances(rows), [
+            ('opening', '', Decimal('82.50')),
+            ('line', 'E4', Decimal('42.50')),
+            ('closing', '', Decimal('42.50')),
+        ])
+    
+    def test_carry_forward(self):
+        """Test carry forward rules for income accounts and opening-balance entries."""
+        account = self.accounts['606100']
+        self.assertEqual(calculate_opening_balance(account, self.fiscal_year), Decimal('0.00'))
+        self.assertEqual(
+            calculate_opening_balance(account, self.fiscal_year, carry_forward=True), Decimal('80.00')
+        )
+        
+        # Opening-balance entries already carry the prior balances forward
+        entry = self.create_entry('AN', date(2024, 1, 1), [('512000', True, '420.00'), ('101000', False, '420.00')])
+        entry.is_opening_balance = True
+        entry.save()
+        rebuild_balance_snapshots(self.fiscal_year)
+        rows = list(account_statement('512000', self.fiscal_year))
+        self.assertEqual(self._balances(rows)[:2], [('opening', '', Decimal('0.00')), ('line', 'AN', Decimal('420.00'))])
+    
+    def test_statement_endpoint(self):
+        """Test the streamed statement endpoint."""
+        user = User.objects.create_superuser(email='admin@example.com', password='testpass123')
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get(STATEMENT_URL, {
+            'fiscal_year': self.fiscal_year.pk, 'account': '512000', 'end_date': '2024-02-28'
+        })
+        self.assertEqual(response.status_code, 200)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['row_type'] for row in rows], ['opening', 'line', 'line', 'line', 'closing'])
+        self.assertEqual(Decimal(str(rows[-1]['running_balance'])), Decimal('502.50'))
+        
+        response = client.get(STATEMENT_URL, {'fiscal_year': self.fiscal_year.pk, 'account': '512000', 'stream': 'csv'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertTrue(lines[0].startswith('row_type,entry_date'))
+        
+        response = client.get(STATEMENT_URL, {'fiscal_year': self.fiscal_year.pk, 'account': '999999'})
+        self.assertEqual(response.status_code, 404)
+        response = client.get(STATEMENT_URL, {'fiscal_year': self.fiscal_year.pk})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,301 @@
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from accounting.models import AccountingEntry, AccountingType
+from accounting.tests.utils import LedgerTestMixin
+from accounting.utils.entry_lines import create_entry_lines, sync_entry_lines
+from accounting.utils.ledger_balances import verify_balance_snapshots
+
+User = get_user_model()
+
+
+class AccountingEntryTotalsTest(LedgerTestMixin, TestCase):
+    """Test suite for the stored debit/credit totals of accounting entries."""
+    
+    def setUp(self):
+        """Set up a posted entry and an API client."""
+        self.create_ledger_fixtures()
+        self.entry = self.create_entry('E1', date(2024, 1, 10), [
+            ('606100', True, '100.00'),
+            ('401000', False, '60.00'),
+            ('401000', False, '40.00'),
+        ])
+        self.user = User.objects.create_superuser(email='admin@example.com', password='testpass123')
+        self.client_api = APIClient()
+        self.client_api.force_authenticate(self.user)
+    
+    def test_totals_are_stored(self):
+        """Test that totals are read without querying the lines."""
+        entry = AccountingEntry.objects.get(pk=self.entry.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(entry.total_debit, Decimal('100.00'))
+            self.assertEqual(entry.total_credit, Decimal('100.00'))
+            self.assertTrue(entry.is_balanced)
+    
+    def test_with_line_totals_annotation(self):
+        """Test that the listing annotation matches the stored totals in one query."""
+        self.create_entry('E2', date(2024, 1, 11), [
+            ('512000', True, '10.00'),
+            ('411000', False, '10.00'),
+        ], status='draft')
+        with self.assertNumQueries(1):
+            rows = list(AccountingEntry.objects.with_line_totals().order_by('entry_number'))
+        self.assertEqual(
+            [(e.line_debit, e.line_credit) for e in rows],
+            [(e.total_debit, e.total_credit) for e in rows]
+        )
+    
+    def test_serializer_keeps_totals_in_sync(self):
+        """Test that writing lines through the API updates the stored totals."""
+        response = self.client_api.post('/api/v1.0/acc/accounting-entries/', {
+            'entry_number': 'API-1',
+            'journal': self.journal.pk,
+            'fiscal_year': self.fiscal_year.pk,
+            'entry_date': '2024-03-01',
+            'lines': [
+                {'account': self.accounts['606100'].pk, 'is_debit': True, 'amount': '12.50'},
+                {'account': self.accounts['512000'].pk, 'is_debit': False, 'amount': '12.50'},
+            ]
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        
+        entry = AccountingEntry.objects.get(entry_number='API-1')
+        self.assertEqual(entry.total_debit, Decimal('12.50'))
+        self.assertEqual(entry.total_credit, Decimal('12.50'))
+    
+    def test_reversing_entry_totals(self):
+        """Test that a reversing entry stores the swapped totals."""
+        self.create_entry('E3', date(2024, 1, 12), [
+            ('606100', True, '30.00'),
+            ('512000', False, '30.00'),
+        ])
+        entry = AccountingEntry.objects.get(entry_number='E3')
+        response = self.client_api.post(
+            f'/api/v1.0/acc/accounting-entries/{entry.pk}/create_reversing_entry/', {}, format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        
+        reversal = AccountingEntry.objects.get(original_entry=entry)
+        self.assertEqual((reversal.total_debit, reversal.total_credit), (Decimal('30.00'), Decimal('30.00')))
+    
+    def test_admin_changelist_query_count_is_constant(self):
+        """Test that the admin changelist does not aggregate lines per row."""
+        self.client.force_login(self.user)
+        url = reverse('admin:accounting_accountingentry_changelist')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        
+        for i in range(10):
+            self.create_entry(f'BULK-{i}', date(2024, 2, 1), [
+                ('606100', True, '1.00'),
+                ('512000', False, '1.00'),
+            ], status='draft')
+        
+        with self.assertNumQueries(len(context.captured_queries)):
+            response = self.client.get(url)
+        self.assertContains(response, 'BULK-9')
+
+
+class PostedEntryLockTest(LedgerTestMixin, TestCase):
+    """Test suite for the protection of posted entries against edits and deletes."""
+    
+    def setUp(self):
+        """Set up a posted entry, a draft entry and an API client."""
+        self.create_ledger_fixtures()
+        self.posted = self.create_entry('E1', date(2024, 1, 10), [
+            ('606100', True, '100.00'),
+            ('401000', False, '100.00'),
+        ])
+        self.draft = self.create_entry('E2', date(2024, 1, 11), [
+            ('512000', True, '10.00'),
+            ('411000', False, '10.00'),
+        ], status='draft')
+        self.user = User.objects.create_superuser(email='admin@example.com', password='testpass123')
+        self.client_api = APIClient()
+        self.client_api.force_authenticate(self.user)
+    
+    def payload(self, entry, amount, status=None):
+        return {
+            'entry_number': entry.entry_number,
+            'journal': self.journal.pk,
+            'fiscal_year': self.fiscal_year.pk,
+            'entry_date': '2024-01-10',
+            'status': status or entry.status,
+            'lines': [
+                {'account': self.accounts['606100'].pk, 'is_debit': True, 'amount': amount},
+                {'account': self.accounts['512000'].pk, 'is_debit': False, 'amount': amount},
+            ]
+        }
+    
+    def test_update_posted_entry_is_rejected(self):
+        """Test that the lines of a posted entry cannot be rewritten through the API."""
+        url = f'/api/v1.0/acc/accounting-entries/{self.posted.pk}/'
+        response = self.client_api.put(url, self.payload(self.posted, '999.00'), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('reversing entry', str(response.data))
+        response = self.client_api.patch(url, {'reference': 'changed'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        
+        self.posted.refresh_from_db()
+        self.assertEqual(self.posted.total_debit, Decimal('100.00'))
+        self.assertEqual(verify_balance_snapshots(), [])
+    
+    def test_delete_posted_entry_is_rejected(self):
+        """Test that a posted entry cannot be deleted through the API."""
+        response = self.client_api.delete(f'/api/v1.0/acc/accounting-entries/{self.posted.pk}/')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('reversing entry', response.data['detail'])
+        self.assertTrue(AccountingEntry.objects.filter(pk=self.posted.pk).exists())
+        self.assertEqual(verify_balance_snapshots(), [])
+    
+    def test_validate_only_accepts_draft_entries(self):
+        """Test that a posted entry cannot be moved back to validated and posted twice."""
+        url = f'/api/v1.0/acc/accounting-entries/{self.posted.pk}/'
+        response = self.client_api.post(f'{url}validate/')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('reversing entry', response.data['detail'])
+        self.assertEqual(self.client_api.post(f'{url}post_to_ledger/').status_code, 400)
+        self.posted.refresh_from_db()
+        self.assertEqual(self.posted.status, 'posted')
+        self.assertEqual(verify_balance_snapshots(), [])
+        
+        url = f'/api/v1.0/acc/accounting-entries/{self.draft.pk}/validate/'
+        self.assertEqual(self.client_api.post(url).status_code, 200)
+        response = self.client_api.post(url)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['detail'], 'Only draft entries can be validated.')
+    
+    def test_draft_entry_stays_editable(self):
+        """Test that draft entries can still be updated and deleted, but not posted directly."""
+        url = f'/api/v1.0/acc/accounting-entries/{self.draft.pk}/'
+        response = self.client_api.put(url, self.payload(self.draft, '20.00'), format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.draft.refresh_from_db()
+        self.assertEqual(self.draft.total_debit, Decimal('20.00'))
+        
+        response = self.client_api.put(url, self.payload(self.draft, '20.00', status='posted'), format='json')
+        self.assertEqual(response.status_code, 400)
+        
+        response = self.client_api.delete(url)
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(verify_balance_snapshots(), [])
+    
+    def test_admin_posted_entry_is_read_only(self):
+        """Test that the admin neither deletes nor edits the lines of a posted entry."""
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('admin:accounting_accountingentry_delete', args=[self.posted.pk]))
+        self.assertEqual(response.status_code, 403)
+        
+        response = self.client.post(reverse('admin:accounting_accountingentry_changelist'), {
+            'action': 'delete_selected',
+            'post': 'yes',
+            '_selected_action': [self.posted.pk, self.draft.pk],
+        })
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(AccountingEntry.objects.filter(pk__in=[self.posted.pk, self.draft.pk]).count(), 2)
+        
+        response = self.client.get(reverse('admin:accounting_accountingentry_change', args=[self.posted.pk]))
+        inline = response.context['inline_admin_formsets'][0]
+        self.assertFalse(inline.has_change_permission or inline.has_add_permission or inline.has_delete_permission)
+        self.assertEqual(verify_balance_snapshots(), [])
+
+
+class EntryLinesSyncTest(LedgerTestMixin, TestCase):
+    """Test suite for the batched line writes of accounting entries."""
+    
+    def setUp(self):
+        """Set up an entry with three lines."""
+        self.create_ledger_fixtures()
+        self.entry = self.create_entry('E1', date(2024, 1, 10), [
+            ('606100', True, '100.00'),
+            ('401000', False, '60.00'),
+            ('401000', False, '40.00'),
+        ], status='validated')
+    
+    def line_data(self, number, is_debit, amount):
+        return {'account': self.accounts[number], 'is_debit': is_debit, 'amount': Decimal(amount)}
+    
+    def test_sync_only_writes_changed_lines(self):
+        """Test that unchanged lines keep their row and removed numbers are deleted."""
+        first_pk = self.entry.lines.get(line_number=1).pk
+        result = sync_entry_lines(self.entry, [
+            self.line_data('606100', True, '100.00'),
+            self.line_data('401000', False, '100.00'),
+        ])
+        self.assertEqual(result, {'created': 0, 'updated': 1, 'deleted': 1, 'unchanged': 1})
+        self.assertEqual(self.entry.lines.get(line_number=1).pk, first_pk)
+        self.assertEqual(self.entry.lines.get(line_number=2).amount, Decimal('100.00'))
+        self.entry.refresh_from_db()
+        self.assertEqual((self.entry.total_debit, self.entry.total_credit), (Decimal('100.00'), Decimal('100.00')))
+    
+    def test_create_entry_lines_uses_batched_inserts(self):
+        """Test that creating many lines does not run one query per line."""
+        entry = AccountingEntry.objects.create(
+            entry_number='E2', journal=self.journal, fiscal_year=self.fiscal_year, entry_date=date(2024, 1, 11)
+        )
+        lines = [self.line_data('606100', i % 2 == 0, '1.00') for i in range(200)]
+        with CaptureQueriesContext(connection) as context:
+            create_entry_lines(entry, lines, batch_size=100)
+        self.assertLess(len(context.captured_queries), 20)
+        self.assertEqual(entry.lines.count(), 200)
+        self.assertEqual(entry.total_debit, Decimal('100.00'))
+
+
+class AccountingEntryCompactViewTest(LedgerTestMixin, TestCase):
+    """Test suite for the compact entry representation and the planned entry querysets."""
+    
+    def setUp(self):
+        """Set up posted entries with reference data on their lines."""
+        self.create_ledger_fixtures()
+        self.suppliers = AccountingType.objects.create(code='FRS', short_name='Fournisseurs', full_name='Fournisseurs')
+        self.user = User.objects.create_superuser(email='admin@example.com', password='testpass123')
+        self.client_api = APIClient()
+        self.client_api.force_authenticate(self.user)
+        self.url = '/api/v1.0/acc/accounting-entries/'
+    
+    def _create_entries(self, count, prefix, lines=3):
+        for i in range(count):
+            entry = self.create_entry(f'{prefix}-{i}', date(2024, 1, 10), [('606100', True, '10.00')] * (lines - 1) + [
+                ('401000', False, f'{10 * (lines - 1)}.00')
+            ])
+            entry.lines.filter(account=self.accounts['401000']).update(
+                auxiliary_account_type=self.suppliers, auxiliary_account_id='S1'
+            )
+    
+    def test_compact_representation(self):
+        """Test that compact lines carry ids and codes only."""
+        self._create_entries(1, 'E')
+        response = self.client_api.get(self.url, {'view': 'compact'})
+        self.assertEqual(response.status_code, 200)
+        entry = response.data['results'][0]
+        self.assertEqual((entry['journal_code'], entry['fiscal_year_code']), ('ACH', 2024))
+        line = entry['lines'][-1]
+        self.assertEqual(line['account_number'], '401000')
+        self.assertEqual(line['amount'], '20.00')
+        self.assertEqual((line['auxiliary_account_type_code'], line['auxiliary_account_id']), ('FRS', 'S1'))
+        self.assertNotIn('account_details', line)
+        
+        response = self.client_api.get(f"{self.url}{entry['id']}/", {'view': 'compact'})
+        self.assertEqual(response.data['lines'], entry['lines'])
+    
+    def test_queries_per_page_are_fixed(self):
+        """Test that a page costs the same number of queries whatever its entries and lines."""
+        for view in ('compact', 'full'):
+            with self.subTest(view=view):
+                AccountingEntry.objects.all().delete()
+                self._create_entries(2, f'{view}-A')
+                # Load the reference registry first: its tables are read once per process
+                self.client_api.get(self.url, {'view': view})
+                with CaptureQueriesContext(connection) as context:
+                    self.client_api.get(self.url, {'view': view})
+                
+                self._create_entries(10, f'{view}-B', lines=20)
+                with self.assertNumQueries(len(context.captured_queries)):
+                    response = self.client_api.get(self.url, {'view': view})
+                self.assertEqual(response.data['count'], 12)
@@ -0,0 +1,179 @@
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from accounting.models import AccountingEntry, AccountingEntryLine, AnalyticalAggregate
+from accounting.models.reference_data import Activity, Municipality
+from accounting.tests.utils import LedgerTestMixin
+from accounting.utils.analytics import generate_cube, rebuild_analytical_aggregates
+from accounting.utils.ledger_balances import increment_totals, post_entry
+
+User = get_user_model()
+
+
+class AnalyticalCubeTest(LedgerTestMixin, TestCase):
+    """Test suite for the analytical cube and its materialized aggregates."""
+    
+    def setUp(self):
+        """Set up lines tagged with activities, municipalities and analytical codes."""
+        caches['accounting_reports'].clear()
+        self.create_ledger_fixtures()
+        self.water = Activity.objects.create(code='EAU', name='Eau')
+        self.waste = Activity.objects.create(code='DEC', name='Déchets')
+        self.paris = Municipality.objects.create(
+            insee_code='75056', name='Paris', postal_code='75001', department_code='75', region_code='11'
+        )
+        self.lyon = Municipality.objects.create(
+            insee_code='69123', name='Lyon', postal_code='69001', department_code='69', region_code='84'
+        )
+    
+    def _post(self, number, activity, lines):
+        """Post an entry whose lines are (account, is_debit, amount, municipality, analytical_code)."""
+        entry = self.create_entry(number, date(2024, 3, 1), [line[:3] for line in lines], status='validated')
+        entry.activity = activity
+        entry.save()
+        for line_number, line in enumerate(lines, start=1):
+            AccountingEntryLine.objects.filter(entry=entry, line_number=line_number).update(
+                municipality=line[3], analytical_code=line[4]
+            )
+        post_entry(entry)
+    
+    def _post_fixtures(self):
+        self._post('E1', self.water, [
+            ('606100', True, '100.00', self.paris, 'A1'),
+            ('606100', True, '50.00', self.lyon, 'A2'),
+            ('401000', False, '150.00', None, None),
+        ])
+        self._post('E2', self.waste, [
+            ('606100', True, '30.00', self.paris, 'A1'),
+            ('401000', False, '30.00', None, None),
+        ])
+    
+    def test_cube_from_lines(self):
+        """Test a two-dimensional pivot answered by one query."""
+        self._post_fixtures()
+        with CaptureQueriesContext(connection) as queries:
+            cube = generate_cube(['activity', 'municipality'], 'debit', self.fiscal_year, use_aggregates=False)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual([member['code'] for member in cube['members']['activity']], ['DEC', 'EAU'])
+        self.assertEqual([member['name'] for member in cube['members']['municipality']], ['Lyon', 'Paris', None])
+        self.assertEqual(cube['values'], [
+            [Decimal('0.00'), Decimal('30.00'), Decimal('0.00')],
+            [Decimal('50.00'), Decimal('100.00'), Decimal('0.00')],
+        ])
+        self.assertEqual(cube['total'], Decimal('180.00'))
+        
+        cube = generate_cube(['analytical_code'], 'net', use_aggregates=False)
+        self.assertEqual([member['code'] for member in cube['members']['analytical_code']], ['A1', 'A2', None])
+        self.assertEqual(cube['values'], [Decimal('130.00'), Decimal('50.00'), Decimal('-180.00')])
+        with self.assertRaises(ValueError):
+            generate_cube(['activity', 'activity'])
+    
+    @override_settings(ACCOUNTING_ANALYTICAL_AGGREGATES=True)
+    def test_aggregates_match_lines(self):
+        """Test that the aggregates maintained on posting give the same cube as the lines."""
+        self._post_fixtures()
+        self.assertTrue(AnalyticalAggregate.objects.exists())
+        for dimensions in (['activity'], ['municipality', 'analytical_code'], ['analytical_code', 'activity', 'municipality']):
+            with self.subTest(dimensions=dimensions):
+                from_aggregates = generate_cube(dimensions, fiscal_year=self.fiscal_year)
+                from_lines = generate_cube(dimensions, fiscal_year=self.fiscal_year, use_aggregates=False)
+                self.assertEqual(from_aggregates['source'], 'aggregates')
+                self.assertEqual(from_aggregates['values'], from_lines['values'])
+                self.assertEqual(from_aggregates['members'], from_lines['members'])
+        
+        stored = generate_cube(['analytical_code', 'activity', 'municipality'])
+        rebuild_analytical_aggregates(self.fiscal_year)
+        self.assertEqual(generate_cube(['analytical_code', 'activity', 'municipality']), stored)
+    
+    def test_cube_endpoint(self):
+        """Test the cube endpoint and its validation."""
+        self._post_fixtures()
+        user = User.objects.create_superuser(email='admin@example.com', password='testpass123')
+        client = APIClient()
+        client.force_authenticate(user)
+        url = '/api/v1.0/acc/reports/cube/'
+        response = client.get(url, {'dimensions': 'activity', 'measure': 'credit', 'fiscal_year': self.fiscal_year.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['values'], [Decimal('30.00'), Decimal('150.00')])
+        self.assertEqual(client.get(url, {'dimensions': 'a,b,c,d'}).status_code, 400)
+        self.assertEqual(client.get(url, {'dimensions': 'activity', 'measure': 'x'}).status_code, 400)
+    
+    def test_aggregate_key_is_unique(self):
+        """Test that an aggregate key, NULL members included, cannot be stored twice."""
+        key = {'fiscal_year': self.fiscal_year, 'journal': self.journal, 'activity': self.water}
+        AnalyticalAggregate.objects.create(**key)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            AnalyticalAggregate.objects.create(**key)
+        AnalyticalAggregate.objects.create(analytical_code='A1', **key)
+    
+    def test_empty_analytical_code_is_null(self):
+        """Test that lines without a code, stored as '' or NULL, add up in one aggregate row."""
+        self._post('E1', self.water, [('606100', True, '10.00', None, None), ('401000', False, '10.00', None, None)])
+        self._post('E2', self.water, [('606100', True, '10.00', None, ''), ('401000', False, '10.00', None, '')])
+        self.assertFalse(AnalyticalAggregate.objects.filter(analytical_code='').exists())
+        cube = generate_cube(['analytical_code'], measure='debit', fiscal_year=self.fiscal_year)
+        self.assertEqual(cube['values'], [Decimal('20.00')])
+        self.assertEqual(generate_cube(['analytical_code'], measure='debit', use_aggregates=False)['values'], cube['values'])
+        
+        rebuild_analytical_aggregates(self.fiscal_year)
+        self.assertEqual(generate_cube(['analytical_code'], measure='debit')['values'], [Decimal('20.00')])
+    
+    def test_increment_refuses_an_unmatched_conflict(self):
+        """Test that amounts rejected by the constraint without a row to increment raise instead of being lost."""
+        key = {'fiscal_year_id': self.fiscal_year.pk, 'journal_id': self.journal.pk}
+        AnalyticalAggregate.objects.create(analytical_code=None, **key)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            increment_totals(AnalyticalAggregate, dict(key, analytical_code=''), Decimal('10.00'), Decimal('0.00'))
+    
+    @override_settings(ACCOUNTING_ANALYTICAL_AGGREGATES=True)
+    def test_posted_reversal_offsets_its_cell(self):
+        """Test that a posted reversing entry brings the cells of the original back to zero."""
+        self._post_fixtures()
+        user = User.objects.create_superuser(email='admin@example.com', password='testpass123')
+        client = APIClient()
+        client.force_authenticate(user)
+        original = AccountingEntry.objects.get(entry_number='E1')
+        response = client.post(f'/api/v1.0/acc/accounting-entries/{original.pk}/create_reversing_entry/')
+        self.assertEqual(response.status_code, 200, response.content)
+        reversal = AccountingEntry.objects.get(pk=response.data['id'])
+        self.assertEqual(reversal.activity, self.water)
+        reversal.status = 'validated'
+        reversal.save()
+        post_entry(reversal)
+        
+        for use_aggregates in (True, False):
+            with self.subTest(use_aggregates=use_aggregates):
+                cube = generate_cube(
+                    ['activity', 'municipality', 'analytical_code'], measure='debit', use_aggregates=use_aggregates
+                )
+                self.assertEqual(cube['total'], Decimal('330.00'))
+                net = generate_cube(
+                    ['activity', 'municipality', 'analytical_code'], use_aggregates=use_aggregates
+                )
+                water = [member['key'] for member in net['members']['activity']].index(self.water.pk)
+                self.assertEqual(
+                    [value for by_code in net['values'][water] for value in by_code], [Decimal('0.00')] * 9
+                )
+    
+    def test_cube_cell_limit(self):
+        """Test that a cube larger than the cell limit is refused instead of being built."""
+        self._post_fixtures()
+        user = User.objects.create_superuser(email='admin@example.com', password='testpass123')
+        client = APIClient()
+        client.force_authenticate(user)
+        # 2 activities x 3 municipalities
+        with mock.patch('accounting.utils.analytics.MAX_CUBE_CELLS', 5):
+            with self.assertRaises(ValueError):
+                generate_cube(['activity', 'municipality'], use_aggregates=False)
+            response = client.get('/api/v1.0/acc/reports/cube/', {
+                'dimensions': 'activity,municipality', 'fiscal_year': self.fiscal_year.pk
+            })
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('cells', response.data['error'])
+            self.assertEqual(len(generate_cube(['municipality'], use_aggregates=False)['values']), 3)
@@ -0,0 +1,84 @@
+import json
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from accounting.models import AccountingEntryLine, AccountingType
+from accounting.tests.utils import LedgerTestMixin
+from accounting.utils.auxiliary_ledger import aging_bucket_names, auxiliary_balance_rows
+from accounting.utils.reference_data import reference_table
+
+User = get_user_model()
+
+
+class AuxiliaryLedgerTest(LedgerTestMixin, TestCase):
+    """Test suite for the sub-ledger balance and aging report."""
+    
+    def setUp(self):
+        """Set up supplier and client lines with due dates."""
+        self.create_ledger_fixtures()
+        self.suppliers = AccountingType.objects.create(code='FRS', short_name='Fournisseurs', full_name='Fournisseurs')
+        self.clients = AccountingType.objects.create(code='CLI', short_name='Clients', full_name='Clients')
+        self.create_entry('E1', date(2024, 1, 10), [('606100', True, '100.00'), ('401000', False, '100.00')])
+        self.create_entry('E2', date(2024, 5, 20), [('606100', True, '40.00'), ('401000', False, '40.00')])
+        self.create_entry('E3', date(2024, 6, 1), [('606100', True, '70.00'), ('401000', False, '70.00')])
+        self.create_entry('E4', date(2024, 6, 10), [('411000', True, '250.00'), ('706000', False, '250.00')])
+        self.create_entry('E5', date(2024, 6, 15), [('401000', True, '100.00'), ('512000', False, '100.00')])
+        self._tag('E1', 2, self.suppliers, 'S1', reconciliation_code='A')
+        self._tag('E5', 1, self.suppliers, 'S1', reconciliation_code='A')
+        self._tag('E2', 2, self.suppliers, 'S1')
+        self._tag('E3', 2, self.suppliers, 'S2', due_date=date(2024, 7, 15))
+        self._tag('E4', 1, self.clients, 'C1', due_date=date(2024, 3, 1))
+    
+    def _tag(self, entry_number, line_number, auxiliary_type, auxiliary_id, **fields):
+        AccountingEntryLine.objects.filter(entry__entry_number=entry_number, line_number=line_number).update(
+            auxiliary_account_type=auxiliary_type, auxiliary_account_id=auxiliary_id, **fields
+        )
+    
+    def test_balances_and_aging(self):
+        """Test the balance and aging buckets of each third party, in one query."""
+        reference_table(AccountingType)
+        with CaptureQueriesContext(connection) as queries:
+            rows = list(auxiliary_balance_rows(as_of_date=date(2024, 6, 30)))
+        self.assertEqual(len(queries), 1)
+        rows = {(row['auxiliary_type'], row['auxiliary_id']): row for row in rows}
+        self.assertEqual(set(rows), {('FRS', 'S1'), ('FRS', 'S2'), ('CLI', 'C1')})
+        
+        s1 = rows[('FRS', 'S1')]
+        self.assertEqual((s1['debit'], s1['credit'], s1['balance']), (Decimal('100.00'), Decimal('140.00'), Decimal('-40.00')))
+        self.assertEqual(s1['days_31_60'], Decimal('-40.00'))
+        self.assertEqual(rows[('FRS', 'S2')]['not_due'], Decimal('-70.00'))
+        self.assertEqual(rows[('CLI', 'C1')]['days_over_90'], Decimal('250.00'))
+        for row in rows.values():
+            self.assertEqual(sum(row[name] for name in aging_bucket_names()), row['balance'])
+    
+    def test_filters(self):
+        """Test account, type and date filters and custom buckets."""
+        rows = list(auxiliary_balance_rows(as_of_date='2024-06-30', accounts=['411*']))
+        self.assertEqual([row['auxiliary_id'] for row in rows], ['C1'])
+        rows = list(auxiliary_balance_rows(as_of_date='2024-05-31', auxiliary_type='FRS'))
+        self.assertEqual([(row['auxiliary_id'], row['balance']) for row in rows], [('S1', Decimal('-140.00'))])
+        rows = list(auxiliary_balance_rows(as_of_date='2024-06-30', buckets=(45,)))
+        self.assertEqual(set(rows[0]), {
+            'auxiliary_type', 'auxiliary_id', 'debit', 'credit', 'balance', 'not_due', 'days_0_45', 'days_over_45'
+        })
+        with self.assertRaises(ValueError):
+            list(auxiliary_balance_rows(buckets=(60, 30)))
+    
+    def test_auxiliary_balances_endpoint(self):
+        """Test the streamed sub-ledger endpoint."""
+        user = User.objects.create_superuser(email='admin@example.com', password='testpass123')
+        client = APIClient()
+        client.force_authenticate(user)
+        url = '/api/v1.0/acc/reports/auxiliary_balances/'
+        response = client.get(url, {'as_of_date': '2024-06-30', 'auxiliary_type': 'FRS'})
+        self.assertEqual(response.status_code, 200)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['auxiliary_id'] for row in rows], ['S1', 'S2'])
+        response = client.get(url, {'stream': 'csv', 'buckets': '30,60'})
+        header = b''.join(response.streaming_content).decode().splitlines()[0]
+        self.assertTrue(header.endswith('days_31_60,days_over_60'))
+        self.assertEqual(client.get(url, {'buckets': '60,x'}).status_code, 400)
@@ -0,0 +1,95 @@
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from accounting.models import FiscalYear
+from accounting.tests.utils import LedgerTestMixin
+from accounting.utils.comparative import (
+    MAX_COMPARATIVE_PERIODS,
+    build_periods,
+    generate_comparative_report,
+    parse_periods,
+)
+
+User = get_user_model()
+
+
+class ComparativeReportTest(LedgerTestMixin, TestCase):
+    """Test suite for the comparative (multi-period) reports."""
+    
+    def setUp(self):
+        """Set up a ledger spread over two fiscal years."""
+        self.create_ledger_fixtures()
+        self.create_entry('E1', date(2024, 1, 10), [('606100', True, '100.00'), ('401000', False, '100.00')])
+        self.create_entry('E2', date(2024, 3, 5), [('411000', True, '250.00'), ('706000', False, '250.00')])
+        self.create_entry('E3', date(2024, 3, 20), [('606100', True, '40.00'), ('512000', False, '40.00')])
+        fiscal_year = self.fiscal_year
+        self.fiscal_year = FiscalYear.objects.create(
+            year=2023, name='EXERCICE 2023', start_date=date(2023, 1, 1), end_date=date(2023, 12, 31)
+        )
+        self.create_entry('P1', date(2023, 5, 1), [('411000', True, '200.00'), ('706000', False, '200.00')])
+        self.create_entry('P2', date(2023, 6, 1), [('606100', True, '60.00'), ('512000', False, '60.00')])
+        self.fiscal_year = fiscal_year
+    
+    def test_period_presets(self):
+        """Test the monthly, quarterly and year-over-year period sets."""
+        monthly = build_periods(self.fiscal_year, 'monthly')
+        self.assertEqual(len(monthly), 12)
+        self.assertEqual((monthly[1]['label'], monthly[1]['end_date']), ('2024-02', date(2024, 2, 29)))
+        self.assertEqual([p['label'] for p in build_periods(self.fiscal_year, 'quarterly')],
+                         ['2024-Q1', '2024-Q2', '2024-Q3', '2024-Q4'])
+        self.assertEqual([p['label'] for p in build_periods(self.fiscal_year, 'yoy')], ['2024', '2023'])
+        self.assertEqual(parse_periods('N=2024-01-01:2024-06-30, 2023-01-01:2023-06-30')[1]['label'],
+                         '2023-01-01:2023-06-30')
+        with self.assertRaises(ValueError):
+            parse_periods('2024-06-30:2024-01-01')
+        with self.assertRaises(ValueError):
+            parse_periods(','.join(['2024-01-01:2024-01-31'] * (MAX_COMPARATIVE_PERIODS + 1)))
+    
+    def test_income_statement_year_over_year(self):
+        """Test N vs N-1 income statement columns from one query."""
+        periods = build_periods(self.fiscal_year, 'yoy')
+        with CaptureQueriesContext(connection) as queries:
+            report = generate_comparative_report(periods, 'income_statement')
+        self.assertEqual(len(queries), 1)
+        self.assertEqual([row['account_number'] for row in report['accounts']], ['606100', '706000'])
+        self.assertEqual(report['values'], [
+            [Decimal('140.00'), Decimal('60.00')],
+            [Decimal('250.00'), Decimal('200.00')],
+        ])
+        self.assertEqual(report['totals']['net_income'], [Decimal('110.00'), Decimal('140.00')])
+    
+    def test_monthly_trial_balance(self):
+        """Test monthly trial balance columns and account selection."""
+        periods = build_periods(self.fiscal_year, 'monthly')
+        report = generate_comparative_report(periods, accounts=['4*'])
+        self.assertEqual([row['account_number'] for row in report['accounts']], ['401000', '411000'])
+        self.assertEqual(report['values'][0][0], Decimal('-100.00'))
+        self.assertEqual(report['values'][1][2], Decimal('250.00'))
+        
+        report = generate_comparative_report(periods)
+        self.assertTrue(all(report['totals']['is_balanced']))
+        self.assertEqual(report['totals']['total_debit'][2], Decimal('290.00'))
+    
+    def test_comparative_endpoint(self):
+        """Test the comparative report endpoint."""
+        user = User.objects.create_superuser(email='admin@example.com', password='testpass123')
+        client = APIClient()
+        client.force_authenticate(user)
+        url = '/api/v1.0/acc/reports/comparative/'
+        response = client.get(url, {
+            'fiscal_year': self.fiscal_year.pk, 'statement': 'income_statement', 'periods': 'yoy'
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['values']), 2)
+        response = client.get(url, {'periods': 'H1=2024-01-01:2024-06-30,H1-1=2023-01-01:2023-06-30'})
+        self.assertEqual([p['label'] for p in response.data['periods']], ['H1', 'H1-1'])
+        self.assertEqual(client.get(url, {'periods': 'monthly'}).status_code, 400)
+        self.assertEqual(client.get(url, {'periods': 'bad'}).status_code, 400)
+        response = client.get(url, {'periods': ','.join(['2024-01-01:2024-01-31'] * (MAX_COMPARATIVE_PERIODS + 1))})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(f'At most {MAX_COMPARATIVE_PERIODS} periods', response.data['error'])
+        self.assertEqual(client.get(url, {'statement': 'x'}).status_code, 400)
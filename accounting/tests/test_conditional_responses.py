@@ -0,0 +1,164 @@
+import gzip
+import json
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+from accounting.mixins import _full_dump, _full_dumps, nested_models
+from accounting.models import (
+    AccountingChapter,
+    AccountingClass,
+    AccountingSection,
+    AccountingType,
+    GeneralLedgerAccount,
+)
+from accounting.models.reference_data import Municipality, ServiceType
+from accounting.serializers import GeneralLedgerAccountSerializer
+from accounting.views import AccountingJournalViewSet, GeneralLedgerAccountViewSet
+
+User = get_user_model()
+
+MUNICIPALITIES_URL = '/api/v1.0/acc/municipalities/'
+ACCOUNTS_URL = '/api/v1.0/acc/general-ledger-accounts/'
+
+
+class ConditionalReferenceResponseTest(TestCase):
+    """Test suite for the ETag / Last-Modified support of the reference endpoints."""
+    
+    def setUp(self):
+        """Set up a few municipalities and an authenticated API client."""
+        for insee_code, name, postal_code in [
+            ('75056', 'Paris', '75001'),
+            ('69123', 'Lyon', '69001'),
+            ('13055', 'Marseille', '13001'),
+        ]:
+            Municipality.objects.create(
+                insee_code=insee_code, name=name, postal_code=postal_code,
+                department_code=insee_code[:2], region_code='00'
+            )
+        self.user = User.objects.create_superuser(email='admin@example.com', password='testpass123')
+        self.client_api = APIClient()
+        self.client_api.force_authenticate(self.user)
+    
+    def test_list_has_validators(self):
+        """Test that a list response carries an ETag and a Last-Modified header."""
+        response = self.client_api.get(MUNICIPALITIES_URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', response)
+        self.assertIn('no-cache', response['Cache-Control'])
+    
+    def test_if_none_match_returns_304_without_reading_the_table(self):
+        """Test that a matching ETag is answered 304 after the version query only."""
+        etag = self.client_api.get(MUNICIPALITIES_URL)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client_api.get(MUNICIPALITIES_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+    
+    def test_if_modified_since_returns_304(self):
+        """Test that an unchanged table is answered 304 to If-Modified-Since."""
+        last_modified = self.client_api.get(MUNICIPALITIES_URL)['Last-Modified']
+        response = self.client_api.get(MUNICIPALITIES_URL, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+    
+    def test_etag_changes_with_the_table_and_the_query(self):
+        """Test that a deletion, an update or other query parameters change the ETag."""
+        etag = self.client_api.get(MUNICIPALITIES_URL)['ETag']
+        self.assertNotEqual(self.client_api.get(MUNICIPALITIES_URL, {'search': 'Paris'})['ETag'], etag)
+        
+        Municipality.objects.get(insee_code='13055').delete()
+        response = self.client_api.get(MUNICIPALITIES_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+        
+        etag = response['ETag']
+        lyon = Municipality.objects.get(insee_code='69123')
+        lyon.name = 'Lyon 1er'
+        lyon.save()
+        self.assertEqual(self.client_api.get(MUNICIPALITIES_URL, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+    
+    def test_retrieve_is_conditional(self):
+        """Test that a detail response is validated the same way."""
+        url = f'{MUNICIPALITIES_URL}{Municipality.objects.get(insee_code="75056").pk}/'
+        etag = self.client_api.get(url)['ETag']
+        self.assertEqual(self.client_api.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+    
+    def test_full_dump(self):
+        """Test that ?all=1 returns the whole table, compressed when the client accepts gzip."""
+        response = self.client_api.get(MUNICIPALITIES_URL, {'all': '1'}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        rows = json.loads(gzip.decompress(response.content))
+        self.assertEqual([row['insee_code'] for row in rows], ['13055', '69123', '75056'])
+        
+        # Served from the pre-serialized dump while the table is unchanged
+        with self.assertNumQueries(1):
+            plain = self.client_api.get(MUNICIPALITIES_URL, {'all': '1'})
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertEqual(json.loads(plain.content), rows)
+        
+        ServiceType.objects.create(code='EAU', name='Eau')
+        Municipality.objects.create(
+            insee_code='33063', name='Bordeaux', postal_code='33000', department_code='33', region_code='75'
+        )
+        rows = json.loads(self.client_api.get(MUNICIPALITIES_URL, {'all': '1'}).content)
+        self.assertEqual(len(rows), 4)
+
+
+class ConditionalRelatedModelsTest(TestCase):
+    """Test suite for the versions of the related tables serialized with the reference endpoints."""
+    
+    def setUp(self):
+        """Set up one account of the chart and an authenticated API client."""
+        accounting_class = AccountingClass.objects.create(code='6', name='Charges')
+        chapter = AccountingChapter.objects.create(accounting_class=accounting_class, code='60', name='Achats')
+        self.section = AccountingSection.objects.create(chapter=chapter, code='601', name='Achats stockes')
+        GeneralLedgerAccount.objects.create(
+            section=self.section, account_number='601000', short_name='Achats', full_name='Achats stockes',
+            is_balance_sheet=False
+        )
+        self.user = User.objects.create_superuser(email='admin@example.com', password='testpass123')
+        self.client_api = APIClient()
+        self.client_api.force_authenticate(self.user)
+    
+    def test_related_models(self):
+        """Test that the nested serializers and the declared related models are versioned."""
+        self.assertEqual(
+            nested_models(GeneralLedgerAccountSerializer), (AccountingSection, AccountingChapter, AccountingClass)
+        )
+        self.assertEqual(
+            GeneralLedgerAccountViewSet()._version_models(),
+            [GeneralLedgerAccount, AccountingSection, AccountingChapter, AccountingClass]
+        )
+        self.assertIn(AccountingType, AccountingJournalViewSet()._version_models())
+    
+    def test_etag_changes_with_a_related_table(self):
+        """Test that renaming the section of an account changes the ETag of the account list."""
+        etag = self.client_api.get(ACCOUNTS_URL)['ETag']
+        with self.assertNumQueries(4):
+            self.assertEqual(self.client_api.get(ACCOUNTS_URL, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        
+        self.section.name = 'Achats stockés'
+        self.section.save()
+        response = self.client_api.get(ACCOUNTS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['results'][0]['section_details']['name'], 'Achats stockés')
+    
+    def test_full_dump_follows_a_related_table(self):
+        """Test that the full dump is rebuilt when a related table changes."""
+        rows = json.loads(self.client_api.get(ACCOUNTS_URL, {'all': '1'}).content)
+        self.assertEqual(rows[0]['section_details']['name'], 'Achats stockes')
+        
+        self.section.name = 'Achats stockés'
+        self.section.save()
+        rows = json.loads(self.client_api.get(ACCOUNTS_URL, {'all': '1'}).content)
+        self.assertEqual(rows[0]['section_details']['name'], 'Achats stockés')
+    
+    def test_full_dump_is_stored_under_the_current_version(self):
+        """Test that a dump requested with an outdated version is stored under the version read in the lock."""
+        view = GeneralLedgerAccountViewSet()
+        view.request = None
+        view.format_kwarg = None
+        _full_dump(view, ((None, 0),))
+        self.assertEqual(_full_dumps['accounting.generalledgeraccount'][0], view._table_versions())
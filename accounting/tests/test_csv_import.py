@@ -0,0 +1,266 @@
+import io
+import os
+import tempfile
+from datetime import date
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from accounting.management.commands.import_fiscal_years import FiscalYearImporter
+from accounting.management.commands.import_journals import AccountingJournalImporter
+from accounting.management.commands.import_payer_types import PayerTypeImporter
+from accounting.models import AccountingJournal, AnalyticalAggregate, FiscalYear, FiscalYearReportArchive, ImportedRow
+from accounting.models.reference_data import PayerType
+from accounting.utils.csv_import import detect_encoding, import_csv, open_csv, open_text
+from accounting.utils.reference_data import reference_table, registry
+from accounting.tests.utils import LedgerTestMixin
+
+
+class CSVImportTest(TestCase):
+    """Test suite for the declarative CSV import engine."""
+    
+    def setUp(self):
+        registry.clear()
+    
+    def run_import(self, importer, text, **kwargs):
+        return import_csv(importer, io.StringIO(text), **kwargs)
+    
+    def test_import_and_upsert(self):
+        """Test that rows are inserted, then updated in place on a second import."""
+        result = self.run_import(PayerTypeImporter(), 'CODE;NAME\nPART;Particulier\nPRO;Professionnel\n')
+        self.assertEqual((result['rows'], result['imported'], result['errors']), (2, 2, []))
+        self.assertGreater(result['rows_per_second'], 0)
+        pk = PayerType.objects.get(code='PART').pk
+        
+        self.run_import(PayerTypeImporter(), 'CODE_TYPE_PAYEUR;LIB_TYPE_PAYEUR\nPART;Particuliers\n')
+        payer_type = PayerType.objects.get(code='PART')
+        self.assertEqual((payer_type.pk, payer_type.name), (pk, 'Particuliers'))
+        self.assertEqual(PayerType.objects.count(), 2)
+    
+    def test_skipped_and_rejected_rows(self):
+        """Test that rows missing a required value are skipped and invalid ones rejected."""
+        result = self.run_import(PayerTypeImporter(), 'CODE;NAME\n;Sans code\nNULL;Nul\nTOOLONG;Trop long\nOK;Valide\n')
+        self.assertEqual((result['rows'], result['imported'], result['skipped']), (4, 1, 2))
+        self.assertEqual(len(result['errors']), 1)
+        line_number, message = result['errors'][0]
+        self.assertEqual(line_number, 4)
+        self.assertIn('code', message)
+        self.assertEqual(list(PayerType.objects.values_list('code', flat=True)), ['OK'])
+    
+    def test_duplicates_keep_the_last_row(self):
+        """Test that duplicated keys are written once, with the last row."""
+        importer = PayerTypeImporter()
+        importer.batch_size = 2
+        result = self.run_import(importer, 'CODE;NAME\nA;Un\nA;Deux\nB;Trois\n')
+        self.assertEqual(result['imported'], 2)
+        self.assertEqual(PayerType.objects.get(code='A').name, 'Deux')
+    
+    def test_dry_run_and_progress(self):
+        """Test that a dry run validates without writing and reports progress by batch."""
+        calls = []
+        importer = PayerTypeImporter()
+        importer.batch_size = 2
+        result = self.run_import(
+            importer, 'CODE;NAME\nA;Un\nB;Deux\nC;Trois\n', dry_run=True,
+            progress=lambda rows, imported: calls.append((rows, imported))
+        )
+        self.assertTrue(result['dry_run'])
+        self.assertEqual(result['imported'], 3)
+        self.assertEqual(calls, [(2, 2), (3, 3)])
+        self.assertFalse(PayerType.objects.exists())
+    
+    def test_registry_is_invalidated(self):
+        """Test that a bulk import drops the in-memory reference table."""
+        self.assertIsNone(reference_table(PayerType).get_by_code('A'))
+        self.run_import(PayerTypeImporter(), 'CODE;NAME\nA;Un\n')
+        self.assertEqual(reference_table(PayerType).get_by_code('A')['name'], 'Un')
+    
+    def test_derived_fields(self):
+        """Test the values derived by clean() in the journal and fiscal year importers."""
+        self.run_import(
+            AccountingJournalImporter(),
+            'ID_JOURNAL_COMPTABLE;CODE_JOURNAL_COMPTABLE;LIB_RED_JOURNAL_COMPTABLE;LIB_JOURNAL_COMPTABLE;CODE_SOCIETE;\n'
+            'HLM RAN;RAN;Report;Report a nouveau;N/A;\n'
+            'HLM ACH;ACH;Achats;Journal des achats;HLM;\n'
+        )
+        opening = AccountingJournal.objects.get(id_journal='HLM RAN')
+        self.assertTrue(opening.is_opening_balance)
+        self.assertIsNone(opening.company_code)
+        self.assertEqual(AccountingJournal.objects.get(id_journal='HLM ACH').company_code, 'HLM')
+        
+        result = self.run_import(FiscalYearImporter(), 'NO_EXERCICE;LIB_EXERCICE_\n2000;\n???;INCONNU\nabc;X\n')
+        self.assertEqual((result['imported'], result['skipped'], len(result['errors'])), (1, 1, 1))
+        fiscal_year = FiscalYear.objects.get(year=2000)
+        self.assertEqual(fiscal_year.name, 'EXERCICE 2000')
+        self.assertTrue(fiscal_year.is_closed)
+    
+    def test_fiscal_years_are_saved(self):
+        """Test that the fiscal year import keeps a single current year and drops the archives of reopened years."""
+        current_year = timezone.now().year
+        other = FiscalYear.objects.create(
+            year=2000, name='2000', start_date=date(2000, 1, 1), end_date=date(2000, 12, 31), is_current=True
+        )
+        reopened = FiscalYear.objects.create(
+            year=current_year, name='N', start_date=date(current_year, 1, 1), end_date=date(current_year, 12, 31),
+            is_closed=True
+        )
+        FiscalYearReportArchive.objects.create(
+            fiscal_year=reopened, report='trial_balance', ledger_version=0, content=b'', size=0
+        )
+        
+        self.run_import(FiscalYearImporter(), f'NO_EXERCICE;LIB_EXERCICE_\n{current_year};\n{current_year - 1};\n')
+        self.assertEqual(list(FiscalYear.objects.filter(is_current=True).values_list('year', flat=True)), [current_year])
+        other.refresh_from_db()
+        self.assertFalse(other.is_current)
+        reopened.refresh_from_db()
+        self.assertFalse(reopened.is_closed)
+        self.assertFalse(FiscalYearReportArchive.objects.filter(fiscal_year=reopened).exists())
+        self.assertTrue(FiscalYear.objects.get(year=current_year - 1).is_closed)
+    
+    def test_command(self):
+        """Test an import command with a positional path and --dry-run."""
+        file = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='latin-1')
+        self.addCleanup(os.remove, file.name)
+        with file:
+            file.write('CODE_TYPE_PAYEUR;LIB_TYPE_PAYEUR\n???;INCONNU\nPART;Particulier\n')
+        
+        out = StringIO()
+        call_command('import_payer_types', file.name, '--dry-run', stdout=out)
+        self.assertIn('Dry run: 2 payer types from 2 rows', out.getvalue())
+        self.assertFalse(PayerType.objects.exists())
+        
+        out = StringIO()
+        call_command('import_payer_types', path=file.name, stdout=out)
+        self.assertIn('Successfully imported 2 payer types', out.getvalue())
+        self.assertEqual(PayerType.objects.count(), 2)
+
+
+class CSVSyncTest(LedgerTestMixin, TestCase):
+    """Test suite for the incremental sync of the CSV imports."""
+    
+    def setUp(self):
+        self.create_ledger_fixtures()
+        self.file = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='latin-1', newline='')
+        self.file.close()
+        self.addCleanup(os.remove, self.file.name)
+    
+    def sync(self, text, importer=None, fingerprint=True):
+        with open(self.file.name, 'w', encoding='latin-1', newline='') as file:
+            file.write(text)
+        importer = importer or PayerTypeImporter()
+        reader, file, _ = open_csv(self.file.name)
+        with file:
+            return importer.sync(reader, fingerprint=importer.fingerprint(self.file.name) if fingerprint else None)
+    
+    def counts(self, result):
+        return tuple(result[key] for key in ('inserted', 'updated', 'deleted', 'kept', 'unchanged'))
+    
+    def test_sync(self):
+        """Test that only inserted, changed and removed rows are written."""
+        result = self.sync('CODE;NAME\nPART;Particulier\nPRO;Professionnel\nASSO;Association\n')
+        self.assertEqual(self.counts(result), (3, 0, 0, 0, 0))
+        ids = dict(PayerType.objects.values_list('code', 'pk'))
+        
+        result = self.sync('CODE;NAME\nPART;Particuliers\nPRO;Professionnel\nCOLL;Collectivité\n')
+        self.assertEqual(self.counts(result), (1, 1, 1, 0, 1))
+        self.assertEqual(
+            dict(PayerType.objects.values_list('code', 'name')),
+            {'PART': 'Particuliers', 'PRO': 'Professionnel', 'COLL': 'Collectivité'}
+        )
+        # Rows are updated in place, never deleted and inserted again
+        self.assertEqual(PayerType.objects.get(code='PRO').pk, ids['PRO'])
+        self.assertEqual(ImportedRow.objects.filter(source='accounting.payertype').count(), 3)
+        
+        # A row deleted from the table is inserted again
+        PayerType.objects.filter(code='PRO').delete()
+        result = self.sync('CODE;NAME\nPART;Particuliers\nPRO;Professionnel\nCOLL;Collectivité\n', fingerprint=False)
+        self.assertEqual(self.counts(result), (1, 0, 0, 0, 2))
+    
+    def test_unchanged_file(self):
+        """Test that a file identical to the last sync is not read."""
+        self.sync('CODE;NAME\nPART;Particulier\n')
+        PayerType.objects.update(name='Modifié')
+        
+        result = self.sync('CODE;NAME\nPART;Particulier\n')
+        self.assertTrue(result['file_unchanged'])
+        self.assertEqual(result['rows'], 0)
+        self.assertEqual(PayerType.objects.get().name, 'Modifié')
+        
+        # Rows are compared with the previous sync, not with the table: a full import restores them
+        result = self.sync('CODE;NAME\nPART;Particulier\n', fingerprint=False)
+        self.assertEqual((result['file_unchanged'], result['unchanged']), (False, 1))
+        self.assertEqual(PayerType.objects.get().name, 'Modifié')
+        import_csv(PayerTypeImporter(), io.StringIO('CODE;NAME\nPART;Particulier\n'))
+        self.assertEqual(PayerType.objects.get().name, 'Particulier')
+    
+    def test_referenced_rows_are_kept(self):
+        """Test that rows removed from the file stay while a foreign key references them."""
+        self.sync('CODE;NAME\nPART;Particulier\nPRO;Professionnel\n')
+        aggregate = AnalyticalAggregate.objects.create(
+            fiscal_year=self.fiscal_year, journal=self.journal, payer_type=PayerType.objects.get(code='PART')
+        )
+        
+        result = self.sync('CODE;NAME\n')
+        self.assertEqual(self.counts(result), (0, 0, 1, 1, 0))
+        self.assertEqual(list(PayerType.objects.values_list('code', flat=True)), ['PART'])
+        self.assertTrue(AnalyticalAggregate.objects.filter(pk=aggregate.pk).exists())
+        
+        # Retried at the next sync, once no longer referenced
+        aggregate.delete()
+        result = self.sync('CODE;NAME\n', fingerprint=False)
+        self.assertEqual(self.counts(result), (0, 0, 1, 0, 0))
+        self.assertFalse(PayerType.objects.exists())
+        self.assertFalse(ImportedRow.objects.exists())
+    
+    def test_command(self):
+        """Test --sync on an import command."""
+        out = StringIO()
+        self.sync('CODE;NAME\nPART;Particulier\n', fingerprint=False)
+        call_command('import_payer_types', self.file.name, '--sync', stdout=out)
+        self.assertIn('0 inserted, 0 updated, 0 deleted, 1 unchanged', out.getvalue())
+        
+        out = StringIO()
+        call_command('import_payer_types', self.file.name, '--sync', stdout=out)
+        self.assertIn('unchanged since the last sync', out.getvalue())
+
+
+class EncodingDetectionTest(TestCase):
+    """Test the single-pass encoding detection of the CSV imports."""
+    
+    def open_bytes(self, data, sniff_size=64):
+        text, encoding = open_text(io.BytesIO(data), sniff_size=sniff_size)
+        with text:
+            return text.read(), encoding
+    
+    def test_detect_encoding(self):
+        """Test BOMs, strict UTF-8 and the cp1252 fallback."""
+        self.assertEqual(detect_encoding('é;x'.encode('utf-8-sig')), 'utf-8-sig')
+        self.assertEqual(detect_encoding('é;x'.encode('utf-16')), 'utf-16')
+        self.assertEqual(detect_encoding('é;x'.encode('utf-32')), 'utf-32')
+        self.assertEqual(detect_encoding('Hérault;x'.encode('utf-8')), 'utf-8')
+        self.assertEqual(detect_encoding('Hérault;x'.encode('cp1252')), 'cp1252')
+        # A character cut by the sample boundary is still UTF-8, unless the file ends there
+        self.assertEqual(detect_encoding('é'.encode('utf-8')[:1]), 'utf-8')
+        self.assertEqual(detect_encoding('é'.encode('utf-8')[:1], complete=True), 'cp1252')
+    
+    def test_open_text(self):
+        """Test decoding whole files, including non-UTF-8 bytes past an ASCII sample."""
+        self.assertEqual(self.open_bytes('Hérault;Œuvre\r\n'.encode('cp1252')), ('Hérault;Œuvre\r\n', 'cp1252'))
+        self.assertEqual(self.open_bytes('Hérault;€'.encode('utf-8-sig')), ('Hérault;€', 'utf-8-sig'))
+        self.assertEqual(self.open_bytes('Hérault;€'.encode('utf-16')), ('Hérault;€', 'utf-16'))
+        late = b'A' * 100 + 'Hérault;'.encode('utf-8') + 'Pyrénées'.encode('cp1252')
+        self.assertEqual(self.open_bytes(late), ('A' * 100 + 'Hérault;Pyrénées', 'utf-8'))
+    
+    def test_open_csv(self):
+        """Test reading a cp1252 CSV file in one pass."""
+        file = tempfile.NamedTemporaryFile('wb', suffix='.csv', delete=False)
+        self.addCleanup(os.remove, file.name)
+        with file:
+            file.write('CODE;LIB\r\nA;Arrêté\r\nB;Pièce\r\n'.encode('cp1252'))
+        
+        reader, text, encoding = open_csv(file.name)
+        with text:
+            rows = [(row['CODE'], row['LIB']) for row in reader]
+        self.assertEqual(encoding, 'cp1252')
+        self.assertEqual(rows, [('A', 'Arrêté'), ('B', 'Pièce')])
+        self.assertTrue(text.closed)
@@ -0,0 +1,124 @@
+import json
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from accounting.models import AccountBalanceSnapshot, AccountingEntry
+from accounting.tests.utils import LedgerTestMixin
+from accounting.utils.entry_import import import_entries
+
+User = get_user_model()
+
+BULK_URL = '/api/v1.0/acc/accounting-entries/bulk/'
+
+
+class EntryBulkImportTest(LedgerTestMixin, TestCase):
+    """Test suite for the bulk import of accounting entries."""
+    
+    def setUp(self):
+        """Set up the ledger fixtures and an authenticated API client."""
+        self.create_ledger_fixtures()
+        self.user = User.objects.create_superuser(email='admin@example.com', password='testpass123')
+        self.client_api = APIClient()
+        self.client_api.force_authenticate(self.user)
+    
+    def entry_payload(self, number, amount='100.00', credit_amount=None, status='draft'):
+        return {
+            'entry_number': number,
+            'journal': self.journal.pk,
+            'fiscal_year': self.fiscal_year.pk,
+            'entry_date': '2024-03-15',
+            'status': status,
+            'lines': [
+                {'account': self.accounts['606100'].pk, 'is_debit': True, 'amount': amount},
+                {'account': self.accounts['401000'].pk, 'is_debit': False, 'amount': credit_amount or amount},
+            ]
+        }
+    
+    def test_json_array_import(self):
+        """Test that a JSON array of entries is created with its lines and totals."""
+        payload = [self.entry_payload(f'B{i}') for i in range(5)]
+        response = self.client_api.post(BULK_URL, payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 5)
+        self.assertEqual([r['status'] for r in response.data['results']], ['created'] * 5)
+        entry = AccountingEntry.objects.get(entry_number='B3')
+        self.assertEqual(entry.lines.count(), 2)
+        self.assertEqual(entry.total_debit, Decimal('100.00'))
+        self.assertEqual(response.data['results'][3]['id'], entry.pk)
+    
+    def test_ndjson_import(self):
+        """Test that an NDJSON stream is imported entry by entry."""
+        body = '\n'.join(json.dumps(self.entry_payload(f'N{i}')) for i in range(3)) + '\n'
+        response = self.client_api.post(BULK_URL, body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(AccountingEntry.objects.filter(entry_number__startswith='N').count(), 3)
+    
+    def test_ndjson_parse_error_reports_committed_chunks(self):
+        """Test that a bad NDJSON line ends the import with its position and the results so far."""
+        lines = [json.dumps(self.entry_payload(f'P{i}')) for i in range(3)] + ['1', json.dumps(self.entry_payload('P4'))]
+        body = '\n'.join(lines) + '\n'
+        response = self.client_api.post(
+            f'{BULK_URL}?atomic=per_chunk&chunk_size=2', body, content_type='application/x-ndjson'
+        )
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([r['status'] for r in response.data['results']], ['created', 'created'])
+        self.assertEqual(response.data['parse_error']['line'], 4)
+        self.assertEqual(response.data['parse_error']['index'], 2)
+        self.assertIn('expected a JSON object', response.data['parse_error']['detail'])
+        self.assertEqual(list(AccountingEntry.objects.order_by('entry_number').values_list('entry_number', flat=True)),
+                         ['P0', 'P1'])
+        
+        body = json.dumps(self.entry_payload('Q0')) + '\n{bad\n'
+        response = self.client_api.post(f'{BULK_URL}?atomic=all', body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['parse_error']['line'], 2)
+        self.assertFalse(AccountingEntry.objects.filter(entry_number='Q0').exists())
+        
+        body = json.dumps(self.entry_payload('U0')).encode() + b'\n{"entry_number": "\xe9"}\n'
+        response = self.client_api.post(f'{BULK_URL}?atomic=all', body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['parse_error']['line'], 2)
+        self.assertIn('codec', response.data['parse_error']['detail'])
+    
+    def test_per_chunk_rolls_back_only_the_failing_chunk(self):
+        """Test that an unbalanced entry discards its chunk and keeps the others."""
+        payload = [self.entry_payload(f'C{i}') for i in range(4)]
+        payload[3] = self.entry_payload('C3', '100.00', '90.00')
+        response = self.client_api.post(f'{BULK_URL}?atomic=per_chunk&chunk_size=2', payload, format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(
+            [r['status'] for r in response.data['results']],
+            ['created', 'created', 'rolled_back', 'invalid']
+        )
+        self.assertIn('lines', response.data['results'][3]['errors'])
+        self.assertEqual(AccountingEntry.objects.count(), 2)
+    
+    def test_atomic_all_rolls_back_everything(self):
+        """Test that one invalid entry rolls back the whole import and every error is reported."""
+        payload = [self.entry_payload(f'A{i}') for i in range(4)]
+        payload.append(self.entry_payload('A0'))
+        response = self.client_api.post(f'{BULK_URL}?atomic=all&chunk_size=2', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['created'], 0)
+        self.assertEqual(response.data['results'][4]['status'], 'invalid')
+        self.assertIn('entry_number', response.data['results'][4]['errors'])
+        self.assertEqual(AccountingEntry.objects.count(), 0)
+    
+    def test_posted_entries_update_balances(self):
+        """Test that entries imported as posted are added to the account balances."""
+        report = import_entries([self.entry_payload(f'P{i}', status='posted') for i in range(3)])
+        self.assertEqual(report['created'], 3)
+        snapshot = AccountBalanceSnapshot.objects.get(account=self.accounts['606100'], period=date(2024, 3, 1))
+        self.assertEqual(snapshot.debit_total, Decimal('300.00'))
+        self.assertIsNotNone(AccountingEntry.objects.get(entry_number='P0').posting_date)
+    
+    def test_query_count_does_not_grow_per_entry(self):
+        """Test that validation and writes run batched queries rather than queries per entry."""
+        with CaptureQueriesContext(connection) as context:
+            import_entries([self.entry_payload(f'L{i}') for i in range(100)])
+        self.assertEqual(AccountingEntry.objects.count(), 100)
+        self.assertLess(len(context.captured_queries), 20)
@@ -0,0 +1,119 @@
+from datetime import date
+from decimal import Decimal
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from accounting.utils.financial_statements import (
+    calculate_account_balance,
+    calculate_account_balances,
+    generate_balance_sheet,
+    generate_financial_statements,
+    generate_income_statement,
+    generate_trial_balance
+)
+from accounting.tests.utils import LedgerTestMixin
+
+
+class TrialBalanceTest(LedgerTestMixin, TestCase):
+    """Test suite for the set-based trial balance engine."""
+    
+    def setUp(self):
+        """Set up a small posted ledger."""
+        self.create_ledger_fixtures()
+        self.create_entry('E1', date(2024, 1, 10), [
+            ('606100', True, '100.00'),
+            ('401000', False, '100.00'),
+        ])
+        self.create_entry('E2', date(2024, 2, 5), [
+            ('411000', True, '250.00'),
+            ('706000', False, '250.00'),
+        ])
+        self.create_entry('E3', date(2024, 3, 1), [
+            ('512000', True, '250.00'),
+            ('411000', False, '250.00'),
+        ])
+        # Draft entries never reach the ledger
+        self.create_entry('E4', date(2024, 3, 2), [
+            ('606100', True, '999.00'),
+            ('512000', False, '999.00'),
+        ], status='draft')
+    
+    def test_balances_match_per_account_computation(self):
+        """Test that grouped balances equal the per-account aggregate."""
+        balances = calculate_account_balances(self.fiscal_year)
+        for account in self.accounts.values():
+            self.assertEqual(
+                balances.get(account.pk, Decimal('0.00')),
+                calculate_account_balance(account, self.fiscal_year)
+            )
+    
+    def test_trial_balance_uses_constant_queries(self):
+        """Test that the trial balance does not issue one query per account."""
+        with self.assertNumQueries(2):
+            report = generate_trial_balance(self.fiscal_year)
+        
+        self.assertEqual(
+            [row['account_number'] for row in report['accounts']],
+            ['401000', '512000', '606100', '706000']
+        )
+        self.assertEqual(report['total_debit'], Decimal('350.00'))
+        self.assertEqual(report['total_credit'], Decimal('350.00'))
+        self.assertTrue(report['is_balanced'])
+    
+    def test_trial_balance_as_of_date_and_zero_balances(self):
+        """Test the as_of_date filter and the include_zero_balances flag."""
+        report = generate_trial_balance(self.fiscal_year, as_of_date=date(2024, 2, 28), include_zero_balances=True)
+        rows = {row['account_number']: row for row in report['accounts']}
+        
+        self.assertEqual(len(rows), len(self.accounts))
+        self.assertEqual(rows['411000']['debit'], Decimal('250.00'))
+        self.assertEqual(rows['512000']['debit'], Decimal('0.00'))
+        self.assertEqual(rows['101000']['credit'], Decimal('0.00'))
+
+
+class FinancialStatementsTest(LedgerTestMixin, TestCase):
+    """Test suite for the financial statements built from one balance pass."""
+    
+    def setUp(self):
+        """Set up a small posted ledger with capital, purchases and sales."""
+        self.create_ledger_fixtures()
+        self.accounts['101000'].financial_statement_group = 'CAPITAUX'
+        self.accounts['101000'].save()
+        self.create_entry('E1', date(2024, 1, 2), [
+            ('512000', True, '1000.00'),
+            ('101000', False, '1000.00'),
+        ])
+        self.create_entry('E2', date(2024, 1, 10), [
+            ('606100', True, '100.00'),
+            ('401000', False, '100.00'),
+        ])
+        self.create_entry('E3', date(2024, 2, 5), [
+            ('411000', True, '250.00'),
+            ('706000', False, '250.00'),
+        ])
+    
+    def test_statements_share_one_balance_pass(self):
+        """Test that both statements are built with a small constant number of queries."""
+        with CaptureQueriesContext(connection) as context:
+            statements = generate_financial_statements(self.fiscal_year, '2024-02-15')
+        self.assertLessEqual(len(context.captured_queries), 3)
+        self.assertEqual(statements['income_statement'], generate_income_statement(self.fiscal_year, '2024-02-15'))
+        self.assertEqual(statements['balance_sheet'], generate_balance_sheet(self.fiscal_year, '2024-02-15'))
+    
+    def test_income_statement(self):
+        """Test the income statement totals."""
+        statement = generate_income_statement(self.fiscal_year)
+        self.assertEqual(statement['total_revenue'], Decimal('250.00'))
+        self.assertEqual(statement['total_expenses'], Decimal('100.00'))
+        self.assertEqual(statement['net_income'], Decimal('150.00'))
+    
+    def test_balance_sheet_classifies_each_account_once(self):
+        """Test that each account lands in a single section and the balance sheet balances."""
+        sheet = generate_balance_sheet(self.fiscal_year)
+        self.assertEqual([row['account_number'] for row in sheet['assets']], ['411000', '512000'])
+        self.assertEqual([row['account_number'] for row in sheet['liabilities']], ['401000'])
+        self.assertEqual([row['account_number'] for row in sheet['equity']], ['101000'])
+        self.assertEqual(sheet['total_assets'], Decimal('1250.00'))
+        self.assertEqual(sheet['total_equity_with_earnings'], Decimal('1150.00'))
+        self.assertEqual(sheet['groups']['equity'], {'CAPITAUX': Decimal('1000.00')})
+        self.assertTrue(sheet['is_balanced'])
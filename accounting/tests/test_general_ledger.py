@@ -0,0 +1,92 @@
+import csv
+import io
+import json
+from datetime import date
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+from accounting.tests.utils import LedgerTestMixin
+from accounting.utils.financial_statements import generate_general_ledger, iter_general_ledger_lines
+
+User = get_user_model()
+
+LEDGER_URL = '/api/v1.0/acc/reports/general_ledger/'
+
+
+class GeneralLedgerStreamingTest(LedgerTestMixin, TestCase):
+    """Test suite for the streamed general ledger export."""
+    
+    def setUp(self):
+        """Set up a small posted ledger and an authenticated API client."""
+        self.create_ledger_fixtures()
+        # Created out of order on purpose
+        self.create_entry('E2', date(2024, 2, 5), [
+            ('411000', True, '250.00'),
+            ('706000', False, '250.00'),
+        ])
+        self.create_entry('E1', date(2024, 1, 10), [
+            ('606100', True, '100.00'),
+            ('401000', False, '60.00'),
+            ('401000', False, '40.00'),
+        ])
+        self.create_entry('E3', date(2024, 2, 5), [
+            ('512000', True, '250.00'),
+            ('411000', False, '250.00'),
+        ])
+        self.create_entry('D1', date(2024, 1, 1), [
+            ('606100', True, '5.00'),
+            ('401000', False, '5.00'),
+        ], status='draft')
+        self.user = User.objects.create_superuser(email='admin@example.com', password='testpass123')
+        self.client_api = APIClient()
+        self.client_api.force_authenticate(self.user)
+    
+    def test_lines_are_ordered_by_keyset(self):
+        """Test that lines come in (entry_date, entry_number, line_number) order, posted only."""
+        keys = [(row['entry_number'], row['line_number']) for row in iter_general_ledger_lines(self.fiscal_year)]
+        self.assertEqual(keys, [('E1', 1), ('E1', 2), ('E1', 3), ('E2', 1), ('E2', 2), ('E3', 1), ('E3', 2)])
+    
+    def test_cursor_resumes_after_last_line(self):
+        """Test that after= resumes right after the given line, across entries sharing a date."""
+        rows = list(iter_general_ledger_lines(self.fiscal_year))
+        for position, row in enumerate(rows):
+            resumed = list(iter_general_ledger_lines(self.fiscal_year, after=row['cursor']))
+            self.assertEqual(resumed, rows[position + 1:])
+    
+    def test_grouped_report_is_unchanged(self):
+        """Test that the in-memory report still groups lines by entry."""
+        report = generate_general_ledger(self.fiscal_year, account='401000')
+        self.assertEqual(len(report['entries']), 1)
+        self.assertEqual(report['entries'][0]['entry_number'], 'E1')
+        self.assertEqual([line['line_number'] for line in report['entries'][0]['lines']], [2, 3])
+    
+    def test_ndjson_stream(self):
+        """Test that stream=ndjson returns one JSON line per ledger line."""
+        response = self.client_api.get(LEDGER_URL, {'fiscal_year': self.fiscal_year.pk, 'stream': 'ndjson'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(rows[0]['amount'], '100.00')
+        
+        response = self.client_api.get(LEDGER_URL, {
+            'fiscal_year': self.fiscal_year.pk, 'stream': 'ndjson', 'after': rows[4]['cursor']
+        })
+        resumed = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(resumed, rows[5:])
+    
+    def test_csv_stream(self):
+        """Test that stream=csv returns a header and one row per ledger line."""
+        response = self.client_api.get(LEDGER_URL, {
+            'fiscal_year': self.fiscal_year.pk, 'stream': 'csv', 'account': '411000'
+        })
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([(row['entry_number'], row['is_debit']) for row in rows], [('E2', 'True'), ('E3', 'False')])
+    
+    def test_invalid_cursor(self):
+        """Test that a malformed cursor is rejected before streaming starts."""
+        response = self.client_api.get(LEDGER_URL, {
+            'fiscal_year': self.fiscal_year.pk, 'stream': 'ndjson', 'after': 'not-a-cursor'
+        })
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,81 @@
+import csv
+import os
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from accounting.models import AccountingChapter, AccountingClass, AccountingSection, GeneralLedgerAccount
+
+HEADER = [
+    'NO_CPT_COMPTABLE_GENERAL', 'LIB_CHAPITRE_COMPTABLE', 'LIB_SECTION_COMPTABLE',
+    'LIB_RED_CPT_COMPTABLE_GENERAL', 'LIB_CPT_COMPTABLE_GENERAL', 'INDIC_BILAN_RESULTAT',
+    'CODE_CPT_BUDG_THEO', 'STATUT_RECUP_CPT', 'CODE_REGRP_ETATS_FINANC_CPT',
+]
+
+
+class ImportPCGTest(TestCase):
+    """Test suite for the bulk import of the chart of accounts."""
+    
+    def write_csv(self, rows):
+        file = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='latin-1', newline='')
+        self.addCleanup(os.remove, file.name)
+        with file:
+            writer = csv.writer(file, delimiter=';')
+            writer.writerow(HEADER)
+            writer.writerows(rows)
+        return file.name
+    
+    def import_pcg(self, rows):
+        out = StringIO()
+        call_command('import_pcg', self.write_csv(rows), stdout=out)
+        return out.getvalue()
+    
+    def test_import(self):
+        """Test that the hierarchy and the accounts are created from the rows."""
+        output = self.import_pcg([
+            ['101000', 'Capital et réserves', 'Capital', 'Capital', 'Capital social', 'BILAN', '', '', ''],
+            ['106100', 'Capital et réserves', 'Réserves', 'Rés. légale', 'Réserve légale', 'BILAN', '', '', 'G1'],
+            ['606100', 'Achats', '', 'Fournitures', 'Fournitures non stockables', '', '60', 'R', ''],
+        ])
+        self.assertIn('Successfully imported 3 general ledger accounts from 3 rows', output)
+        self.assertIn('rows/s', output)
+        
+        self.assertEqual(AccountingClass.objects.get(code='6').name, 'Comptes de charges')
+        self.assertEqual(AccountingChapter.objects.get(code='10').accounting_class.code, '1')
+        self.assertEqual(AccountingSection.objects.get(code='106').name, 'Réserves')
+        self.assertEqual(AccountingSection.objects.get(code='606').name, '')
+        
+        account = GeneralLedgerAccount.objects.get(account_number='606100')
+        self.assertEqual(account.section.code, '606')
+        self.assertFalse(account.is_balance_sheet)
+        self.assertEqual((account.budget_account_code, account.recovery_status), ('60', 'R'))
+        self.assertIsNone(account.financial_statement_group)
+        self.assertTrue(GeneralLedgerAccount.objects.get(account_number='106100').is_balance_sheet)
+    
+    def test_reimport_updates_rows(self):
+        """Test that a second import updates the rows in place and keeps names it does not provide."""
+        self.import_pcg([
+            ['101000', 'Capital et réserves', 'Capital', 'Capital', 'Capital social', '', '', '', ''],
+        ])
+        account_id = GeneralLedgerAccount.objects.get(account_number='101000').pk
+        self.import_pcg([
+            ['101000', '', '', 'Capital', 'Capital souscrit', '', '', '', ''],
+        ])
+        account = GeneralLedgerAccount.objects.get(account_number='101000')
+        self.assertEqual((account.pk, account.full_name), (account_id, 'Capital souscrit'))
+        self.assertEqual(AccountingChapter.objects.get(code='10').name, 'Capital et réserves')
+        self.assertEqual(AccountingSection.objects.get(code='101').name, 'Capital')
+        self.assertEqual(GeneralLedgerAccount.objects.count(), 1)
+    
+    def test_queries_are_batched(self):
+        """Test that the rows are written in a few chunked upserts, not per row."""
+        path = self.write_csv([
+            [f'6{i:05d}', f'Chapitre {i % 10}', f'Section {i % 100}', f'C{i}', f'Compte {i}', '', '', '', '']
+            for i in range(1000)
+        ])
+        with CaptureQueriesContext(connection) as queries:
+            call_command('import_pcg', path, stdout=StringIO())
+        self.assertEqual(GeneralLedgerAccount.objects.count(), 1000)
+        self.assertLess(len(queries.captured_queries), 25)
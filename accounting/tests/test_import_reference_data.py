@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from accounting.management.commands.import_reference_data import (
+    CHECKPOINT_FILE,
+    STAGES,
+    ImportStage,
+    run_stages,
+    select_stages,
+)
+from accounting.models import AccountingJournal, AccountingType
+
+
+class ImportReferenceDataTest(TestCase):
+    """Test suite for the dependency-ordered import of the reference data."""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir)
+
+    def write(self, name, content):
+        with open(os.path.join(self.data_dir, name), 'w', encoding='cp1252', newline='') as file:
+            file.write(content)
+
+    def stage(self, name, calls, depends_on=(), fail=False):
+        """Build a stage recording its calls, over a file of its name."""
+        self.write(f'{name}.csv', 'x')
+
+        def run(path, sync=True):
+            calls.append(name)
+            if fail:
+                raise RuntimeError('broken file')
+            return {'rows': 1, 'imported': 1, 'errors': []}
+
+        return ImportStage(name, f'{name}.csv', run, tuple(depends_on))
+
+    def test_select_stages(self):
+        """Test --only and --skip, in declaration order."""
+        names = [stage.name for stage in select_stages(STAGES, only=['pcg', 'accounting_types'])]
+        self.assertEqual(names, ['accounting_types', 'pcg'])
+        names = [stage.name for stage in select_stages(STAGES, skip=['municipalities'])]
+        self.assertEqual(len(names), len(STAGES) - 1)
+        self.assertNotIn('municipalities', names)
+        with self.assertRaises(ValueError):
+            select_stages(STAGES, skip=['unknown'])
+
+    def test_dependency_order(self):
+        """Test that stages run after their dependencies, and that a failure blocks its dependents."""
+        for workers in (1, 3):
+            calls = []
+            stages = [
+                self.stage('journals', calls, depends_on=['types']),
+                self.stage('types', calls),
+                self.stage('tables', calls),
+                self.stage('pcg', calls, fail=True),
+                self.stage('accounts', calls, depends_on=['pcg']),
+                ImportStage('missing', 'missing.csv', None, ()),
+            ]
+            results = {result['name']: result for result in run_stages(stages, self.data_dir, workers=workers)}
+
+            self.assertLess(calls.index('types'), calls.index('journals'))
+            self.assertNotIn('accounts', calls)
+            statuses = {name: result['status'] for name, result in results.items()}
+            self.assertEqual(statuses, {
+                'journals': 'done', 'types': 'done', 'tables': 'done',
+                'pcg': 'failed', 'accounts': 'blocked', 'missing': 'missing',
+            })
+            self.assertEqual(results['pcg']['error'], 'broken file')
+
+    def test_cycle(self):
+        """Test that a dependency cycle is reported instead of waiting forever."""
+        calls = []
+        stages = [self.stage('a', calls, depends_on=['b']), self.stage('b', calls, depends_on=['a'])]
+        with self.assertRaises(ValueError):
+            run_stages(stages, self.data_dir, workers=2)
+
+    def test_command_resume(self):
+        """Test the command, its checkpoint and --resume after a failed stage."""
+        self.write('type-de-comptabilite.csv', 'CODE_TYPE_COMPTABILITE;LIB_TYPE_COMPTABILITE\nGEN;Générale\n')
+        # A directory in place of the journals file makes the stage fail
+        os.mkdir(os.path.join(self.data_dir, 'journal_comptable.csv'))
+
+        out = StringIO()
+        call_command(
+            'import_reference_data', data_dir=self.data_dir, only=['accounting_types', 'journals'],
+            workers=1, stdout=out
+        )
+        self.assertIn('1 not imported: journals', out.getvalue())
+        self.assertEqual(AccountingType.objects.get(code='GEN').full_name, 'Générale')
+        self.assertTrue(os.path.exists(os.path.join(self.data_dir, CHECKPOINT_FILE)))
+
+        os.rmdir(os.path.join(self.data_dir, 'journal_comptable.csv'))
+        self.write('journal_comptable.csv', 'ID_JOURNAL_COMPTABLE;CODE_JOURNAL_COMPTABLE\nGEN ACH;ACH\n')
+        AccountingType.objects.all().delete()
+        out = StringIO()
+        call_command(
+            'import_reference_data', data_dir=self.data_dir, only=['accounting_types', 'journals'],
+            workers=1, resume=True, stdout=out
+        )
+        self.assertIn('accounting_types         already imported', out.getvalue())
+        self.assertIn('Successfully imported 2 stages', out.getvalue())
+        self.assertFalse(AccountingType.objects.exists())
+        self.assertTrue(AccountingJournal.objects.filter(id_journal='GEN ACH').exists())
+        self.assertFalse(os.path.exists(os.path.join(self.data_dir, CHECKPOINT_FILE)))
@@ -0,0 +1,124 @@
+from datetime import date
+from io import StringIO
+from decimal import Decimal
+from unittest import mock
+from django.core.management import call_command
+from django.db.models import QuerySet
+from django.test import TestCase
+from accounting.models import AccountBalanceSnapshot, AccountingEntry, AccountingEntryLine
+from accounting.utils.financial_statements import calculate_account_balances, generate_trial_balance
+from accounting.utils.ledger_balances import (
+    increment_totals,
+    post_entry,
+    rebuild_balance_snapshots,
+    verify_balance_snapshots
+)
+from accounting.tests.utils import LedgerTestMixin
+
+
+class AccountBalanceSnapshotTest(LedgerTestMixin, TestCase):
+    """Test suite for the materialized account balances."""
+    
+    def setUp(self):
+        """Set up a posted ledger spanning two months."""
+        self.create_ledger_fixtures()
+        self.create_entry('E1', date(2024, 1, 10), [
+            ('606100', True, '100.00'),
+            ('401000', False, '100.00'),
+        ])
+        self.create_entry('E2', date(2024, 2, 5), [
+            ('606100', True, '40.00'),
+            ('401000', False, '40.00'),
+        ])
+        self.create_entry('E3', date(2024, 2, 20), [
+            ('401000', True, '140.00'),
+            ('512000', False, '140.00'),
+        ])
+    
+    def test_posting_updates_snapshots(self):
+        """Test that posting increments the per-account monthly totals."""
+        snapshot = AccountBalanceSnapshot.objects.get(
+            account=self.accounts['606100'], period=date(2024, 2, 1)
+        )
+        self.assertEqual(snapshot.debit_total, Decimal('40.00'))
+        self.assertEqual(snapshot.credit_total, Decimal('0.00'))
+        self.assertEqual(verify_balance_snapshots(), [])
+    
+    def test_snapshot_balances_match_lines(self):
+        """Test that snapshot reads agree with line scans, including mid-month dates."""
+        for as_of_date in (None, date(2024, 1, 31), date(2024, 2, 10), '2024-02-29'):
+            self.assertEqual(
+                calculate_account_balances(self.fiscal_year, as_of_date),
+                calculate_account_balances(self.fiscal_year, as_of_date, use_snapshots=False)
+            )
+    
+    def test_reversing_entry_offsets_balances(self):
+        """Test that posting a reversing entry cancels the original amounts."""
+        original = AccountingEntry.objects.get(entry_number='E2')
+        reversal = AccountingEntry.objects.create(
+            entry_number='E2-R',
+            journal=self.journal,
+            fiscal_year=self.fiscal_year,
+            entry_date=date(2024, 2, 25),
+            status='validated',
+            is_reversing_entry=True,
+            original_entry=original
+        )
+        for line in original.lines.all():
+            AccountingEntryLine.objects.create(
+                entry=reversal,
+                account=line.account,
+                line_number=line.line_number,
+                is_debit=not line.is_debit,
+                amount=line.amount
+            )
+        post_entry(reversal)
+        
+        balances = calculate_account_balances(self.fiscal_year)
+        self.assertEqual(balances[self.accounts['606100'].pk], Decimal('100.00'))
+        self.assertEqual(verify_balance_snapshots(), [])
+    
+    def test_rebuild_balances_command(self):
+        """Test that the rebuild command restores snapshots lost out of band."""
+        AccountBalanceSnapshot.objects.all().delete()
+        self.assertEqual(generate_trial_balance(self.fiscal_year)['accounts'], [])
+        
+        call_command('rebuild_balances', stdout=StringIO())
+        
+        self.assertEqual(verify_balance_snapshots(), [])
+        self.assertEqual(len(generate_trial_balance(self.fiscal_year)['accounts']), 2)
+        self.assertEqual(rebuild_balance_snapshots(self.fiscal_year), 5)
+    
+    def test_concurrent_snapshot_creation(self):
+        """Test that a snapshot created by another transaction after the UPDATE is incremented, not duplicated."""
+        key = {
+            'account_id': self.accounts['606100'].pk,
+            'fiscal_year_id': self.fiscal_year.pk,
+            'journal_id': self.journal.pk,
+            'period': date(2024, 1, 1),
+        }
+        update = QuerySet.update
+        calls = []
+        
+        def update_missing_once(queryset, **kwargs):
+            # The first UPDATE runs before the other transaction commits its row
+            calls.append(kwargs)
+            return 0 if len(calls) == 1 else update(queryset, **kwargs)
+        
+        with mock.patch.object(QuerySet, 'update', update_missing_once):
+            increment_totals(AccountBalanceSnapshot, key, Decimal('5.00'), Decimal('0.00'))
+        self.assertEqual(len(calls), 2)
+        snapshot = AccountBalanceSnapshot.objects.get(**key)
+        self.assertEqual(snapshot.debit_total, Decimal('105.00'))
+    
+    def test_entry_is_posted_once(self):
+        """Test that posting an entry already posted elsewhere fails without changing the balances."""
+        entry = self.create_entry('E4', date(2024, 3, 1), [
+            ('606100', True, '10.00'),
+            ('401000', False, '10.00'),
+        ], status='validated')
+        stale = AccountingEntry.objects.get(pk=entry.pk)
+        post_entry(entry)
+        with self.assertRaises(ValueError):
+            post_entry(stale)
+        self.assertEqual(verify_balance_snapshots(), [])
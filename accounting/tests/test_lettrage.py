@@ -0,0 +1,131 @@
+from datetime import date
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+from accounting.models import AccountingEntryLine
+from accounting.models.reference_data import ReconciliationType
+from accounting.tests.utils import LedgerTestMixin
+from accounting.utils import lettrage
+from accounting.utils.lettrage import (
+    match_open_lines,
+    match_pairs,
+    match_subsets,
+    reconcile_account,
+    write_reconciliation_codes,
+)
+
+User = get_user_model()
+
+
+class MatchingAlgorithmTest(TestCase):
+    """Test suite for the pair and subset-sum matching of open lines."""
+    
+    def test_pairs_oldest_first(self):
+        """Test that equal amounts are paired in input order."""
+        pairs, debits, credits = match_pairs([(1, 500), (2, 300), (3, 500)], [(10, 500), (11, 700)])
+        self.assertEqual(pairs, [(1, 10)])
+        self.assertEqual(debits, [(2, 300), (3, 500)])
+        self.assertEqual(credits, [(11, 700)])
+    
+    def test_subsets(self):
+        """Test that a line is matched against a group of opposite lines."""
+        matches, targets, pool = match_subsets([(10, 1000), (11, 50)], [(1, 300), (2, 450), (3, 250), (4, 999)])
+        self.assertEqual([(target, sorted(ids)) for target, ids in matches], [(10, [1, 2, 3])])
+        self.assertEqual(targets, [(11, 50)])
+        self.assertEqual(pool, [(4, 999)])
+    
+    def test_subset_size_is_bounded(self):
+        """Test that groups larger than the maximum size are not searched."""
+        debits = [(i, 100) for i in range(5)]
+        self.assertEqual(match_subsets([(10, 500)], debits, max_size=4)[0], [])
+        self.assertEqual(len(match_subsets([(10, 500)], debits, max_size=5)[0][0][1]), 5)
+    
+    def test_match_open_lines_both_directions(self):
+        """Test pairs, one credit against many debits and one debit against many credits."""
+        pairs, groups = match_open_lines(
+            [(1, 100), (2, 70), (3, 30), (4, 90)],
+            [(10, 100), (11, 100), (12, 35), (13, 55)]
+        )
+        self.assertEqual(pairs, [[1, 10]])
+        self.assertEqual(sorted(map(sorted, groups)), [[2, 3, 11], [4, 12, 13]])
+        self.assertEqual(match_open_lines([(1, 60), (2, 40)], [(10, 100)], subsets=False), ([], []))
+
+
+class ReconcileAccountTest(LedgerTestMixin, TestCase):
+    """Test suite for the lettering of account lines."""
+    
+    def setUp(self):
+        """Set up supplier invoices and payments for two third parties."""
+        self.create_ledger_fixtures()
+        self.create_entry('F1', date(2024, 1, 10), [('606100', True, '100.00'), ('401000', False, '100.00')])
+        self.create_entry('F2', date(2024, 1, 12), [('606100', True, '60.00'), ('401000', False, '60.00')])
+        self.create_entry('F3', date(2024, 1, 15), [('606100', True, '40.00'), ('401000', False, '40.00')])
+        self.create_entry('F4', date(2024, 1, 20), [('606100', True, '100.00'), ('401000', False, '100.00')])
+        self.create_entry('R1', date(2024, 2, 1), [('401000', True, '100.00'), ('512000', False, '100.00')])
+        self.create_entry('R2', date(2024, 2, 2), [('401000', True, '100.00'), ('512000', False, '100.00')])
+        for number, line, supplier in [('F1', 2, 'S1'), ('F2', 2, 'S1'), ('F3', 2, 'S1'), ('R1', 1, 'S1'),
+                                       ('R2', 1, 'S1'), ('F4', 2, 'S2')]:
+            AccountingEntryLine.objects.filter(entry__entry_number=number, line_number=line).update(
+                auxiliary_account_id=supplier
+            )
+    
+    def _codes(self):
+        return dict(AccountingEntryLine.objects.filter(
+            account=self.accounts['401000']
+        ).values_list('entry__entry_number', 'reconciliation_code'))
+    
+    def test_reconcile_account(self):
+        """Test that pairs and groups are lettered per third party."""
+        # Codes continue after the highest existing code of the account
+        self.create_entry('X', date(2024, 3, 1), [('401000', True, '1.00'), ('512000', False, '1.00')])
+        AccountingEntryLine.objects.filter(entry__entry_number='X', line_number=1).update(reconciliation_code='L7')
+        lettering = ReconciliationType.objects.create(code='AUTO', name='Lettrage automatique')
+        result = reconcile_account('401000', reconciliation_type=lettering)
+        self.assertEqual((result['open_lines'], result['pairs'], result['subsets'], result['lines_matched']), (6, 1, 1, 5))
+        codes = self._codes()
+        self.assertEqual((codes['F1'], codes['R1']), ('L8', 'L8'))
+        self.assertEqual({codes['F2'], codes['F3'], codes['R2']}, {'L9'})
+        self.assertIsNone(codes['F4'])
+        self.assertEqual(
+            AccountingEntryLine.objects.filter(reconciliation_type=lettering).count(), 5
+        )
+        self.assertEqual(reconcile_account('401000')['lines_matched'], 0)
+    
+    def test_dry_run_and_filters(self):
+        """Test that a dry run writes nothing and filters restrict the open lines."""
+        result = reconcile_account('401000', dry_run=True, max_subset_size=1)
+        self.assertEqual((result['pairs'], result['subsets']), (1, 0))
+        self.assertEqual(set(self._codes().values()), {None})
+        self.assertEqual(reconcile_account('401000', auxiliary_id='S2')['open_lines'], 1)
+    
+    def test_lines_lettered_meanwhile_abort_the_run(self):
+        """Test that a run writes nothing when one of its lines was lettered since it was read."""
+        def letter_meanwhile(*args, **kwargs):
+            AccountingEntryLine.objects.filter(entry__entry_number='R1', line_number=1).update(reconciliation_code='M1')
+            return match_open_lines(*args, **kwargs)
+        
+        with mock.patch.object(lettrage, 'match_open_lines', side_effect=letter_meanwhile):
+            with self.assertRaises(ValueError):
+                reconcile_account('401000')
+        # The concurrent update ran in the same transaction here, so it is rolled back too
+        self.assertEqual(set(self._codes().values()), {None})
+        
+        line = AccountingEntryLine.objects.get(entry__entry_number='F1', line_number=2)
+        lettered = AccountingEntryLine.objects.get(entry__entry_number='R1', line_number=1)
+        AccountingEntryLine.objects.filter(pk=lettered.pk).update(reconciliation_code='M1')
+        with self.assertRaises(ValueError):
+            write_reconciliation_codes([(line.pk, 'L1'), (lettered.pk, 'L1')])
+        codes = self._codes()
+        self.assertEqual((codes['F1'], codes['R1']), (None, 'M1'))
+    
+    def test_reconcile_endpoint(self):
+        """Test the account reconcile endpoint."""
+        user = User.objects.create_superuser(email='admin@example.com', password='testpass123')
+        client = APIClient()
+        client.force_authenticate(user)
+        url = f"/api/v1.0/acc/general-ledger-accounts/{self.accounts['401000'].pk}/reconcile/"
+        response = client.post(url, {'auxiliary_id': 'S1', 'dry_run': True}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['lines_matched'], 5)
+        self.assertEqual(client.post(url, {'reconciliation_type': 'NOPE'}, format='json').status_code, 404)
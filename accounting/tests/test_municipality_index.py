@@ -0,0 +1,108 @@
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+from accounting.models.reference_data import Municipality
+from accounting.utils.municipality_index import fold, get_municipality_index, invalidate_municipality_index
+
+User = get_user_model()
+
+AUTOCOMPLETE_URL = '/api/v1.0/acc/municipalities/autocomplete/'
+
+
+class MunicipalityIndexTest(TestCase):
+    """Test suite for the in-memory municipality lookup index."""
+    
+    def setUp(self):
+        """Set up a few municipalities, including leading-zero codes as in the source file."""
+        for insee_code, name, postal_code in [
+            ('42218', 'Saint-Étienne', '42000'),
+            ('75056', 'PARIS', '75001'),
+            ('1053', 'BOURG EN BRESSE', '1000'),
+            ('2A004', 'AJACCIO', '20000'),
+            ('13055', 'MARSEILLE', '13001'),
+            ('51454', 'REIMS', '51100'),
+            ('1004', 'AMBERIEU EN BUGEY', '1500'),
+        ]:
+            Municipality.objects.create(
+                insee_code=insee_code, name=name, postal_code=postal_code,
+                department_code=insee_code[:2], region_code='00'
+            )
+        invalidate_municipality_index(broadcast=False)
+        self.index = get_municipality_index()
+    
+    def names(self, records):
+        return [record.name for record in records]
+    
+    def test_fold(self):
+        """Test that accents, case, punctuation and Saint abbreviations are folded."""
+        self.assertEqual(fold("Saint-Étienne"), 'saint etienne')
+        self.assertEqual(fold('ST ETIENNE'), 'saint etienne')
+        self.assertEqual(fold("L'Haÿ-les-Roses"), 'l hay les roses')
+    
+    def test_name_prefix(self):
+        """Test name prefixes, ignoring accents and case, whole names before later words."""
+        self.assertEqual(self.names(self.index.search('st eti')), ['Saint-Étienne'])
+        self.assertEqual(self.names(self.index.search('étienne')), ['Saint-Étienne'])
+        self.assertEqual(self.names(self.index.search('BOURG')), ['BOURG EN BRESSE'])
+        self.assertEqual(self.names(self.index.search('ma')), ['MARSEILLE'])
+        self.assertEqual(self.index.search('xyz'), [])
+    
+    def test_codes(self):
+        """Test postal code prefixes and exact INSEE codes, zero-padded."""
+        self.assertEqual(self.names(self.index.search('010')), ['BOURG EN BRESSE'])
+        self.assertEqual(self.names(self.index.search('01')), ['BOURG EN BRESSE', 'AMBERIEU EN BUGEY'])
+        self.assertEqual(self.names(self.index.search('75056')), ['PARIS'])
+        self.assertEqual(self.names(self.index.search('2a004')), ['AJACCIO'])
+        self.assertEqual(self.index.get('01053').name, 'BOURG EN BRESSE')
+    
+    def test_limit(self):
+        """Test that no more than limit records are returned."""
+        self.assertEqual(len(self.index.search('0', limit=1)), 1)
+    
+    def test_fuzzy(self):
+        """Test that misspelled names are found only with fuzzy matching."""
+        self.assertEqual(self.index.search('marseile'), [])
+        self.assertEqual(self.names(self.index.search('marseile', fuzzy=True))[0], 'MARSEILLE')
+        self.assertEqual(self.names(self.index.fuzzy_search('rheims')), ['REIMS'])
+    
+    def test_changes_invalidate_the_index(self):
+        """Test that saving or deleting a municipality rebuilds the index."""
+        Municipality.objects.create(
+            insee_code='69123', name='LYON', postal_code='69001', department_code='69', region_code='00'
+        )
+        self.assertEqual(self.names(get_municipality_index().search('lyo')), ['LYON'])
+        Municipality.objects.filter(insee_code='69123').delete()
+        self.assertEqual(get_municipality_index().search('lyo'), [])
+    
+    def test_bulk_delete_broadcasts_once(self):
+        """Test that a change of many municipalities changes the cross-process stamp once, on commit."""
+        with mock.patch('accounting.signals.invalidate_municipality_index') as invalidate:
+            with self.captureOnCommitCallbacks(execute=True):
+                Municipality.objects.filter(region_code='00').delete()
+                self.assertNotIn(mock.call(), invalidate.call_args_list)
+        self.assertEqual(invalidate.call_args_list.count(mock.call()), 1)
+        self.assertEqual(invalidate.call_args_list.count(mock.call(broadcast=False)), 7)
+    
+    def test_autocomplete_endpoint(self):
+        """Test the autocomplete action and its parameters."""
+        user = User.objects.create_superuser(email='admin@example.com', password='testpass123')
+        client = APIClient()
+        client.force_authenticate(user)
+        
+        with self.assertNumQueries(0):
+            response = client.get(AUTOCOMPLETE_URL, {'q': 'saint'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [{
+            'id': Municipality.objects.get(insee_code='42218').pk,
+            'insee_code': '42218',
+            'name': 'Saint-Étienne',
+            'postal_code': '42000',
+            'department_code': '42',
+            'region_code': '00',
+        }])
+        
+        response = client.get(AUTOCOMPLETE_URL, {'q': 'marseile', 'fuzzy': 'true'})
+        self.assertEqual(response.data[0]['insee_code'], '13055')
+        self.assertEqual(client.get(AUTOCOMPLETE_URL).status_code, 400)
+        self.assertEqual(client.get(AUTOCOMPLETE_URL, {'q': 'pa', 'limit': '0'}).status_code, 400)
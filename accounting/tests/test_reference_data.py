@@ -0,0 +1,90 @@
+from django.test import TestCase, override_settings
+from accounting.models import AccountingJournal
+from accounting.models.reference_data import PayerType
+from accounting.tests.utils import LedgerTestMixin
+from accounting.checks import check_reference_data_cache
+from accounting.utils.reference_data import ReferenceTable, journal_ids, reference_table, registry
+
+
+class ReferenceDataRegistryTest(LedgerTestMixin, TestCase):
+    """Test suite for the in-memory reference data registry."""
+    
+    def setUp(self):
+        """Set up the ledger fixtures and a payer type, with an empty registry."""
+        self.create_ledger_fixtures()
+        self.payer_type = PayerType.objects.create(code='PART', name='Particulier')
+        registry.clear()
+    
+    def test_table_is_loaded_once(self):
+        """Test that a loaded table answers lookups without querying the database."""
+        # The first load ever also creates the cross-process stamp
+        reference_table(PayerType)
+        registry.clear()
+        # Stamp and rows
+        with self.assertNumQueries(2):
+            reference_table(PayerType)
+        with self.assertNumQueries(0):
+            table = reference_table(PayerType)
+            self.assertEqual(table.code(self.payer_type.pk), 'PART')
+            self.assertEqual(table.get_by_code('PART')['name'], 'Particulier')
+            self.assertIsNone(table.code(None))
+    
+    def test_rows_are_immutable(self):
+        """Test that the cached rows and indexes cannot be modified."""
+        table = reference_table(PayerType)
+        with self.assertRaises(TypeError):
+            table.by_id[self.payer_type.pk]['code'] = 'X'
+        with self.assertRaises(TypeError):
+            table.by_code['X'] = None
+    
+    def test_save_and_delete_invalidate_the_table(self):
+        """Test that post_save and post_delete drop the cached table."""
+        self.assertEqual(reference_table(PayerType).code(self.payer_type.pk), 'PART')
+        self.payer_type.code = 'PRO'
+        self.payer_type.save()
+        self.assertEqual(reference_table(PayerType).code(self.payer_type.pk), 'PRO')
+        pk = self.payer_type.pk
+        self.payer_type.delete()
+        self.assertIsNone(reference_table(PayerType).get(pk))
+    
+    def test_duplicate_codes(self):
+        """Test that a code shared by several rows resolves to all of them."""
+        other = AccountingJournal.objects.create(id_journal='ACH2', code='ACH', short_name='Achats 2')
+        table = reference_table(AccountingJournal)
+        self.assertEqual(table.ids_for_code('ACH'), (self.journal.pk, other.pk))
+        self.assertEqual(table.get_by_code('ACH')['id'], self.journal.pk)
+        self.assertEqual(table.ids_for_code('XXX'), ())
+    
+    def test_fiscal_years_are_keyed_by_year(self):
+        """Test that fiscal years use their year as code."""
+        self.assertEqual(reference_table(type(self.fiscal_year)).get_by_code(2024)['id'], self.fiscal_year.pk)
+    
+    @override_settings(ACCOUNTING_REFERENCE_DATA_CHECK_INTERVAL=0)
+    def test_stamp_change_from_another_process(self):
+        """Test that a changed cross-process stamp makes the table reload."""
+        table = reference_table(PayerType)
+        self.assertIsInstance(table, ReferenceTable)
+        # Another process changed the table without this one receiving the signal
+        PayerType.objects.filter(pk=self.payer_type.pk).update(code='PRO')
+        self.assertIs(reference_table(PayerType), table)
+        registry._cache().set(registry._stamp_key(PayerType), 'changed-elsewhere', timeout=None)
+        self.assertEqual(reference_table(PayerType).code(self.payer_type.pk), 'PRO')
+    
+    def test_code_created_by_another_process(self):
+        """Test that a code missing from the loaded table is looked up in the database."""
+        self.assertEqual(journal_ids('VEN'), ())
+        # Created elsewhere: no signal in this process, stamp not checked yet
+        AccountingJournal.objects.bulk_create([AccountingJournal(id_journal='VEN', code='VEN', short_name='Ventes')])
+        journal = AccountingJournal.objects.get(code='VEN')
+        self.assertEqual(journal_ids('VEN'), (journal.pk,))
+        # The local table was dropped and now holds the new journal
+        with self.assertNumQueries(2):
+            self.assertEqual(reference_table(AccountingJournal).ids_for_code('VEN'), (journal.pk,))
+    
+    def test_process_local_cache_is_rejected(self):
+        """Test the system check refusing a reference data cache private to each process."""
+        self.assertEqual(check_reference_data_cache(None), [])
+        with override_settings(ACCOUNTING_REFERENCE_DATA_CACHE='default'):
+            self.assertEqual([error.id for error in check_reference_data_cache(None)], ['accounting.E002'])
+        with override_settings(ACCOUNTING_REFERENCE_DATA_CACHE='missing'):
+            self.assertEqual([error.id for error in check_reference_data_cache(None)], ['accounting.E001'])
@@ -0,0 +1,145 @@
+import json
+from datetime import date
+from io import StringIO
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework.utils.encoders import JSONEncoder
+from accounting.models import FiscalYearReportArchive
+from accounting.tests.utils import LedgerTestMixin
+from accounting.utils.financial_statements import generate_general_ledger
+from accounting.utils.ledger_balances import bump_ledger_version
+from accounting.utils.report_archives import archive_fiscal_year, archive_if_stale, fiscal_years_to_archive
+
+User = get_user_model()
+
+REPORTS_URL = '/api/v1.0/acc/reports/'
+
+
+class FiscalYearArchiveTest(LedgerTestMixin, TestCase):
+    """Test suite for the report archives of closed fiscal years."""
+    
+    def setUp(self):
+        """Set up a posted ledger and an authenticated API client."""
+        caches['accounting_reports'].clear()
+        self.create_ledger_fixtures()
+        self.create_entry('E1', date(2024, 1, 10), [
+            ('606100', True, '100.00'),
+            ('401000', False, '100.00'),
+        ])
+        self.create_entry('E2', date(2024, 2, 5), [
+            ('411000', True, '250.00'),
+            ('706000', False, '250.00'),
+        ])
+        self.user = User.objects.create_superuser(email='admin@example.com', password='testpass123')
+        self.client_api = APIClient()
+        self.client_api.force_authenticate(self.user)
+    
+    def get_reports(self):
+        """Return the responses of the archived report endpoints."""
+        params = {'fiscal_year': self.fiscal_year.pk}
+        return {
+            'trial_balance': self.client_api.get(f'{REPORTS_URL}trial_balance/', params).json(),
+            'income_statement': self.client_api.get(f'{REPORTS_URL}income_statement/', params).json(),
+            'balance_sheet': self.client_api.get(f'{REPORTS_URL}balance_sheet/', params).json(),
+            'general_ledger': self.client_api.get(
+                f'{REPORTS_URL}general_ledger/', dict(params, account='401000')
+            ).json(),
+        }
+    
+    def test_closing_builds_archives(self):
+        """Test that the close command builds one archive per report and per account."""
+        call_command('close_fiscal_year', '2024', verbosity=0, stdout=StringIO())
+        archives = FiscalYearReportArchive.objects.filter(fiscal_year=self.fiscal_year)
+        self.assertEqual(archives.filter(report='general_ledger').count(), 4)
+        self.assertEqual(archives.exclude(report='general_ledger').count(), 3)
+    
+    def test_saving_a_closed_year_archives_after_commit(self):
+        """Test that a close saved outside the command queues the archive build after the commit."""
+        with mock.patch('accounting.signals.start_archive_thread') as start:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.fiscal_year.is_closed = True
+                self.fiscal_year.save()
+                # Nothing is built in the saving request
+                self.assertFalse(FiscalYearReportArchive.objects.filter(fiscal_year=self.fiscal_year).exists())
+            start.assert_called_once_with(self.fiscal_year.pk)
+            
+            # Saving the closed year again queues nothing, nor does the command
+            with self.captureOnCommitCallbacks(execute=True):
+                self.fiscal_year.save()
+            self.fiscal_year.is_closed = False
+            self.fiscal_year.save()
+            call_command('close_fiscal_year', '2024', verbosity=0, stdout=StringIO())
+            self.assertEqual(start.call_count, 1)
+        
+        # The thread builds only stale archives
+        self.assertEqual(archive_if_stale(self.fiscal_year.pk), 0)
+        bump_ledger_version(self.fiscal_year.pk)
+        self.assertEqual(archive_if_stale(self.fiscal_year.pk), 7)
+    
+    @override_settings(ACCOUNTING_ARCHIVE_ON_CLOSE=False)
+    def test_pending_archives(self):
+        """Test that --pending builds the archives of the years closed without a build."""
+        with mock.patch('accounting.signals.start_archive_thread') as start:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.fiscal_year.is_closed = True
+                self.fiscal_year.save()
+        start.assert_not_called()
+        self.assertEqual(list(fiscal_years_to_archive()), [self.fiscal_year])
+        
+        call_command('close_fiscal_year', pending=True, stdout=StringIO())
+        self.assertEqual(FiscalYearReportArchive.objects.filter(fiscal_year=self.fiscal_year).count(), 7)
+        self.assertEqual(list(fiscal_years_to_archive()), [])
+    
+    def test_archives_are_streamed_by_account(self):
+        """Test that small insert batches give the same general ledger archives as the computed ledger."""
+        self.assertEqual(archive_fiscal_year(self.fiscal_year, batch_size=1), 7)
+        for account_number in ('401000', '411000', '606100', '706000'):
+            archive = FiscalYearReportArchive.objects.get(report='general_ledger', key=account_number)
+            self.assertEqual(
+                archive.load(),
+                json.loads(json.dumps(generate_general_ledger(self.fiscal_year, account_number), cls=JSONEncoder))
+            )
+    
+    def test_closed_year_served_from_archives(self):
+        """Test that archived reports match the computed ones and run no aggregation query."""
+        computed = self.get_reports()
+        self.fiscal_year.is_closed = True
+        self.fiscal_year.save()
+        archive_fiscal_year(self.fiscal_year)
+        caches['accounting_reports'].clear()
+        
+        with CaptureQueriesContext(connection) as context:
+            archived = self.get_reports()
+        self.assertEqual(archived, computed)
+        self.assertFalse([q for q in context.captured_queries if 'accountingentryline' in q['sql']])
+        self.assertFalse([q for q in context.captured_queries if 'accountbalancesnapshot' in q['sql']])
+    
+    def test_stale_or_partial_archives_are_not_served(self):
+        """Test that a changed ledger or a partial period falls back to the computation."""
+        self.fiscal_year.is_closed = True
+        self.fiscal_year.save()
+        archive_fiscal_year(self.fiscal_year)
+        self.create_entry('E3', date(2024, 3, 1), [
+            ('512000', True, '250.00'),
+            ('411000', False, '250.00'),
+        ])
+        response = self.client_api.get(f'{REPORTS_URL}trial_balance/', {'fiscal_year': self.fiscal_year.pk})
+        self.assertIn('512000', [row['account_number'] for row in response.data['accounts']])
+        response = self.client_api.get(f'{REPORTS_URL}trial_balance/', {
+            'fiscal_year': self.fiscal_year.pk, 'as_of_date': '2024-01-31'
+        })
+        self.assertEqual(response.data['total_debit'], 100)
+    
+    def test_reopening_drops_archives(self):
+        """Test that reopening a fiscal year deletes its archives."""
+        call_command('close_fiscal_year', '2024', verbosity=0, stdout=StringIO())
+        self.fiscal_year.refresh_from_db()
+        self.fiscal_year.is_closed = False
+        self.fiscal_year.save()
+        self.assertFalse(FiscalYearReportArchive.objects.filter(fiscal_year=self.fiscal_year).exists())
@@ -0,0 +1,136 @@
+import tempfile
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from accounting.models import FiscalYear
+from accounting.tests.utils import LedgerTestMixin
+from accounting.utils.report_cache import report_cache_stats, reset_report_cache_stats
+
+User = get_user_model()
+
+REPORTS_URL = '/api/v1.0/acc/reports/'
+
+
+class ReportCacheTest(LedgerTestMixin, TestCase):
+    """Test suite for the report cache keyed by ledger version."""
+    
+    def setUp(self):
+        """Set up a posted ledger, an empty report cache and an authenticated API client."""
+        caches['accounting_reports'].clear()
+        self.create_ledger_fixtures()
+        self.create_entry('E1', date(2024, 1, 10), [
+            ('606100', True, '100.00'),
+            ('401000', False, '100.00'),
+        ])
+        self.user = User.objects.create_superuser(email='admin@example.com', password='testpass123')
+        self.client_api = APIClient()
+        self.client_api.force_authenticate(self.user)
+    
+    def get_trial_balance(self):
+        response = self.client_api.get(f'{REPORTS_URL}trial_balance/', {'fiscal_year': self.fiscal_year.pk})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+    
+    def test_repeated_report_is_served_from_cache(self):
+        """Test that an unchanged ledger serves the report without aggregating again."""
+        first = self.get_trial_balance()
+        # Fiscal year lookup only: no aggregation on a hit
+        with self.assertNumQueries(1):
+            self.client_api.get(f'{REPORTS_URL}trial_balance/', {'fiscal_year': self.fiscal_year.pk})
+        self.assertEqual(self.get_trial_balance(), first)
+        self.assertEqual(report_cache_stats()['misses'], 1)
+        self.assertEqual(report_cache_stats()['hits'], 2)
+    
+    def test_posting_bumps_version_and_invalidates(self):
+        """Test that posting an entry changes the ledger version and the served report."""
+        self.assertEqual(self.get_trial_balance()['total_debit'], Decimal('100.00'))
+        version = FiscalYear.objects.get(pk=self.fiscal_year.pk).ledger_version
+        self.create_entry('E2', date(2024, 1, 11), [
+            ('606100', True, '50.00'),
+            ('401000', False, '50.00'),
+        ])
+        self.assertEqual(FiscalYear.objects.get(pk=self.fiscal_year.pk).ledger_version, version + 1)
+        self.assertEqual(self.get_trial_balance()['total_debit'], Decimal('150.00'))
+    
+    def test_cancel_and_reverse_bump_version(self):
+        """Test that cancelling and reversing entries bump the ledger version."""
+        draft = self.create_entry('D1', date(2024, 1, 12), [('606100', True, '1.00'), ('401000', False, '1.00')],
+                                  status='draft')
+        version = FiscalYear.objects.get(pk=self.fiscal_year.pk).ledger_version
+        self.client_api.post(f'/api/v1.0/acc/accounting-entries/{draft.pk}/cancel/')
+        self.assertEqual(FiscalYear.objects.get(pk=self.fiscal_year.pk).ledger_version, version + 1)
+        
+        posted = self.fiscal_year.entries.get(entry_number='E1')
+        self.client_api.post(f'/api/v1.0/acc/accounting-entries/{posted.pk}/create_reversing_entry/')
+        self.assertEqual(FiscalYear.objects.get(pk=self.fiscal_year.pk).ledger_version, version + 2)
+    
+    def test_edit_and_delete_bump_version(self):
+        """Test that updating and deleting entries through the API bump the ledger version."""
+        draft = self.create_entry('D1', date(2024, 1, 12), [('606100', True, '1.00'), ('401000', False, '1.00')],
+                                  status='draft')
+        version = FiscalYear.objects.get(pk=self.fiscal_year.pk).ledger_version
+        response = self.client_api.patch(
+            f'/api/v1.0/acc/accounting-entries/{draft.pk}/', {'reference': 'edited'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(FiscalYear.objects.get(pk=self.fiscal_year.pk).ledger_version, version + 1)
+        
+        response = self.client_api.delete(f'/api/v1.0/acc/accounting-entries/{draft.pk}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(FiscalYear.objects.get(pk=self.fiscal_year.pk).ledger_version, version + 2)
+    
+    def test_params_are_part_of_the_key(self):
+        """Test that different parameters are cached separately."""
+        self.get_trial_balance()
+        response = self.client_api.get(f'{REPORTS_URL}trial_balance/', {
+            'fiscal_year': self.fiscal_year.pk, 'include_zero_balances': 'true'
+        })
+        self.assertEqual(len(response.data['accounts']), len(self.accounts))
+        self.assertEqual(report_cache_stats()['misses'], 2)
+    
+    def test_invalid_as_of_date(self):
+        """Test that a malformed or impossible as_of_date is answered 400 before any report is built."""
+        for report in ('trial_balance', 'income_statement', 'balance_sheet', 'financial_statements'):
+            for value in ('abc', '2024-13-45'):
+                with self.subTest(report=report, as_of_date=value):
+                    response = self.client_api.get(f'{REPORTS_URL}{report}/', {
+                        'fiscal_year': self.fiscal_year.pk, 'as_of_date': value
+                    })
+                    self.assertEqual(response.status_code, 400)
+                    self.assertEqual(response.data['error'], f'Invalid date: {value}')
+        self.assertEqual(report_cache_stats()['misses'], 0)
+    
+    def test_cache_stats_endpoint(self):
+        """Test that the hit/miss counters are exposed."""
+        reset_report_cache_stats()
+        self.get_trial_balance()
+        self.get_trial_balance()
+        response = self.client_api.get(f'{REPORTS_URL}cache_stats/')
+        self.assertEqual((response.data['hits'], response.data['misses']), (1, 1))
+        self.assertEqual(response.data['hit_ratio'], 0.5)
+    
+    def test_file_based_backend(self):
+        """Test that the report cache works with the file-based backend."""
+        with tempfile.TemporaryDirectory() as location:
+            cache_settings = {
+                'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                'accounting_reports': {
+                    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                    'LOCATION': location,
+                },
+            }
+            with override_settings(CACHES=cache_settings):
+                first = self.get_trial_balance()
+                self.assertEqual(self.get_trial_balance(), first)
+                stats = report_cache_stats()
+                self.assertTrue(stats['backend'].endswith('FileBasedCache'))
+                self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+    
+    @override_settings(ACCOUNTING_REPORT_CACHE=None)
+    def test_cache_can_be_disabled(self):
+        """Test that reports are computed directly when the cache is disabled."""
+        self.get_trial_balance()
+        self.assertFalse(report_cache_stats()['enabled'])
@@ -0,0 +1,90 @@
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from accounting.models import AccountingClass, AccountingChapter, AccountingSection, GeneralLedgerAccount
+from accounting.tests.utils import LedgerTestMixin
+from accounting.utils.rollup import AccountPrefixIndex, generate_rollup_balances
+
+User = get_user_model()
+
+
+class RollupBalancesTest(LedgerTestMixin, TestCase):
+    """Test suite for the class > chapter > section > account roll-up."""
+    
+    def setUp(self):
+        """Set up a small posted ledger with part of the chart hierarchy."""
+        self.create_ledger_fixtures()
+        charges = AccountingClass.objects.create(code='6', name='Comptes de charges')
+        achats = AccountingChapter.objects.create(accounting_class=charges, code='60', name='Achats')
+        AccountingSection.objects.create(chapter=achats, code='606', name='Achats non stockés')
+        self.accounts['607000'] = GeneralLedgerAccount.objects.create(
+            account_number='607000', short_name='Marchandises', full_name='Marchandises', is_balance_sheet=False
+        )
+        self.create_entry('E1', date(2024, 1, 10), [
+            ('606100', True, '100.00'),
+            ('607000', True, '20.00'),
+            ('401000', False, '120.00'),
+        ])
+        self.create_entry('E2', date(2024, 2, 5), [
+            ('411000', True, '250.00'),
+            ('706000', False, '250.00'),
+        ])
+    
+    def test_tree_sums_every_level(self):
+        """Test that every node carries the sum of its accounts."""
+        rollup = generate_rollup_balances(self.fiscal_year)
+        classes = {node['code']: node for node in rollup['classes']}
+        self.assertEqual(sorted(classes), ['4', '6', '7'])
+        self.assertEqual(classes['6']['name'], 'Comptes de charges')
+        self.assertEqual(classes['6']['balance'], Decimal('120.00'))
+        chapter = classes['6']['chapters'][0]
+        self.assertEqual((chapter['code'], chapter['name'], chapter['balance']), ('60', 'Achats', Decimal('120.00')))
+        self.assertEqual(
+            [(section['code'], section['balance']) for section in chapter['sections']],
+            [('606', Decimal('100.00')), ('607', Decimal('20.00'))]
+        )
+        self.assertEqual(chapter['sections'][0]['accounts'][0]['code'], '606100')
+        self.assertEqual(classes['4']['balance'], Decimal('130.00'))
+        self.assertTrue(rollup['is_balanced'])
+    
+    def test_depth_and_query_count(self):
+        """Test that the depth trims the tree and the roll-up runs a constant number of queries."""
+        with CaptureQueriesContext(connection) as context:
+            rollup = generate_rollup_balances(self.fiscal_year, depth='chapter')
+        self.assertLessEqual(len(context.captured_queries), 3)
+        node = rollup['classes'][0]['chapters'][0]
+        self.assertEqual(node['code'], '40')
+        self.assertNotIn('sections', node)
+    
+    def test_prefix_index(self):
+        """Test prefix sums at any depth."""
+        index = AccountPrefixIndex({
+            '401000': Decimal('-120.00'), '606100': Decimal('100.00'),
+            '606150': Decimal('5.00'), '607000': Decimal('20.00'),
+        })
+        self.assertEqual(index.prefix_sums(['6', '60', '606', '6061', '60615', '9', '']), {
+            '6': Decimal('125.00'), '60': Decimal('125.00'), '606': Decimal('105.00'), '6061': Decimal('105.00'),
+            '60615': Decimal('5.00'), '9': Decimal('0.00'), '': Decimal('5.00'),
+        })
+    
+    def test_rollup_endpoint(self):
+        """Test the roll-up endpoint with prefix sums."""
+        caches['accounting_reports'].clear()
+        user = User.objects.create_superuser(email='admin@example.com', password='testpass123')
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get('/api/v1.0/acc/reports/rollup/', {
+            'fiscal_year': self.fiscal_year.pk, 'depth': 'class', 'prefixes': '60,606,7'
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([node['code'] for node in response.data['classes']], ['4', '6', '7'])
+        self.assertEqual(response.data['prefix_sums'], {
+            '60': Decimal('120.00'), '606': Decimal('100.00'), '7': Decimal('-250.00')
+        })
+        response = client.get('/api/v1.0/acc/reports/rollup/', {'fiscal_year': self.fiscal_year.pk, 'depth': 'x'})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,73 @@
+from datetime import date
+from decimal import Decimal
+from accounting.models import (
+    FiscalYear,
+    AccountingJournal,
+    GeneralLedgerAccount,
+    AccountingEntry,
+    AccountingEntryLine
+)
+from accounting.utils.ledger_balances import post_entry
+from accounting.utils.reference_data import registry
+
+
+class LedgerTestMixin:
+    """Helpers to build a small chart of accounts and posted ledger in tests."""
+    
+    def create_ledger_fixtures(self):
+        """Create a fiscal year, a journal and a handful of accounts."""
+        # Rows cached by an earlier test were rolled back with it
+        registry.clear()
+        self.fiscal_year = FiscalYear.objects.create(
+            year=2024,
+            name='EXERCICE 2024',
+            start_date=date(2024, 1, 1),
+            end_date=date(2024, 12, 31),
+            is_current=True
+        )
+        self.journal = AccountingJournal.objects.create(
+            id_journal='ACH', code='ACH', short_name='Achats', name='Journal des achats'
+        )
+        self.accounts = {
+            number: GeneralLedgerAccount.objects.create(
+                account_number=number,
+                short_name=name,
+                full_name=name,
+                is_balance_sheet=number[0] not in ('6', '7')
+            )
+            for number, name in [
+                ('101000', 'Capital'),
+                ('401000', 'Fournisseurs'),
+                ('411000', 'Clients'),
+                ('512000', 'Banque'),
+                ('606100', 'Fournitures'),
+                ('706000', 'Prestations'),
+            ]
+        }
+    
+    def create_entry(self, number, entry_date, lines, status='posted', journal=None):
+        """
+        Create an entry with its lines.
+        
+        Each line is a tuple (account_number, is_debit, amount). Posted entries go
+        through post_entry so that the account balances are maintained.
+        """
+        entry = AccountingEntry.objects.create(
+            entry_number=number,
+            journal=journal or self.journal,
+            fiscal_year=self.fiscal_year,
+            entry_date=entry_date,
+            status='validated' if status == 'posted' else status
+        )
+        for line_number, (account_number, is_debit, amount) in enumerate(lines, start=1):
+            AccountingEntryLine.objects.create(
+                entry=entry,
+                account=self.accounts[account_number],
+                line_number=line_number,
+                is_debit=is_debit,
+                amount=Decimal(amount)
+            )
+        entry.update_totals()
+        if status == 'posted':
+            post_entry(entry)
+        return entry
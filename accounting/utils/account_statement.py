@@ -0,0 +1,212 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.db import connection
+from django.db.models import Case, DecimalField, F, Sum, Value, When, Window
+from django.db.models.expressions import RowRange
+from django.utils.dateparse import parse_date
+from accounting.models import (
+    AccountBalanceSnapshot,
+    AccountingEntry,
+    AccountingEntryLine,
+    AccountingJournal,
+    GeneralLedgerAccount
+)
+from accounting.utils.financial_statements import LEDGER_CHUNK_SIZE, calculate_account_balances
+from accounting.utils.ledger_balances import CENT
+from accounting.utils.reference_data import journal_ids, reference_table
+
+
+# Columns of a streamed account statement row
+ACCOUNT_STATEMENT_COLUMNS = [
+    'row_type',
+    'entry_date',
+    'entry_number',
+    'journal_code',
+    'line_number',
+    'description',
+    'debit',
+    'credit',
+    'running_balance',
+]
+
+# Sort key of the statement lines, also the window ordering
+_STATEMENT_ORDER = ('entry__entry_date', 'entry__entry_number', 'line_number')
+
+_SIGNED_AMOUNT = Case(
+    When(is_debit=True, then=F('amount')),
+    default=-F('amount'),
+    output_field=DecimalField(max_digits=17, decimal_places=2)
+)
+
+
+def _parse(value):
+    if isinstance(value, str):
+        parsed = parse_date(value)
+        if parsed is None:
+            raise ValueError(f"Invalid date: {value}")
+        return parsed
+    return value
+
+
+def calculate_opening_balance(account, fiscal_year, start_date=None, journal_code=None, carry_forward=None):
+    """
+    Return the balance of an account just before the start of a statement.
+    
+    The balance of the fiscal year before start_date is read from the
+    materialized snapshots. With carry_forward, the closing balance of the
+    prior fiscal years is added too, unless the fiscal year already holds
+    opening-balance entries (which carry that balance forward themselves).
+    
+    Parameters:
+    - account: GeneralLedgerAccount instance
+    - fiscal_year: FiscalYear instance
+    - start_date: Optional first day of the statement (date or ISO string)
+    - journal_code: Optional journal code
+    - carry_forward: Add the prior fiscal years (defaults to True for balance
+      sheet accounts, False for income statement accounts)
+    """
+    start_date = _parse(start_date)
+    if carry_forward is None:
+        carry_forward = account.is_balance_sheet
+    
+    opening = Decimal('0.00')
+    if start_date and start_date > fiscal_year.start_date:
+        balances = calculate_account_balances(
+            fiscal_year, start_date - timedelta(days=1), journal_code, accounts=[account]
+        )
+        opening += balances.get(account.pk, Decimal('0.00'))
+    
+    if carry_forward and not AccountingEntry.objects.filter(
+        fiscal_year=fiscal_year, is_opening_balance=True, status='posted'
+    ).exists():
+        prior = AccountBalanceSnapshot.objects.filter(
+            account=account,
+            fiscal_year__end_date__lt=fiscal_year.start_date
+        )
+        if journal_code:
+            prior = prior.filter(journal_id__in=journal_ids(journal_code))
+        total = prior.aggregate(balance=Sum(F('debit_total') - F('credit_total')))['balance']
+        opening += (total or Decimal('0.00')).quantize(CENT)
+    
+    return opening
+
+
+def account_statement(account, fiscal_year, start_date=None, end_date=None, journal_code=None,
+                      carry_forward=None, use_window=None, chunk_size=LEDGER_CHUNK_SIZE):
+    """
+    Build the statement of an account: every posted line with its running balance.
+    
+    When the database supports window functions, the running balance is computed
+    by the database with SUM() OVER (ORDER BY entry_date, entry_number,
+    line_number); otherwise the lines are streamed in that order and the balance
+    is accumulated in Python. Either way the lines are read with a server-side
+    iterator, so accounts with hundreds of thousands of lines are never loaded
+    in memory at once.
+    
+    Parameters:
+    - account: GeneralLedgerAccount instance or account_number
+    - fiscal_year: FiscalYear instance
+    - start_date: Optional first day of the statement
+    - end_date: Optional last day of the statement
+    - journal_code: Optional journal code
+    - carry_forward: See calculate_opening_balance
+    - use_window: Force (True) or disable (False) the window function; defaults to
+      the backend capability
+    - chunk_size: Number of lines fetched per round trip
+    
+    Returns:
+    - Iterator of dicts with the ACCOUNT_STATEMENT_COLUMNS keys: an "opening" row,
+      one "line" row per entry line and a "closing" row
+    
+    Raises:
+    - GeneralLedgerAccount.DoesNotExist: If the account number is unknown
+    - ValueError: If a date is invalid
+    """
+    if isinstance(account, str):
+        account = GeneralLedgerAccount.objects.get(account_number=account)
+    start_date = _parse(start_date)
+    end_date = _parse(end_date)
+    if use_window is None:
+        use_window = connection.features.supports_over_clause
+    
+    opening = calculate_opening_balance(account, fiscal_year, start_date, journal_code, carry_forward)
+    
+    lines = AccountingEntryLine.objects.filter(
+        account=account,
+        entry__fiscal_year=fiscal_year,
+        entry__status='posted'
+    )
+    if start_date:
+        lines = lines.filter(entry__entry_date__gte=start_date)
+    if end_date:
+        lines = lines.filter(entry__entry_date__lte=end_date)
+    if journal_code:
+        lines = lines.filter(entry__journal_id__in=journal_ids(journal_code))
+    lines = lines.order_by(*_STATEMENT_ORDER)
+    
+    fields = ('entry__entry_date', 'entry__entry_number', 'entry__journal_id', 'line_number',
+              'description', 'is_debit', 'amount')
+    if use_window:
+        rows = lines.annotate(
+            cumulative=Window(
+                expression=Sum(_SIGNED_AMOUNT),
+                order_by=[F(field).asc() for field in _STATEMENT_ORDER],
+                frame=RowRange(start=None, end=0)
+            )
+        ).values_list(*fields, 'cumulative')
+    else:
+        rows = lines.values_list(*fields)
+    
+    def statement():
+        journals = reference_table(AccountingJournal)
+        yield {
+            'row_type': 'opening',
+            'entry_date': start_date or fiscal_year.start_date,
+            'entry_number': '',
+            'journal_code': '',
+            'line_number': None,
+            'description': 'Opening balance',
+            'debit': None,
+            'credit': None,
+            'running_balance': opening,
+        }
+        
+        balance = opening
+        total_debit = Decimal('0.00')
+        total_credit = Decimal('0.00')
+        for row in rows.iterator(chunk_size=chunk_size):
+            entry_date, entry_number, journal_id, line_number, description, is_debit, amount = row[:7]
+            if is_debit:
+                total_debit += amount
+            else:
+                total_credit += amount
+            if use_window:
+                # SQLite sums decimals as floats: round back to cents
+                balance = opening + Decimal(str(row[7])).quantize(CENT)
+            else:
+                balance += amount if is_debit else -amount
+            yield {
+                'row_type': 'line',
+                'entry_date': entry_date,
+                'entry_number': entry_number,
+                'journal_code': journals.code(journal_id),
+                'line_number': line_number,
+                'description': description or '',
+                'debit': amount if is_debit else Decimal('0.00'),
+                'credit': Decimal('0.00') if is_debit else amount,
+                'running_balance': balance,
+            }
+        
+        yield {
+            'row_type': 'closing',
+            'entry_date': end_date or fiscal_year.end_date,
+            'entry_number': '',
+            'journal_code': '',
+            'line_number': None,
+            'description': 'Closing balance',
+            'debit': total_debit,
+            'credit': total_credit,
+            'running_balance': balance,
+        }
+    
+    return statement()
@@ -0,0 +1,287 @@
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, Sum
+from accounting.models import AccountingEntryLine, AnalyticalAggregate
+from accounting.utils.ledger_balances import CENT, increment_totals
+from accounting.utils.reference_data import journal_ids
+
+
+# Cube dimensions: lookup path of the key, code and name on entry lines and on aggregate rows
+CUBE_DIMENSIONS = {
+    'analytical_code': {
+        'line': ('analytical_code', None, None),
+        'aggregate': ('analytical_code', None, None),
+    },
+    'activity': {
+        'line': ('entry__activity_id', 'entry__activity__code', 'entry__activity__name'),
+        'aggregate': ('activity_id', 'activity__code', 'activity__name'),
+    },
+    'service_type': {
+        'line': ('entry__service_type_id', 'entry__service_type__code', 'entry__service_type__name'),
+        'aggregate': ('service_type_id', 'service_type__code', 'service_type__name'),
+    },
+    'municipality': {
+        'line': ('municipality_id', 'municipality__insee_code', 'municipality__name'),
+        'aggregate': ('municipality_id', 'municipality__insee_code', 'municipality__name'),
+    },
+    'payer_type': {
+        'line': ('payer_type_id', 'payer_type__code', 'payer_type__name'),
+        'aggregate': ('payer_type_id', 'payer_type__code', 'payer_type__name'),
+    },
+    'pricing_type': {
+        'line': ('pricing_type_id', 'pricing_type__code', 'pricing_type__name'),
+        'aggregate': ('pricing_type_id', 'pricing_type__code', 'pricing_type__name'),
+    },
+}
+
+CUBE_MEASURES = ('net', 'debit', 'credit')
+
+MAX_CUBE_DIMENSIONS = 3
+
+# Largest dense matrix returned by generate_cube (product of the member counts)
+MAX_CUBE_CELLS = 100000
+
+# Key of an aggregate row, in the order of the aggregate fields
+_AGGREGATE_KEY = (
+    'fiscal_year_id', 'journal_id', 'analytical_code', 'activity_id',
+    'service_type_id', 'municipality_id', 'payer_type_id', 'pricing_type_id',
+)
+_LINE_KEY = (
+    'entry__fiscal_year_id', 'entry__journal_id', 'analytical_code', 'entry__activity_id',
+    'entry__service_type_id', 'municipality_id', 'payer_type_id', 'pricing_type_id',
+)
+
+
+def analytical_aggregates_enabled():
+    """Return whether the analytical aggregates are maintained on posting."""
+    return getattr(settings, 'ACCOUNTING_ANALYTICAL_AGGREGATES', False)
+
+
+def _analytical_code(value):
+    # '' and NULL are the same member, as in the unique key of the aggregates
+    return value or None
+
+
+def _key_order(item):
+    # Aggregate keys hold NULLs: sort them first, without comparing None to values
+    return tuple((value is not None, value) for value in item[0])
+
+
+def _increment_aggregates(deltas):
+    """
+    Increment the analytical aggregates in place.
+    
+    Rows are written in key order and created race-free (see
+    ledger_balances.increment_totals), relying on the unique key constraint.
+    
+    Parameters:
+    - deltas: Dict mapping an aggregate key (see _AGGREGATE_KEY) to (debit, credit)
+    """
+    with transaction.atomic():
+        for key, (debit, credit) in sorted(deltas.items(), key=_key_order):
+            increment_totals(AnalyticalAggregate, dict(zip(_AGGREGATE_KEY, key)), debit, credit)
+
+
+def _sum_lines_by_combination(lines):
+    """Sum entry lines per aggregate key, as a dict key -> (debit, credit)."""
+    rows = lines.order_by().values(*_LINE_KEY).annotate(
+        debit=Sum('amount', filter=Q(is_debit=True)),
+        credit=Sum('amount', filter=Q(is_debit=False))
+    ).values_list(*_LINE_KEY, 'debit', 'credit')
+    totals = {}
+    for row in rows:
+        # The '' and NULL analytical codes are grouped apart but share one key
+        key = row[:2] + (_analytical_code(row[2]),) + row[3:-2]
+        debit, credit = totals.get(key, (Decimal('0.00'), Decimal('0.00')))
+        totals[key] = (
+            debit + (row[-2] or Decimal('0.00')).quantize(CENT),
+            credit + (row[-1] or Decimal('0.00')).quantize(CENT),
+        )
+    return totals
+
+
+def apply_entry_to_analytics(entry):
+    """
+    Add the lines of a posted entry to the analytical aggregates.
+    
+    Parameters:
+    - entry: AccountingEntry instance being posted
+    """
+    _increment_aggregates(_sum_lines_by_combination(AccountingEntryLine.objects.filter(entry=entry)))
+
+
+def apply_lines_to_analytics(lines):
+    """
+    Add in-memory lines of posted entries to the analytical aggregates.
+    
+    Parameters:
+    - lines: Iterable of AccountingEntryLine instances with their entry set
+    """
+    deltas = {}
+    for line in lines:
+        entry = line.entry
+        key = (
+            entry.fiscal_year_id, entry.journal_id, _analytical_code(line.analytical_code), entry.activity_id,
+            entry.service_type_id, line.municipality_id, line.payer_type_id, line.pricing_type_id,
+        )
+        debit, credit = deltas.get(key, (Decimal('0.00'), Decimal('0.00')))
+        if line.is_debit:
+            debit += line.amount
+        else:
+            credit += line.amount
+        deltas[key] = (debit, credit)
+    _increment_aggregates(deltas)
+
+
+def rebuild_analytical_aggregates(fiscal_year=None, batch_size=1000):
+    """
+    Recompute the analytical aggregates from the posted entry lines.
+    
+    Parameters:
+    - fiscal_year: Optional FiscalYear instance to restrict the rebuild
+    - batch_size: Number of aggregate rows inserted per query
+    
+    Returns:
+    - int: Number of aggregate rows written
+    """
+    lines = AccountingEntryLine.objects.filter(entry__status='posted')
+    if fiscal_year:
+        lines = lines.filter(entry__fiscal_year=fiscal_year)
+    computed = _sum_lines_by_combination(lines)
+    
+    with transaction.atomic():
+        existing = AnalyticalAggregate.objects.all()
+        if fiscal_year:
+            existing = existing.filter(fiscal_year=fiscal_year)
+        existing.delete()
+        AnalyticalAggregate.objects.bulk_create(
+            [
+                AnalyticalAggregate(debit_total=debit, credit_total=credit, **dict(zip(_AGGREGATE_KEY, key)))
+                for key, (debit, credit) in computed.items()
+            ],
+            batch_size=batch_size
+        )
+    return len(computed)
+
+
+def _member(key, code, name):
+    return {'key': key, 'code': code if code is not None else key, 'name': name if name is not None else key}
+
+
+def generate_cube(dimensions, measure='net', fiscal_year=None, journal_code=None, use_aggregates=None):
+    """
+    Pivot posted amounts over up to three analytical dimensions.
+    
+    The cube is answered by a single GROUP BY, over the analytical aggregates
+    when they are maintained, otherwise over the posted entry lines. Member
+    codes and names are grouped along with their keys, so no extra lookup is
+    needed to label the axes.
+    
+    Parameters:
+    - dimensions: List of 1 to 3 names from CUBE_DIMENSIONS
+    - measure: 'net' (debit minus credit), 'debit' or 'credit'
+    - fiscal_year: Optional FiscalYear instance
+    - journal_code: Optional journal code
+    - use_aggregates: Read the aggregates (True) or the lines (False); defaults to
+      ACCOUNTING_ANALYTICAL_AGGREGATES
+    
+    Returns:
+    - Dict with the dimensions, the measure, the members of each dimension
+      (key, code and name, the missing value last), the dense values matrix
+      indexed in member order, and the total
+    
+    Raises:
+    - ValueError: If the dimensions or the measure are invalid, or if the dense
+      matrix would exceed MAX_CUBE_CELLS cells
+    """
+    if not 1 <= len(dimensions) <= MAX_CUBE_DIMENSIONS:
+        raise ValueError(f"Between 1 and {MAX_CUBE_DIMENSIONS} dimensions are required")
+    unknown = [dimension for dimension in dimensions if dimension not in CUBE_DIMENSIONS]
+    if unknown or len(set(dimensions)) != len(dimensions):
+        raise ValueError(f"Invalid dimensions: {', '.join(unknown) or ', '.join(dimensions)}")
+    if measure not in CUBE_MEASURES:
+        raise ValueError(f"Unknown measure: {measure}")
+    if use_aggregates is None:
+        use_aggregates = analytical_aggregates_enabled()
+    
+    if use_aggregates:
+        source = 'aggregate'
+        rows = AnalyticalAggregate.objects.all()
+        if fiscal_year:
+            rows = rows.filter(fiscal_year=fiscal_year)
+        if journal_code:
+            rows = rows.filter(journal_id__in=journal_ids(journal_code))
+        debit = Sum('debit_total')
+        credit = Sum('credit_total')
+    else:
+        source = 'line'
+        rows = AccountingEntryLine.objects.filter(entry__status='posted')
+        if fiscal_year:
+            rows = rows.filter(entry__fiscal_year=fiscal_year)
+        if journal_code:
+            rows = rows.filter(entry__journal_id__in=journal_ids(journal_code))
+        debit = Sum('amount', filter=Q(is_debit=True))
+        credit = Sum('amount', filter=Q(is_debit=False))
+    
+    paths = [CUBE_DIMENSIONS[dimension][source] for dimension in dimensions]
+    fields = [path for triple in paths for path in triple if path]
+    cells = rows.order_by().values(*fields).annotate(debit=debit, credit=credit).values_list(*fields, 'debit', 'credit')
+    
+    members = [{} for _ in dimensions]
+    values = {}
+    for row in cells:
+        position = 0
+        coordinates = []
+        for index, (key_path, code_path, name_path) in enumerate(paths):
+            key = row[position]
+            if dimensions[index] == 'analytical_code':
+                key = _analytical_code(key)
+            code = row[position + 1] if code_path else None
+            name = row[position + 2] if name_path else None
+            position += 1 + bool(code_path) + bool(name_path)
+            members[index].setdefault(key, _member(key, code, name))
+            coordinates.append(key)
+        row_debit = (row[-2] or Decimal('0.00')).quantize(CENT)
+        row_credit = (row[-1] or Decimal('0.00')).quantize(CENT)
+        amount = {'net': row_debit - row_credit, 'debit': row_debit, 'credit': row_credit}[measure]
+        coordinates = tuple(coordinates)
+        values[coordinates] = values.get(coordinates, Decimal('0.00')) + amount
+    
+    # Members sorted by code, the missing value (None) last
+    ordered = [
+        sorted(dimension_members.values(), key=lambda member: (member['key'] is None, str(member['code'])))
+        for dimension_members in members
+    ]
+    indexes = [{member['key']: index for index, member in enumerate(dimension)} for dimension in ordered]
+    
+    size = 1
+    for dimension_members in ordered:
+        size *= len(dimension_members)
+    if size > MAX_CUBE_CELLS:
+        raise ValueError(
+            f"The cube would have {size} cells (limit {MAX_CUBE_CELLS}): "
+            "use fewer dimensions or filter by fiscal year or journal"
+        )
+    
+    def dense(depth):
+        return [
+            dense(depth + 1) if depth + 1 < len(ordered) else Decimal('0.00')
+            for _ in ordered[depth]
+        ]
+    
+    matrix = dense(0) if ordered[0] else []
+    for coordinates, amount in values.items():
+        cell = matrix
+        for depth, key in enumerate(coordinates[:-1]):
+            cell = cell[indexes[depth][key]]
+        cell[indexes[-1][coordinates[-1]]] = amount
+    
+    return {
+        'dimensions': list(dimensions),
+        'measure': measure,
+        'source': 'aggregates' if use_aggregates else 'lines',
+        'members': {dimension: dimension_members for dimension, dimension_members in zip(dimensions, ordered)},
+        'values': matrix,
+        'total': sum(values.values(), Decimal('0.00')),
+    }
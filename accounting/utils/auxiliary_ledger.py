@@ -0,0 +1,149 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.db.models import Case, DecimalField, F, Q, Sum, When
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import GreaterThan, LessThan, Range
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from accounting.models import AccountingEntryLine, AccountingType, GeneralLedgerAccount
+from accounting.utils.financial_statements import account_selector_filter
+from accounting.utils.ledger_balances import CENT
+from accounting.utils.reference_data import reference_ids, reference_table
+
+
+# Default upper bounds, in days past due, of the aging buckets
+DEFAULT_AGING_BUCKETS = (30, 60, 90)
+
+# Number of third parties fetched per round trip
+AUXILIARY_CHUNK_SIZE = 2000
+
+_SIGNED_AMOUNT = Case(
+    When(is_debit=True, then=F('amount')),
+    default=-F('amount'),
+    output_field=DecimalField(max_digits=17, decimal_places=2)
+)
+
+
+def aging_bucket_names(buckets=DEFAULT_AGING_BUCKETS):
+    """
+    Return the column names of the aging buckets.
+    
+    For buckets (30, 60, 90): not_due, days_0_30, days_31_60, days_61_90, days_over_90.
+    """
+    names = ['not_due']
+    lower = 0
+    for upper in buckets:
+        names.append(f'days_{lower}_{upper}')
+        lower = upper + 1
+    names.append(f'days_over_{buckets[-1]}')
+    return names
+
+
+def auxiliary_balance_columns(buckets=DEFAULT_AGING_BUCKETS):
+    """Return the columns of an auxiliary balance row."""
+    return ['auxiliary_type', 'auxiliary_id', 'debit', 'credit', 'balance'] + aging_bucket_names(buckets)
+
+
+def _bucket_sums(as_of_date, buckets):
+    """
+    Build one conditional sum per aging bucket.
+    
+    The age of a line is counted from its due date, or its entry date when it
+    has none. Reconciled lines (with a reconciliation code) are settled and left
+    out of the aging.
+    """
+    due_date = Coalesce('due_date', 'entry__entry_date')
+    open_line = Q(reconciliation_code__isnull=True) | Q(reconciliation_code='')
+    conditions = [GreaterThan(due_date, as_of_date)]
+    lower = 0
+    for upper in buckets:
+        conditions.append(Range(due_date, (as_of_date - timedelta(days=upper), as_of_date - timedelta(days=lower))))
+        lower = upper + 1
+    conditions.append(LessThan(due_date, as_of_date - timedelta(days=buckets[-1])))
+    
+    return {
+        name: Sum(Case(When(open_line & Q(condition), then=_SIGNED_AMOUNT)))
+        for name, condition in zip(aging_bucket_names(buckets), conditions)
+    }
+
+
+def _stream_rows(rows, bucket_names, include_zero_balances, chunk_size):
+    auxiliary_types = reference_table(AccountingType)
+    for type_id, auxiliary_id, debit, credit, *aging in rows.iterator(chunk_size=chunk_size):
+        debit = (debit or Decimal('0.00')).quantize(CENT)
+        credit = (credit or Decimal('0.00')).quantize(CENT)
+        balance = debit - credit
+        if not include_zero_balances and not balance:
+            continue
+        row = {
+            'auxiliary_type': auxiliary_types.code(type_id) or '',
+            'auxiliary_id': auxiliary_id,
+            'debit': debit,
+            'credit': credit,
+            'balance': balance,
+        }
+        for name, amount in zip(bucket_names, aging):
+            row[name] = (amount or Decimal('0.00')).quantize(CENT)
+        yield row
+
+
+def auxiliary_balance_rows(fiscal_year=None, as_of_date=None, accounts=None, auxiliary_type=None,
+                           buckets=DEFAULT_AGING_BUCKETS, include_zero_balances=False,
+                           chunk_size=AUXILIARY_CHUNK_SIZE):
+    """
+    Stream the balance and aging of every third party of the sub-ledgers.
+    
+    Posted lines carrying an auxiliary account are grouped by (auxiliary type,
+    auxiliary id) in a single query, in the order of the composite index on
+    those columns, and read back in chunks. Each row holds the debit, credit
+    and balance of the third party and its open (unreconciled) amounts split
+    into due-date aging buckets.
+    
+    Parameters:
+    - fiscal_year: Optional FiscalYear instance
+    - as_of_date: Optional reference date of the balance and the aging (defaults to today)
+    - accounts: Optional account numbers and prefixes (e.g. ["401*"] for suppliers)
+    - auxiliary_type: Optional AccountingType code
+    - buckets: Increasing upper bounds, in days past due, of the aging buckets
+    - include_zero_balances: Whether to include settled third parties
+    - chunk_size: Number of third parties fetched per round trip
+    
+    Returns:
+    - Generator of dicts with the auxiliary_balance_columns keys
+    
+    Raises:
+    - ValueError: If the date or the buckets are invalid
+    """
+    if isinstance(as_of_date, str):
+        parsed = parse_date(as_of_date)
+        if parsed is None:
+            raise ValueError(f"Invalid date: {as_of_date}")
+        as_of_date = parsed
+    as_of_date = as_of_date or timezone.now().date()
+    buckets = tuple(int(bucket) for bucket in buckets)
+    if not buckets or any(bucket <= 0 for bucket in buckets) or list(buckets) != sorted(set(buckets)):
+        raise ValueError("Aging buckets must be increasing positive numbers of days")
+    
+    lines = AccountingEntryLine.objects.filter(
+        entry__status='posted',
+        entry__entry_date__lte=as_of_date,
+        auxiliary_account_id__isnull=False
+    ).exclude(auxiliary_account_id='')
+    if fiscal_year:
+        lines = lines.filter(entry__fiscal_year=fiscal_year)
+    if accounts:
+        lines = lines.filter(account__in=GeneralLedgerAccount.objects.filter(account_selector_filter(accounts)))
+    if auxiliary_type:
+        lines = lines.filter(auxiliary_account_type_id__in=reference_ids(AccountingType, auxiliary_type))
+    
+    bucket_sums = _bucket_sums(as_of_date, buckets)
+    rows = lines.order_by('auxiliary_account_type_id', 'auxiliary_account_id').values(
+        'auxiliary_account_type_id', 'auxiliary_account_id'
+    ).annotate(
+        debit=Sum('amount', filter=Q(is_debit=True)),
+        credit=Sum('amount', filter=Q(is_debit=False)),
+        **bucket_sums
+    ).values_list(
+        'auxiliary_account_type_id', 'auxiliary_account_id', 'debit', 'credit', *bucket_sums
+    )
+    return _stream_rows(rows, list(bucket_sums), include_zero_balances, chunk_size)
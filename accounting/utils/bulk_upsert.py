@@ -0,0 +1,55 @@
+from django.db import connections, router
+from django.db.models import AutoField, BigAutoField, SmallAutoField
+
+
+# Rows per INSERT when the backend sets no variable limit of its own
+BULK_UPSERT_BATCH_SIZE = 2000
+
+
+def upsert_batch_size(model, objects, batch_size=BULK_UPSERT_BATCH_SIZE):
+    """
+    Return the number of rows per INSERT for a bulk upsert of objects.
+    
+    The size is capped by the number of variables the backend accepts in one
+    query (999 / 32766 on SQLite, divided by the number of inserted columns).
+    """
+    fields = [
+        field for field in model._meta.concrete_fields
+        if not isinstance(field, (AutoField, BigAutoField, SmallAutoField))
+    ]
+    connection = connections[router.db_for_write(model)]
+    return max(1, min(batch_size, connection.ops.bulk_batch_size(fields, objects)))
+
+
+def bulk_upsert(model, objects, unique_fields, update_fields, batch_size=BULK_UPSERT_BATCH_SIZE):
+    """
+    Insert objects, updating the existing rows that collide on unique_fields.
+    
+    Rows are written with bulk_create(update_conflicts=True) in chunks sized to
+    the backend variable limit (see upsert_batch_size). updated_at is refreshed on
+    updated rows when the model has one.
+    
+    Parameters:
+    - model: Model class of the objects
+    - objects: List of unsaved model instances
+    - unique_fields: Fields of the unique constraint identifying a row
+    - update_fields: Fields overwritten on existing rows
+    - batch_size: Upper bound of rows per INSERT
+    
+    Returns:
+    - Number of rows written
+    """
+    if not objects:
+        return 0
+    update_fields = list(update_fields)
+    if 'updated_at' not in update_fields and any(field.name == 'updated_at' for field in model._meta.concrete_fields):
+        update_fields.append('updated_at')
+    size = upsert_batch_size(model, objects, batch_size)
+    for start in range(0, len(objects), size):
+        model.objects.bulk_create(
+            objects[start:start + size],
+            update_conflicts=True,
+            unique_fields=unique_fields,
+            update_fields=update_fields
+        )
+    return len(objects)
@@ -0,0 +1,218 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from django.db.models import Case, DecimalField, F, Q, Sum, When
+from django.utils.dateparse import parse_date
+from accounting.models import AccountingEntryLine, FiscalYear, GeneralLedgerAccount
+from accounting.utils.financial_statements import account_selector_filter, classify_account
+from accounting.utils.ledger_balances import CENT
+from accounting.utils.reference_data import journal_ids, reference_table
+
+
+# Statements available in comparative mode
+COMPARATIVE_STATEMENTS = ('trial_balance', 'income_statement')
+
+# Named period sets built from a fiscal year
+PERIOD_PRESETS = ('monthly', 'quarterly', 'yoy')
+
+# Most explicit periods accepted by parse_periods: each one adds a column to aggregate
+MAX_COMPARATIVE_PERIODS = 24
+
+
+def _period(label, start_date, end_date):
+    return {'label': label, 'start_date': start_date, 'end_date': end_date}
+
+
+def _add_months(value, months):
+    month = value.month - 1 + months
+    return date(value.year + month // 12, month % 12 + 1, 1)
+
+
+def _split_fiscal_year(fiscal_year, months):
+    periods = []
+    start = fiscal_year.start_date.replace(day=1)
+    while start <= fiscal_year.end_date:
+        end = _add_months(start, months) - timedelta(days=1)
+        periods.append(_period(
+            start.strftime('%Y-%m') if months == 1 else f"{start.year}-Q{(start.month - 1) // 3 + 1}",
+            max(start, fiscal_year.start_date),
+            min(end, fiscal_year.end_date)
+        ))
+        start = _add_months(start, months)
+    return periods
+
+
+def build_periods(fiscal_year, preset):
+    """
+    Build a named set of periods from a fiscal year.
+    
+    Parameters:
+    - fiscal_year: FiscalYear instance
+    - preset: 'monthly' (one column per month), 'quarterly' or 'yoy' (the fiscal
+      year and the prior one, N and N-1)
+    
+    Returns:
+    - List of period dicts with label, start_date and end_date
+    
+    Raises:
+    - ValueError: If the preset is unknown
+    """
+    if preset == 'monthly':
+        return _split_fiscal_year(fiscal_year, 1)
+    if preset == 'quarterly':
+        return _split_fiscal_year(fiscal_year, 3)
+    if preset == 'yoy':
+        prior = reference_table(FiscalYear).get_by_code(fiscal_year.year - 1)
+        if prior is not None:
+            prior_period = _period(str(prior['year']), prior['start_date'], prior['end_date'])
+        else:
+            prior_period = _period(
+                str(fiscal_year.year - 1),
+                fiscal_year.start_date.replace(year=fiscal_year.start_date.year - 1),
+                fiscal_year.start_date - timedelta(days=1)
+            )
+        return [_period(str(fiscal_year.year), fiscal_year.start_date, fiscal_year.end_date), prior_period]
+    raise ValueError(f"Unknown period preset: {preset}")
+
+
+def parse_periods(spec):
+    """
+    Parse explicit periods written as "start:end" or "label=start:end", comma separated.
+    
+    Example: "N=2024-01-01:2024-06-30,N-1=2023-01-01:2023-06-30"
+    
+    Raises:
+    - ValueError: If a period is malformed or ends before it starts, or if there
+      are more than MAX_COMPARATIVE_PERIODS periods
+    """
+    items = [item.strip() for item in spec.split(',') if item.strip()]
+    if len(items) > MAX_COMPARATIVE_PERIODS:
+        raise ValueError(f"At most {MAX_COMPARATIVE_PERIODS} periods can be compared, got {len(items)}")
+    periods = []
+    for item in items:
+        label, _, dates = item.rpartition('=')
+        start, _, end = dates.partition(':')
+        start_date, end_date = parse_date(start.strip()), parse_date(end.strip())
+        if start_date is None or end_date is None:
+            raise ValueError(f"Invalid period: {item}")
+        if end_date < start_date:
+            raise ValueError(f"Period ends before it starts: {item}")
+        periods.append(_period(label.strip() or dates.strip(), start_date, end_date))
+    if not periods:
+        raise ValueError("At least one period is required")
+    return periods
+
+
+def _period_sum(period):
+    """Sum the signed amounts of the lines dated within a period."""
+    return Sum(
+        Case(
+            When(entry__entry_date__range=(period['start_date'], period['end_date']), is_debit=True,
+                 then=F('amount')),
+            When(entry__entry_date__range=(period['start_date'], period['end_date']), is_debit=False,
+                 then=-F('amount')),
+            output_field=DecimalField(max_digits=17, decimal_places=2)
+        )
+    )
+
+
+def generate_comparative_report(periods, statement='trial_balance', journal_code=None, accounts=None,
+                                include_zero_balances=False):
+    """
+    Generate a trial balance or an income statement over several periods at once.
+    
+    Every column comes from one conditional-aggregation query over the posted
+    entry lines: one SUM(CASE WHEN entry_date BETWEEN ...) per period, grouped
+    by account. Each column is the movement of the period (debit minus credit).
+    
+    Parameters:
+    - periods: List of period dicts (see build_periods and parse_periods)
+    - statement: 'trial_balance' or 'income_statement'
+    - journal_code: Optional journal code
+    - accounts: Optional account numbers and prefixes (e.g. ["6*", "706000"])
+    - include_zero_balances: Whether to keep accounts that are zero in every period
+    
+    Returns:
+    - Dict with the periods, one row per account (number, name and, for the
+      income statement, section), the accounts x periods matrix of values and
+      the totals per period. Income statement values are signed so that both
+      revenues and expenses are positive.
+    
+    Raises:
+    - ValueError: If the statement is unknown or no period is given
+    """
+    if statement not in COMPARATIVE_STATEMENTS:
+        raise ValueError(f"Unknown statement: {statement}")
+    if not periods:
+        raise ValueError("At least one period is required")
+    
+    lines = AccountingEntryLine.objects.filter(
+        entry__status='posted',
+        entry__entry_date__gte=min(period['start_date'] for period in periods),
+        entry__entry_date__lte=max(period['end_date'] for period in periods)
+    )
+    if journal_code:
+        lines = lines.filter(entry__journal_id__in=journal_ids(journal_code))
+    if accounts:
+        lines = lines.filter(account__in=GeneralLedgerAccount.objects.filter(account_selector_filter(accounts)))
+    if statement == 'income_statement':
+        lines = lines.filter(
+            Q(account__account_number__startswith='6') | Q(account__account_number__startswith='7')
+        )
+    
+    columns = {f'p{index}': _period_sum(period) for index, period in enumerate(periods)}
+    rows = lines.order_by('account__account_number').values(
+        'account__account_number', 'account__full_name', 'account__is_balance_sheet'
+    ).annotate(**columns).values_list(
+        'account__account_number', 'account__full_name', 'account__is_balance_sheet', *columns
+    )
+    
+    account_rows = []
+    matrix = []
+    for account_number, full_name, is_balance_sheet, *values in rows:
+        values = [(value or Decimal('0.00')).quantize(CENT) for value in values]
+        if not include_zero_balances and not any(values):
+            continue
+        row = {'account_number': account_number, 'account_name': full_name}
+        if statement == 'income_statement':
+            section = classify_account(account_number, is_balance_sheet, Decimal('0.00'))
+            row['section'] = section
+            if section == 'revenues':
+                values = [-value for value in values]
+        account_rows.append(row)
+        matrix.append(values)
+    
+    width = len(periods)
+    if statement == 'income_statement':
+        revenues = [Decimal('0.00')] * width
+        expenses = [Decimal('0.00')] * width
+        for row, values in zip(account_rows, matrix):
+            target = revenues if row['section'] == 'revenues' else expenses
+            for index, value in enumerate(values):
+                target[index] += value
+        totals = {
+            'total_revenue': revenues,
+            'total_expenses': expenses,
+            'net_income': [revenue - expense for revenue, expense in zip(revenues, expenses)],
+        }
+    else:
+        debit = [Decimal('0.00')] * width
+        credit = [Decimal('0.00')] * width
+        for values in matrix:
+            for index, value in enumerate(values):
+                if value > 0:
+                    debit[index] += value
+                else:
+                    credit[index] -= value
+        totals = {
+            'total_debit': debit,
+            'total_credit': credit,
+            'is_balanced': [d == c for d, c in zip(debit, credit)],
+        }
+    
+    return {
+        'statement': statement,
+        'periods': periods,
+        'accounts': account_rows,
+        'values': matrix,
+        'totals': totals,
+    }
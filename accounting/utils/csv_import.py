@@ -0,0 +1,439 @@
+import codecs
+import csv
+import hashlib
+import io
+import json
+import time
+from functools import reduce
+from operator import or_
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from accounting.models import ImportedFile, ImportedRow
+from accounting.utils.bulk_upsert import bulk_upsert
+from accounting.utils.reference_data import REFERENCE_MODELS, registry
+
+
+# Rows coerced, validated and written together
+IMPORT_BATCH_SIZE = 1000
+
+# Source values read as missing
+NULL_VALUES = ('', 'NULL')
+
+# Bytes read ahead to detect the encoding of a file
+SNIFF_SIZE = 64 * 1024
+
+# Byte order marks, longest first (the UTF-32 LE mark starts with the UTF-16 LE one)
+_BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+
+def _cp1252_fallback(error):
+    """Decode the bytes that are not UTF-8 as cp1252 (files mixing both, or sniffed on an ASCII sample)."""
+    return error.object[error.start:error.end].decode('cp1252', errors='replace'), error.end
+
+
+codecs.register_error('cp1252fallback', _cp1252_fallback)
+
+
+def detect_encoding(sample, complete=False):
+    """
+    Detect the encoding of a file from its first bytes.
+    
+    A byte order mark wins; otherwise the sample is decoded as strict UTF-8
+    (a character cut at the end of the sample is accepted unless complete),
+    and anything else is read as cp1252, the encoding of the exports of the
+    source system.
+    
+    Parameters:
+    - sample: First bytes of the file
+    - complete: The sample is the whole file
+    
+    Returns:
+    - Python codec name: 'utf-8-sig', 'utf-16', 'utf-32', 'utf-8' or 'cp1252'
+    """
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=complete)
+    except UnicodeDecodeError:
+        return 'cp1252'
+    return 'utf-8'
+
+
+def open_text(stream, sniff_size=SNIFF_SIZE):
+    """
+    Wrap a binary stream in a text stream decoded with its detected encoding.
+    
+    The sample is peeked from the stream buffer, so the file is read once, and
+    the text is decoded incrementally as it is consumed. Bytes of a UTF-8
+    file that turn out not to be UTF-8 after the sample are decoded as cp1252,
+    and the few bytes cp1252 leaves undefined are replaced.
+    
+    Returns:
+    - Tuple (text stream, encoding)
+    """
+    if not hasattr(stream, 'peek'):
+        stream = io.BufferedReader(stream, buffer_size=sniff_size)
+    sample = stream.peek(sniff_size)[:sniff_size]
+    # A sample shorter than asked is the whole file
+    encoding = detect_encoding(sample, complete=len(sample) < sniff_size)
+    errors = 'cp1252fallback' if encoding == 'utf-8' else ('replace' if encoding == 'cp1252' else 'strict')
+    return io.TextIOWrapper(stream, encoding=encoding, errors=errors, newline=''), encoding
+
+
+def file_fingerprint(file_path, *parts):
+    """
+    Hash the bytes of a file and parts (e.g. the declaration of its importer).
+    
+    The file is read by 1 MiB blocks, without decoding or parsing it.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(repr(part).encode('utf-8'))
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def row_hash(values):
+    """Hash the field values of an imported row."""
+    data = json.dumps(values, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def open_csv(file_path, delimiter=';'):
+    """
+    Open a CSV file once, with its detected encoding (see open_text).
+    
+    Returns:
+    - Tuple (csv.DictReader, text file to close, encoding)
+    """
+    file, encoding = open_text(open(file_path, 'rb', buffering=SNIFF_SIZE))
+    return csv.DictReader(file, delimiter=delimiter), file, encoding
+
+
+class Column:
+    """
+    Mapping of one CSV column to a model field.
+
+    Parameters:
+    - field: Model field name
+    - source: Header of the column, or tuple of accepted headers (the first
+      present in the file is read)
+    - required: Rows whose value is missing are skipped
+    - coerce: Callable turning the stripped string into the field value; a
+      ValueError rejects the row
+    - default: Value of a missing cell (the field default when unset)
+    - null_values: Source values read as missing
+    """
+
+    def __init__(self, field, source, required=False, coerce=None, default=None, null_values=NULL_VALUES):
+        self.field = field
+        self.sources = (source,) if isinstance(source, str) else tuple(source)
+        self.required = required
+        self.coerce = coerce
+        self.default = default
+        self.null_values = null_values
+
+    def header(self, fieldnames):
+        """Return the header of this column in a file, or None when it is absent."""
+        for source in self.sources:
+            if source in fieldnames:
+                return source
+        return None
+
+
+class RowError(ValueError):
+    """Raised by CSVImporter.clean to reject a row with a message."""
+
+
+class CSVImporter:
+    """
+    Declarative CSV to model import.
+
+    Subclasses declare the model, its columns and the fields identifying a row;
+    clean() may derive or reject values. Rows are streamed from the reader,
+    coerced and validated by batches of batch_size, deduplicated on the unique
+    fields (the last row wins) and upserted with bulk_upsert. sync() writes
+    only the differences with the previous sync instead.
+
+    Attributes:
+    - model: Model class written
+    - columns: List of Column
+    - unique_fields: Fields of the unique constraint used to upsert
+    - skip_values: {field: values} of rows to ignore (e.g. placeholder codes)
+    """
+
+    model = None
+    columns = []
+    unique_fields = []
+    skip_values = {}
+    delimiter = ';'
+    batch_size = IMPORT_BATCH_SIZE
+
+    def clean(self, values):
+        """
+        Derive or check the field values of one row.
+
+        Returns the values to write, or None to skip the row silently; raise
+        RowError to reject it.
+        """
+        return values
+
+    def update_fields(self, values):
+        """Return the fields overwritten on existing rows."""
+        return [field for field in values if field not in self.unique_fields]
+
+    def upsert(self, objects, update_fields):
+        """
+        Insert objects, or update the rows with the same unique fields.
+
+        Written with bulk_upsert, so save() and the model signals are not run;
+        importers of models relying on them override this.
+        """
+        bulk_upsert(self.model, objects, self.unique_fields, update_fields)
+
+    def after_import(self):
+        """
+        Drop the in-memory copies of the written table, as the model signals would.
+        
+        Bulk writes send no signals: the local copy is dropped now and other
+        processes are told on commit.
+        """
+        if self.model in REFERENCE_MODELS:
+            registry.invalidate(self.model, broadcast=False)
+            transaction.on_commit(lambda: registry.invalidate(self.model))
+
+    def _model_fields(self):
+        return {field.name: field for field in self.model._meta.concrete_fields}
+
+    def _coerce(self, row, headers, fields):
+        values = {}
+        for column, header in zip(self.columns, headers):
+            raw = row.get(header) if header else None
+            raw = raw.strip() if raw is not None else ''
+            if raw in column.null_values:
+                if column.required:
+                    return None
+                value = column.default if column.default is not None else fields[column.field].get_default()
+            else:
+                value = column.coerce(raw) if column.coerce else raw
+            values[column.field] = value
+        for field, skipped in self.skip_values.items():
+            if values.get(field) in skipped:
+                return None
+        values = self.clean(values)
+        if values is None:
+            return None
+        for name, value in values.items():
+            field = fields[name]
+            if value is None:
+                if not field.null:
+                    raise RowError(f'{name}: this field cannot be null')
+                continue
+            # Field validators (max_length, ...), without the per-row queries of Field.clean
+            try:
+                field.run_validators(field.to_python(value))
+            except ValidationError as exc:
+                raise RowError(f"{name}: {'; '.join(exc.messages)}")
+        return values
+
+    def _write(self, batch, dry_run):
+        """Deduplicate a batch on the unique fields (last row wins) and upsert it."""
+        rows = {tuple(values[field] for field in self.unique_fields): values for values in batch}
+        if rows and not dry_run:
+            objects = [self.model(**values) for values in rows.values()]
+            self.upsert(objects, self.update_fields(batch[0]))
+        return len(rows)
+
+    @property
+    def source(self):
+        """Label of the imported model, identifying its sync state."""
+        return self.model._meta.label_lower
+
+    def fingerprint(self, file_path):
+        """Return the fingerprint of a file read by this importer (see file_fingerprint)."""
+        declaration = [(column.field, column.sources, column.required) for column in self.columns]
+        return file_fingerprint(
+            file_path, type(self).__module__, type(self).__qualname__,
+            declaration, self.unique_fields, self.skip_values
+        )
+
+    def _key(self, values):
+        return '\x1f'.join(str(value) for value in values)
+
+    def _rows(self, reader, result):
+        """Yield the coerced values of the rows, counting read, skipped and rejected rows in result."""
+        fields = self._model_fields()
+        headers = [column.header(reader.fieldnames or []) for column in self.columns]
+        for row in reader:
+            result['rows'] += 1
+            try:
+                values = self._coerce(row, headers, fields)
+            except ValueError as exc:
+                result['errors'].append((reader.line_num, str(exc)))
+                continue
+            if values is None:
+                result['skipped'] += 1
+                continue
+            yield values
+
+    def _unreferenced(self, queryset):
+        """Exclude the rows of queryset still referenced by a foreign key."""
+        for relation in self.model._meta.related_objects:
+            if relation.many_to_many:
+                queryset = queryset.exclude(**{f'{relation.name}__isnull': False})
+                continue
+            field = relation.field
+            referenced = relation.related_model._base_manager.filter(
+                **{f'{field.attname}__isnull': False}
+            ).values(field.attname)
+            queryset = queryset.exclude(**{f'{field.target_field.attname}__in': referenced})
+        return queryset
+
+    def _delete(self, keys):
+        """
+        Delete the rows of keys that no foreign key references.
+
+        Returns:
+        - Keys of the deleted rows
+        """
+        lookups = [Q(**dict(zip(self.unique_fields, key.split('\x1f')))) for key in keys]
+        deleted = []
+        for start in range(0, len(lookups), self.batch_size):
+            queryset = self._unreferenced(
+                self.model._base_manager.filter(reduce(or_, lookups[start:start + self.batch_size]))
+            )
+            batch = [self._key(values) for values in queryset.values_list(*self.unique_fields)]
+            if batch:
+                queryset.delete()
+                deleted.extend(batch)
+        return deleted
+
+    def run(self, reader, dry_run=False, progress=None):
+        """
+        Import the rows of a csv.DictReader.
+
+        Parameters:
+        - reader: csv.DictReader over the file
+        - dry_run: Parse, coerce and validate every row without writing
+        - progress: Optional callable(rows_read, rows_imported) called after each batch
+
+        Returns:
+        - Dict with rows (read), imported, skipped, errors (list of
+          (line number, message)), elapsed (seconds), rows_per_second and dry_run
+        """
+        start = time.perf_counter()
+        result = {'rows': 0, 'imported': 0, 'skipped': 0, 'errors': [], 'dry_run': dry_run}
+
+        def flush(batch):
+            result['imported'] += self._write(batch, dry_run)
+            if progress:
+                progress(result['rows'], result['imported'])
+
+        with transaction.atomic():
+            batch = []
+            for values in self._rows(reader, result):
+                batch.append(values)
+                if len(batch) >= self.batch_size:
+                    flush(batch)
+                    batch = []
+            flush(batch)
+            if not dry_run:
+                self.after_import()
+
+        result['elapsed'] = time.perf_counter() - start
+        result['rows_per_second'] = result['rows'] / max(result['elapsed'], 1e-9)
+        return result
+
+    def sync(self, reader, fingerprint=None, dry_run=False, progress=None):
+        """
+        Write only the differences between a file and the previous sync.
+
+        Each row is hashed and compared with the hashes stored by the previous
+        sync (ImportedRow): new and changed rows, and rows missing from the
+        table, are upserted; rows of the previous sync removed from the file
+        are deleted, unless a foreign key still references them (they are
+        kept and retried at the next sync). With a fingerprint equal to the
+        one of the previous sync (ImportedFile), the file is not read.
+        Rows are compared with the previous sync, not with the table, so an
+        edit of a row unchanged in the file is kept; run() overwrites it.
+
+        Parameters:
+        - reader: csv.DictReader over the file
+        - fingerprint: Optional result of fingerprint() for the file
+        - dry_run: Compute the differences without writing
+        - progress: Optional callable(rows_read, rows_imported) called once written
+
+        Returns:
+        - Dict of run() with inserted, updated, deleted, kept (removed from the
+          file but referenced), unchanged (identical rows) and file_unchanged
+        """
+        start = time.perf_counter()
+        result = {
+            'rows': 0, 'imported': 0, 'skipped': 0, 'errors': [], 'dry_run': dry_run,
+            'inserted': 0, 'updated': 0, 'deleted': 0, 'kept': 0, 'unchanged': 0, 'file_unchanged': False,
+        }
+        if fingerprint and ImportedFile.objects.filter(source=self.source, fingerprint=fingerprint).exists():
+            result['file_unchanged'] = True
+        else:
+            rows = {}
+            for values in self._rows(reader, result):
+                rows[self._key(values[field] for field in self.unique_fields)] = values
+            with transaction.atomic():
+                self._sync_rows(rows, result, dry_run)
+                if fingerprint and not dry_run:
+                    ImportedFile.objects.update_or_create(
+                        source=self.source, defaults={'fingerprint': fingerprint, 'rows': result['rows']}
+                    )
+        if progress:
+            progress(result['rows'], result['imported'])
+
+        result['elapsed'] = time.perf_counter() - start
+        result['rows_per_second'] = result['rows'] / max(result['elapsed'], 1e-9)
+        return result
+
+    def _sync_rows(self, rows, result, dry_run):
+        hashes = {key: row_hash(values) for key, values in rows.items()}
+        stored = dict(ImportedRow.objects.filter(source=self.source).values_list('key', 'row_hash'))
+        existing = {self._key(values) for values in self.model._base_manager.values_list(*self.unique_fields)}
+
+        changed = [key for key, digest in hashes.items() if stored.get(key) != digest or key not in existing]
+        removed = [key for key in stored if key not in rows]
+        result['inserted'] = sum(1 for key in changed if key not in existing)
+        result['updated'] = len(changed) - result['inserted']
+        result['unchanged'] = len(rows) - len(changed)
+        result['imported'] = len(changed)
+        if dry_run:
+            result['deleted'] = len(removed)
+            return
+
+        if changed:
+            objects = [self.model(**rows[key]) for key in changed]
+            self.upsert(objects, self.update_fields(rows[changed[0]]))
+            bulk_upsert(
+                ImportedRow,
+                [ImportedRow(source=self.source, key=key, row_hash=hashes[key]) for key in changed],
+                ['source', 'key'], ['row_hash']
+            )
+        deleted = self._delete(removed) if removed else []
+        for start in range(0, len(deleted), self.batch_size):
+            ImportedRow.objects.filter(source=self.source, key__in=deleted[start:start + self.batch_size]).delete()
+        result['deleted'] = len(deleted)
+        result['kept'] = len(removed) - len(deleted)
+        if changed or deleted:
+            self.after_import()
+
+
+def import_csv(importer, file, dry_run=False, progress=None):
+    """Run an importer over an open text file (see CSVImporter.run)."""
+    reader = csv.DictReader(file, delimiter=importer.delimiter)
+    return importer.run(reader, dry_run=dry_run, progress=progress)
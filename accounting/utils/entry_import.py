@@ -0,0 +1,214 @@
+from contextlib import nullcontext
+from itertools import islice
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from accounting.models import AccountingEntry, AccountingEntryLine
+from accounting.serializers import AccountingEntryBulkSerializer, preload_related_objects
+from accounting.utils.entry_lines import LINE_BATCH_SIZE, build_entry_lines, line_totals
+from accounting.utils.analytics import analytical_aggregates_enabled, apply_lines_to_analytics
+from accounting.utils.ledger_balances import apply_lines_to_balances, bump_ledger_version
+
+
+# Number of entries validated and written per transaction
+ENTRY_CHUNK_SIZE = 500
+
+# Rollback scopes of a bulk import
+ATOMIC_MODES = ('all', 'per_chunk')
+
+
+def _chunks(items, size):
+    """Yield (offset, list) chunks of an iterable without materializing it."""
+    iterator = iter(items)
+    offset = 0
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield offset, chunk
+        offset += len(chunk)
+
+
+def _validate_chunk(chunk, offset, seen_numbers, context):
+    """
+    Validate a chunk of entry payloads in memory.
+
+    Referenced objects are preloaded once for the whole chunk, and entry
+    numbers are checked against the database with a single query.
+
+    Returns:
+    - List of (result, validated_data) pairs; validated_data is None for invalid entries
+    """
+    serializer = AccountingEntryBulkSerializer(context=context)
+    preload_related_objects(serializer, chunk, context)
+
+    numbers = {item.get('entry_number') for item in chunk if isinstance(item, dict)}
+    existing_numbers = set(
+        AccountingEntry.objects.filter(entry_number__in=numbers).values_list('entry_number', flat=True)
+    )
+
+    validated = []
+    for index, item in enumerate(chunk, start=offset):
+        result = {'index': index, 'entry_number': None, 'status': 'invalid'}
+        if not isinstance(item, dict):
+            result['errors'] = {'non_field_errors': ['Expected a JSON object.']}
+            validated.append((result, None))
+            continue
+
+        entry_number = item.get('entry_number')
+        result['entry_number'] = entry_number
+        serializer = AccountingEntryBulkSerializer(data=item, context=context)
+        if not serializer.is_valid():
+            result['errors'] = serializer.errors
+            validated.append((result, None))
+            continue
+        if entry_number in existing_numbers or entry_number in seen_numbers:
+            result['errors'] = {'entry_number': ['An accounting entry with this entry number already exists.']}
+            validated.append((result, None))
+            continue
+
+        seen_numbers.add(entry_number)
+        result['status'] = 'valid'
+        validated.append((result, serializer.validated_data))
+    return validated
+
+
+def _write_chunk(validated):
+    """
+    Insert the entries of a chunk and their lines with bulk INSERTs.
+
+    Returns:
+    - List of created AccountingEntry instances, in input order
+    """
+    today = timezone.now().date()
+    entries = []
+    lines = []
+    posted_lines = []
+    for data in validated:
+        data = dict(data)
+        lines_data = data.pop('lines')
+        entry = AccountingEntry(**data)
+        entry_lines = build_entry_lines(entry, lines_data)
+        entry.total_debit, entry.total_credit = line_totals(entry_lines)
+        if entry.status == 'posted':
+            entry.posting_date = entry.posting_date or today
+            posted_lines.extend(entry_lines)
+        entries.append(entry)
+        lines.extend(entry_lines)
+
+    AccountingEntry.objects.bulk_create(entries, batch_size=LINE_BATCH_SIZE)
+    if not connection.features.can_return_rows_from_bulk_insert:
+        ids = dict(
+            AccountingEntry.objects.filter(entry_number__in=[entry.entry_number for entry in entries])
+            .values_list('entry_number', 'id')
+        )
+        for entry in entries:
+            entry.pk = ids[entry.entry_number]
+
+    AccountingEntryLine.objects.bulk_create(lines, batch_size=LINE_BATCH_SIZE)
+    if posted_lines:
+        apply_lines_to_balances(posted_lines)
+        if analytical_aggregates_enabled():
+            apply_lines_to_analytics(posted_lines)
+        bump_ledger_version(*{line.entry.fiscal_year_id for line in posted_lines})
+    return entries
+
+
+def import_entries(items, atomic='per_chunk', chunk_size=ENTRY_CHUNK_SIZE):
+    """
+    Import accounting entries with their lines in chunks of bulk INSERTs.
+
+    Every entry is validated in memory (including its balance) before anything
+    is written. The rollback scope is controlled by atomic:
+    - 'per_chunk': each chunk is written in its own transaction; a chunk holding
+      an invalid entry, or failing in the database, is not written, and the
+      other chunks are kept.
+    - 'all': the whole import is one transaction; a single invalid entry rolls
+      everything back. The remaining entries are still validated so the report
+      lists every error.
+
+    Posted entries update the materialized account balances like post_entry does.
+
+    Streamed items (NDJSON) are parsed while the import runs. A parse error stops
+    it: the chunks written before it are kept in 'per_chunk' mode (rolled back in
+    'all' mode), the entries read since the last chunk are not written, and the
+    report gives the error with its line and the index of the first entry not
+    imported.
+
+    Parameters:
+    - items: Iterable of entry payloads (dicts with nested "lines")
+    - atomic: Rollback scope, 'per_chunk' or 'all'
+    - chunk_size: Number of entries per chunk
+
+    Returns:
+    - Dict with the created/failed counts and one result per entry, in input order.
+      Entry statuses are 'created', 'invalid', or 'rolled_back' for valid entries
+      discarded with their rollback scope. parse_error is None, or a dict with
+      detail, line (for NDJSON) and index.
+    """
+    if atomic not in ATOMIC_MODES:
+        raise ValueError(f"Invalid atomic mode: {atomic}. Expected one of {', '.join(ATOMIC_MODES)}")
+
+    results = []
+    seen_numbers = set()
+    context = {'related_objects': {}}
+    failed = False
+    parse_error = None
+
+    with transaction.atomic() if atomic == 'all' else nullcontext():
+        chunks = _chunks(items, chunk_size)
+        while True:
+            try:
+                offset, chunk = next(chunks)
+            except StopIteration:
+                break
+            except ParseError as exc:
+                failed = True
+                parse_error = {
+                    'detail': str(exc.detail),
+                    'line': getattr(exc, 'line_number', None),
+                    'index': len(results),
+                }
+                break
+
+            validated = _validate_chunk(chunk, offset, seen_numbers, context)
+            results.extend(result for result, _ in validated)
+            valid = [(result, data) for result, data in validated if data is not None]
+            chunk_failed = len(valid) < len(validated)
+            failed = failed or chunk_failed
+
+            if chunk_failed or (atomic == 'all' and failed):
+                for result, _ in valid:
+                    result['status'] = 'rolled_back'
+                continue
+
+            try:
+                with transaction.atomic():
+                    entries = _write_chunk([data for _, data in valid])
+            except DatabaseError as exc:
+                failed = True
+                for result, _ in valid:
+                    result['status'] = 'rolled_back'
+                    result['errors'] = {'non_field_errors': [str(exc)]}
+                continue
+
+            for (result, _), entry in zip(valid, entries):
+                result['status'] = 'created'
+                result['id'] = entry.pk
+
+        if atomic == 'all' and failed:
+            transaction.set_rollback(True)
+            for result in results:
+                if result['status'] == 'created':
+                    result['status'] = 'rolled_back'
+                    del result['id']
+
+    created = sum(1 for result in results if result['status'] == 'created')
+    return {
+        'atomic': atomic,
+        'total': len(results),
+        'created': created,
+        'failed': len(results) - created,
+        'parse_error': parse_error,
+        'results': results,
+    }
@@ -0,0 +1,169 @@
+from decimal import Decimal
+from django.db import transaction
+from django.utils import timezone
+from accounting.models import AccountingEntryLine
+
+
+# Number of lines written per INSERT/UPDATE statement
+LINE_BATCH_SIZE = 1000
+
+# Line fields that are not compared when diffing lines on update
+_UNDIFFED_FIELDS = {'id', 'entry', 'line_number', 'created_at', 'updated_at'}
+
+
+def line_totals(lines):
+    """Return the (debit, credit) totals of in-memory lines."""
+    total_debit = sum((line.amount for line in lines if line.is_debit), Decimal('0.00'))
+    total_credit = sum((line.amount for line in lines if not line.is_debit), Decimal('0.00'))
+    return total_debit, total_credit
+
+
+def _set_totals(entry, lines):
+    """Set the stored totals of an entry from in-memory lines."""
+    entry.total_debit, entry.total_credit = line_totals(lines)
+    entry.save(update_fields=['total_debit', 'total_credit', 'updated_at'])
+
+
+def build_entry_lines(entry, lines_data):
+    """
+    Build unsaved lines for an entry, numbered from 1 in the given order.
+
+    Parameters:
+    - entry: AccountingEntry instance the lines belong to
+    - lines_data: Iterable of dicts of line field values
+
+    Returns:
+    - List of unsaved AccountingEntryLine instances
+    """
+    lines = []
+    for line_number, line_data in enumerate(lines_data, start=1):
+        line_data = dict(line_data, line_number=line_number)
+        lines.append(AccountingEntryLine(entry=entry, **line_data))
+    return lines
+
+
+def create_entry_lines(entry, lines_data, batch_size=LINE_BATCH_SIZE):
+    """
+    Insert the lines of a new entry with batched INSERTs and store its totals.
+
+    Parameters:
+    - entry: Saved AccountingEntry instance without lines
+    - lines_data: Iterable of dicts of line field values
+    - batch_size: Number of lines per INSERT statement
+
+    Returns:
+    - List of created AccountingEntryLine instances
+    """
+    lines = build_entry_lines(entry, lines_data)
+
+    with transaction.atomic():
+        AccountingEntryLine.objects.bulk_create(lines, batch_size=batch_size)
+        _set_totals(entry, lines)
+    return lines
+
+
+def _line_values(line_data, fields):
+    """
+    Return the database values of a line described by a dict, in the order of fields.
+
+    Missing fields take their model default, so the result matches a freshly built line.
+    """
+    values = []
+    for field in fields:
+        if field.name in line_data:
+            value = line_data[field.name]
+            if field.is_relation and value is not None and hasattr(value, 'pk'):
+                value = value.pk
+        elif field.attname in line_data:
+            value = line_data[field.attname]
+        else:
+            value = field.get_default()
+        values.append(value)
+    return tuple(values)
+
+
+def sync_entry_lines(entry, lines_data, batch_size=LINE_BATCH_SIZE):
+    """
+    Replace the lines of an existing entry, writing only what changed.
+
+    Incoming lines are numbered from 1 and matched with the stored lines by
+    line_number: new numbers are inserted, changed lines are updated, and
+    numbers that are no longer present are deleted. Unchanged lines are left
+    untouched. Stored lines are compared as raw values, so model instances are
+    only built for the lines that are actually written.
+
+    Parameters:
+    - entry: Saved AccountingEntry instance
+    - lines_data: Iterable of dicts of line field values
+    - batch_size: Number of lines per INSERT/UPDATE statement
+
+    Returns:
+    - Dict with the number of created, updated, deleted and unchanged lines
+    """
+    fields = [
+        field for field in AccountingEntryLine._meta.concrete_fields
+        if field.name not in _UNDIFFED_FIELDS
+    ]
+    existing = {
+        row[1]: (row[0], row[2:])
+        for row in AccountingEntryLine.objects.filter(entry=entry).values_list(
+            'pk', 'line_number', *[field.attname for field in fields]
+        ).iterator(chunk_size=batch_size)
+    }
+
+    to_create = []
+    to_update = []
+    changed_fields = set()
+    unchanged = 0
+    line_count = 0
+    total_debit = Decimal('0.00')
+    total_credit = Decimal('0.00')
+    now = timezone.now()
+    for line_number, line_data in enumerate(lines_data, start=1):
+        line_count = line_number
+        values = _line_values(line_data, fields)
+        line = dict(zip((field.attname for field in fields), values))
+        if line['is_debit']:
+            total_debit += Decimal(line['amount'])
+        else:
+            total_credit += Decimal(line['amount'])
+
+        current = existing.pop(line_number, None)
+        if current is None:
+            to_create.append(AccountingEntryLine(entry=entry, line_number=line_number, **line))
+            continue
+
+        pk, current_values = current
+        differences = [
+            field for field, old, new in zip(fields, current_values, values)
+            if field.to_python(old) != field.to_python(new)
+        ]
+        if not differences:
+            unchanged += 1
+            continue
+
+        changed_fields.update(field.name for field in differences)
+        to_update.append(AccountingEntryLine(
+            pk=pk, entry=entry, line_number=line_number, updated_at=now, **line
+        ))
+
+    with transaction.atomic():
+        if existing:
+            # Incoming lines are numbered 1..n, so the leftovers are exactly the numbers above n
+            AccountingEntryLine.objects.filter(entry=entry, line_number__gt=line_count).delete()
+        if to_update:
+            AccountingEntryLine.objects.bulk_update(
+                to_update, sorted(changed_fields) + ['updated_at'], batch_size=batch_size
+            )
+        if to_create:
+            AccountingEntryLine.objects.bulk_create(to_create, batch_size=batch_size)
+        entry.total_debit = total_debit
+        entry.total_credit = total_credit
+        entry.save(update_fields=['total_debit', 'total_credit', 'updated_at'])
+
+    return {
+        'created': len(to_create),
+        'updated': len(to_update),
+        'deleted': len(existing),
+        'unchanged': unchanged,
+    }
@@ -1,8 +1,22 @@
+import base64
+import binascii
+import json
 from django.db import models
 from django.db.models import Sum, Case, When, Q, F, Value, DecimalField
 from django.db.models.functions import Coalesce
+from django.conf import settings
+from django.utils.dateparse import parse_date
+from datetime import timedelta
 from decimal import Decimal
-from .models import GeneralLedgerAccount, AccountingEntry, AccountingEntryLine
+from accounting.models import (
+    GeneralLedgerAccount,
+    AccountingJournal,
+    AccountingEntry,
+    AccountingEntryLine,
+    AccountBalanceSnapshot
+)
+from accounting.utils.ledger_balances import CENT, month_start
+from accounting.utils.reference_data import journal_ids, reference_table
 
 
 def calculate_account_balance(account, fiscal_year=None, as_of_date=None, journal_code=None):
@@ -24,26 +38,13 @@ def calculate_account_balance(account, fiscal_year=None, as_of_date=None, journa
         except GeneralLedgerAccount.DoesNotExist:
             return Decimal('0.00')
     
-    # Start with all entry lines for this account
-    query = AccountingEntryLine.objects.filter(account=account)
-    
-    # Filter by fiscal year if provided
-    if fiscal_year:
-        query = query.filter(entry__fiscal_year=fiscal_year)
-    
-    # Filter by date if provided
-    if as_of_date:
-        query = query.filter(entry__entry_date__lte=as_of_date)
-    
-    # Filter by journal if provided
-    if journal_code:
-        query = query.filter(entry__journal__code=journal_code)
-    
-    # Only include posted entries
-    query = query.filter(entry__status='posted')
-    
-    # Calculate balance
-    result = query.aggregate(
+    balances = calculate_account_balances(fiscal_year, as_of_date, journal_code, accounts=[account])
+    return balances.get(account.pk, Decimal('0.00'))
+
+
+def _sum_lines_by_account(query):
+    """Sum a queryset of entry lines per account, as a dict account_id -> signed balance."""
+    rows = query.order_by().values('account_id').annotate(
         balance=Sum(
             Case(
                 When(is_debit=True, then=F('amount')),
@@ -52,15 +53,173 @@ def calculate_account_balance(account, fiscal_year=None, as_of_date=None, journa
                 output_field=DecimalField()
             )
         )
-    )
+    ).values_list('account_id', 'balance')
     
-    return result['balance'] or Decimal('0.00')
+    return {account_id: (balance or Decimal('0.00')).quantize(CENT) for account_id, balance in rows}
+
+
+def calculate_account_balances(fiscal_year=None, as_of_date=None, journal_code=None, accounts=None,
+                               use_snapshots=None):
+    """
+    Calculate the balances of many general ledger accounts with grouped queries.
+    
+    This is the set-based counterpart of calculate_account_balance. By default the
+    balances are read from the monthly AccountBalanceSnapshot rows; when as_of_date
+    falls inside a month, the lines of that partial month are added from the ledger.
+    
+    Parameters:
+    - fiscal_year: Optional FiscalYear instance to filter entries by fiscal year
+    - as_of_date: Optional date (or ISO string) to calculate balances as of a specific date
+    - journal_code: Optional journal code to filter entries by journal
+    - accounts: Optional queryset or iterable of GeneralLedgerAccount to restrict the result
+    - use_snapshots: Read the materialized balances (defaults to the
+      ACCOUNTING_USE_BALANCE_SNAPSHOTS setting, True if unset); False scans the lines
+    
+    Returns:
+    - Dict mapping account id to its Decimal balance (positive for debit, negative for credit).
+      Accounts without any posted line are absent from the dict.
+    """
+    if use_snapshots is None:
+        use_snapshots = getattr(settings, 'ACCOUNTING_USE_BALANCE_SNAPSHOTS', True)
+    
+    if isinstance(as_of_date, str):
+        parsed_date = parse_date(as_of_date)
+        if parsed_date is None:
+            raise ValueError(f"Invalid date: {as_of_date}")
+        as_of_date = parsed_date
+    
+    lines = AccountingEntryLine.objects.filter(entry__status='posted')
+    if fiscal_year:
+        lines = lines.filter(entry__fiscal_year=fiscal_year)
+    if journal_code:
+        lines = lines.filter(entry__journal_id__in=journal_ids(journal_code))
+    if accounts is not None:
+        lines = lines.filter(account__in=accounts)
+    
+    if not use_snapshots:
+        if as_of_date:
+            lines = lines.filter(entry__entry_date__lte=as_of_date)
+        return _sum_lines_by_account(lines)
+    
+    snapshots = AccountBalanceSnapshot.objects.all()
+    if fiscal_year:
+        snapshots = snapshots.filter(fiscal_year=fiscal_year)
+    if journal_code:
+        snapshots = snapshots.filter(journal_id__in=journal_ids(journal_code))
+    if accounts is not None:
+        snapshots = snapshots.filter(account__in=accounts)
+    
+    balances = {}
+    if as_of_date:
+        period = month_start(as_of_date)
+        if (as_of_date + timedelta(days=1)).month != as_of_date.month:
+            # as_of_date closes its month: the snapshot covers it entirely
+            snapshots = snapshots.filter(period__lte=period)
+        else:
+            snapshots = snapshots.filter(period__lt=period)
+            balances = _sum_lines_by_account(
+                lines.filter(entry__entry_date__gte=period, entry__entry_date__lte=as_of_date)
+            )
+    
+    rows = snapshots.order_by().values('account_id').annotate(
+        balance=Sum(F('debit_total') - F('credit_total'))
+    ).values_list('account_id', 'balance')
+    
+    for account_id, balance in rows:
+        balance = (balance or Decimal('0.00')).quantize(CENT)
+        balances[account_id] = balances.get(account_id, Decimal('0.00')) + balance
+    
+    return balances
+
+
+# Columns of a streamed account balance row
+ACCOUNT_BALANCE_COLUMNS = ['account_number', 'account_name', 'balance', 'is_debit']
+
+
+def account_selector_filter(selectors):
+    """
+    Build a filter on GeneralLedgerAccount from account numbers and prefixes.
+    
+    A selector ending with "*" is a prefix (e.g. "6*" or "401*"); any other
+    selector is an exact account number.
+    
+    Parameters:
+    - selectors: Iterable of account numbers and prefixes
+    
+    Returns:
+    - Q object
+    
+    Raises:
+    - ValueError: If no selector is given
+    """
+    numbers = set()
+    prefixes = set()
+    for selector in selectors:
+        selector = str(selector).strip()
+        if not selector:
+            continue
+        if selector.endswith('*'):
+            prefixes.add(selector.rstrip('*'))
+        else:
+            numbers.add(selector)
+    if not numbers and not prefixes:
+        raise ValueError("At least one account number or prefix is required")
+    
+    query = Q(account_number__in=numbers) if numbers else Q(pk__in=[])
+    for prefix in sorted(prefixes):
+        query |= Q(account_number__startswith=prefix)
+    return query
+
+
+def account_balance_rows(selectors, fiscal_year=None, as_of_date=None, journal_code=None,
+                         include_zero_balances=True, chunk_size=2000):
+    """
+    Compute the balances of many accounts selected by number or prefix.
+    
+    The balances are computed up front with one grouped query (see
+    calculate_account_balances) restricted to the selected accounts through a
+    subquery; the selected accounts are then read lazily in account_number order.
+    The number of queries does not depend on the number of accounts.
+    
+    Parameters:
+    - selectors: Account numbers and prefixes (see account_selector_filter)
+    - fiscal_year: Optional FiscalYear instance
+    - as_of_date: Optional date (or ISO string)
+    - journal_code: Optional journal code
+    - include_zero_balances: Whether to emit selected accounts whose balance is zero
+    - chunk_size: Number of accounts fetched per round trip
+    
+    Returns:
+    - Iterator of dicts with the ACCOUNT_BALANCE_COLUMNS keys
+    """
+    accounts = GeneralLedgerAccount.objects.filter(account_selector_filter(selectors))
+    balances = calculate_account_balances(fiscal_year, as_of_date, journal_code, accounts=accounts)
+    
+    def rows():
+        for account_id, account_number, full_name in accounts.order_by('account_number').values_list(
+            'id', 'account_number', 'full_name'
+        ).iterator(chunk_size=chunk_size):
+            balance = balances.get(account_id, Decimal('0.00'))
+            if balance == Decimal('0.00') and not include_zero_balances:
+                continue
+            yield {
+                'account_number': account_number,
+                'account_name': full_name,
+                'balance': balance,
+                'is_debit': balance > Decimal('0.00')
+            }
+    
+    return rows()
 
 
 def generate_trial_balance(fiscal_year, as_of_date=None, include_zero_balances=False):
     """
     Generate a trial balance for a given fiscal year.
     
+    Balances are computed with one grouped aggregate (see calculate_account_balances)
+    and matched in memory against the chart of accounts, so the number of queries does
+    not depend on the number of accounts.
+    
     Parameters:
     - fiscal_year: FiscalYear instance
     - as_of_date: Optional date to calculate balance as of a specific date
@@ -69,13 +228,16 @@ def generate_trial_balance(fiscal_year, as_of_date=None, include_zero_balances=F
     Returns:
     - Dict with debit and credit totals, and a list of accounts with their balances
     """
-    accounts = GeneralLedgerAccount.objects.all().order_by('account_number')
+    balances = calculate_account_balances(fiscal_year, as_of_date)
+    
+    accounts = GeneralLedgerAccount.objects.order_by('account_number')
+    
     trial_balance = []
     total_debit = Decimal('0.00')
     total_credit = Decimal('0.00')
     
-    for account in accounts:
-        balance = calculate_account_balance(account, fiscal_year, as_of_date)
+    for account_id, account_number, full_name in accounts.values_list('id', 'account_number', 'full_name'):
+        balance = balances.get(account_id, Decimal('0.00'))
         
         if balance == Decimal('0.00') and not include_zero_balances:
             continue
@@ -87,8 +249,8 @@ def generate_trial_balance(fiscal_year, as_of_date=None, include_zero_balances=F
         total_credit += credit_amount
         
         trial_balance.append({
-            'account_number': account.account_number,
-            'account_name': account.full_name,
+            'account_number': account_number,
+            'account_name': full_name,
             'debit': debit_amount,
             'credit': credit_amount
         })
@@ -101,68 +263,290 @@ def generate_trial_balance(fiscal_year, as_of_date=None, include_zero_balances=F
     }
 
 
-def generate_general_ledger(fiscal_year, account=None, start_date=None, end_date=None):
+# Number of lines fetched per round trip when iterating over the ledger
+LEDGER_CHUNK_SIZE = 2000
+
+# Columns of a flattened general ledger line, in export order
+GENERAL_LEDGER_COLUMNS = [
+    'entry_number',
+    'entry_date',
+    'journal_code',
+    'entry_description',
+    'line_number',
+    'account_number',
+    'account_name',
+    'is_debit',
+    'amount',
+    'description',
+    'cursor',
+]
+
+
+def encode_ledger_cursor(entry_date, entry_number, line_number):
+    """Return the opaque keyset cursor of a general ledger line."""
+    payload = json.dumps([str(entry_date), entry_number, line_number], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def decode_ledger_cursor(cursor):
     """
-    Generate a general ledger report for a given fiscal year.
+    Decode a keyset cursor returned by iter_general_ledger_lines.
+    
+    Returns:
+    - Tuple (entry_date, entry_number, line_number)
+    
+    Raises:
+    - ValueError: If the cursor is malformed
+    """
+    try:
+        entry_date, entry_number, line_number = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        parsed_date = parse_date(entry_date)
+    except (TypeError, ValueError, UnicodeError, binascii.Error):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    if parsed_date is None or not isinstance(entry_number, str) or not isinstance(line_number, int):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return parsed_date, entry_number, line_number
+
+
+def iter_general_ledger_lines(fiscal_year, account=None, start_date=None, end_date=None, after=None,
+                              chunk_size=LEDGER_CHUNK_SIZE, by_account=False):
+    """
+    Iterate over the posted lines of a fiscal year as flat dicts.
+    
+    Lines are read with a server-side iterator in (entry_date, entry_number,
+    line_number) order, so memory stays constant whatever the size of the
+    ledger. Each row carries a keyset "cursor"; passing it back as after
+    resumes the iteration right after that line.
     
     Parameters:
     - fiscal_year: FiscalYear instance
     - account: Optional GeneralLedgerAccount instance or account_number to filter by account
     - start_date: Optional start date for the report
     - end_date: Optional end date for the report
+    - after: Optional cursor of the last line already received
+    - chunk_size: Number of lines fetched per round trip
+    - by_account: Order by account_number first, so the lines of an account are
+      contiguous (the cursor then only applies within an account)
     
-    Returns:
-    - Dict with list of entries and their details
+    Yields:
+    - Dict with the GENERAL_LEDGER_COLUMNS keys
+    
+    Raises:
+    - ValueError: If after is combined with by_account
     """
-    # Start with entries from the fiscal year
-    entries = AccountingEntry.objects.filter(
-        fiscal_year=fiscal_year,
-        status='posted'
-    ).order_by('entry_date', 'entry_number')
+    if after and by_account:
+        raise ValueError("A ledger cursor cannot resume an iteration ordered by account")
+    lines = AccountingEntryLine.objects.filter(
+        entry__fiscal_year=fiscal_year,
+        entry__status='posted'
+    )
     
-    # Apply date filters if provided
     if start_date:
-        entries = entries.filter(entry_date__gte=start_date)
+        lines = lines.filter(entry__entry_date__gte=start_date)
     if end_date:
-        entries = entries.filter(entry_date__lte=end_date)
-    
-    # Get all lines for these entries
-    lines = AccountingEntryLine.objects.filter(
-        entry__in=entries
-    ).select_related('entry', 'account')
-    
-    # If account is provided, filter lines by account
+        lines = lines.filter(entry__entry_date__lte=end_date)
     if account:
         if isinstance(account, str):
-            try:
-                account = GeneralLedgerAccount.objects.get(account_number=account)
-            except GeneralLedgerAccount.DoesNotExist:
-                return {'entries': []}
-        lines = lines.filter(account=account)
-    
-    # Organize by entry
-    gl_entries = {}
+            lines = lines.filter(account__account_number=account)
+        else:
+            lines = lines.filter(account=account)
+    if after:
+        after_date, after_number, after_line = decode_ledger_cursor(after)
+        lines = lines.filter(
+            Q(entry__entry_date__gt=after_date)
+            | Q(entry__entry_date=after_date, entry__entry_number__gt=after_number)
+            | Q(entry__entry_date=after_date, entry__entry_number=after_number, line_number__gt=after_line)
+        )
+    
+    ordering = ('entry__entry_date', 'entry__entry_number', 'line_number')
+    if by_account:
+        ordering = ('account__account_number',) + ordering
+    rows = lines.order_by(*ordering).values_list(
+        'entry__entry_number',
+        'entry__entry_date',
+        'entry__journal_id',
+        'entry__reference',
+        'line_number',
+        'account__account_number',
+        'account__short_name',
+        'is_debit',
+        'amount',
+        'description'
+    )
+    
+    journals = reference_table(AccountingJournal)
+    for (entry_number, entry_date, journal_id, reference, line_number,
+         account_number, account_name, is_debit, amount, description) in rows.iterator(chunk_size=chunk_size):
+        yield {
+            'entry_number': entry_number,
+            'entry_date': entry_date,
+            'journal_code': journals.code(journal_id),
+            'entry_description': reference,
+            'line_number': line_number,
+            'account_number': account_number,
+            'account_name': account_name,
+            'is_debit': is_debit,
+            'amount': amount,
+            'description': description or '',
+            'cursor': encode_ledger_cursor(entry_date, entry_number, line_number),
+        }
+
+
+def generate_general_ledger(fiscal_year, account=None, start_date=None, end_date=None):
+    """
+    Generate a general ledger report for a given fiscal year.
+    
+    The whole report is built in memory; use iter_general_ledger_lines to
+    stream large ledgers instead.
+    
+    Parameters:
+    - fiscal_year: FiscalYear instance
+    - account: Optional GeneralLedgerAccount instance or account_number to filter by account
+    - start_date: Optional start date for the report
+    - end_date: Optional end date for the report
+    
+    Returns:
+    - Dict with list of entries and their details
+    """
+    return group_ledger_lines(iter_general_ledger_lines(fiscal_year, account, start_date, end_date))
+
+
+def group_ledger_lines(lines):
+    """
+    Group flat general ledger lines by entry, in the shape of generate_general_ledger.
+    
+    Parameters:
+    - lines: Iterable of rows from iter_general_ledger_lines, ordered by entry
+    """
+    # Lines come ordered by entry, so the lines of an entry are contiguous
+    gl_entries = []
+    current = None
     for line in lines:
-        entry_id = line.entry.id
-        if entry_id not in gl_entries:
-            gl_entries[entry_id] = {
-                'entry_number': line.entry.entry_number,
-                'entry_date': line.entry.entry_date,
-                'journal_code': line.entry.journal.code,
-                'description': line.entry.reference,
+        if current is None or current['entry_number'] != line['entry_number']:
+            current = {
+                'entry_number': line['entry_number'],
+                'entry_date': line['entry_date'],
+                'journal_code': line['journal_code'],
+                'description': line['entry_description'],
                 'lines': []
             }
+            gl_entries.append(current)
         
-        gl_entries[entry_id]['lines'].append({
-            'account_number': line.account.account_number,
-            'account_name': line.account.short_name,
-            'is_debit': line.is_debit,
-            'amount': line.amount,
-            'description': line.description or '',
-            'line_number': line.line_number
+        current['lines'].append({
+            'account_number': line['account_number'],
+            'account_name': line['account_name'],
+            'is_debit': line['is_debit'],
+            'amount': line['amount'],
+            'description': line['description'],
+            'line_number': line['line_number']
+        })
+    
+    return {'entries': gl_entries}
+
+
+# Statement sections whose accounts normally carry a credit balance; amounts are negated
+CREDIT_SECTIONS = ('liabilities', 'equity', 'revenues')
+
+
+def classify_account(account_number, is_balance_sheet, balance):
+    """
+    Return the financial statement section of an account.
+    
+    Classes 6 and 7 go to the income statement. On the balance sheet, class 1
+    is equity, classes 2 and 3 are assets, and classes 4 and 5 are assets or
+    liabilities depending on the sign of their balance.
+    
+    Parameters:
+    - account_number: Account number
+    - is_balance_sheet: Whether the account is a balance sheet account
+    - balance: Signed account balance (positive for debit)
+    
+    Returns:
+    - 'assets', 'liabilities', 'equity', 'revenues', 'expenses' or None for accounts
+      outside both statements
+    """
+    class_code = account_number[:1]
+    if class_code == '6':
+        return 'expenses'
+    if class_code == '7':
+        return 'revenues'
+    if not is_balance_sheet:
+        return None
+    if class_code == '1':
+        return 'equity'
+    if class_code in ('2', '3'):
+        return 'assets'
+    if class_code in ('4', '5'):
+        return 'assets' if balance > 0 else 'liabilities'
+    return None
+
+
+def generate_financial_statements(fiscal_year, as_of_date=None):
+    """
+    Generate the income statement and the balance sheet from one balance pass.
+    
+    All account balances are fetched with a single grouped query, then each
+    account is classified once, in memory, by class code. Every row also carries
+    the account financial_statement_group, and each section is subtotaled by group.
+    
+    Parameters:
+    - fiscal_year: FiscalYear instance
+    - as_of_date: Optional date to calculate the statements as of a specific date
+    
+    Returns:
+    - Dict with 'income_statement' and 'balance_sheet' in the shape of
+      generate_income_statement and generate_balance_sheet
+    """
+    balances = calculate_account_balances(fiscal_year, as_of_date)
+    accounts = GeneralLedgerAccount.objects.filter(
+        id__in=[account_id for account_id, balance in balances.items() if balance]
+    ).order_by('account_number').values_list(
+        'id', 'account_number', 'full_name', 'is_balance_sheet', 'financial_statement_group'
+    )
+    
+    sections = {section: [] for section in ('assets', 'liabilities', 'equity', 'revenues', 'expenses')}
+    totals = {section: Decimal('0.00') for section in sections}
+    groups = {section: {} for section in sections}
+    for account_id, account_number, full_name, is_balance_sheet, group in accounts:
+        balance = balances[account_id]
+        section = classify_account(account_number, is_balance_sheet, balance)
+        if section is None:
+            continue
+        amount = -balance if section in CREDIT_SECTIONS else balance
+        sections[section].append({
+            'account_number': account_number,
+            'account_name': full_name,
+            'group': group,
+            'amount': amount
         })
+        totals[section] += amount
+        groups[section][group] = groups[section].get(group, Decimal('0.00')) + amount
+    
+    net_income = totals['revenues'] - totals['expenses']
+    total_equity_with_earnings = totals['equity'] + net_income
     
-    return {'entries': list(gl_entries.values())}
+    return {
+        'income_statement': {
+            'revenues': sections['revenues'],
+            'expenses': sections['expenses'],
+            'total_revenue': totals['revenues'],
+            'total_expenses': totals['expenses'],
+            'net_income': net_income,
+            'groups': {section: groups[section] for section in ('revenues', 'expenses')}
+        },
+        'balance_sheet': {
+            'assets': sections['assets'],
+            'liabilities': sections['liabilities'],
+            'equity': sections['equity'],
+            'total_assets': totals['assets'],
+            'total_liabilities': totals['liabilities'],
+            'total_equity': totals['equity'],
+            'retained_earnings': net_income,
+            'total_equity_with_earnings': total_equity_with_earnings,
+            'is_balanced': totals['assets'] == totals['liabilities'] + total_equity_with_earnings,
+            'groups': {section: groups[section] for section in ('assets', 'liabilities', 'equity')}
+        }
+    }
 
 
 def generate_income_statement(fiscal_year, as_of_date=None):
@@ -176,50 +560,7 @@ def generate_income_statement(fiscal_year, as_of_date=None):
     Returns:
     - Dict with revenue, expenses, and net income figures
     """
-    # Get revenue accounts (class 7 in French accounting)
-    revenue_accounts = GeneralLedgerAccount.objects.filter(account_number__startswith='7')
-    
-    # Get expense accounts (class 6 in French accounting)
-    expense_accounts = GeneralLedgerAccount.objects.filter(account_number__startswith='6')
-    
-    # Calculate total revenue
-    total_revenue = Decimal('0.00')
-    revenues = []
-    for account in revenue_accounts:
-        # Revenue accounts normally have credit balances, so we negate the result
-        balance = -calculate_account_balance(account, fiscal_year, as_of_date)
-        if balance != Decimal('0.00'):
-            revenues.append({
-                'account_number': account.account_number,
-                'account_name': account.full_name,
-                'amount': balance
-            })
-            total_revenue += balance
-    
-    # Calculate total expenses
-    total_expenses = Decimal('0.00')
-    expenses = []
-    for account in expense_accounts:
-        # Expense accounts normally have debit balances
-        balance = calculate_account_balance(account, fiscal_year, as_of_date)
-        if balance != Decimal('0.00'):
-            expenses.append({
-                'account_number': account.account_number,
-                'account_name': account.full_name,
-                'amount': balance
-            })
-            total_expenses += balance
-    
-    # Calculate net income
-    net_income = total_revenue - total_expenses
-    
-    return {
-        'revenues': sorted(revenues, key=lambda x: x['account_number']),
-        'expenses': sorted(expenses, key=lambda x: x['account_number']),
-        'total_revenue': total_revenue,
-        'total_expenses': total_expenses,
-        'net_income': net_income
-    }
+    return generate_financial_statements(fiscal_year, as_of_date)['income_statement']
 
 
 def generate_balance_sheet(fiscal_year, as_of_date=None):
@@ -233,87 +574,4 @@ def generate_balance_sheet(fiscal_year, as_of_date=None):
     Returns:
     - Dict with assets, liabilities, and equity figures
     """
-    # Get asset accounts (class 1-5 in French accounting)
-    asset_accounts = GeneralLedgerAccount.objects.filter(
-        Q(account_number__startswith='1') |
-        Q(account_number__startswith='2') |
-        Q(account_number__startswith='3') |
-        Q(account_number__startswith='4') |
-        Q(account_number__startswith='5'),
-        is_balance_sheet=True
-    )
-    
-    # Get liability accounts (class 1, 4, 5 in French accounting)
-    liability_accounts = GeneralLedgerAccount.objects.filter(
-        Q(account_number__startswith='1') |
-        Q(account_number__startswith='4') |
-        Q(account_number__startswith='5'),
-        is_balance_sheet=True
-    )
-    
-    # Get equity accounts (class 1 in French accounting)
-    equity_accounts = GeneralLedgerAccount.objects.filter(
-        account_number__startswith='1',
-        is_balance_sheet=True
-    )
-    
-    # Calculate total assets
-    total_assets = Decimal('0.00')
-    assets = []
-    for account in asset_accounts:
-        # Asset accounts normally have debit balances
-        balance = calculate_account_balance(account, fiscal_year, as_of_date)
-        if balance > Decimal('0.00'):
-            assets.append({
-                'account_number': account.account_number,
-                'account_name': account.full_name,
-                'amount': balance
-            })
-            total_assets += balance
-    
-    # Calculate total liabilities
-    total_liabilities = Decimal('0.00')
-    liabilities = []
-    for account in liability_accounts:
-        # Liability accounts normally have credit balances, so we negate the result
-        balance = -calculate_account_balance(account, fiscal_year, as_of_date)
-        if balance > Decimal('0.00'):
-            liabilities.append({
-                'account_number': account.account_number,
-                'account_name': account.full_name,
-                'amount': balance
-            })
-            total_liabilities += balance
-    
-    # Calculate total equity
-    total_equity = Decimal('0.00')
-    equity = []
-    for account in equity_accounts:
-        # Equity accounts normally have credit balances, so we negate the result
-        balance = -calculate_account_balance(account, fiscal_year, as_of_date)
-        if balance != Decimal('0.00'):
-            equity.append({
-                'account_number': account.account_number,
-                'account_name': account.full_name,
-                'amount': balance
-            })
-            total_equity += balance
-    
-    # Calculate retained earnings if not as of the end of the fiscal year
-    income_statement = generate_income_statement(fiscal_year, as_of_date)
-    retained_earnings = income_statement['net_income']
-    
-    # Total equity including current year earnings
-    total_equity_with_earnings = total_equity + retained_earnings
-    
-    return {
-        'assets': sorted(assets, key=lambda x: x['account_number']),
-        'liabilities': sorted(liabilities, key=lambda x: x['account_number']),
-        'equity': sorted(equity, key=lambda x: x['account_number']),
-        'total_assets': total_assets,
-        'total_liabilities': total_liabilities,
-        'total_equity': total_equity,
-        'retained_earnings': retained_earnings,
-        'total_equity_with_earnings': total_equity_with_earnings,
-        'is_balanced': total_assets == (total_liabilities + total_equity_with_earnings)
-    }
+    return generate_financial_statements(fiscal_year, as_of_date)['balance_sheet']
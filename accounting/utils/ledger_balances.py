@@ -0,0 +1,285 @@
+from datetime import date
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import Sum, Q, F
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from accounting.models import (
+    AccountBalanceSnapshot,
+    AccountingEntry,
+    AccountingEntryLine,
+    AccountingEntryStatus,
+    FiscalYear
+)
+
+
+# SQLite sums decimals as floats: aggregates are rounded back to cents
+CENT = Decimal('0.01')
+
+
+def month_start(value):
+    """Return the first day of the month of the given date."""
+    return value.replace(day=1)
+
+
+def bump_ledger_version(*fiscal_year_ids):
+    """
+    Increment the ledger version of fiscal years whose ledger changed.
+
+    Cached reports are keyed by this version, so bumping it invalidates them.
+
+    Parameters:
+    - fiscal_year_ids: Primary keys of the fiscal years to bump
+    """
+    FiscalYear.objects.filter(pk__in=fiscal_year_ids).update(
+        ledger_version=F('ledger_version') + 1,
+        updated_at=timezone.now()
+    )
+
+
+def increment_totals(model, key, debit, credit):
+    """
+    Add amounts to the debit/credit totals of the row with this key, creating it if needed.
+
+    The increment is done in SQL (F expressions), so concurrent postings add up.
+    When two transactions create the same row at once, the insert of the second
+    one fails on the unique constraint of the key, inside a savepoint, and it
+    increments the row of the first one instead.
+
+    Parameters:
+    - model: Model with debit_total and credit_total fields, unique on the key fields
+    - key: Dict of the key field values
+    - debit: Amount added to debit_total
+    - credit: Amount added to credit_total
+
+    Raises:
+    - IntegrityError: The insert conflicts with a row that the key does not
+      select, so the amounts could not be recorded
+    """
+    increment = {
+        'debit_total': F('debit_total') + debit,
+        'credit_total': F('credit_total') + credit,
+        'updated_at': timezone.now(),
+    }
+    if model.objects.filter(**key).update(**increment):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(debit_total=debit, credit_total=credit, **key)
+    except IntegrityError:
+        if not model.objects.filter(**key).update(**increment):
+            raise
+
+
+def _increment_balances(deltas):
+    """
+    Increment the materialized account balances in place.
+
+    Rows are written in key order, so concurrent postings lock them in the same
+    order and cannot deadlock.
+
+    Parameters:
+    - deltas: Dict mapping (account_id, fiscal_year_id, journal_id, period) to (debit, credit)
+    """
+    with transaction.atomic():
+        for (account_id, fiscal_year_id, journal_id, period), (debit, credit) in sorted(deltas.items()):
+            key = {
+                'account_id': account_id,
+                'fiscal_year_id': fiscal_year_id,
+                'journal_id': journal_id,
+                'period': period,
+            }
+            increment_totals(AccountBalanceSnapshot, key, debit, credit)
+
+
+def apply_entry_to_balances(entry):
+    """
+    Add the lines of an entry to the materialized account balances.
+
+    The lines are summed per account in one query, then each
+    (account, fiscal year, journal, month) snapshot is incremented in place.
+    Posted entries are never removed: a reversing entry is posted like any
+    other, with its sides swapped.
+
+    Parameters:
+    - entry: AccountingEntry instance being posted
+    """
+    totals = AccountingEntryLine.objects.filter(entry=entry).order_by().values('account_id').annotate(
+        debit=Sum('amount', filter=Q(is_debit=True)),
+        credit=Sum('amount', filter=Q(is_debit=False))
+    )
+    period = month_start(entry.entry_date)
+
+    _increment_balances({
+        (row['account_id'], entry.fiscal_year_id, entry.journal_id, period): (
+            (row['debit'] or Decimal('0.00')).quantize(CENT),
+            (row['credit'] or Decimal('0.00')).quantize(CENT)
+        )
+        for row in totals
+    })
+
+
+def apply_lines_to_balances(lines):
+    """
+    Add in-memory lines of posted entries to the materialized account balances.
+
+    Used when entries are inserted in bulk: the lines are summed per snapshot
+    in Python, so the cost is one UPDATE per touched snapshot rather than one
+    aggregate query per entry.
+
+    Parameters:
+    - lines: Iterable of AccountingEntryLine instances with their entry set
+    """
+    deltas = {}
+    for line in lines:
+        entry = line.entry
+        key = (line.account_id, entry.fiscal_year_id, entry.journal_id, month_start(entry.entry_date))
+        debit, credit = deltas.get(key, (Decimal('0.00'), Decimal('0.00')))
+        if line.is_debit:
+            debit += line.amount
+        else:
+            credit += line.amount
+        deltas[key] = (debit, credit)
+    _increment_balances(deltas)
+
+
+def post_entry(entry, posting_date=None):
+    """
+    Move a validated entry to the posted status and update the account balances.
+
+    Reversing entries carry swapped debit/credit lines, so posting them through
+    this function offsets the balances of the original entry. The analytical
+    aggregates are updated too when they are enabled.
+
+    The entry row is locked and its status checked again before posting, so an
+    entry posted twice at the same time is only added to the balances once.
+
+    Parameters:
+    - entry: AccountingEntry instance to post
+    - posting_date: Optional posting date (defaults to today)
+
+    Raises:
+    - ValueError: If the entry is no longer in the validated status
+    """
+    with transaction.atomic():
+        current_status = AccountingEntry.objects.select_for_update().values_list('status', flat=True).get(pk=entry.pk)
+        if current_status != AccountingEntryStatus.VALIDATED:
+            raise ValueError(f"Entry {entry.entry_number} is {current_status}: only validated entries can be posted")
+        entry.status = 'posted'
+        entry.posting_date = posting_date or timezone.now().date()
+        entry.save()
+        apply_entry_to_balances(entry)
+        # Imported here: the analytics module depends on this one
+        from accounting.utils.analytics import analytical_aggregates_enabled, apply_entry_to_analytics
+        if analytical_aggregates_enabled():
+            apply_entry_to_analytics(entry)
+        bump_ledger_version(entry.fiscal_year_id)
+    return entry
+
+
+def compute_balance_snapshots(fiscal_year=None):
+    """
+    Compute the snapshot rows from the posted entry lines.
+
+    Parameters:
+    - fiscal_year: Optional FiscalYear instance to restrict the computation
+
+    Returns:
+    - Dict mapping (account_id, fiscal_year_id, journal_id, period) to (debit, credit)
+    """
+    query = AccountingEntryLine.objects.filter(entry__status='posted')
+    if fiscal_year:
+        query = query.filter(entry__fiscal_year=fiscal_year)
+
+    rows = query.order_by().values(
+        'account_id',
+        'entry__fiscal_year_id',
+        'entry__journal_id',
+        period=TruncMonth('entry__entry_date')
+    ).annotate(
+        debit=Sum('amount', filter=Q(is_debit=True)),
+        credit=Sum('amount', filter=Q(is_debit=False))
+    )
+
+    result = {}
+    for row in rows:
+        period = row['period']
+        if not isinstance(period, date):
+            period = date.fromisoformat(str(period)[:10])
+        key = (row['account_id'], row['entry__fiscal_year_id'], row['entry__journal_id'], period)
+        result[key] = (
+            (row['debit'] or Decimal('0.00')).quantize(CENT),
+            (row['credit'] or Decimal('0.00')).quantize(CENT)
+        )
+    return result
+
+
+def rebuild_balance_snapshots(fiscal_year=None, batch_size=1000):
+    """
+    Recompute the materialized account balances from scratch.
+
+    Parameters:
+    - fiscal_year: Optional FiscalYear instance to restrict the rebuild
+    - batch_size: Number of snapshot rows inserted per query
+
+    Returns:
+    - int: Number of snapshot rows written
+    """
+    computed = compute_balance_snapshots(fiscal_year)
+
+    with transaction.atomic():
+        existing = AccountBalanceSnapshot.objects.all()
+        if fiscal_year:
+            existing = existing.filter(fiscal_year=fiscal_year)
+        existing.delete()
+
+        AccountBalanceSnapshot.objects.bulk_create(
+            [
+                AccountBalanceSnapshot(
+                    account_id=account_id,
+                    fiscal_year_id=fiscal_year_id,
+                    journal_id=journal_id,
+                    period=period,
+                    debit_total=debit,
+                    credit_total=credit
+                )
+                for (account_id, fiscal_year_id, journal_id, period), (debit, credit) in computed.items()
+            ],
+            batch_size=batch_size
+        )
+
+        if fiscal_year:
+            bump_ledger_version(fiscal_year.pk)
+        else:
+            bump_ledger_version(*FiscalYear.objects.values_list('pk', flat=True))
+    return len(computed)
+
+
+def verify_balance_snapshots(fiscal_year=None):
+    """
+    Compare the materialized account balances with the posted entry lines.
+
+    Parameters:
+    - fiscal_year: Optional FiscalYear instance to restrict the check
+
+    Returns:
+    - List of (key, expected, stored) tuples for every mismatching snapshot
+    """
+    expected = compute_balance_snapshots(fiscal_year)
+
+    stored_query = AccountBalanceSnapshot.objects.all()
+    if fiscal_year:
+        stored_query = stored_query.filter(fiscal_year=fiscal_year)
+    stored = {
+        (row[0], row[1], row[2], row[3]): (row[4], row[5])
+        for row in stored_query.values_list(
+            'account_id', 'fiscal_year_id', 'journal_id', 'period', 'debit_total', 'credit_total'
+        )
+    }
+
+    zero = (Decimal('0.00'), Decimal('0.00'))
+    mismatches = []
+    for key in expected.keys() | stored.keys():
+        if expected.get(key, zero) != stored.get(key, zero):
+            mismatches.append((key, expected.get(key, zero), stored.get(key, zero)))
+    return mismatches
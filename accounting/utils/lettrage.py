@@ -0,0 +1,303 @@
+from bisect import bisect_right
+from decimal import Decimal
+from itertools import groupby
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from accounting.models import AccountingEntryLine, GeneralLedgerAccount
+from accounting.utils.entry_lines import LINE_BATCH_SIZE
+
+
+# Prefix of the generated reconciliation codes
+DEFAULT_CODE_PREFIX = 'L'
+
+# Bounds of the subset-sum search: lines per match, candidates per target and DP states
+MAX_SUBSET_SIZE = 4
+MAX_SUBSET_CANDIDATES = 16
+MAX_SUBSET_STATES = 256
+
+
+def match_pairs(debits, credits):
+    """
+    Match debits and credits of the same amount with a sorted two-pointer pass.
+    
+    Lines of equal amounts are matched in the order they are given, so giving
+    them oldest first letters the oldest lines first.
+    
+    Parameters:
+    - debits: List of (key, amount_in_cents)
+    - credits: List of (key, amount_in_cents)
+    
+    Returns:
+    - Tuple (pairs, unmatched_debits, unmatched_credits), where pairs is a list of
+      (debit_key, credit_key) and the unmatched lists keep their input order
+    """
+    sorted_debits = sorted(range(len(debits)), key=lambda index: debits[index][1])
+    sorted_credits = sorted(range(len(credits)), key=lambda index: credits[index][1])
+    pairs = []
+    matched_debits = set()
+    matched_credits = set()
+    i = j = 0
+    while i < len(sorted_debits) and j < len(sorted_credits):
+        debit = debits[sorted_debits[i]]
+        credit = credits[sorted_credits[j]]
+        if debit[1] == credit[1]:
+            pairs.append((debit[0], credit[0]))
+            matched_debits.add(sorted_debits[i])
+            matched_credits.add(sorted_credits[j])
+            i += 1
+            j += 1
+        elif debit[1] < credit[1]:
+            i += 1
+        else:
+            j += 1
+    return (
+        pairs,
+        [line for index, line in enumerate(debits) if index not in matched_debits],
+        [line for index, line in enumerate(credits) if index not in matched_credits]
+    )
+
+
+def _subset_sum(target, amounts, max_size, max_states):
+    """
+    Find positions in amounts whose values add up to target, with a capped DP.
+    
+    The DP keeps at most max_states reachable totals, each with the first
+    combination found for it, so the search is bounded whatever the input.
+    
+    Returns:
+    - Tuple of positions, or None when no subset was found within the bounds
+    """
+    reachable = {0: ()}
+    for position, amount in enumerate(amounts):
+        for total, combination in list(reachable.items()):
+            if len(combination) >= max_size:
+                continue
+            new_total = total + amount
+            if new_total == target:
+                return combination + (position,)
+            if new_total < target and new_total not in reachable and len(reachable) < max_states:
+                reachable[new_total] = combination + (position,)
+    return None
+
+
+def match_subsets(targets, candidates, max_size=MAX_SUBSET_SIZE, max_candidates=MAX_SUBSET_CANDIDATES,
+                  max_states=MAX_SUBSET_STATES):
+    """
+    Match single lines against groups of opposite lines with the same total.
+    
+    Lines are identified by keys in chronological order. For each target, only
+    the max_candidates remaining candidates closest to it in time (and smaller
+    than it) are searched, so each target costs a bounded amount of work.
+    Matched candidates are removed from the pool.
+    
+    Parameters:
+    - targets: List of (key, amount_in_cents) to match one by one
+    - candidates: List of (key, amount_in_cents) to draw the groups from
+    - max_size: Maximum number of candidates per group
+    - max_candidates: Number of candidates searched per target
+    - max_states: Maximum number of DP states per target
+    
+    Returns:
+    - Tuple (matches, unmatched_targets, unmatched_candidates), where matches is
+      a list of (target_key, [candidate_keys])
+    """
+    pool = sorted(candidates)
+    keys = [line[0] for line in pool]
+    matches = []
+    unmatched = []
+    for target_key, target in targets:
+        position = bisect_right(keys, target_key)
+        end = min(len(pool), max(position + max_candidates // 2, max_candidates))
+        start = max(0, end - max_candidates)
+        window = [index for index in range(start, end) if pool[index][1] < target]
+        positions = None
+        if len(window) > 1 and sum(pool[index][1] for index in window) >= target:
+            positions = _subset_sum(target, [pool[index][1] for index in window], max_size, max_states)
+        if positions is None:
+            unmatched.append((target_key, target))
+            continue
+        indexes = sorted((window[position] for position in positions), reverse=True)
+        matches.append((target_key, [pool[index][0] for index in reversed(indexes)]))
+        for index in indexes:
+            del pool[index]
+            del keys[index]
+    return matches, unmatched, pool
+
+
+def match_open_lines(debits, credits, subsets=True, max_subset_size=MAX_SUBSET_SIZE):
+    """
+    Match the open lines of one third party.
+    
+    Exact pairs are matched first, then, when subsets is set, each remaining
+    credit is matched against groups of debits and each remaining debit against
+    groups of credits.
+    
+    Parameters:
+    - debits: List of (key, amount_in_cents), keys in chronological order
+    - credits: List of (key, amount_in_cents), keys in chronological order
+    - subsets: Whether to search subset-sum matches
+    - max_subset_size: Maximum number of lines on the grouped side of a match
+    
+    Returns:
+    - Tuple (pairs, groups): pairs is a list of key pairs and groups a list of
+      key lists of subset matches
+    """
+    pairs, debits, credits = match_pairs(debits, credits)
+    groups = []
+    if subsets and max_subset_size > 1 and debits and credits:
+        matches, credits, debits = match_subsets(credits, debits, max_subset_size)
+        groups.extend([credit_id] + debit_ids for credit_id, debit_ids in matches)
+        matches, debits, credits = match_subsets(debits, credits, max_subset_size)
+        groups.extend([debit_id] + credit_ids for debit_id, credit_ids in matches)
+    return [list(pair) for pair in pairs], groups
+
+
+def next_reconciliation_number(account, prefix=DEFAULT_CODE_PREFIX):
+    """Return the first free number of the reconciliation codes of an account with the given prefix."""
+    codes = AccountingEntryLine.objects.filter(
+        account=account, reconciliation_code__startswith=prefix
+    ).values_list('reconciliation_code', flat=True).distinct()
+    numbers = [int(code[len(prefix):]) for code in codes if code[len(prefix):].isdigit()]
+    return max(numbers, default=0) + 1
+
+
+def write_reconciliation_codes(codes, reconciliation_type=None):
+    """
+    Set the reconciliation code of many lines with one parameterized UPDATE.
+    
+    Every line gets its own code, which bulk_update would express as a CASE
+    over the whole batch; building and evaluating that expression costs far
+    more than the write itself, so the rows are sent with executemany instead.
+    Only open lines are updated: if any line was lettered since it was read,
+    nothing is written.
+    
+    Parameters:
+    - codes: List of (line_id, reconciliation_code)
+    - reconciliation_type: Optional ReconciliationType set on the lines
+    
+    Raises:
+    - ValueError: If some lines are no longer open
+    """
+    meta = AccountingEntryLine._meta
+    quote = connection.ops.quote_name
+    now = meta.get_field('updated_at').get_db_prep_value(timezone.now(), connection)
+    assignments = ['reconciliation_code', 'updated_at']
+    if reconciliation_type is not None:
+        assignments.append('reconciliation_type')
+    code_column = quote(meta.get_field('reconciliation_code').column)
+    sql = "UPDATE {} SET {} WHERE {} = %s AND ({} IS NULL OR {} = '')".format(
+        quote(meta.db_table),
+        ', '.join(f'{quote(meta.get_field(name).column)} = %s' for name in assignments),
+        quote(meta.pk.column),
+        code_column,
+        code_column
+    )
+    extra = (reconciliation_type.pk,) if reconciliation_type is not None else ()
+    with transaction.atomic(), connection.cursor() as cursor:
+        for start in range(0, len(codes), LINE_BATCH_SIZE):
+            batch = codes[start:start + LINE_BATCH_SIZE]
+            cursor.executemany(sql, [(code, now) + extra + (line_id,) for line_id, code in batch])
+            if cursor.rowcount != len(batch):
+                raise ValueError(
+                    f"{len(batch) - cursor.rowcount} line(s) were lettered by another run, nothing was written"
+                )
+
+
+def reconcile_account(account, auxiliary_id=None, fiscal_year=None, reconciliation_type=None, subsets=True,
+                      max_subset_size=MAX_SUBSET_SIZE, prefix=DEFAULT_CODE_PREFIX, dry_run=False):
+    """
+    Letter the open lines of an account automatically.
+    
+    Open lines (posted, without reconciliation code) are loaded as raw values
+    in one query and matched per third party (auxiliary id): exact-amount pairs
+    with a two-pointer pass, then small groups with a bounded subset-sum search.
+    Each match gets a new reconciliation code, and all codes are written in
+    batches by write_reconciliation_codes. Unless dry_run is set, the account
+    row is locked for the whole run, so concurrent runs on the same account
+    read the open lines and number the codes one after the other.
+    
+    Parameters:
+    - account: GeneralLedgerAccount instance or account_number
+    - auxiliary_id: Optional auxiliary account id to restrict the lettering
+    - fiscal_year: Optional FiscalYear instance to restrict the lettering
+    - reconciliation_type: Optional ReconciliationType set on the lettered lines
+    - subsets: Whether to search subset-sum matches
+    - max_subset_size: Maximum number of lines on the grouped side of a match
+    - prefix: Prefix of the generated codes
+    - dry_run: Compute the matches without writing them
+    
+    Returns:
+    - Dict with the number of open lines, pairs, subset matches and matched lines,
+      and the list of matches (code, auxiliary_id, line_ids, amount)
+    
+    Raises:
+    - GeneralLedgerAccount.DoesNotExist: If the account number is unknown
+    - ValueError: If lines were lettered outside the lock since they were read;
+      nothing is written
+    """
+    if isinstance(account, str):
+        account = GeneralLedgerAccount.objects.get(account_number=account)
+    
+    with transaction.atomic():
+        if not dry_run:
+            # Held until the codes are written: other runs on the account wait here
+            GeneralLedgerAccount.objects.select_for_update().get(pk=account.pk)
+        matches, open_lines, pair_count, group_count = _match_account(
+            account, auxiliary_id, fiscal_year, subsets, max_subset_size, prefix
+        )
+        if matches and not dry_run:
+            write_reconciliation_codes(
+                [(line_id, match['code']) for match in matches for line_id in match['line_ids']],
+                reconciliation_type
+            )
+    
+    return {
+        'account': account.account_number,
+        'dry_run': dry_run,
+        'open_lines': open_lines,
+        'pairs': pair_count,
+        'subsets': group_count,
+        'lines_matched': sum(len(match['line_ids']) for match in matches),
+        'matches': matches,
+    }
+
+
+def _match_account(account, auxiliary_id, fiscal_year, subsets, max_subset_size, prefix):
+    """Match the open lines of an account, as (matches, open lines, pairs, groups)."""
+    lines = AccountingEntryLine.objects.filter(account=account, entry__status='posted').filter(
+        Q(reconciliation_code__isnull=True) | Q(reconciliation_code='')
+    )
+    if auxiliary_id is not None:
+        lines = lines.filter(auxiliary_account_id=auxiliary_id)
+    if fiscal_year:
+        lines = lines.filter(entry__fiscal_year=fiscal_year)
+    rows = lines.order_by(
+        'auxiliary_account_id', 'entry__entry_date', 'entry__entry_number', 'line_number'
+    ).values_list('pk', 'auxiliary_account_id', 'is_debit', 'amount')
+    
+    number = next_reconciliation_number(account, prefix)
+    matches = []
+    open_lines = pair_count = group_count = 0
+    for third_party, group in groupby(rows.iterator(chunk_size=LINE_BATCH_SIZE), key=lambda row: row[1]):
+        # Lines are keyed by their position, which follows the entry dates
+        line_ids = []
+        debits = []
+        credits = []
+        for key, (pk, _, is_debit, amount) in enumerate(group):
+            line_ids.append(pk)
+            (debits if is_debit else credits).append((key, int(amount * 100)))
+        open_lines += len(line_ids)
+        amounts = dict(debits + credits)
+        pairs, groups = match_open_lines(debits, credits, subsets, max_subset_size)
+        pair_count += len(pairs)
+        group_count += len(groups)
+        for keys in pairs + groups:
+            matches.append({
+                'code': f'{prefix}{number}',
+                'auxiliary_id': third_party,
+                'line_ids': [line_ids[key] for key in keys],
+                'amount': Decimal(amounts[keys[0]]) / 100,
+            })
+            number += 1
+    return matches, open_lines, pair_count, group_count
@@ -0,0 +1,253 @@
+import re
+import threading
+import time
+import unicodedata
+import uuid
+from bisect import bisect_left
+from collections import Counter, namedtuple
+from django.conf import settings
+from django.core.cache import caches
+from accounting.models.reference_data import Municipality
+
+
+AUTOCOMPLETE_LIMIT = 10
+MAX_AUTOCOMPLETE_LIMIT = 50
+
+# Minimum trigram similarity of a fuzzy match (0 to 1)
+FUZZY_THRESHOLD = 0.3
+
+MunicipalityRecord = namedtuple(
+    'MunicipalityRecord', ['id', 'insee_code', 'name', 'postal_code', 'department_code', 'region_code']
+)
+
+_ABBREVIATIONS = {'st': 'saint', 'ste': 'sainte'}
+_SEPARATORS = re.compile(r"[^0-9a-z]+")
+_STAMP_KEY = 'accounting:municipality-index'
+
+
+def fold(text):
+    """
+    Fold a municipality name for matching.
+    
+    Accents are stripped, case is lowered, hyphens, apostrophes and other
+    punctuation become single spaces, and St / Ste are expanded
+    ('Saint-Étienne', 'ST ETIENNE' and 'saint etienne' all fold the same).
+    """
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char)).lower()
+    words = _SEPARATORS.sub(' ', text).split()
+    return ' '.join(_ABBREVIATIONS.get(word, word) for word in words)
+
+
+def normalize_code(code):
+    """Return an INSEE or postal code with its leading zeros (the source file drops them)."""
+    code = (code or '').strip().upper()
+    return code.zfill(5) if code.isdigit() else code
+
+
+def _trigrams(folded):
+    padded = f'  {folded} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class MunicipalityIndex:
+    """
+    Immutable in-memory lookup structure over the municipalities.
+    
+    - by_insee: dict on the (zero-padded) INSEE code
+    - name prefixes: sorted array of folded full names, and a second one holding
+      the folded name from each later word ('etienne' finds Saint-Étienne)
+    - postal prefixes: sorted array of zero-padded postal codes
+    - trigrams: inverted index from name trigram to records, built on the first
+      fuzzy search
+    
+    A prefix search is two bisections plus the matches read, so its cost does not
+    depend on the number of municipalities.
+    """
+    
+    def __init__(self, records, stamp=None):
+        self.records = tuple(records)
+        self.stamp = stamp
+        self.folded_names = tuple(fold(record.name) for record in self.records)
+        self.by_insee = {normalize_code(record.insee_code): position for position, record in enumerate(self.records)}
+        
+        names = []
+        words = []
+        postal_codes = []
+        for position, folded in enumerate(self.folded_names):
+            names.append((folded, position))
+            start = folded.find(' ')
+            while start != -1:
+                words.append((folded[start + 1:], position))
+                start = folded.find(' ', start + 1)
+            postal_codes.append((normalize_code(self.records[position].postal_code), position))
+        names.sort()
+        words.sort()
+        postal_codes.sort()
+        self._names = ([key for key, _ in names], [position for _, position in names])
+        self._words = ([key for key, _ in words], [position for _, position in words])
+        self._postal_codes = ([key for key, _ in postal_codes], [position for _, position in postal_codes])
+        self._trigram_index = None
+        self._trigram_lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self.records)
+    
+    def get(self, insee_code):
+        """Return the record with this INSEE code, or None."""
+        position = self.by_insee.get(normalize_code(insee_code))
+        return self.records[position] if position is not None else None
+    
+    @staticmethod
+    def _prefix_positions(array, prefix):
+        keys, positions = array
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + '\uffff', lo=start)
+        return positions[start:end]
+    
+    def prefix_search(self, query, limit=AUTOCOMPLETE_LIMIT):
+        """
+        Return the records whose name, a word of their name or postal code starts with query.
+        
+        Digits search the postal codes (an exact INSEE code comes first); other
+        queries search the names, whole-name matches before word matches, each in
+        alphabetical order.
+        """
+        results = []
+        seen = set()
+        
+        def add(positions):
+            for position in positions:
+                if len(results) >= limit:
+                    return
+                if position not in seen:
+                    seen.add(position)
+                    results.append(self.records[position])
+        
+        code = query.strip().upper()
+        if code.isdigit() or (len(code) == 5 and code[:2] in ('2A', '2B') and code[2:].isdigit()):
+            if len(code) == 5:
+                exact = self.by_insee.get(code)
+                if exact is not None:
+                    add([exact])
+            if code.isdigit():
+                add(self._prefix_positions(self._postal_codes, code))
+            return results
+        
+        folded = fold(query)
+        if not folded:
+            return results
+        add(self._prefix_positions(self._names, folded))
+        add(self._prefix_positions(self._words, folded))
+        return results
+    
+    def _trigrams(self):
+        if self._trigram_index is None:
+            with self._trigram_lock:
+                if self._trigram_index is None:
+                    index = {}
+                    for position, folded in enumerate(self.folded_names):
+                        for trigram in _trigrams(folded):
+                            index.setdefault(trigram, []).append(position)
+                    self._trigram_index = index
+        return self._trigram_index
+    
+    def fuzzy_search(self, query, limit=AUTOCOMPLETE_LIMIT, threshold=FUZZY_THRESHOLD):
+        """
+        Return the records whose name is most similar to query, by trigram similarity.
+        
+        Similarity is the Dice coefficient of the two trigram sets; records below
+        threshold are dropped.
+        """
+        folded = fold(query)
+        if not folded:
+            return []
+        query_trigrams = _trigrams(folded)
+        index = self._trigrams()
+        shared = Counter()
+        for trigram in query_trigrams:
+            shared.update(index.get(trigram, ()))
+        scored = []
+        for position, count in shared.items():
+            size = len(self.folded_names[position]) + 1
+            score = 2 * count / (len(query_trigrams) + size)
+            if score >= threshold:
+                scored.append((-score, self.folded_names[position], position))
+        scored.sort()
+        return [self.records[position] for _, _, position in scored[:limit]]
+    
+    def search(self, query, limit=AUTOCOMPLETE_LIMIT, fuzzy=False):
+        """
+        Return up to limit records for a type-ahead query.
+        
+        Prefix matches come first; with fuzzy, the remaining slots are filled by
+        trigram matches (typos, missing words).
+        """
+        results = self.prefix_search(query, limit)
+        if fuzzy and len(results) < limit:
+            seen = {record.id for record in results}
+            for record in self.fuzzy_search(query, limit):
+                if len(results) >= limit:
+                    break
+                if record.id not in seen:
+                    results.append(record)
+        return results
+
+
+def build_municipality_index(stamp=None):
+    """Read the municipalities in one query and build their index."""
+    rows = Municipality.objects.order_by('insee_code').values_list(*MunicipalityRecord._fields)
+    return MunicipalityIndex((MunicipalityRecord(*row) for row in rows.iterator(chunk_size=5000)), stamp)
+
+
+_index = None
+_index_lock = threading.Lock()
+_checked_at = 0.0
+
+
+def _cache():
+    return caches[getattr(settings, 'ACCOUNTING_REFERENCE_DATA_CACHE', 'default')]
+
+
+def get_municipality_index():
+    """
+    Return the process-wide municipality index, building it on first use.
+    
+    Like the reference data registry, the index is dropped by the signals of
+    Municipality and by invalidate_municipality_index (bulk imports), and other
+    processes see the change through a version stamp in the shared cache
+    ACCOUNTING_REFERENCE_DATA_CACHE (checked at startup, see accounting.checks),
+    read at most every ACCOUNTING_REFERENCE_DATA_CHECK_INTERVAL seconds.
+    """
+    global _index, _checked_at
+    index = _index
+    now = time.monotonic()
+    if index is not None and now - _checked_at >= getattr(settings, 'ACCOUNTING_REFERENCE_DATA_CHECK_INTERVAL', 5):
+        _checked_at = now
+        if _cache().get(_STAMP_KEY) != index.stamp:
+            index = _index = None
+    if index is None:
+        with _index_lock:
+            index = _index
+            if index is None:
+                cache = _cache()
+                stamp = cache.get(_STAMP_KEY)
+                if stamp is None:
+                    cache.add(_STAMP_KEY, uuid.uuid4().hex, timeout=None)
+                    stamp = cache.get(_STAMP_KEY)
+                index = _index = build_municipality_index(stamp)
+                _checked_at = time.monotonic()
+    return index
+
+
+def invalidate_municipality_index(broadcast=True):
+    """
+    Drop the municipality index of this process.
+    
+    Parameters:
+    - broadcast: Also change the cross-process stamp so other processes rebuild it
+    """
+    global _index
+    _index = None
+    if broadcast:
+        _cache().set(_STAMP_KEY, uuid.uuid4().hex, timeout=None)
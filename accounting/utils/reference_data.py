@@ -0,0 +1,204 @@
+import threading
+import time
+import uuid
+from types import MappingProxyType
+from django.conf import settings
+from django.core.cache import caches
+from accounting.models import AccountingJournal, AccountingType, FiscalYear
+from accounting.models.reference_data import (
+    AccountingEntryType,
+    Activity,
+    ClientAccountType,
+    EngagementType,
+    PayerType,
+    PricingType,
+    ReconciliationType,
+    ServiceType
+)
+
+
+# Small lookup tables held in memory, with the field used as their code
+REFERENCE_MODELS = {
+    ClientAccountType: 'code',
+    AccountingEntryType: 'code',
+    EngagementType: 'code',
+    ReconciliationType: 'code',
+    Activity: 'code',
+    ServiceType: 'code',
+    PricingType: 'code',
+    PayerType: 'code',
+    AccountingJournal: 'code',
+    FiscalYear: 'year',
+    AccountingType: 'code',
+}
+
+# Fields left out of the cached rows: timestamps, and counters updated without signals
+_EXCLUDED_FIELDS = {'created_at', 'updated_at', 'ledger_version'}
+
+_STAMP_KEY = 'accounting:reference-data:{}'
+
+
+class ReferenceTable:
+    """
+    Immutable in-memory copy of a reference table.
+    
+    Rows are read-only mappings of field values, indexed by id and by code. When
+    a code is not unique (journal and service type codes), by_code holds the row
+    with the lowest id and ids_for_code lists them all.
+    """
+    
+    def __init__(self, model, code_field, rows, stamp):
+        self.model = model
+        self.code_field = code_field
+        self.stamp = stamp
+        by_id = {}
+        ids_by_code = {}
+        for row in rows:
+            row = MappingProxyType(row)
+            by_id[row['id']] = row
+            ids_by_code.setdefault(row[code_field], []).append(row['id'])
+        self.by_id = MappingProxyType(by_id)
+        self.by_code = MappingProxyType({code: by_id[ids[0]] for code, ids in ids_by_code.items()})
+        self._ids_by_code = {code: tuple(ids) for code, ids in ids_by_code.items()}
+    
+    def get(self, pk):
+        """Return the row with this id, or None."""
+        return self.by_id.get(pk)
+    
+    def get_by_code(self, code):
+        """Return the row with this code, or None."""
+        return self.by_code.get(code)
+    
+    def code(self, pk):
+        """Return the code of the row with this id, or None."""
+        row = self.by_id.get(pk)
+        return row[self.code_field] if row is not None else None
+    
+    def ids_for_code(self, code):
+        """Return the ids of every row with this code."""
+        return self._ids_by_code.get(code, ())
+
+
+class ReferenceDataRegistry:
+    """
+    Process-wide registry of the reference tables.
+    
+    Each table is loaded once per process. It is dropped locally when one of its
+    rows is saved or deleted (see accounting.signals), and other processes see
+    the change through a version stamp kept in a shared cache: a process checks
+    the stamps at most once per ACCOUNTING_REFERENCE_DATA_CHECK_INTERVAL seconds
+    and reloads the tables whose stamp changed. The cache must be shared by
+    every process (database or file backend, see accounting.checks).
+    
+    Until the next check, rows created by another process are missing from the
+    local tables: lookups by code that must not miss them go through ids_for_code,
+    which falls back to the database.
+    """
+    
+    def __init__(self, models):
+        self.models = dict(models)
+        self._tables = {}
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+    
+    def _cache(self):
+        return caches[getattr(settings, 'ACCOUNTING_REFERENCE_DATA_CACHE', 'default')]
+    
+    def _stamp_key(self, model):
+        return _STAMP_KEY.format(model._meta.label_lower)
+    
+    def _check_stamps(self):
+        """Drop the tables whose cross-process stamp changed since they were loaded."""
+        interval = getattr(settings, 'ACCOUNTING_REFERENCE_DATA_CHECK_INTERVAL', 5)
+        now = time.monotonic()
+        if now - self._checked_at < interval:
+            return
+        # Tables loaded from now on read their stamp as they load
+        self._checked_at = now
+        if not self._tables:
+            return
+        tables = dict(self._tables)
+        stamps = self._cache().get_many([self._stamp_key(model) for model in tables])
+        for model, table in tables.items():
+            if stamps.get(self._stamp_key(model)) != table.stamp:
+                self._tables.pop(model, None)
+    
+    def table(self, model):
+        """
+        Return the in-memory table of a reference model, loading it if needed.
+        
+        Raises:
+        - KeyError: If the model is not a registered reference model
+        """
+        code_field = self.models[model]
+        self._check_stamps()
+        table = self._tables.get(model)
+        if table is None:
+            with self._lock:
+                table = self._tables.get(model)
+                if table is None:
+                    cache = self._cache()
+                    key = self._stamp_key(model)
+                    # Read the stamp before the rows, so a concurrent change is never missed
+                    stamp = cache.get(key)
+                    if stamp is None:
+                        cache.add(key, uuid.uuid4().hex, timeout=None)
+                        stamp = cache.get(key)
+                    fields = [
+                        field.attname for field in model._meta.concrete_fields
+                        if field.name not in _EXCLUDED_FIELDS
+                    ]
+                    rows = model.objects.order_by('pk').values(*fields)
+                    table = ReferenceTable(model, code_field, list(rows), stamp)
+                    self._tables[model] = table
+        return table
+    
+    def invalidate(self, model, broadcast=True):
+        """
+        Drop the in-memory table of a model.
+        
+        Parameters:
+        - model: Reference model whose rows changed
+        - broadcast: Also change the cross-process stamp so other processes reload it
+        """
+        self._tables.pop(model, None)
+        if broadcast:
+            self._cache().set(self._stamp_key(model), uuid.uuid4().hex, timeout=None)
+    
+    def ids_for_code(self, model, code):
+        """
+        Return the ids of the rows of a model with this code.
+        
+        A code missing from the in-memory table is looked up in the database, in
+        case another process created it since the stamps were last checked; the
+        local table is then dropped so that the next access reloads it.
+        """
+        ids = self.table(model).ids_for_code(code)
+        if not ids:
+            ids = tuple(model.objects.filter(**{self.models[model]: code}).order_by('pk').values_list('pk', flat=True))
+            if ids:
+                self.invalidate(model, broadcast=False)
+        return ids
+    
+    def clear(self):
+        """Drop every in-memory table (the stamps are left untouched)."""
+        self._tables.clear()
+        self._checked_at = 0.0
+
+
+registry = ReferenceDataRegistry(REFERENCE_MODELS)
+
+
+def reference_table(model):
+    """Return the in-memory table of a reference model (see ReferenceDataRegistry)."""
+    return registry.table(model)
+
+
+def reference_ids(model, code):
+    """Return the ids of the rows of a reference model with this code (see ReferenceDataRegistry.ids_for_code)."""
+    return registry.ids_for_code(model, code)
+
+
+def journal_ids(code):
+    """Return the ids of the journals with this code."""
+    return reference_ids(AccountingJournal, code)
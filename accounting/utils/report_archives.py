@@ -0,0 +1,176 @@
+import gzip
+import json
+import logging
+import threading
+from itertools import groupby
+from operator import itemgetter
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+from django.utils.dateparse import parse_date
+from rest_framework.utils.encoders import JSONEncoder
+from accounting.models import ArchivedReport, FiscalYear, FiscalYearReportArchive
+from accounting.utils.financial_statements import (
+    generate_financial_statements,
+    generate_trial_balance,
+    group_ledger_lines,
+    iter_general_ledger_lines
+)
+
+logger = logging.getLogger(__name__)
+
+
+def encode_report(data):
+    """
+    Serialize a report to gzip-compressed JSON; returns (content, uncompressed size).
+    
+    The REST framework encoder is used so an archived report renders exactly
+    like the computed one.
+    """
+    raw = json.dumps(data, cls=JSONEncoder, separators=(',', ':')).encode('utf-8')
+    return gzip.compress(raw), len(raw)
+
+
+def _archive(fiscal_year, report, data, key=''):
+    content, size = encode_report(data)
+    return FiscalYearReportArchive(
+        fiscal_year=fiscal_year,
+        report=report,
+        key=key,
+        ledger_version=fiscal_year.ledger_version,
+        content=content,
+        size=size
+    )
+
+
+def archive_fiscal_year(fiscal_year, batch_size=100):
+    """
+    Precompute and store the reports of a fiscal year.
+    
+    Builds the trial balance, income statement, balance sheet and the general
+    ledger of every account, and replaces the existing archives of the year.
+    The general ledger is streamed in a single pass over the lines ordered by
+    account: each account is archived before the next one is read, and at most
+    batch_size archives are held in memory.
+    
+    This is a batch job: it runs in the close_fiscal_year command, or in a
+    background thread started once a close is committed (see
+    start_archive_thread), never in the saving request.
+    
+    Parameters:
+    - fiscal_year: FiscalYear instance, normally closed
+    - batch_size: Number of archives inserted per query
+    
+    Returns:
+    - int: Number of archives written
+    """
+    # The archives record the version they were built from
+    fiscal_year.refresh_from_db(fields=['ledger_version'])
+    count = 0
+    
+    with transaction.atomic():
+        FiscalYearReportArchive.objects.filter(fiscal_year=fiscal_year).delete()
+        statements = generate_financial_statements(fiscal_year)
+        pending = [
+            _archive(fiscal_year, ArchivedReport.TRIAL_BALANCE, generate_trial_balance(fiscal_year)),
+            _archive(fiscal_year, ArchivedReport.INCOME_STATEMENT, statements['income_statement']),
+            _archive(fiscal_year, ArchivedReport.BALANCE_SHEET, statements['balance_sheet']),
+        ]
+        
+        lines = iter_general_ledger_lines(fiscal_year, by_account=True)
+        for account_number, account_lines in groupby(lines, key=itemgetter('account_number')):
+            pending.append(_archive(
+                fiscal_year, ArchivedReport.GENERAL_LEDGER, group_ledger_lines(account_lines), account_number
+            ))
+            if len(pending) >= batch_size:
+                FiscalYearReportArchive.objects.bulk_create(pending)
+                count += len(pending)
+                pending = []
+        FiscalYearReportArchive.objects.bulk_create(pending)
+        count += len(pending)
+    return count
+
+
+def fiscal_years_to_archive():
+    """Return the closed fiscal years whose archives are missing or older than their ledger."""
+    current = FiscalYearReportArchive.objects.filter(
+        fiscal_year=OuterRef('pk'),
+        report=ArchivedReport.TRIAL_BALANCE,
+        ledger_version=OuterRef('ledger_version')
+    )
+    return FiscalYear.objects.filter(is_closed=True).exclude(Exists(current)).order_by('year')
+
+
+def archive_if_stale(fiscal_year_id):
+    """
+    Archive a closed fiscal year unless its archives match its ledger version.
+    
+    Returns:
+    - int: Number of archives written (0 when they were current)
+    """
+    count = 0
+    for fiscal_year in fiscal_years_to_archive().filter(pk=fiscal_year_id):
+        count += archive_fiscal_year(fiscal_year)
+    return count
+
+
+def start_archive_thread(fiscal_year_id):
+    """
+    Archive a closed fiscal year in a background thread, with its own connection.
+    
+    A build lost with the process (restart, crash) is picked up by
+    close_fiscal_year --pending, which should also run from cron.
+    
+    Returns:
+    - The started Thread
+    """
+    def run():
+        try:
+            archive_if_stale(fiscal_year_id)
+        except Exception:
+            logger.exception("Archiving fiscal year %s failed, close_fiscal_year --pending will retry", fiscal_year_id)
+        finally:
+            connection.close()
+    
+    thread = threading.Thread(target=run, name=f'archive-fiscal-year-{fiscal_year_id}', daemon=True)
+    thread.start()
+    return thread
+
+
+def delete_fiscal_year_archives(fiscal_year):
+    """Delete the archives of a fiscal year, e.g. when it is reopened."""
+    FiscalYearReportArchive.objects.filter(fiscal_year=fiscal_year).delete()
+
+
+def get_archived_report(fiscal_year, report, as_of_date=None, key=''):
+    """
+    Return a precomputed report of a closed fiscal year, or None.
+    
+    An archive is only served for the full year (no as_of_date, or an
+    as_of_date on or after the end of the year), and only if the ledger has
+    not changed since it was built. Open fiscal years return None without
+    querying the database.
+    
+    Parameters:
+    - fiscal_year: FiscalYear instance, freshly loaded
+    - report: ArchivedReport value
+    - as_of_date: Optional as-of date requested
+    - key: Account number for the general ledger, empty otherwise
+    
+    Returns:
+    - The decoded report, or None when it has to be computed
+    """
+    if not fiscal_year.is_closed:
+        return None
+    if as_of_date:
+        if isinstance(as_of_date, str):
+            as_of_date = parse_date(as_of_date)
+        if as_of_date is None or as_of_date < fiscal_year.end_date:
+            return None
+    
+    archive = FiscalYearReportArchive.objects.filter(
+        fiscal_year=fiscal_year,
+        report=report,
+        key=key,
+        ledger_version=fiscal_year.ledger_version
+    ).only('content').first()
+    return archive.load() if archive else None
@@ -0,0 +1,121 @@
+import hashlib
+import json
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import InvalidCacheBackendError
+
+
+# Cache alias used for report results (see CACHES in the settings)
+DEFAULT_REPORT_CACHE_ALIAS = 'accounting_reports'
+
+# Keys of the hit/miss counters, stored in the report cache itself so that
+# processes sharing a file-based cache share their statistics
+_HITS_KEY = 'report-cache:hits'
+_MISSES_KEY = 'report-cache:misses'
+
+_MISSING = object()
+
+
+def get_report_cache():
+    """
+    Return the cache backend used for report results, or None if caching is disabled.
+    
+    The alias is read from the ACCOUNTING_REPORT_CACHE setting (defaults to
+    'accounting_reports'); setting it to None, or not configuring the alias in
+    CACHES, disables the report cache.
+    """
+    alias = getattr(settings, 'ACCOUNTING_REPORT_CACHE', DEFAULT_REPORT_CACHE_ALIAS)
+    if not alias:
+        return None
+    try:
+        return caches[alias]
+    except InvalidCacheBackendError:
+        return None
+
+
+def report_cache_key(report, fiscal_year, as_of_date=None, params=None):
+    """
+    Build the cache key of a report result.
+    
+    The key includes the ledger version of the fiscal year: posting, reversing
+    or cancelling an entry bumps it, so results cached before the change are
+    never served again and simply expire.
+    
+    Parameters:
+    - report: Report name (e.g. 'trial_balance')
+    - fiscal_year: FiscalYear instance, freshly loaded
+    - as_of_date: Optional as-of date of the report
+    - params: Optional dict of other report parameters
+    """
+    params_digest = hashlib.sha1(
+        json.dumps(params or {}, sort_keys=True, default=str).encode('utf-8')
+    ).hexdigest()
+    return f'report:{report}:{fiscal_year.pk}:v{fiscal_year.ledger_version}:{as_of_date or ""}:{params_digest}'
+
+
+def _count(cache, key):
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr()
+        cache.set(key, 1, timeout=None)
+
+
+def cached_report(report, fiscal_year, build, as_of_date=None, params=None):
+    """
+    Return a report result from the cache, building and storing it on a miss.
+    
+    Parameters:
+    - report: Report name
+    - fiscal_year: FiscalYear instance, freshly loaded
+    - build: Callable without arguments returning the report result
+    - as_of_date: Optional as-of date of the report
+    - params: Optional dict of other report parameters
+    
+    Returns:
+    - The report result
+    """
+    cache = get_report_cache()
+    if cache is None:
+        return build()
+    
+    key = report_cache_key(report, fiscal_year, as_of_date, params)
+    result = cache.get(key, _MISSING)
+    if result is not _MISSING:
+        _count(cache, _HITS_KEY)
+        return result
+    
+    _count(cache, _MISSES_KEY)
+    result = build()
+    cache.set(key, result)
+    return result
+
+
+def report_cache_stats():
+    """
+    Return the hit/miss counters of the report cache.
+    
+    Returns:
+    - Dict with enabled, backend, hits, misses and hit_ratio
+    """
+    cache = get_report_cache()
+    if cache is None:
+        return {'enabled': False, 'backend': None, 'hits': 0, 'misses': 0, 'hit_ratio': None}
+    
+    hits = cache.get(_HITS_KEY, 0)
+    misses = cache.get(_MISSES_KEY, 0)
+    return {
+        'enabled': True,
+        'backend': f'{type(cache).__module__}.{type(cache).__name__}',
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else None
+    }
+
+
+def reset_report_cache_stats():
+    """Reset the hit/miss counters of the report cache."""
+    cache = get_report_cache()
+    if cache is not None:
+        cache.delete_many([_HITS_KEY, _MISSES_KEY])
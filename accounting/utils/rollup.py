@@ -0,0 +1,142 @@
+from bisect import bisect_left, bisect_right
+from decimal import Decimal
+from accounting.models import (
+    AccountingClass,
+    AccountingChapter,
+    AccountingSection,
+    GeneralLedgerAccount
+)
+from accounting.utils.financial_statements import calculate_account_balances
+
+
+# Levels of the chart of accounts, from the top; the code of each level is
+# the account number prefix of that length (class 6, chapter 60, section 606)
+ROLLUP_LEVELS = ('class', 'chapter', 'section', 'account')
+
+_LEVEL_CHILDREN = {'class': 'chapters', 'chapter': 'sections', 'section': 'accounts'}
+_LEVEL_PREFIX_LENGTH = {'class': 1, 'chapter': 2, 'section': 3}
+
+
+def _hierarchy_names():
+    """Return the names of the classes, chapters and sections by code, in one query."""
+    rows = AccountingClass.objects.order_by().values_list('code', 'name').union(
+        AccountingChapter.objects.order_by().values_list('code', 'name'),
+        AccountingSection.objects.order_by().values_list('code', 'name'),
+        all=True
+    )
+    return dict(rows)
+
+
+def generate_rollup_balances(fiscal_year, as_of_date=None, journal_code=None, depth='account',
+                             include_zero_balances=False):
+    """
+    Generate the balances of every level of the chart of accounts.
+    
+    Account balances come from one grouped aggregate (see calculate_account_balances);
+    they are then summed up the class > chapter > section > account tree in memory,
+    each level being identified by the account number prefix of its length.
+    
+    Parameters:
+    - fiscal_year: FiscalYear instance
+    - as_of_date: Optional date to calculate the balances as of a specific date
+    - journal_code: Optional journal code
+    - depth: Deepest level returned: 'class', 'chapter', 'section' or 'account'
+    - include_zero_balances: Whether to include accounts with a zero balance
+    
+    Returns:
+    - Dict with the class nodes and the grand total. Each node has code, name and
+      balance (positive for debit), and its children under "chapters", "sections"
+      or "accounts" down to the requested depth.
+    """
+    if depth not in ROLLUP_LEVELS:
+        raise ValueError(f"Invalid depth: {depth}. Expected one of {', '.join(ROLLUP_LEVELS)}")
+    
+    balances = calculate_account_balances(fiscal_year, as_of_date, journal_code)
+    names = _hierarchy_names()
+    accounts = GeneralLedgerAccount.objects.order_by('account_number').values_list('id', 'account_number', 'full_name')
+    if not include_zero_balances:
+        accounts = accounts.filter(id__in=[account_id for account_id, balance in balances.items() if balance])
+    
+    deepest = ROLLUP_LEVELS.index(depth)
+    classes = []
+    total = Decimal('0.00')
+    # Path of the nodes currently open at each level, reused while the prefix matches
+    path = {}
+    for account_id, account_number, full_name in accounts:
+        balance = balances.get(account_id, Decimal('0.00'))
+        total += balance
+        siblings = classes
+        for level in ROLLUP_LEVELS[:deepest + 1]:
+            if level == 'account':
+                siblings.append({'code': account_number, 'name': full_name, 'balance': balance})
+                break
+            code = account_number[:_LEVEL_PREFIX_LENGTH[level]]
+            node = path.get(level)
+            if node is None or node['code'] != code:
+                node = {'code': code, 'name': names.get(code, ''), 'balance': Decimal('0.00')}
+                if level != depth:
+                    node[_LEVEL_CHILDREN[level]] = []
+                siblings.append(node)
+                path[level] = node
+                # A new node closes every deeper open node
+                for deeper in ROLLUP_LEVELS[ROLLUP_LEVELS.index(level) + 1:]:
+                    path.pop(deeper, None)
+            node['balance'] += balance
+            if level == depth:
+                break
+            siblings = node[_LEVEL_CHILDREN[level]]
+    
+    return {
+        'depth': depth,
+        'classes': classes,
+        'total': total,
+        'is_balanced': total == Decimal('0.00')
+    }
+
+
+class AccountPrefixIndex:
+    """
+    Prefix-sum index over account balances.
+    
+    Account numbers are kept sorted with the running total of their balances, so
+    the accounts sharing a prefix form a contiguous range and the sum of any
+    prefix (6, 60, 606, 6061, ...) is the difference of two running totals
+    found by binary search, whatever its depth.
+    """
+    
+    def __init__(self, balances_by_number):
+        """
+        Parameters:
+        - balances_by_number: Dict mapping account number to its balance
+        """
+        self.numbers = sorted(balances_by_number)
+        self.cumulative = [Decimal('0.00')]
+        for number in self.numbers:
+            self.cumulative.append(self.cumulative[-1] + balances_by_number[number])
+    
+    def __len__(self):
+        return len(self.numbers)
+    
+    def prefix_sum(self, prefix):
+        """Return the total balance of the accounts whose number starts with prefix."""
+        low = bisect_left(self.numbers, prefix)
+        high = bisect_right(self.numbers, prefix + '\U0010ffff')
+        return self.cumulative[high] - self.cumulative[low]
+    
+    def prefix_sums(self, prefixes):
+        """Return a dict mapping each prefix to its total balance."""
+        return {prefix: self.prefix_sum(prefix) for prefix in prefixes}
+
+
+def build_prefix_index(fiscal_year, as_of_date=None, journal_code=None):
+    """
+    Build the prefix-sum index of the account balances of a fiscal year.
+    
+    Costs the grouped balance query plus one query for the account numbers.
+    The result is meant to be cached per ledger version (see cached_report).
+    """
+    balances = calculate_account_balances(fiscal_year, as_of_date, journal_code)
+    numbers = GeneralLedgerAccount.objects.filter(
+        id__in=[account_id for account_id, balance in balances.items() if balance]
+    ).values_list('id', 'account_number')
+    return AccountPrefixIndex({number: balances[account_id] for account_id, number in numbers})
@@ -0,0 +1,73 @@
+import csv
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from django.http import StreamingHttpResponse
+
+
+# Streaming formats supported by the report endpoints
+STREAM_FORMATS = ('ndjson', 'csv')
+
+STREAM_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def _json_default(value):
+    """Serialize the values returned by the ORM that json does not handle."""
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def iter_ndjson(rows):
+    """Yield one JSON document per row, newline terminated."""
+    for row in rows:
+        yield json.dumps(row, default=_json_default) + '\n'
+
+
+class _Echo:
+    """File-like object whose write() returns the value, used to stream csv.writer output."""
+    
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows, columns):
+    """
+    Yield CSV lines for rows, starting with a header line.
+    
+    Parameters:
+    - rows: Iterable of dicts
+    - columns: Column names, in output order
+    """
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([row.get(column) for column in columns])
+
+
+def streaming_response(rows, stream_format, columns, filename=None):
+    """
+    Build a StreamingHttpResponse emitting rows as NDJSON or CSV.
+    
+    Rows are consumed lazily while the response is sent, so a report of any
+    size is served with constant memory as long as rows is an iterator.
+    
+    Parameters:
+    - rows: Iterable of dicts
+    - stream_format: 'ndjson' or 'csv'
+    - columns: Column names, used for the CSV header and column order
+    - filename: Optional download file name, without extension
+    """
+    if stream_format == 'csv':
+        content = iter_csv(rows, columns)
+    else:
+        content = iter_ndjson(rows)
+    response = StreamingHttpResponse(content, content_type=STREAM_CONTENT_TYPES[stream_format])
+    if filename:
+        response['Content-Disposition'] = f'attachment; filename="{filename}.{stream_format}"'
+    return response
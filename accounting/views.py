@@ -1,8 +1,12 @@
 from rest_framework import viewsets, permissions, filters, status
 from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db import transaction
+from django.db.models import Prefetch
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from accounting.models import (
     AccountingClass,
     AccountingChapter,
@@ -12,7 +16,8 @@ from accounting.models import (
     AccountingType,
     AccountingJournal,
     AccountingEntry,
-    AccountingEntryLine
+    AccountingEntryLine,
+    ArchivedReport
 )
 from accounting.models.reference_data import (
     ClientAccountType,
@@ -34,7 +39,9 @@ from accounting.serializers import (
     AccountingTypeSerializer,
     AccountingJournalSerializer,
     AccountingEntrySerializer,
+    AccountingEntryCompactSerializer,
     AccountingEntryCreateUpdateSerializer,
+    locked_entry_error,
     AccountingEntryLineSerializer,
     ClientAccountTypeSerializer,
     AccountingEntryTypeSerializer,
@@ -46,9 +53,39 @@ from accounting.serializers import (
     PayerTypeSerializer,
     MunicipalitySerializer
 )
+from accounting.mixins import ConditionalReferenceMixin
+from accounting.parsers import NDJSONParser
+from accounting.utils.entry_import import ATOMIC_MODES, ENTRY_CHUNK_SIZE, import_entries
+from accounting.utils.entry_lines import LINE_BATCH_SIZE, create_entry_lines
+from accounting.utils.ledger_balances import bump_ledger_version, post_entry
+from accounting.utils.report_archives import get_archived_report
+from accounting.utils.report_cache import cached_report, report_cache_stats
+from accounting.utils.streaming import STREAM_FORMATS, streaming_response
 
 
-class AccountingClassViewSet(viewsets.ModelViewSet):
+def invalid_date_response(*values):
+    """
+    Return a 400 response for the first value that is not a YYYY-MM-DD date.
+    
+    Empty values are skipped. parse_date returns None for a malformed value
+    and raises ValueError for a well-formed but impossible one (2024-13-45).
+    
+    Returns:
+    - Response, or None when every value is a valid date
+    """
+    for value in values:
+        if not value:
+            continue
+        try:
+            valid = parse_date(str(value)) is not None
+        except ValueError:
+            valid = False
+        if not valid:
+            return Response({"error": f"Invalid date: {value}"}, status=status.HTTP_400_BAD_REQUEST)
+    return None
+
+
+class AccountingClassViewSet(ConditionalReferenceMixin, viewsets.ModelViewSet):
     queryset = AccountingClass.objects.all()
     serializer_class = AccountingClassSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -59,7 +96,7 @@ class AccountingClassViewSet(viewsets.ModelViewSet):
     ordering = ['code']
 
 
-class AccountingChapterViewSet(viewsets.ModelViewSet):
+class AccountingChapterViewSet(ConditionalReferenceMixin, viewsets.ModelViewSet):
     queryset = AccountingChapter.objects.all()
     serializer_class = AccountingChapterSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -70,7 +107,7 @@ class AccountingChapterViewSet(viewsets.ModelViewSet):
     ordering = ['code']
 
 
-class AccountingSectionViewSet(viewsets.ModelViewSet):
+class AccountingSectionViewSet(ConditionalReferenceMixin, viewsets.ModelViewSet):
     queryset = AccountingSection.objects.all()
     serializer_class = AccountingSectionSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -81,7 +118,7 @@ class AccountingSectionViewSet(viewsets.ModelViewSet):
     ordering = ['code']
 
 
-class GeneralLedgerAccountViewSet(viewsets.ModelViewSet):
+class GeneralLedgerAccountViewSet(ConditionalReferenceMixin, viewsets.ModelViewSet):
     queryset = GeneralLedgerAccount.objects.all()
     serializer_class = GeneralLedgerAccountSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -114,6 +151,51 @@ class GeneralLedgerAccountViewSet(viewsets.ModelViewSet):
             
         serializer = self.get_serializer(accounts, many=True)
         return Response(serializer.data)
+    
+    @action(detail=True, methods=['post'])
+    def reconcile(self, request, pk=None):
+        """
+        Letter the open lines of the account automatically.
+        
+        Body parameters: auxiliary_id, fiscal_year, reconciliation_type (code),
+        subsets (default true), max_subset_size and dry_run (default false).
+        """
+        from accounting.utils.lettrage import MAX_SUBSET_SIZE, reconcile_account
+        
+        account = self.get_object()
+        auxiliary_id = request.data.get('auxiliary_id')
+        fiscal_year_id = request.data.get('fiscal_year')
+        reconciliation_type_code = request.data.get('reconciliation_type')
+        subsets = str(request.data.get('subsets', 'true')).lower() == 'true'
+        dry_run = str(request.data.get('dry_run', 'false')).lower() == 'true'
+        try:
+            max_subset_size = int(request.data.get('max_subset_size', MAX_SUBSET_SIZE))
+        except (TypeError, ValueError):
+            return Response({"error": "max_subset_size must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        fiscal_year = None
+        if fiscal_year_id:
+            try:
+                fiscal_year = FiscalYear.objects.get(pk=fiscal_year_id)
+            except FiscalYear.DoesNotExist:
+                return Response({"error": "Fiscal year not found"}, status=status.HTTP_404_NOT_FOUND)
+        
+        reconciliation_type = None
+        if reconciliation_type_code:
+            try:
+                reconciliation_type = ReconciliationType.objects.get(code=reconciliation_type_code)
+            except ReconciliationType.DoesNotExist:
+                return Response({"error": "Reconciliation type not found"}, status=status.HTTP_404_NOT_FOUND)
+        
+        try:
+            result = reconcile_account(
+                account, auxiliary_id, fiscal_year, reconciliation_type,
+                subsets=subsets, max_subset_size=max_subset_size, dry_run=dry_run
+            )
+        except ValueError as e:
+            # Lines lettered by someone else while the matches were computed
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        return Response(result)
 
 
 class FiscalYearViewSet(viewsets.ModelViewSet):
@@ -140,7 +222,7 @@ class FiscalYearViewSet(viewsets.ModelViewSet):
             )
 
 
-class AccountingTypeViewSet(viewsets.ModelViewSet):
+class AccountingTypeViewSet(ConditionalReferenceMixin, viewsets.ModelViewSet):
     queryset = AccountingType.objects.all()
     serializer_class = AccountingTypeSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -151,10 +233,12 @@ class AccountingTypeViewSet(viewsets.ModelViewSet):
     ordering = ['code']
 
 
-class AccountingJournalViewSet(viewsets.ModelViewSet):
+class AccountingJournalViewSet(ConditionalReferenceMixin, viewsets.ModelViewSet):
     queryset = AccountingJournal.objects.all()
     serializer_class = AccountingJournalSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # Journal ids are prefixed with the code of their accounting type (GEN ACH)
+    conditional_related_models = [AccountingType]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['code', 'is_opening_balance', 'company_code']
     search_fields = ['code', 'short_name', 'name']
@@ -171,26 +255,118 @@ class AccountingEntryViewSet(viewsets.ModelViewSet):
     ordering_fields = ['entry_date', 'entry_number', 'posting_date']
     ordering = ['-entry_date', '-entry_number']
     
+    def is_compact_view(self):
+        """Whether the compact representation (?view=compact) was requested for a read."""
+        return self.action in ['list', 'retrieve'] and self.request.query_params.get('view') == 'compact'
+    
+    def get_queryset(self):
+        """
+        Plan the joins and prefetches of the representation up front.
+        
+        Every page then costs a fixed number of queries whatever its number of
+        entries and lines.
+        """
+        queryset = super().get_queryset()
+        if self.action not in ['list', 'retrieve']:
+            return queryset
+        if self.is_compact_view():
+            lines = AccountingEntryLine.objects.select_related('account', 'municipality')
+        else:
+            queryset = queryset.select_related(
+                'journal', 'fiscal_year', 'entry_type', 'engagement_type', 'activity', 'service_type'
+            )
+            # Reference codes of the lines are read from the in-memory registry
+            lines = AccountingEntryLine.objects.select_related(
+                'account__section__chapter__accounting_class',
+                'municipality'
+            )
+        return queryset.prefetch_related(Prefetch('lines', queryset=lines.order_by('line_number')))
+    
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
             return AccountingEntryCreateUpdateSerializer
+        if self.is_compact_view():
+            return AccountingEntryCompactSerializer
         return AccountingEntrySerializer
     
-    @action(detail=True, methods=['post'])
-    def validate(self, request, pk=None):
-        """Validate an accounting entry."""
-        entry = self.get_object()
+    def destroy(self, request, *args, **kwargs):
+        """Delete a draft or validated entry; posted entries are reversed instead."""
+        with transaction.atomic():
+            entry = self.get_object()
+            if not AccountingEntry.objects.select_for_update().get(pk=entry.pk).is_editable:
+                return Response({"detail": locked_entry_error(entry)}, status=status.HTTP_400_BAD_REQUEST)
+            self.perform_destroy(entry)
+            bump_ledger_version(entry.fiscal_year_id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    
+    @action(detail=False, methods=['post'], url_path='bulk', parser_classes=[JSONParser, NDJSONParser])
+    def bulk(self, request):
+        """
+        Import many entries with their lines in one call.
+        
+        The body is a JSON array of entries or NDJSON (one entry per line,
+        Content-Type: application/x-ndjson). An NDJSON line that cannot be parsed
+        ends the import; the report gives its position in parse_error. Query parameters:
+        - atomic: 'per_chunk' (default) or 'all'
+        - chunk_size: number of entries written per transaction
+        """
+        atomic = request.query_params.get('atomic', 'per_chunk')
+        if atomic not in ATOMIC_MODES:
+            return Response(
+                {"detail": f"atomic must be one of: {', '.join(ATOMIC_MODES)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            chunk_size = int(request.query_params.get('chunk_size', ENTRY_CHUNK_SIZE))
+        except ValueError:
+            chunk_size = 0
+        if chunk_size < 1:
+            return Response(
+                {"detail": "chunk_size must be a positive integer."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Check if entry is balanced
-        if not entry.is_balanced:
+        entries = request.data
+        if isinstance(entries, dict):
             return Response(
-                {"detail": "Entry is not balanced. Total debits must equal total credits."},
+                {"detail": "Expected a JSON array or NDJSON stream of entries."},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Update status to validated
-        entry.status = 'validated'
-        entry.save()
+        report = import_entries(entries, atomic=atomic, chunk_size=chunk_size)
+        if not report['failed'] and not report['parse_error']:
+            response_status = status.HTTP_201_CREATED
+        elif report['created']:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response(report, status=response_status)
+    
+    @action(detail=True, methods=['post'])
+    def validate(self, request, pk=None):
+        """Validate a draft accounting entry."""
+        with transaction.atomic():
+            entry = self.get_object()
+            # Locked so that a concurrent post cannot be moved back to validated
+            entry = AccountingEntry.objects.select_for_update().get(pk=entry.pk)
+            if not entry.is_editable:
+                return Response({"detail": locked_entry_error(entry)}, status=status.HTTP_400_BAD_REQUEST)
+            if entry.status != 'draft':
+                return Response(
+                    {"detail": "Only draft entries can be validated."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            # Check if entry is balanced
+            if not entry.is_balanced:
+                return Response(
+                    {"detail": "Entry is not balanced. Total debits must equal total credits."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            # Update status to validated
+            entry.status = 'validated'
+            entry.save()
         
         serializer = self.get_serializer(entry)
         return Response(serializer.data)
@@ -207,10 +383,12 @@ class AccountingEntryViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Update status to posted
-        entry.status = 'posted'
-        entry.posting_date = request.data.get('posting_date', None) or timezone.now().date()
-        entry.save()
+        # Update status to posted and record the lines in the account balances
+        try:
+            post_entry(entry, request.data.get('posting_date', None))
+        except ValueError as e:
+            # Posted or changed by a concurrent request since it was read
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         serializer = self.get_serializer(entry)
         return Response(serializer.data)
@@ -228,8 +406,10 @@ class AccountingEntryViewSet(viewsets.ModelViewSet):
             )
         
         # Update status to cancelled
-        entry.status = 'cancelled'
-        entry.save()
+        with transaction.atomic():
+            entry.status = 'cancelled'
+            entry.save()
+            bump_ledger_version(entry.fiscal_year_id)
         
         serializer = self.get_serializer(entry)
         return Response(serializer.data)
@@ -246,38 +426,50 @@ class AccountingEntryViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Create reversing entry
-        reversing_entry = AccountingEntry.objects.create(
-            journal=original_entry.journal,
-            fiscal_year=original_entry.fiscal_year,
-            entry_date=request.data.get('entry_date', None) or timezone.now().date(),
-            reference=f"Reversal of {original_entry.entry_number}: {original_entry.reference}",
-            status='draft',
-            is_reversing_entry=True,
-            original_entry=original_entry,
-            source_document=original_entry.source_document,
-            source_document_id=original_entry.source_document_id
-        )
-        
-        # Create reversed lines
-        for line in original_entry.lines.all():
-            AccountingEntryLine.objects.create(
-                entry=reversing_entry,
-                account=line.account,
-                line_number=line.line_number,
-                description=f"Reversal of {original_entry.entry_number}-{line.line_number}: {line.description}",
-                is_debit=not line.is_debit,  # Reverse debit/credit
-                amount=line.amount,
-                auxiliary_account_type=line.auxiliary_account_type,
-                auxiliary_account_id=line.auxiliary_account_id
+        with transaction.atomic():
+            # Create reversing entry
+            reversing_entry = AccountingEntry.objects.create(
+                journal=original_entry.journal,
+                fiscal_year=original_entry.fiscal_year,
+                entry_date=request.data.get('entry_date', None) or timezone.now().date(),
+                reference=f"Reversal of {original_entry.entry_number}: {original_entry.reference}",
+                status='draft',
+                is_reversing_entry=True,
+                original_entry=original_entry,
+                source_document=original_entry.source_document,
+                source_document_id=original_entry.source_document_id,
+                # Same analytical dimensions, so that posting it offsets the original
+                entry_type_id=original_entry.entry_type_id,
+                engagement_type_id=original_entry.engagement_type_id,
+                activity_id=original_entry.activity_id,
+                service_type_id=original_entry.service_type_id
             )
+            
+            # Create reversed lines in batches
+            create_entry_lines(reversing_entry, (
+                {
+                    'account_id': line.account_id,
+                    'description': f"Reversal of {original_entry.entry_number}-{line.line_number}: {line.description}",
+                    'is_debit': not line.is_debit,  # Reverse debit/credit
+                    'amount': line.amount,
+                    'auxiliary_account_type_id': line.auxiliary_account_type_id,
+                    'auxiliary_account_id': line.auxiliary_account_id,
+                    'client_account_type_id': line.client_account_type_id,
+                    'payer_type_id': line.payer_type_id,
+                    'pricing_type_id': line.pricing_type_id,
+                    'analytical_code': line.analytical_code,
+                    'municipality_id': line.municipality_id
+                }
+                for line in original_entry.lines.order_by('line_number').iterator(chunk_size=LINE_BATCH_SIZE)
+            ))
+            bump_ledger_version(reversing_entry.fiscal_year_id)
         
         serializer = self.get_serializer(reversing_entry)
         return Response(serializer.data)
 
 
 # Reference data ViewSets
-class ClientAccountTypeViewSet(viewsets.ModelViewSet):
+class ClientAccountTypeViewSet(ConditionalReferenceMixin, viewsets.ModelViewSet):
     queryset = ClientAccountType.objects.all()
     serializer_class = ClientAccountTypeSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -288,7 +480,7 @@ class ClientAccountTypeViewSet(viewsets.ModelViewSet):
     ordering = ['code']
 
 
-class AccountingEntryTypeViewSet(viewsets.ModelViewSet):
+class AccountingEntryTypeViewSet(ConditionalReferenceMixin, viewsets.ModelViewSet):
     queryset = AccountingEntryType.objects.all()
     serializer_class = AccountingEntryTypeSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -299,7 +491,7 @@ class AccountingEntryTypeViewSet(viewsets.ModelViewSet):
     ordering = ['code']
 
 
-class EngagementTypeViewSet(viewsets.ModelViewSet):
+class EngagementTypeViewSet(ConditionalReferenceMixin, viewsets.ModelViewSet):
     queryset = EngagementType.objects.all()
     serializer_class = EngagementTypeSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -310,7 +502,7 @@ class EngagementTypeViewSet(viewsets.ModelViewSet):
     ordering = ['code']
 
 
-class ReconciliationTypeViewSet(viewsets.ModelViewSet):
+class ReconciliationTypeViewSet(ConditionalReferenceMixin, viewsets.ModelViewSet):
     queryset = ReconciliationType.objects.all()
     serializer_class = ReconciliationTypeSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -321,7 +513,7 @@ class ReconciliationTypeViewSet(viewsets.ModelViewSet):
     ordering = ['code']
 
 
-class ActivityViewSet(viewsets.ModelViewSet):
+class ActivityViewSet(ConditionalReferenceMixin, viewsets.ModelViewSet):
     queryset = Activity.objects.all()
     serializer_class = ActivitySerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -332,7 +524,7 @@ class ActivityViewSet(viewsets.ModelViewSet):
     ordering = ['code']
 
 
-class ServiceTypeViewSet(viewsets.ModelViewSet):
+class ServiceTypeViewSet(ConditionalReferenceMixin, viewsets.ModelViewSet):
     queryset = ServiceType.objects.all()
     serializer_class = ServiceTypeSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -343,7 +535,7 @@ class ServiceTypeViewSet(viewsets.ModelViewSet):
     ordering = ['code']
 
 
-class PricingTypeViewSet(viewsets.ModelViewSet):
+class PricingTypeViewSet(ConditionalReferenceMixin, viewsets.ModelViewSet):
     queryset = PricingType.objects.all()
     serializer_class = PricingTypeSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -354,7 +546,7 @@ class PricingTypeViewSet(viewsets.ModelViewSet):
     ordering = ['code']
 
 
-class PayerTypeViewSet(viewsets.ModelViewSet):
+class PayerTypeViewSet(ConditionalReferenceMixin, viewsets.ModelViewSet):
     queryset = PayerType.objects.all()
     serializer_class = PayerTypeSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -365,7 +557,7 @@ class PayerTypeViewSet(viewsets.ModelViewSet):
     ordering = ['code']
 
 
-class MunicipalityViewSet(viewsets.ModelViewSet):
+class MunicipalityViewSet(ConditionalReferenceMixin, viewsets.ModelViewSet):
     queryset = Municipality.objects.all()
     serializer_class = MunicipalitySerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -374,6 +566,38 @@ class MunicipalityViewSet(viewsets.ModelViewSet):
     search_fields = ['insee_code', 'name', 'postal_code']
     ordering_fields = ['insee_code', 'name']
     ordering = ['insee_code']
+    
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """
+        Type-ahead search on municipality names, postal codes and INSEE codes.
+        
+        Served from the in-memory municipality index: name and postal code prefixes
+        (accents and case ignored), exact INSEE code, and trigram matching of
+        misspelled names with fuzzy=true.
+        """
+        from accounting.utils.municipality_index import (
+            AUTOCOMPLETE_LIMIT,
+            MAX_AUTOCOMPLETE_LIMIT,
+            get_municipality_index
+        )
+        
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"detail": "q is required."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.query_params.get('limit', AUTOCOMPLETE_LIMIT))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= MAX_AUTOCOMPLETE_LIMIT:
+            return Response(
+                {"detail": f"limit must be an integer between 1 and {MAX_AUTOCOMPLETE_LIMIT}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        fuzzy = request.query_params.get('fuzzy', 'false').lower() == 'true'
+        
+        records = get_municipality_index().search(query, limit=limit, fuzzy=fuzzy)
+        return Response([record._asdict() for record in records])
 
 
 class AccountingReportViewSet(viewsets.ViewSet):
@@ -393,33 +617,83 @@ class AccountingReportViewSet(viewsets.ViewSet):
         
         if not fiscal_year_id:
             return Response({"error": "fiscal_year parameter is required"}, status=status.HTTP_400_BAD_REQUEST)
+        invalid = invalid_date_response(as_of_date)
+        if invalid is not None:
+            return invalid
         
         try:
             fiscal_year = FiscalYear.objects.get(pk=fiscal_year_id)
         except FiscalYear.DoesNotExist:
             return Response({"error": "Fiscal year not found"}, status=status.HTTP_404_NOT_FOUND)
         
-        trial_balance = generate_trial_balance(fiscal_year, as_of_date, include_zero_balances)
+        if not include_zero_balances:
+            archived = get_archived_report(fiscal_year, ArchivedReport.TRIAL_BALANCE, as_of_date)
+            if archived is not None:
+                return Response(archived)
+        
+        trial_balance = cached_report(
+            'trial_balance', fiscal_year,
+            lambda: generate_trial_balance(fiscal_year, as_of_date, include_zero_balances),
+            as_of_date=as_of_date,
+            params={'include_zero_balances': include_zero_balances}
+        )
         return Response(trial_balance)
     
     @action(detail=False, methods=['get'])
     def general_ledger(self, request):
-        """Generate a general ledger report."""
-        from accounting.utils.financial_statements import generate_general_ledger
+        """
+        Generate a general ledger report.
+        
+        With stream=ndjson or stream=csv the lines are streamed one per row in
+        (entry_date, entry_number, line_number) order. Each row carries a cursor:
+        pass the last one received as after= to resume an interrupted download.
+        """
+        from accounting.utils.financial_statements import (
+            GENERAL_LEDGER_COLUMNS,
+            decode_ledger_cursor,
+            generate_general_ledger,
+            iter_general_ledger_lines
+        )
         
         fiscal_year_id = request.query_params.get('fiscal_year')
         account_number = request.query_params.get('account')
         start_date = request.query_params.get('start_date')
         end_date = request.query_params.get('end_date')
+        stream_format = request.query_params.get('stream')
+        after = request.query_params.get('after')
         
         if not fiscal_year_id:
             return Response({"error": "fiscal_year parameter is required"}, status=status.HTTP_400_BAD_REQUEST)
+        invalid = invalid_date_response(start_date, end_date)
+        if invalid is not None:
+            return invalid
         
         try:
             fiscal_year = FiscalYear.objects.get(pk=fiscal_year_id)
         except FiscalYear.DoesNotExist:
             return Response({"error": "Fiscal year not found"}, status=status.HTTP_404_NOT_FOUND)
         
+        if stream_format:
+            if stream_format not in STREAM_FORMATS:
+                return Response(
+                    {"error": f"stream must be one of: {', '.join(STREAM_FORMATS)}"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if after:
+                try:
+                    decode_ledger_cursor(after)
+                except ValueError as exc:
+                    return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+            lines = iter_general_ledger_lines(fiscal_year, account_number, start_date, end_date, after=after)
+            return streaming_response(
+                lines, stream_format, GENERAL_LEDGER_COLUMNS, filename=f'general_ledger_{fiscal_year.year}'
+            )
+        
+        if account_number and not start_date and not end_date:
+            archived = get_archived_report(fiscal_year, ArchivedReport.GENERAL_LEDGER, key=account_number)
+            if archived is not None:
+                return Response(archived)
+        
         general_ledger = generate_general_ledger(fiscal_year, account_number, start_date, end_date)
         return Response(general_ledger)
     
@@ -433,13 +707,24 @@ class AccountingReportViewSet(viewsets.ViewSet):
         
         if not fiscal_year_id:
             return Response({"error": "fiscal_year parameter is required"}, status=status.HTTP_400_BAD_REQUEST)
+        invalid = invalid_date_response(as_of_date)
+        if invalid is not None:
+            return invalid
         
         try:
             fiscal_year = FiscalYear.objects.get(pk=fiscal_year_id)
         except FiscalYear.DoesNotExist:
             return Response({"error": "Fiscal year not found"}, status=status.HTTP_404_NOT_FOUND)
         
-        income_statement = generate_income_statement(fiscal_year, as_of_date)
+        archived = get_archived_report(fiscal_year, ArchivedReport.INCOME_STATEMENT, as_of_date)
+        if archived is not None:
+            return Response(archived)
+        
+        income_statement = cached_report(
+            'income_statement', fiscal_year,
+            lambda: generate_income_statement(fiscal_year, as_of_date),
+            as_of_date=as_of_date
+        )
         return Response(income_statement)
     
     @action(detail=False, methods=['get'])
@@ -452,15 +737,52 @@ class AccountingReportViewSet(viewsets.ViewSet):
         
         if not fiscal_year_id:
             return Response({"error": "fiscal_year parameter is required"}, status=status.HTTP_400_BAD_REQUEST)
+        invalid = invalid_date_response(as_of_date)
+        if invalid is not None:
+            return invalid
         
         try:
             fiscal_year = FiscalYear.objects.get(pk=fiscal_year_id)
         except FiscalYear.DoesNotExist:
             return Response({"error": "Fiscal year not found"}, status=status.HTTP_404_NOT_FOUND)
         
-        balance_sheet = generate_balance_sheet(fiscal_year, as_of_date)
+        archived = get_archived_report(fiscal_year, ArchivedReport.BALANCE_SHEET, as_of_date)
+        if archived is not None:
+            return Response(archived)
+        
+        balance_sheet = cached_report(
+            'balance_sheet', fiscal_year,
+            lambda: generate_balance_sheet(fiscal_year, as_of_date),
+            as_of_date=as_of_date
+        )
         return Response(balance_sheet)
     
+    @action(detail=False, methods=['get'])
+    def financial_statements(self, request):
+        """Generate the income statement and the balance sheet from one balance pass."""
+        from accounting.utils.financial_statements import generate_financial_statements
+        
+        fiscal_year_id = request.query_params.get('fiscal_year')
+        as_of_date = request.query_params.get('as_of_date')
+        
+        if not fiscal_year_id:
+            return Response({"error": "fiscal_year parameter is required"}, status=status.HTTP_400_BAD_REQUEST)
+        invalid = invalid_date_response(as_of_date)
+        if invalid is not None:
+            return invalid
+        
+        try:
+            fiscal_year = FiscalYear.objects.get(pk=fiscal_year_id)
+        except FiscalYear.DoesNotExist:
+            return Response({"error": "Fiscal year not found"}, status=status.HTTP_404_NOT_FOUND)
+        
+        statements = cached_report(
+            'financial_statements', fiscal_year,
+            lambda: generate_financial_statements(fiscal_year, as_of_date),
+            as_of_date=as_of_date
+        )
+        return Response(statements)
+    
     @action(detail=False, methods=['get'])
     def account_balance(self, request):
         """Get the balance for a specific account."""
@@ -474,6 +796,9 @@ class AccountingReportViewSet(viewsets.ViewSet):
         
         if not account_number:
             return Response({"error": "account parameter is required"}, status=status.HTTP_400_BAD_REQUEST)
+        invalid = invalid_date_response(as_of_date)
+        if invalid is not None:
+            return invalid
         
         fiscal_year = None
         if fiscal_year_id:
@@ -487,7 +812,16 @@ class AccountingReportViewSet(viewsets.ViewSet):
         except GeneralLedgerAccount.DoesNotExist:
             return Response({"error": "Account not found"}, status=status.HTTP_404_NOT_FOUND)
         
-        balance = calculate_account_balance(account, fiscal_year, as_of_date, journal_code)
+        if fiscal_year:
+            balance = cached_report(
+                'account_balance', fiscal_year,
+                lambda: calculate_account_balance(account, fiscal_year, as_of_date, journal_code),
+                as_of_date=as_of_date,
+                params={'account': account_number, 'journal': journal_code}
+            )
+        else:
+            # Without a fiscal year the balance spans every ledger version
+            balance = calculate_account_balance(account, fiscal_year, as_of_date, journal_code)
         
         return Response({
             'account_number': account_number,
@@ -496,3 +830,321 @@ class AccountingReportViewSet(viewsets.ViewSet):
             'is_debit': balance > Decimal('0.00'),
             'formatted_balance': f"{abs(balance):,.2f} {'DR' if balance > Decimal('0.00') else 'CR'}"
         })
+    
+    @action(detail=False, methods=['get', 'post'])
+    def account_balances(self, request):
+        """
+        Stream the balances of many accounts, selected by number or prefix.
+        
+        Accounts are given as "accounts" (e.g. 401000,411000,6*): a comma separated
+        query parameter on GET, or a JSON list in the body on POST for long lists.
+        Optional filters: fiscal_year, as_of_date, journal, include_zero_balances.
+        Rows are streamed as NDJSON, or CSV with stream=csv.
+        """
+        from accounting.utils.financial_statements import ACCOUNT_BALANCE_COLUMNS, account_balance_rows
+        
+        params = request.data if request.method == 'POST' else request.query_params
+        if request.method == 'POST':
+            selectors = params.get('accounts') or []
+            if isinstance(selectors, str):
+                selectors = selectors.split(',')
+        else:
+            selectors = [
+                selector for value in request.query_params.getlist('accounts') for selector in value.split(',')
+            ]
+        fiscal_year_id = params.get('fiscal_year')
+        as_of_date = params.get('as_of_date')
+        journal_code = params.get('journal')
+        include_zero_balances = str(params.get('include_zero_balances', 'true')).lower() == 'true'
+        stream_format = request.query_params.get('stream', 'ndjson')
+        
+        if stream_format not in STREAM_FORMATS:
+            return Response(
+                {"error": f"stream must be one of: {', '.join(STREAM_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not isinstance(selectors, list) or not any(str(selector).strip() for selector in selectors):
+            return Response({"error": "accounts parameter is required"}, status=status.HTTP_400_BAD_REQUEST)
+        invalid = invalid_date_response(as_of_date)
+        if invalid is not None:
+            return invalid
+        
+        fiscal_year = None
+        if fiscal_year_id:
+            try:
+                fiscal_year = FiscalYear.objects.get(pk=fiscal_year_id)
+            except FiscalYear.DoesNotExist:
+                return Response({"error": "Fiscal year not found"}, status=status.HTTP_404_NOT_FOUND)
+        
+        rows = account_balance_rows(selectors, fiscal_year, as_of_date, journal_code, include_zero_balances)
+        return streaming_response(rows, stream_format, ACCOUNT_BALANCE_COLUMNS, filename='account_balances')
+    
+    @action(detail=False, methods=['get'])
+    def rollup(self, request):
+        """
+        Generate balances at every level of the chart of accounts.
+        
+        Query parameters: fiscal_year (required), as_of_date, journal,
+        depth (class, chapter, section or account), include_zero_balances, and
+        prefixes (e.g. 60,606,6061) to also get prefix sums from the prefix index.
+        """
+        from accounting.utils.rollup import ROLLUP_LEVELS, build_prefix_index, generate_rollup_balances
+        
+        fiscal_year_id = request.query_params.get('fiscal_year')
+        as_of_date = request.query_params.get('as_of_date')
+        journal_code = request.query_params.get('journal')
+        depth = request.query_params.get('depth', 'account')
+        include_zero_balances = request.query_params.get('include_zero_balances', 'false').lower() == 'true'
+        prefixes = [prefix for prefix in request.query_params.get('prefixes', '').split(',') if prefix.strip()]
+        
+        if not fiscal_year_id:
+            return Response({"error": "fiscal_year parameter is required"}, status=status.HTTP_400_BAD_REQUEST)
+        if depth not in ROLLUP_LEVELS:
+            return Response(
+                {"error": f"depth must be one of: {', '.join(ROLLUP_LEVELS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        invalid = invalid_date_response(as_of_date)
+        if invalid is not None:
+            return invalid
+        
+        try:
+            fiscal_year = FiscalYear.objects.get(pk=fiscal_year_id)
+        except FiscalYear.DoesNotExist:
+            return Response({"error": "Fiscal year not found"}, status=status.HTTP_404_NOT_FOUND)
+        
+        rollup = cached_report(
+            'rollup', fiscal_year,
+            lambda: generate_rollup_balances(fiscal_year, as_of_date, journal_code, depth, include_zero_balances),
+            as_of_date=as_of_date,
+            params={'journal': journal_code, 'depth': depth, 'include_zero_balances': include_zero_balances}
+        )
+        if prefixes:
+            index = cached_report(
+                'prefix_index', fiscal_year,
+                lambda: build_prefix_index(fiscal_year, as_of_date, journal_code),
+                as_of_date=as_of_date,
+                params={'journal': journal_code}
+            )
+            rollup = dict(rollup, prefix_sums=index.prefix_sums(prefix.strip() for prefix in prefixes))
+        return Response(rollup)
+    
+    @action(detail=False, methods=['get'])
+    def comparative(self, request):
+        """
+        Generate a trial balance or income statement over several periods at once.
+        
+        Query parameters: statement (trial_balance or income_statement), periods
+        (monthly, quarterly or yoy with fiscal_year, or explicit
+        "N=2024-01-01:2024-06-30,N-1=2023-01-01:2023-06-30"), journal, accounts
+        (numbers and prefixes, e.g. 6*,706000) and include_zero_balances. All
+        columns are computed by a single query and returned as an accounts x
+        periods matrix.
+        """
+        from accounting.utils.comparative import (
+            COMPARATIVE_STATEMENTS,
+            PERIOD_PRESETS,
+            build_periods,
+            generate_comparative_report,
+            parse_periods
+        )
+        
+        fiscal_year_id = request.query_params.get('fiscal_year')
+        statement = request.query_params.get('statement', 'trial_balance')
+        periods_spec = request.query_params.get('periods', 'monthly')
+        journal_code = request.query_params.get('journal')
+        accounts = [account for account in request.query_params.get('accounts', '').split(',') if account.strip()]
+        include_zero_balances = request.query_params.get('include_zero_balances', 'false').lower() == 'true'
+        
+        if statement not in COMPARATIVE_STATEMENTS:
+            return Response(
+                {"error": f"statement must be one of: {', '.join(COMPARATIVE_STATEMENTS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if periods_spec in PERIOD_PRESETS:
+            if not fiscal_year_id:
+                return Response(
+                    {"error": "fiscal_year parameter is required for period presets"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            try:
+                fiscal_year = FiscalYear.objects.get(pk=fiscal_year_id)
+            except FiscalYear.DoesNotExist:
+                return Response({"error": "Fiscal year not found"}, status=status.HTTP_404_NOT_FOUND)
+            periods = build_periods(fiscal_year, periods_spec)
+        else:
+            try:
+                periods = parse_periods(periods_spec)
+            except ValueError as exc:
+                return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        report = generate_comparative_report(periods, statement, journal_code, accounts, include_zero_balances)
+        return Response(report)
+    
+    @action(detail=False, methods=['get'])
+    def account_statement(self, request):
+        """
+        Stream the statement of an account with the running balance of every line.
+        
+        Query parameters: fiscal_year and account (required), start_date, end_date,
+        journal, carry_forward (true/false, defaults to true for balance sheet
+        accounts). Rows are streamed as NDJSON, or CSV with stream=csv: an opening
+        row, one row per line and a closing row.
+        """
+        from accounting.utils.account_statement import ACCOUNT_STATEMENT_COLUMNS, account_statement
+        
+        fiscal_year_id = request.query_params.get('fiscal_year')
+        account_number = request.query_params.get('account')
+        start_date = request.query_params.get('start_date')
+        end_date = request.query_params.get('end_date')
+        journal_code = request.query_params.get('journal')
+        carry_forward = request.query_params.get('carry_forward')
+        stream_format = request.query_params.get('stream', 'ndjson')
+        
+        if not fiscal_year_id or not account_number:
+            return Response(
+                {"error": "fiscal_year and account parameters are required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if stream_format not in STREAM_FORMATS:
+            return Response(
+                {"error": f"stream must be one of: {', '.join(STREAM_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        invalid = invalid_date_response(start_date, end_date)
+        if invalid is not None:
+            return invalid
+        if carry_forward is not None:
+            carry_forward = carry_forward.lower() == 'true'
+        
+        try:
+            fiscal_year = FiscalYear.objects.get(pk=fiscal_year_id)
+        except FiscalYear.DoesNotExist:
+            return Response({"error": "Fiscal year not found"}, status=status.HTTP_404_NOT_FOUND)
+        
+        try:
+            account = GeneralLedgerAccount.objects.get(account_number=account_number)
+        except GeneralLedgerAccount.DoesNotExist:
+            return Response({"error": "Account not found"}, status=status.HTTP_404_NOT_FOUND)
+        
+        rows = account_statement(account, fiscal_year, start_date, end_date, journal_code, carry_forward)
+        return streaming_response(
+            rows, stream_format, ACCOUNT_STATEMENT_COLUMNS,
+            filename=f'account_statement_{account.account_number}_{fiscal_year.year}'
+        )
+    
+    @action(detail=False, methods=['get'])
+    def auxiliary_balances(self, request):
+        """
+        Stream the sub-ledger balance and aging of every third party.
+        
+        Query parameters: fiscal_year, as_of_date (defaults to today), accounts
+        (numbers and prefixes, e.g. 401*), auxiliary_type (accounting type code),
+        buckets (aging bucket bounds in days, default 30,60,90) and
+        include_zero_balances. Rows are streamed as NDJSON, or CSV with stream=csv.
+        """
+        from accounting.utils.auxiliary_ledger import (
+            DEFAULT_AGING_BUCKETS,
+            auxiliary_balance_columns,
+            auxiliary_balance_rows
+        )
+        
+        fiscal_year_id = request.query_params.get('fiscal_year')
+        as_of_date = request.query_params.get('as_of_date')
+        accounts = [account for account in request.query_params.get('accounts', '').split(',') if account.strip()]
+        auxiliary_type = request.query_params.get('auxiliary_type')
+        include_zero_balances = request.query_params.get('include_zero_balances', 'false').lower() == 'true'
+        stream_format = request.query_params.get('stream', 'ndjson')
+        
+        if stream_format not in STREAM_FORMATS:
+            return Response(
+                {"error": f"stream must be one of: {', '.join(STREAM_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        invalid = invalid_date_response(as_of_date)
+        if invalid is not None:
+            return invalid
+        try:
+            buckets = tuple(
+                int(bucket) for bucket in request.query_params.get('buckets', '').split(',') if bucket.strip()
+            ) or DEFAULT_AGING_BUCKETS
+            if any(bucket <= 0 for bucket in buckets) or list(buckets) != sorted(set(buckets)):
+                raise ValueError
+        except ValueError:
+            return Response(
+                {"error": "buckets must be increasing positive numbers of days"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        fiscal_year = None
+        if fiscal_year_id:
+            try:
+                fiscal_year = FiscalYear.objects.get(pk=fiscal_year_id)
+            except FiscalYear.DoesNotExist:
+                return Response({"error": "Fiscal year not found"}, status=status.HTTP_404_NOT_FOUND)
+        
+        rows = auxiliary_balance_rows(
+            fiscal_year, as_of_date, accounts, auxiliary_type, buckets, include_zero_balances
+        )
+        return streaming_response(
+            rows, stream_format, auxiliary_balance_columns(buckets), filename='auxiliary_balances'
+        )
+    
+    @action(detail=False, methods=['get'])
+    def cube(self, request):
+        """
+        Pivot posted amounts over up to three analytical dimensions.
+        
+        Query parameters: dimensions (e.g. activity,municipality; among
+        analytical_code, activity, service_type, municipality, payer_type and
+        pricing_type), measure (net, debit or credit), fiscal_year and journal.
+        Returns the members of each dimension and a dense matrix of values.
+        """
+        from accounting.utils.analytics import CUBE_DIMENSIONS, CUBE_MEASURES, MAX_CUBE_DIMENSIONS, generate_cube
+        
+        dimensions = [
+            dimension.strip() for dimension in request.query_params.get('dimensions', '').split(',')
+            if dimension.strip()
+        ]
+        measure = request.query_params.get('measure', 'net')
+        fiscal_year_id = request.query_params.get('fiscal_year')
+        journal_code = request.query_params.get('journal')
+        
+        if not 1 <= len(dimensions) <= MAX_CUBE_DIMENSIONS or len(set(dimensions)) != len(dimensions) or any(
+            dimension not in CUBE_DIMENSIONS for dimension in dimensions
+        ):
+            return Response(
+                {"error": f"dimensions must be 1 to {MAX_CUBE_DIMENSIONS} distinct values among: "
+                          f"{', '.join(CUBE_DIMENSIONS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if measure not in CUBE_MEASURES:
+            return Response(
+                {"error": f"measure must be one of: {', '.join(CUBE_MEASURES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        fiscal_year = None
+        if fiscal_year_id:
+            try:
+                fiscal_year = FiscalYear.objects.get(pk=fiscal_year_id)
+            except FiscalYear.DoesNotExist:
+                return Response({"error": "Fiscal year not found"}, status=status.HTTP_404_NOT_FOUND)
+        
+        try:
+            if fiscal_year is None:
+                return Response(generate_cube(dimensions, measure, None, journal_code))
+            cube = cached_report(
+                'cube', fiscal_year,
+                lambda: generate_cube(dimensions, measure, fiscal_year, journal_code),
+                params={'dimensions': dimensions, 'measure': measure, 'journal': journal_code}
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(cube)
+    
+    @action(detail=False, methods=['get'])
+    def cache_stats(self, request):
+        """Get the hit/miss counters of the report cache."""
+        return Response(report_cache_stats())
@@ -210,6 +210,47 @@ REST_FRAMEWORK = {
 }
 
 
+# Cache
+# Les résultats des rapports comptables sont mis en cache dans l'alias 'accounting_reports',
+# indexés par la version du grand livre de l'exercice. Pour partager le cache entre
+# plusieurs processus, utiliser le backend fichier:
+#     'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+#     'LOCATION': BASE_DIR / 'cache' / 'accounting_reports',
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Partagé par tous les processus (python manage.py createcachetable)
+    'reference_data': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'accounting_reference_data_cache',
+    },
+    'accounting_reports': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'accounting-reports',
+        'TIMEOUT': 3600,
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+}
+
+# Alias du cache des rapports comptables (None pour désactiver le cache)
+ACCOUNTING_REPORT_CACHE = 'accounting_reports'
+
+# Agrégats analytiques matérialisés, mis à jour à la comptabilisation (cube analytique)
+ACCOUNTING_ANALYTICAL_AGGREGATES = False
+
+# Archives des rapports construites dans un thread en arrière-plan après la clôture
+# d'un exercice (administration, API); close_fiscal_year --pending, lancé par cron,
+# rattrape les constructions perdues
+ACCOUNTING_ARCHIVE_ON_CLOSE = True
+
+# Tables de référence gardées en mémoire: cache partagé portant leur tampon de version
+# entre processus (base de données ou fichier, pas de mémoire locale), et intervalle
+# (secondes) entre deux vérifications de ces tampons
+ACCOUNTING_REFERENCE_DATA_CACHE = 'reference_data'
+ACCOUNTING_REFERENCE_DATA_CHECK_INTERVAL = 5
+
+
 # Configuration JWT
 
 from datetime import timedelta